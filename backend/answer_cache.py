@@ -0,0 +1,374 @@
+"""Cache des réponses RAG: niveau exact (LRU) + niveau sémantique (embeddings)."""
+
+import copy
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MAX_ENTRIES = 2000  # Nombre max de réponses gardées en mémoire
+TTL_SECONDS = 24 * 3600  # Durée de vie d'une réponse en cache
+SEMANTIC_MAX_DISTANCE = 0.08  # Distance cosinus max (1 - similarité) pour réutiliser une réponse
+VERSION_CHECK_INTERVAL = 2.0  # Secondes entre deux relectures du fichier .version d'une collection
+
+# Collections ChromaDB dont dépend chaque valeur de "source"
+SOURCE_COLLECTIONS = {
+    "vikidia": ("cours_college",),
+    "mes_cours": ("mes_cours",),
+    "tous": ("cours_college", "mes_cours"),
+}
+PERSONAL_COLLECTION = "mes_cours"  # Remplacée par la collection de l'élève (voir owners.py)
+
+# (question normalisée, matiere, niveau, source, collection personnelle ou "")
+CacheKey = Tuple[str, str, str, str, str]
+
+
+def normalize_question(question: str) -> str:
+    """Normalise une question pour la clé exacte (casse, accents, espaces, ponctuation finale).
+
+    Args:
+        question: Question brute de l'élève.
+
+    Returns:
+        Question normalisée ("C'est quoi le Théorème ?" -> "c'est quoi le theoreme").
+    """
+    texte = unicodedata.normalize("NFKD", question.lower())
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    texte = texte.replace("’", "'")
+    texte = re.sub(r"\s+", " ", texte)
+    return texte.strip(" ?!.").strip()
+
+
+def _version_file(chroma_dir: Path, collection: str) -> Path:
+    return Path(chroma_dir) / f"{collection}.version"
+
+
+def bump_collections_version(chroma_dir, *collections: str) -> None:
+    """Signale qu'une ou plusieurs collections ChromaDB ont changé.
+
+    Écrit un horodatage dans <chroma_dir>/<collection>.version. Les AnswerCache
+    qui surveillent ce dossier (même dans un autre process, ex: ingest_chromadb)
+    invalident alors les réponses qui dépendent de ces collections.
+
+    Args:
+        chroma_dir: Dossier de persistance ChromaDB.
+        collections: Noms des collections modifiées.
+    """
+    Path(chroma_dir).mkdir(parents=True, exist_ok=True)
+    stamp = str(time.time_ns())
+    for collection in collections:
+        _version_file(chroma_dir, collection).write_text(stamp, encoding="utf-8")
+        logger.info(f"Version de la collection '{collection}' mise à jour")
+
+
+def read_collections_version(chroma_dir, collection: str) -> str:
+    """Retourne la version courante d'une collection ("" si jamais modifiée)."""
+    try:
+        return _version_file(chroma_dir, collection).read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+class AnswerCache:
+    """Cache à deux niveaux devant RAGChain.run.
+
+    - Niveau exact: clé (question normalisée, matiere, niveau, source,
+      collection personnelle), LRU.
+    - Niveau sémantique: même (matiere, niveau, source, collection
+      personnelle) et embedding de la question à moins de
+      `semantic_max_distance` (distance cosinus).
+
+    La collection personnelle est celle de l'élève qui pose la question
+    (owners.personal_collection_name) : deux élèves n'ont pas les mêmes
+    documents dans "mes_cours", ni donc les mêmes réponses.
+
+    Les deux niveaux partagent le même stockage, donc la même éviction par
+    taille (LRU) et par âge (TTL). Thread-safe (run() synchrone est appelé
+    depuis des threads).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        ttl_seconds: float = TTL_SECONDS,
+        semantic_max_distance: float = SEMANTIC_MAX_DISTANCE,
+        chroma_dir: Optional[str] = None,
+        version_check_interval: float = VERSION_CHECK_INTERVAL
+    ):
+        """Initialise le cache.
+
+        Args:
+            max_entries: Nombre max de réponses (au-delà: éviction LRU).
+            ttl_seconds: Durée de vie d'une réponse.
+            semantic_max_distance: Distance cosinus max pour le niveau sémantique
+                (0 désactive le niveau sémantique).
+            chroma_dir: Dossier ChromaDB à surveiller pour l'invalidation
+                (fichiers .version écrits par bump_collections_version).
+            version_check_interval: Secondes entre deux relectures du fichier
+                .version d'une collection (un changement est vu au plus tard
+                après ce délai ; 0 : relu à chaque requête).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_max_distance = semantic_max_distance
+        self.chroma_dir = chroma_dir
+        self.version_check_interval = version_check_interval
+
+        # clé -> (réponse, embedding normalisé ou None, date d'insertion)
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict, Optional[np.ndarray], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = self._read_versions()
+        self._versions_checked_at: Dict[str, float] = dict.fromkeys(self._versions, time.monotonic())
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        question: str,
+        matiere: Optional[str],
+        niveau: Optional[str],
+        source: str,
+        personal_collection: Optional[str] = None
+    ) -> CacheKey:
+        """Construit la clé exacte d'une requête.
+
+        La collection personnelle n'en fait partie que si la source en dépend
+        ("mes_cours", "tous") : les réponses Vikidia sont partagées par tous les élèves.
+        """
+        if PERSONAL_COLLECTION not in SOURCE_COLLECTIONS.get(source, ()):
+            personal_collection = ""
+        else:
+            personal_collection = personal_collection or PERSONAL_COLLECTION
+        return (normalize_question(question), matiere or "", niveau or "college", source, personal_collection)
+
+    def get_exact(
+        self,
+        question: str,
+        matiere: Optional[str],
+        niveau: Optional[str],
+        source: str,
+        personal_collection: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Cherche une réponse pour la même question normalisée (sans embedding).
+
+        Returns:
+            Copie de la réponse en cache, ou None (le miss n'est compté que
+            par get_similar, appelé ensuite avec l'embedding).
+        """
+        key = self.make_key(question, matiere, niveau, source, personal_collection)
+        with self._lock:
+            self._check_versions(_key_collections(key))
+            entry = self._get_entry(key)
+            if entry is None:
+                return None
+            self.exact_hits += 1
+            return copy.deepcopy(entry[0])
+
+    def get_similar(
+        self,
+        question: str,
+        question_embedding: Sequence[float],
+        matiere: Optional[str],
+        niveau: Optional[str],
+        source: str,
+        personal_collection: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Cherche une réponse exacte puis sémantiquement proche.
+
+        Args:
+            question: Question de l'élève.
+            question_embedding: Embedding de la question.
+            matiere: Matière de la requête.
+            niveau: Niveau de la requête.
+            source: Source de la requête.
+            personal_collection: Collection "mes_cours" de l'élève (défaut: partagée).
+
+        Returns:
+            Copie de la réponse en cache, ou None (compté comme miss).
+        """
+        key = self.make_key(question, matiere, niveau, source, personal_collection)
+        with self._lock:
+            self._check_versions(_key_collections(key))
+            entry = self._get_entry(key)
+            if entry is not None:
+                self.exact_hits += 1
+                return copy.deepcopy(entry[0])
+
+            if self.semantic_max_distance > 0:
+                match = self._nearest(key, _normalize_vector(question_embedding))
+                if match is not None:
+                    self.semantic_hits += 1
+                    self._entries.move_to_end(match)
+                    logger.info(f"Cache sémantique: '{key[0]}' ~ '{match[0]}'")
+                    return copy.deepcopy(self._entries[match][0])
+
+            self.misses += 1
+            return None
+
+    def set(
+        self,
+        question: str,
+        matiere: Optional[str],
+        niveau: Optional[str],
+        source: str,
+        result: Dict,
+        question_embedding: Optional[Sequence[float]] = None,
+        personal_collection: Optional[str] = None
+    ) -> None:
+        """Enregistre une réponse (et l'embedding de la question pour le niveau sémantique)."""
+        key = self.make_key(question, matiere, niveau, source, personal_collection)
+        vector = _normalize_vector(question_embedding) if question_embedding is not None else None
+        with self._lock:
+            # Version de référence d'une collection pas encore vue (sans invalider)
+            if self.chroma_dir:
+                for collection in _key_collections(key):
+                    if collection not in self._versions:
+                        self._versions[collection] = read_collections_version(self.chroma_dir, collection)
+                        self._versions_checked_at[collection] = time.monotonic()
+            self._entries[key] = (copy.deepcopy(result), vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, source: Optional[str] = None, personal_collection: Optional[str] = None) -> None:
+        """Vide le cache (entièrement, ou seulement les réponses dépendant d'une source).
+
+        Args:
+            source: "vikidia", "mes_cours"... ou None pour tout vider.
+            personal_collection: Collection "mes_cours" visée (défaut: partagée).
+        """
+        with self._lock:
+            if source is None:
+                self._drop(lambda key: True)
+            else:
+                collections = _source_collections(source, personal_collection or PERSONAL_COLLECTION)
+                self._drop(lambda key: bool(collections & _key_collections(key)))
+
+    def stats(self) -> Dict[str, float]:
+        """Compteurs de hits/misses et taux de succès."""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Méthodes internes (appelées avec self._lock acquis)
+
+    def _get_entry(self, key: CacheKey) -> Optional[Tuple[Dict, Optional[np.ndarray], float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._is_expired(entry):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _is_expired(self, entry: Tuple[Dict, Optional[np.ndarray], float]) -> bool:
+        return time.monotonic() - entry[2] > self.ttl_seconds
+
+    def _nearest(self, key: CacheKey, vector: np.ndarray) -> Optional[CacheKey]:
+        """Clé de la question la plus proche dans la même partition (matiere, niveau, source, collection)."""
+        partition = key[1:]
+        candidates: List[CacheKey] = []
+        vectors: List[np.ndarray] = []
+        expired: List[CacheKey] = []
+        for other_key, entry in self._entries.items():
+            if other_key[1:] != partition or entry[1] is None:
+                continue
+            if self._is_expired(entry):
+                expired.append(other_key)
+                continue
+            candidates.append(other_key)
+            vectors.append(entry[1])
+        for other_key in expired:
+            del self._entries[other_key]
+
+        if not candidates:
+            return None
+
+        similarities = np.stack(vectors) @ vector
+        best = int(np.argmax(similarities))
+        if 1.0 - float(similarities[best]) <= self.semantic_max_distance:
+            return candidates[best]
+        return None
+
+    def _read_versions(self) -> Dict[str, str]:
+        if not self.chroma_dir:
+            return {}
+        collections = {c for cols in SOURCE_COLLECTIONS.values() for c in cols}
+        return {c: read_collections_version(self.chroma_dir, c) for c in collections}
+
+    def _check_versions(self, collections: Set[str]) -> None:
+        """Invalide les réponses dont une de ces collections a changé depuis la dernière lecture.
+
+        Seules les collections de la requête en cours sont relues : une par
+        élève pour "mes_cours", il y en a autant que d'élèves. Chaque fichier
+        .version est relu au plus une fois par `version_check_interval` :
+        get_exact/get_similar sont appelés depuis la boucle d'événements
+        (arun, astream), un accès disque par requête la bloquerait.
+        """
+        if not self.chroma_dir:
+            return
+        now = time.monotonic()
+        changed = set()
+        for collection in collections:
+            checked_at = self._versions_checked_at.get(collection)
+            if checked_at is not None and now - checked_at < self.version_check_interval:
+                continue
+            self._versions_checked_at[collection] = now
+            version = read_collections_version(self.chroma_dir, collection)
+            if version != self._versions.setdefault(collection, version):
+                self._versions[collection] = version
+                changed.add(collection)
+        if not changed:
+            return
+        logger.info(f"Collections modifiées {sorted(changed)}: invalidation du cache de réponses")
+        self._drop(lambda key: bool(changed & _key_collections(key)))
+
+    def _drop(self, predicate) -> None:
+        """Supprime les réponses dont la clé vérifie `predicate` (compté s'il y en a)."""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        if keys:
+            self.invalidations += 1
+
+
+def _source_collections(source: str, personal_collection: str) -> Set[str]:
+    """Collections dont dépend une source, "mes_cours" remplacée par la collection de l'élève."""
+    return {
+        personal_collection if collection == PERSONAL_COLLECTION else collection
+        for collection in SOURCE_COLLECTIONS.get(source, ())
+    }
+
+
+def _key_collections(key: CacheKey) -> Set[str]:
+    return _source_collections(key[3], key[4])
+
+
+def _normalize_vector(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
@@ -0,0 +1,231 @@
+"""Cache persistant (SQLite) des embeddings, partagé par RAGChain, PDFService et l'ingestion."""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_CACHE_PATH = Path(__file__).parent.parent / "data" / "cache" / "embeddings.sqlite3"
+SQLITE_BATCH = 500  # Nombre max de clés par requête SQL (limite de variables SQLite)
+EMBEDDING_CACHE_MAX_ROWS = 200_000  # ~1,2 Go en 1536 dimensions ; au-delà, les moins utilisés sont retirés
+PRUNE_TARGET = 0.9  # Après un nettoyage, la base garde 90% de max_rows
+USED_AT_RESOLUTION = 24 * 3600  # Date de dernière utilisation rafraîchie au plus une fois par jour
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Clé de cache d'un texte: hash SHA-256 du modèle et du texte."""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Stockage clé -> vecteur (float32) dans une base SQLite.
+
+    Thread-safe; plusieurs process (API + ingestion) peuvent partager le
+    même fichier grâce au mode WAL. La base est bornée à `max_rows`
+    vecteurs: au-delà, les moins récemment utilisés sont retirés.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_rows: Optional[int] = EMBEDDING_CACHE_MAX_ROWS):
+        """Ouvre (ou crée) la base SQLite.
+
+        Args:
+            path: Chemin du fichier SQLite.
+            max_rows: Nombre max de vecteurs gardés (None: pas de limite).
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "used_at" not in columns:
+            # Base créée avant la limite de taille: vecteurs considérés comme les plus anciens
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN used_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used_at ON embeddings (used_at)")
+        self._conn.commit()
+        # Estimation du nombre de lignes (les remplacements sont comptés comme des ajouts)
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Retourne les vecteurs connus parmi `keys` (les clés absentes sont omises)."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        stale = []
+        with self._lock:
+            for i in range(0, len(keys), SQLITE_BATCH):
+                batch = keys[i:i + SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, used_at FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                for key, blob, used_at in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                    if now - used_at > USED_AT_RESOLUTION:
+                        stale.append((now, key))
+            if stale:
+                self._conn.executemany("UPDATE embeddings SET used_at = ? WHERE key = ?", stale)
+                self._conn.commit()
+        return found
+
+    def set_many(self, items: Dict[str, List[float]]) -> None:
+        """Enregistre des vecteurs (écrase les clés existantes)."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, used_at) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._rows += len(rows)
+            if self.max_rows is not None and self._rows > self.max_rows:
+                self._prune(int(self.max_rows * PRUNE_TARGET))
+
+    def prune(self, max_rows: int) -> int:
+        """Retire les vecteurs les moins récemment utilisés au-delà de `max_rows`.
+
+        Returns:
+            Nombre de vecteurs retirés.
+        """
+        with self._lock:
+            return self._prune(max_rows)
+
+    def _prune(self, max_rows: int) -> int:
+        """Voir prune (appelé sous le verrou)."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        removed = max(0, count - max_rows)
+        if removed:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY used_at LIMIT ?)",
+                (removed,)
+            )
+            self._conn.commit()
+            logger.info(f"Cache d'embeddings: {removed} vecteurs retirés ({max_rows} gardés)")
+        self._rows = count - removed
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings LangChain avec cache persistant devant un modèle sous-jacent.
+
+    Seuls les textes absents du cache sont envoyés à l'API (une seule fois
+    même s'ils apparaissent plusieurs fois dans le lot).
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, store: EmbeddingStore):
+        """Initialise le wrapper.
+
+        Args:
+            underlying: Embeddings réels (ex: OpenAIEmbeddings).
+            model: Nom du modèle (fait partie de la clé de cache).
+            store: Stockage persistant des vecteurs.
+        """
+        self.underlying = underlying
+        self.model = model
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            computed = self.underlying.embed_documents(list(missing.values()))
+            self._remember(missing, computed, vectors)
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, vectors, missing = self._lookup([text])
+        if missing:
+            self._remember(missing, [self.underlying.embed_query(text)], vectors)
+        return vectors[keys[0]]
+
+    # Versions async: la base SQLite est lue et écrite dans un thread, pour
+    # ne pas bloquer la boucle d'événements (verrou, disque)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            computed = await self.underlying.aembed_documents(list(missing.values()))
+            await asyncio.to_thread(self._remember, missing, computed, vectors)
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, [text])
+        if missing:
+            computed = [await self.underlying.aembed_query(text)]
+            await asyncio.to_thread(self._remember, missing, computed, vectors)
+        return vectors[keys[0]]
+
+    def _lookup(self, texts: List[str]):
+        """Retourne (clés, vecteurs trouvés, {clé: texte} à calculer)."""
+        keys = [embedding_key(self.model, text) for text in texts]
+        vectors = self.store.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        return keys, vectors, missing
+
+    def _remember(self, missing: Dict[str, str], computed: List[List[float]], vectors: Dict) -> None:
+        new_vectors = dict(zip(missing.keys(), computed))
+        self.store.set_many(new_vectors)
+        vectors.update(new_vectors)
+
+
+_shared_embeddings: Dict[tuple, CachedEmbeddings] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_embeddings(
+    model: str = EMBEDDING_MODEL,
+    cache_path: Optional[Path] = None
+) -> CachedEmbeddings:
+    """Retourne l'instance d'embeddings (OpenAI + cache SQLite) partagée du process.
+
+    Args:
+        model: Modèle d'embedding OpenAI.
+        cache_path: Fichier SQLite du cache (défaut: data/cache/embeddings.sqlite3).
+
+    Returns:
+        CachedEmbeddings partagé par tous les services qui utilisent ce modèle.
+    """
+    cache_path = Path(cache_path or EMBEDDING_CACHE_PATH)
+    key = (model, str(cache_path.resolve()))
+    with _shared_lock:
+        if key not in _shared_embeddings:
+            logger.info(f"Initialisation embeddings: {model} (cache: {cache_path})")
+            _shared_embeddings[key] = CachedEmbeddings(
+                OpenAIEmbeddings(model=model),
+                model=model,
+                store=EmbeddingStore(cache_path)
+            )
+        return _shared_embeddings[key]
@@ -0,0 +1,217 @@
+"""Embedding concurrent par lots pour l'ingestion ChromaDB.
+
+- Lots dimensionnés par nombre de tokens estimé (et non par nombre de documents).
+- Plusieurs appels d'embedding en vol (threads), bornés par `max_in_flight`.
+- Débit borné par un budget de tokens par minute (TPM) partagé.
+- Nouvelle tentative avec backoff exponentiel sur les erreurs de rate limit
+  (HTTP 429), en respectant le Retry-After s'il est fourni.
+- Un seul écrivain : les lots embeddés sont écrits dans ChromaDB par le thread
+  appelant, au fil de leur arrivée.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CHARS_PER_TOKEN = 4  # estimation moyenne pour du français
+BATCH_MAX_TOKENS = 20_000  # tokens estimés par appel d'embedding
+BATCH_MAX_DOCS = 256  # textes par appel (limite OpenAI: 2048)
+MAX_IN_FLIGHT = 4  # appels d'embedding simultanés
+TOKENS_PER_MINUTE = 1_000_000  # budget TPM (text-embedding-3-small, tier 1)
+MAX_RETRIES = 6  # nouvelles tentatives par lot sur rate limit
+BACKOFF_BASE = 1.0  # secondes, doublé à chaque tentative
+BACKOFF_MAX = 60.0
+
+Item = Tuple[str, dict]  # (id du chunk, chunk {"text", "metadata"})
+
+
+def estimate_tokens(text: str) -> int:
+    """Nombre de tokens estimé d'un texte."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def make_batches(
+    items: Iterable[Item],
+    max_tokens: int = BATCH_MAX_TOKENS,
+    max_docs: int = BATCH_MAX_DOCS,
+) -> Iterator[List[Item]]:
+    """Regroupe les chunks en lots d'au plus `max_tokens` tokens estimés et `max_docs` textes.
+
+    Les lots sont produits au fil de l'itération (`items` peut être un
+    générateur). Un chunk plus gros que `max_tokens` forme un lot à lui seul.
+    """
+    batch: List[Item] = []
+    batch_tokens = 0
+    for item in items:
+        tokens = estimate_tokens(item[1]["text"])
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_docs):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def is_rate_limit(error: Exception) -> bool:
+    """True si l'erreur est un rate limit de l'API (openai.RateLimitError ou HTTP 429)."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Délai Retry-After (secondes) renvoyé avec l'erreur, s'il existe."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBudget:
+    """Budget de tokens par minute partagé par les threads (token bucket)."""
+
+    def __init__(self, tokens_per_minute: int = TOKENS_PER_MINUTE):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self._tokens = float(tokens_per_minute)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """Attend que `tokens` soient disponibles et les consomme.
+
+        Une demande plus grande que le budget attend que le seau soit plein.
+        """
+        needed = min(tokens, self.capacity)
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    time.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= needed:
+                    self._tokens -= needed
+                    return
+                time.sleep((needed - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Suspend toutes les acquisitions pendant `seconds` (rate limit reçu)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+class EmbeddingPipeline:
+    """Embedde des lots en parallèle et les remet à un écrivain unique."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+    ):
+        """Initialise le pipeline.
+
+        Args:
+            embeddings: Embeddings LangChain (ex: CachedEmbeddings partagé).
+            max_in_flight: Appels d'embedding simultanés max.
+            tokens_per_minute: Budget de tokens estimés envoyés par minute.
+            max_retries: Nouvelles tentatives par lot sur rate limit.
+            backoff_base: Premier délai de backoff (secondes).
+        """
+        self.embeddings = embeddings
+        self.max_in_flight = max(1, max_in_flight)
+        self.budget = TokenBudget(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.retries = 0
+
+    def run(
+        self,
+        batches: Iterable[List[Item]],
+        write: Callable[[List[Item], List[List[float]]], None],
+        total: Optional[int] = None,
+    ) -> int:
+        """Embedde les lots et appelle `write(lot, vecteurs)` dans le thread appelant.
+
+        Au plus `max_in_flight` lots sont en cours à la fois (les suivants ne
+        sont lus qu'ensuite : `batches` peut être un générateur) ; les lots
+        sont écrits dans leur ordre d'arrivée.
+
+        Args:
+            batches: Lots de (id, chunk).
+            write: Écrivain appelé pour chaque lot embeddé.
+            total: Nombre total de chunks, pour l'affichage de la progression.
+
+        Returns:
+            Nombre de chunks écrits.
+        """
+        written = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            pending = set()
+
+            def drain(until: int) -> None:
+                nonlocal pending, written
+                while len(pending) > until:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch, vectors = future.result()
+                        write(batch, vectors)
+                        written += len(batch)
+                        if total:
+                            logger.info(
+                                f"[PROGRESSION] {written}/{total} documents ingérés ({100 * written // total}%)"
+                            )
+                        else:
+                            logger.info(f"[PROGRESSION] {written} documents ingérés")
+
+            try:
+                for batch in batches:
+                    drain(self.max_in_flight - 1)
+                    pending.add(pool.submit(self._embed, batch))
+                drain(0)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+        return written
+
+    def _embed(self, batch: List[Item]) -> Tuple[List[Item], List[List[float]]]:
+        """Embedde un lot (budget TPM + backoff sur rate limit)."""
+        texts = [chunk["text"] for _, chunk in batch]
+        self.budget.acquire(sum(estimate_tokens(text) for text in texts))
+        attempt = 0
+        while True:
+            try:
+                return batch, self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit(e) or attempt >= self.max_retries:
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(BACKOFF_MAX, self.backoff_base * 2 ** attempt)
+                    delay *= 0.5 + random.random() / 2  # jitter : les threads ne repartent pas ensemble
+                self.retries += 1
+                logger.warning(
+                    f"Rate limit embeddings (tentative {attempt + 1}), pause de {delay:.1f}s"
+                )
+                # Tous les appels en vol attendent : inutile de saturer l'API
+                self.budget.pause(delay)
+                self.budget.acquire(0)
+                attempt += 1
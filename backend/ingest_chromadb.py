@@ -1,16 +1,40 @@
 """
 Script d'ingestion des chunks dans ChromaDB.
 Charge tous les chunks depuis data/processed/ et les stocke dans ChromaDB avec embeddings OpenAI.
+
+Ingestion incrémentale : chaque chunk a un id déterministe (hash de l'url, de
+chunk_index et du texte). Seuls les chunks nouveaux ou modifiés sont embeddés
+(upsert) et ceux qui ont disparu de data/processed/ sont supprimés.
+
+Usage:
+    python backend/ingest_chromadb.py [--matiere MATIERE] [--dry-run]
 """
-import json
+import argparse
+import hashlib
 import logging
+import sys
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, Optional
 
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
+
+from answer_cache import bump_collections_version
+from embedding_cache import EmbeddingStore, embedding_key, get_shared_embeddings
+from embedding_pipeline import (
+    BATCH_MAX_TOKENS,
+    CHARS_PER_TOKEN,
+    MAX_IN_FLIGHT,
+    TOKENS_PER_MINUTE,
+    EmbeddingPipeline,
+    Item,
+    make_batches,
+)
+from lesson_catalog import build_and_save_catalog
+
+# Le format des fichiers de chunks est défini par le scraper
+sys.path.append(str(Path(__file__).parent.parent))
+from scraper.chunk_store import fichier_chunks, lire_chunks  # noqa: E402
 
 # Configuration logging
 logging.basicConfig(
@@ -31,60 +55,222 @@ CHROMADB_DIR = PROJECT_ROOT / "chromadb"
 # Configuration ChromaDB
 COLLECTION_NAME = "cours_college"
 EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_PRICE_PER_MTOK = 0.02  # USD par million de tokens (text-embedding-3-small)
+ID_SCAN_BATCH = 5000  # ids lus par appel lors du parcours de la collection
+DELETE_BATCH = 5000  # ids supprimés par appel
+COST_LOOKUP_BATCH = 500  # textes vérifiés par requête au cache d'embeddings
+
+
+def chunk_id(chunk: dict) -> str:
+    """Id déterministe d'un chunk : SHA-256 de l'url, de chunk_index et du texte.
 
+    Un chunk inchangé garde le même id d'une ingestion à l'autre ; un texte
+    modifié donne un nouvel id (l'ancien disparaît au prochain passage).
+    """
+    metadata = chunk.get("metadata", {})
+    source = metadata.get("url") or f"{metadata.get('source', '')}/{metadata.get('titre', '')}"
+    key = f"{source}|{metadata.get('chunk_index', 0)}|{chunk['text']}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-def load_chunks_from_matiere(matiere_dir: Path) -> List[dict]:
-    """Charge les chunks d'une matière depuis le fichier chunks.json."""
-    chunks_file = matiere_dir / "chunks.json"
 
-    if not chunks_file.exists():
-        logger.warning(f"Fichier chunks.json introuvable pour {matiere_dir.name}")
-        return []
+def load_chunks_from_matiere(matiere_dir: Path) -> Iterator[dict]:
+    """Lit les chunks d'une matière (chunks.jsonl[.zst], ou ancien chunks.json) un par un."""
+    chunks_file = fichier_chunks(matiere_dir)
 
-    with open(chunks_file, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
+    if chunks_file is None:
+        logger.warning(f"Fichier de chunks introuvable pour {matiere_dir.name}")
+        return
 
-    logger.info(f"Chargé {len(chunks)} chunks depuis {matiere_dir.name}")
-    return chunks
+    count = 0
+    for chunk in lire_chunks(chunks_file):
+        count += 1
+        yield chunk
 
+    logger.info(f"Lu {count} chunks depuis {matiere_dir.name}/{chunks_file.name}")
 
-def load_all_chunks() -> List[dict]:
-    """Charge tous les chunks de toutes les matières."""
-    all_chunks = []
 
+def load_all_chunks() -> Iterator[dict]:
+    """Lit les chunks de toutes les matières, un par un."""
     if not PROCESSED_DIR.exists():
         logger.error(f"Répertoire {PROCESSED_DIR} introuvable")
-        return []
+        return
 
-    for matiere_dir in PROCESSED_DIR.iterdir():
+    for matiere_dir in sorted(PROCESSED_DIR.iterdir()):
         if matiere_dir.is_dir():
-            chunks = load_chunks_from_matiere(matiere_dir)
-            all_chunks.extend(chunks)
+            yield from load_chunks_from_matiere(matiere_dir)
 
-    logger.info(f"Total: {len(all_chunks)} chunks chargés")
-    return all_chunks
 
+def existing_ids(collection, matiere: Optional[str] = None) -> set:
+    """Ids présents dans la collection (limités à une matière si précisée)."""
+    ids = set()
+    where = {"matiere": matiere} if matiere else None
+    offset = 0
+    while True:
+        page = collection.get(include=[], where=where, limit=ID_SCAN_BATCH, offset=offset)
+        ids.update(page["ids"])
+        if len(page["ids"]) < ID_SCAN_BATCH:
+            return ids
+        offset += ID_SCAN_BATCH
 
-def chunks_to_documents(chunks: List[dict]) -> List[Document]:
-    """Convertit les chunks au format LangChain Document."""
-    documents = []
 
+def iter_items(chunks: Iterable[dict], ids: Optional[set] = None) -> Iterator[Item]:
+    """(id, chunk) sans doublons, limités à `ids` si précisés."""
+    seen = set()
     for chunk in chunks:
-        doc = Document(
-            page_content=chunk["text"],
-            metadata=chunk["metadata"]
-        )
-        documents.append(doc)
+        cid = chunk_id(chunk)
+        if cid in seen or (ids is not None and cid not in ids):
+            continue
+        seen.add(cid)  # doublons éventuels dans les fichiers de chunks
+        yield cid, chunk
+
+
+def plan_ingestion(collection, chunks: Iterable[dict], matiere: Optional[str] = None) -> Dict:
+    """Compare les chunks à la collection (seuls les ids sont gardés en mémoire).
+
+    Args:
+        collection: Collection ChromaDB.
+        chunks: Chunks de data/processed/ (tous, ou ceux de `matiere`).
+        matiere: Si précisée, seuls les chunks de cette matière peuvent être supprimés.
+
+    Returns:
+        {"to_add": {ids}, "to_delete": [ids], "unchanged": int}
+    """
+    wanted = {cid for cid, _ in iter_items(chunks)}
+    present = existing_ids(collection, matiere)
+    return {
+        "to_add": wanted - present,
+        "to_delete": sorted(present - wanted),
+        "unchanged": len(wanted & present),
+    }
+
+
+def estimate_cost(chunks: Iterable[dict], store: Optional[EmbeddingStore] = None) -> Dict:
+    """Estime le coût des embeddings à calculer pour `chunks`.
+
+    Les textes déjà présents dans le cache persistant d'embeddings (ou déjà
+    vus plus haut dans `chunks`) ne repassent pas par l'API et ne sont pas comptés.
+
+    Returns:
+        {"embeddings", "cached", "api_calls", "tokens", "cost_usd"}
+    """
+    seen = set()
+    window: Dict[str, int] = {}  # clé -> longueur du texte, en attente de vérification
+    stats = {"embeddings": 0, "api_calls": 0, "chars": 0}
+
+    def check_window():
+        found = store.get_many(window) if store is not None else {}
+        for key, length in window.items():
+            if key not in found:
+                stats["api_calls"] += 1
+                stats["chars"] += length
+        window.clear()
 
-    return documents
+    for chunk in chunks:
+        stats["embeddings"] += 1
+        key = embedding_key(EMBEDDING_MODEL, chunk["text"])
+        if key in seen:
+            continue
+        seen.add(key)
+        window[key] = len(chunk["text"])
+        if len(window) >= COST_LOOKUP_BATCH:
+            check_window()
+    check_window()
+
+    tokens = stats["chars"] // CHARS_PER_TOKEN
+    return {
+        "embeddings": stats["embeddings"],
+        "cached": stats["embeddings"] - stats["api_calls"],
+        "api_calls": stats["api_calls"],
+        "tokens": tokens,
+        "cost_usd": tokens * EMBEDDING_PRICE_PER_MTOK / 1_000_000,
+    }
+
+
+def log_plan(plan: Dict, cost: Dict) -> None:
+    logger.info(
+        f"Plan: {len(plan['to_add'])} chunks à ajouter, {len(plan['to_delete'])} à supprimer, "
+        f"{plan['unchanged']} inchangés"
+    )
+    logger.info(
+        f"Embeddings: {cost['api_calls']} via l'API ({cost['cached']} en cache), "
+        f"~{cost['tokens']} tokens, ~{cost['cost_usd']:.4f} $"
+    )
 
 
-def ingest_to_chromadb(documents: List[Document], batch_size: int = 100):
-    """Ingère les documents dans ChromaDB avec embeddings OpenAI."""
+def apply_plan(
+    collection,
+    embeddings,
+    plan: Dict,
+    items: Iterable[Item],
+    batch_tokens: int = BATCH_MAX_TOKENS,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    tokens_per_minute: int = TOKENS_PER_MINUTE,
+) -> None:
+    """Supprime les chunks disparus puis upsert les chunks nouveaux ou modifiés.
+
+    Les embeddings sont calculés par lots en parallèle (voir embedding_pipeline) ;
+    les écritures ChromaDB restent faites par ce seul thread.
+
+    Args:
+        collection: Collection ChromaDB.
+        embeddings: Embeddings utilisés pour les nouveaux chunks.
+        plan: Résultat de plan_ingestion.
+        items: (id, chunk) à ajouter, lus au fil de l'eau (voir iter_items).
+    """
+    to_delete = plan["to_delete"]
+    for i in range(0, len(to_delete), DELETE_BATCH):
+        collection.delete(ids=to_delete[i:i + DELETE_BATCH])
+    if to_delete:
+        logger.info(f"Supprimé {len(to_delete)} chunks obsolètes")
+
+    def write(batch, vectors):
+        collection.upsert(
+            ids=[cid for cid, _ in batch],
+            embeddings=vectors,
+            documents=[chunk["text"] for _, chunk in batch],
+            metadatas=[chunk["metadata"] for _, chunk in batch],
+        )
 
-    # Initialiser les embeddings OpenAI
-    logger.info(f"Initialisation embeddings: {EMBEDDING_MODEL}")
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    total = len(plan["to_add"])
+    logger.info(
+        f"Ingestion de {total} documents par lots de ≤{batch_tokens} tokens "
+        f"({max_in_flight} en parallèle)"
+    )
+    pipeline = EmbeddingPipeline(embeddings, max_in_flight, tokens_per_minute)
+    pipeline.run(make_batches(items, max_tokens=batch_tokens), write, total=total)
+    if pipeline.retries:
+        logger.info(f"Rate limit: {pipeline.retries} nouvelles tentatives")
+
+
+def ingest_to_chromadb(
+    chunk_source: Callable[[], Iterable[dict]],
+    matiere: Optional[str] = None,
+    dry_run: bool = False,
+    batch_tokens: int = BATCH_MAX_TOKENS,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    tokens_per_minute: int = TOKENS_PER_MINUTE,
+):
+    """Synchronise la collection ChromaDB avec les chunks (embeddings OpenAI).
+
+    Les chunks sont relus à chaque passe (plan, coût, ingestion) au lieu
+    d'être gardés en mémoire.
+
+    Args:
+        chunk_source: Fonction qui renvoie un nouvel itérable des chunks à
+            ingérer (ex: load_all_chunks).
+        matiere: Limite les suppressions à cette matière (ingestion partielle).
+        dry_run: N'affiche que le plan et le coût estimé, sans rien modifier.
+        batch_tokens: Tokens estimés max par appel d'embedding.
+        max_in_flight: Appels d'embedding simultanés max.
+        tokens_per_minute: Budget de tokens par minute envoyés à l'API.
+
+    Returns:
+        Le plan appliqué (voir plan_ingestion).
+    """
+
+    # Initialiser les embeddings OpenAI (avec cache persistant : une ré-ingestion
+    # des mêmes chunks ne repasse pas par l'API)
+    embeddings = get_shared_embeddings(EMBEDDING_MODEL)
 
     # Créer/charger ChromaDB avec persistance
     logger.info(f"Initialisation ChromaDB: {CHROMADB_DIR}")
@@ -95,42 +281,95 @@ def ingest_to_chromadb(documents: List[Document], batch_size: int = 100):
         embedding_function=embeddings,
         persist_directory=str(CHROMADB_DIR)
     )
+    collection = vector_store._collection
 
-    # Ajouter les documents par batch pour éviter les timeout
-    total = len(documents)
-    logger.info(f"Ingestion de {total} documents par batch de {batch_size}")
-
-    for i in range(0, total, batch_size):
-        batch = documents[i:i+batch_size]
-        vector_store.add_documents(documents=batch)
-        logger.info(f"[PROGRESSION] {min(i+batch_size, total)}/{total} documents ingérés ({100*min(i+batch_size, total)//total}%)")
+    plan = plan_ingestion(collection, chunk_source(), matiere)
+    to_add = (chunk for _, chunk in iter_items(chunk_source(), plan["to_add"]))
+    log_plan(plan, estimate_cost(to_add, getattr(embeddings, "store", None)))
+    if dry_run:
+        logger.info("Dry-run: aucune modification")
+        return plan
+    if not plan["to_add"] and not plan["to_delete"]:
+        logger.info("✅ Collection déjà à jour")
+        return plan
+
+    apply_plan(
+        collection,
+        embeddings,
+        plan,
+        iter_items(chunk_source(), plan["to_add"]),
+        batch_tokens,
+        max_in_flight,
+        tokens_per_minute,
+    )
 
-    logger.info(f"✅ Ingestion terminée: {total} documents dans ChromaDB")
+    logger.info(f"✅ Ingestion terminée: {len(plan['to_add'])} documents ajoutés dans ChromaDB")
+    logger.info(f"Cache embeddings: {embeddings.hits} hits, {embeddings.misses} calculés via l'API")
 
     # Vérification
-    collection = vector_store._collection
     count = collection.count()
     logger.info(f"Vérification: {count} documents dans la collection '{COLLECTION_NAME}'")
 
-    return vector_store
+    # Invalider les réponses en cache de l'API (même si elle tourne dans un autre process)
+    bump_collections_version(CHROMADB_DIR, COLLECTION_NAME)
+
+    # Catalogue des leçons pour la bibliothèque (chargé par l'API au démarrage)
+    catalog = build_and_save_catalog(collection, CHROMADB_DIR, COLLECTION_NAME)
+    logger.info(f"Catalogue des leçons: {len(catalog)} leçons")
+
+    return plan
 
 
 def main():
     """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Ingestion incrémentale des chunks dans ChromaDB")
+    parser.add_argument("--matiere", help="N'ingérer que cette matière (data/processed/<matiere>)")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Afficher le nombre d'embeddings à calculer et leur coût estimé, sans rien modifier",
+    )
+    parser.add_argument(
+        "--concurrence",
+        type=int,
+        default=MAX_IN_FLIGHT,
+        help=f"Appels d'embedding simultanés (défaut: {MAX_IN_FLIGHT})",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=TOKENS_PER_MINUTE,
+        help=f"Budget de tokens par minute de l'API embeddings (défaut: {TOKENS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        default=BATCH_MAX_TOKENS,
+        help=f"Tokens estimés max par appel d'embedding (défaut: {BATCH_MAX_TOKENS})",
+    )
+    args = parser.parse_args()
+
     logger.info("=== Début de l'ingestion ChromaDB ===")
 
-    # 1. Charger tous les chunks
-    chunks = load_all_chunks()
-    if not chunks:
+    # 1. Source des chunks (relue en flux à chaque passe)
+    if args.matiere:
+        def chunk_source():
+            return load_chunks_from_matiere(PROCESSED_DIR / args.matiere)
+    else:
+        chunk_source = load_all_chunks
+    if next(iter(chunk_source()), None) is None:
         logger.error("Aucun chunk trouvé. Arrêt.")
         return
 
-    # 2. Convertir en Documents LangChain
-    logger.info("Conversion en Documents LangChain")
-    documents = chunks_to_documents(chunks)
-
-    # 3. Ingérer dans ChromaDB
-    vector_store = ingest_to_chromadb(documents, batch_size=100)
+    # 2. Synchroniser ChromaDB (upsert des nouveaux, suppression des disparus)
+    ingest_to_chromadb(
+        chunk_source,
+        matiere=args.matiere,
+        dry_run=args.dry_run,
+        batch_tokens=args.batch_tokens,
+        max_in_flight=args.concurrence,
+        tokens_per_minute=args.tpm,
+    )
 
     logger.info("=== Ingestion terminée avec succès ===")
 
@@ -0,0 +1,437 @@
+"""Catalogue des leçons (titre -> url, résumé, niveau, chunks) matérialisé sur disque."""
+
+import base64
+import bisect
+import json
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from answer_cache import read_collections_version
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CATALOG_SUFFIX = ".catalog.json"  # <chroma_dir>/<collection>.catalog.json
+RESUME_CHARS = 200  # Longueur du résumé affiché dans la bibliothèque
+SCAN_BATCH = 5000  # Chunks lus par appel à collection.get lors de la construction
+MAX_OVERLAP_CHARS = 400  # Recouvrement max recherché entre deux chunks consécutifs
+MIN_OVERLAP_CHARS = 20  # En dessous, un recouvrement peut être une coïncidence
+LESSON_CACHE_SIZE = 256  # Leçons reconstruites gardées en mémoire
+SECTION_SEPARATOR = " > "  # chemin de section écrit par le chunker ("Partie > Sous-partie")
+SECTIONS_LIST_SEPARATOR = "\n"  # métadonnée "sections" : chemins des sections d'un chunk
+
+# Champs renvoyés par l'API (chunk_ids reste interne)
+PUBLIC_FIELDS = ("titre", "url", "resume", "matiere", "niveau", "source", "nb_chunks")
+
+
+# Clé de tri d'un résultat: (rang de pertinence, titre); sert aussi de curseur
+SortKey = Tuple[int, str]
+
+
+def fold_text(text: str) -> str:
+    """Minuscules sans accents, pour la recherche dans les titres."""
+    texte = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in texte if not unicodedata.combining(c)).strip()
+
+
+def encode_cursor(key: SortKey) -> str:
+    """Encode une clé de tri en curseur opaque (base64 url-safe)."""
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SortKey:
+    """Décode un curseur produit par encode_cursor.
+
+    Raises:
+        ValueError: Si le curseur est invalide.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, titre = json.loads(raw.decode("utf-8"))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+    if not isinstance(rank, int) or not isinstance(titre, str):
+        raise ValueError(f"Curseur invalide: {cursor}")
+    return (rank, titre)
+
+
+def strip_title_prefix(text: str, titre: str) -> str:
+    """Retire le préfixe "[titre]\n" ajouté à chaque chunk par le chunker."""
+    prefix = f"[{titre}]\n"
+    return text[len(prefix):] if titre and text.startswith(prefix) else text
+
+
+def _overlap_length(previous: str, following: str) -> int:
+    """Longueur du plus long suffixe de `previous` qui commence `following`."""
+    tail = previous[-MAX_OVERLAP_CHARS:]
+    probe = following[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    position = tail.find(probe)
+    while position >= 0:
+        if following.startswith(tail[position:]):
+            return len(tail) - position
+        position = tail.find(probe, position + 1)
+    return 0
+
+
+def merge_chunks(chunks: List[str]) -> str:
+    """Recolle des chunks consécutifs en supprimant leur recouvrement (overlap).
+
+    Le chunker recopie la fin d'un chunk au début du suivant; ce passage
+    n'apparaît qu'une fois dans le texte reconstruit. Sans recouvrement
+    détecté, les chunks sont séparés par une ligne vide.
+
+    Args:
+        chunks: Textes des chunks, dans l'ordre de chunk_index (sans préfixe titre).
+
+    Returns:
+        Texte complet de la leçon.
+    """
+    if not chunks:
+        return ""
+    parts = [chunks[0]]
+    for previous, following in zip(chunks, chunks[1:]):
+        overlap = _overlap_length(previous, following)
+        if overlap:
+            parts.append(following[overlap:])
+        else:
+            parts.append("\n\n" + following)
+    return "".join(parts)
+
+
+def merge_sections(chunks: List[Tuple[str, Dict[str, Any]]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Recolle les chunks d'une leçon section par section et construit son sommaire.
+
+    Le sommaire vient des métadonnées des chunks (section, section_index,
+    sections), sans relire le texte, sauf pour situer les sections regroupées
+    dans un même chunk (leur titre en début de paragraphe). Les chunks d'avant
+    le découpage par sections n'en ont pas : ils sont recollés d'un bloc et le
+    sommaire est vide.
+
+    Args:
+        chunks: (texte sans préfixe titre, métadonnées), dans l'ordre de chunk_index.
+
+    Returns:
+        (texte complet, sommaire). Chaque entrée du sommaire:
+        {"titre", "section" (chemin), "niveau", "position" (début dans le texte)}.
+    """
+    groups: List[Tuple[List[str], List[str]]] = []
+    previous = None
+    for text, metadata in chunks:
+        metadata = metadata or {}
+        key = metadata.get("section_index")
+        if not groups or key != previous:
+            covered = metadata.get("sections")
+            section = metadata.get("section", "") or ""
+            groups.append((covered.split(SECTIONS_LIST_SEPARATOR) if covered else [section], []))
+            previous = key
+        groups[-1][1].append(text)
+
+    parts: List[str] = []
+    toc: List[Dict[str, Any]] = []
+    listed = set()
+    position = 0
+    for sections, texts in groups:
+        if parts:
+            position += 2  # ligne vide entre deux sections
+        merged = merge_chunks(texts)
+        offset = 0
+        for index, section in enumerate(sections):
+            titles = section.split(SECTION_SEPARATOR) if section else []
+            if index and titles:
+                # Section regroupée avec la précédente : son titre ouvre un paragraphe
+                found = merged.find(f"\n\n{titles[-1]}\n\n", offset)
+                if found != -1:
+                    offset = found + 2
+            # Un titre sans texte propre (ex: partie qui ne contient que des
+            # sous-parties) apparaît dans le chemin de ses sous-sections
+            for depth in range(1, len(titles) + 1):
+                path = SECTION_SEPARATOR.join(titles[:depth])
+                if path not in listed:
+                    listed.add(path)
+                    toc.append({"titre": titles[depth - 1], "section": path, "niveau": depth, "position": position + offset})
+        parts.append(merged)
+        position += len(merged)
+    return "\n\n".join(parts), toc
+
+
+class LessonContentCache:
+    """LRU des leçons reconstruites, partagé par la bibliothèque et les quiz.
+
+    La clé inclut la version du catalogue: une ré-ingestion rend les
+    anciennes entrées inaccessibles (puis évincées). Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = LESSON_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Copie de la leçon en cache, ou None."""
+        with self._lock:
+            lesson = self._entries.get(key)
+            if lesson is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(lesson)
+
+    def set(self, key: tuple, lesson: Dict[str, Any]) -> None:
+        """Enregistre une leçon reconstruite."""
+        with self._lock:
+            self._entries[key] = dict(lesson)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def catalog_path(chroma_dir, collection_name: str) -> Path:
+    """Chemin du fichier catalogue d'une collection."""
+    return Path(chroma_dir) / f"{collection_name}{CATALOG_SUFFIX}"
+
+
+class LessonCatalog:
+    """Index en mémoire des leçons d'une collection, groupées par matière.
+
+    Chaque leçon: titre, url, resume, matiere, niveau, source, nb_chunks et
+    chunk_ids (ids ChromaDB triés par chunk_index). Les leçons d'une matière
+    sont triées par titre.
+    """
+
+    def __init__(self, lessons: Dict[str, List[Dict[str, Any]]], version: str = ""):
+        """Initialise le catalogue.
+
+        Args:
+            lessons: matiere -> liste de leçons triées par titre.
+            version: Version de la collection au moment de la construction
+                (voir answer_cache.bump_collections_version).
+        """
+        self.version = version
+        self._lessons = lessons
+        self._by_titre = {
+            matiere: {lesson["titre"]: lesson for lesson in matiere_lessons}
+            for matiere, matiere_lessons in lessons.items()
+        }
+        # Titres normalisés pour la recherche (non sauvegardés sur disque)
+        self._folded = {
+            matiere: [fold_text(lesson["titre"]) for lesson in matiere_lessons]
+            for matiere, matiere_lessons in lessons.items()
+        }
+
+    @classmethod
+    def from_collection(cls, collection, version: str = "", batch_size: int = SCAN_BATCH) -> "LessonCatalog":
+        """Construit le catalogue en parcourant une collection ChromaDB une seule fois.
+
+        Args:
+            collection: Collection ChromaDB (chromadb.Collection).
+            version: Version de la collection à enregistrer.
+            batch_size: Nombre de chunks lus par appel à collection.get.
+
+        Returns:
+            Catalogue construit.
+        """
+        # (matiere, titre) -> infos de la leçon + [(chunk_index, id)]
+        grouped: Dict[tuple, Dict[str, Any]] = {}
+        offset = 0
+        while True:
+            batch = collection.get(include=["metadatas", "documents"], limit=batch_size, offset=offset)
+            ids = batch.get("ids") or []
+            if not ids:
+                break
+            for doc_id, metadata, document in zip(ids, batch["metadatas"], batch["documents"]):
+                metadata = metadata or {}
+                titre = metadata.get("titre", "Sans titre")
+                key = (metadata.get("matiere", ""), titre)
+                chunk_index = int(metadata.get("chunk_index", 0) or 0)
+                entry = grouped.get(key)
+                if entry is None:
+                    entry = grouped[key] = {
+                        "titre": titre,
+                        "url": metadata.get("url", ""),
+                        "matiere": metadata.get("matiere", ""),
+                        "niveau": metadata.get("niveau", "college"),
+                        "source": metadata.get("source", ""),
+                        "_chunks": [],
+                        "_first": (chunk_index, document or ""),
+                    }
+                elif chunk_index < entry["_first"][0]:
+                    entry["_first"] = (chunk_index, document or "")
+                entry["_chunks"].append((chunk_index, doc_id))
+            offset += len(ids)
+            if len(ids) < batch_size:
+                break
+
+        lessons: Dict[str, List[Dict[str, Any]]] = {}
+        for (matiere, _), entry in grouped.items():
+            chunks = sorted(entry.pop("_chunks"))
+            first_content = entry.pop("_first")[1]
+            entry["resume"] = (
+                first_content[:RESUME_CHARS] + "..." if len(first_content) > RESUME_CHARS else first_content
+            )
+            entry["nb_chunks"] = len(chunks)
+            entry["chunk_ids"] = [doc_id for _, doc_id in chunks]
+            lessons.setdefault(matiere, []).append(entry)
+
+        for matiere_lessons in lessons.values():
+            matiere_lessons.sort(key=lambda lesson: lesson["titre"])
+
+        logger.info(
+            f"Catalogue construit: {sum(len(v) for v in lessons.values())} leçons, "
+            f"{offset} chunks parcourus"
+        )
+        return cls(lessons, version)
+
+    @classmethod
+    def load(cls, path) -> Optional["LessonCatalog"]:
+        """Charge un catalogue depuis le disque (None si absent ou illisible)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data["lessons"], data.get("version", ""))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Catalogue illisible ({path}): {e}")
+            return None
+
+    def save(self, path) -> None:
+        """Écrit le catalogue sur disque (JSON compact, remplacement atomique)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.version, "lessons": self._lessons},
+                f, ensure_ascii=False, separators=(",", ":")
+            )
+        os.replace(tmp_path, path)
+        logger.info(f"Catalogue sauvegardé: {path}")
+
+    def lessons(self, matiere: str, niveau: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Leçons d'une matière (triées par titre), filtrées par niveau si précisé."""
+        matiere_lessons = self._lessons.get(matiere, [])
+        if niveau and niveau != "college":
+            return [lesson for lesson in matiere_lessons if lesson["niveau"] == niveau]
+        return matiere_lessons
+
+    def query(
+        self,
+        matiere: str,
+        niveau: Optional[str] = None,
+        q: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        after: Optional[SortKey] = None
+    ) -> Dict[str, Any]:
+        """Page de leçons d'une matière, avec recherche dans les titres.
+
+        Sans `q`, les leçons sont triées par titre. Avec `q`, seuls les titres
+        contenant `q` (casse et accents ignorés) sont gardés: ceux qui commencent
+        par `q` d'abord, puis les autres, chaque groupe trié par titre.
+
+        Args:
+            matiere: Matière.
+            niveau: Niveau optionnel (6eme, 5eme, 4eme, 3eme).
+            q: Texte recherché dans les titres.
+            limit: Taille de la page.
+            offset: Nombre de résultats à sauter (ignoré si `after` est donné).
+            after: Clé de tri du dernier résultat de la page précédente (curseur).
+
+        Returns:
+            Dict avec total, lecons (leçons du catalogue) et next_key
+            (clé de tri à passer en `after` pour la page suivante, ou None).
+        """
+        needle = fold_text(q) if q else ""
+        filter_niveau = niveau and niveau != "college"
+        keys: List[SortKey] = []
+        results: List[Dict[str, Any]] = []
+        for lesson, folded in zip(self._lessons.get(matiere, []), self._folded.get(matiere, [])):
+            if filter_niveau and lesson["niveau"] != niveau:
+                continue
+            rank = 0
+            if needle:
+                position = folded.find(needle)
+                if position < 0:
+                    continue
+                rank = 0 if position == 0 else 1
+            keys.append((rank, lesson["titre"]))
+            results.append(lesson)
+
+        if needle:
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            keys = [keys[i] for i in order]
+            results = [results[i] for i in order]
+
+        start = bisect.bisect_right(keys, after) if after is not None else max(offset, 0)
+        end = start + limit
+        return {
+            "total": len(results),
+            "lecons": results[start:end],
+            "next_key": keys[end - 1] if end < len(results) else None,
+        }
+
+    def get(self, matiere: str, titre: str) -> Optional[Dict[str, Any]]:
+        """Leçon d'une matière par titre exact (None si inconnue)."""
+        return self._by_titre.get(matiere, {}).get(titre)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._lessons.values())
+
+
+def build_and_save_catalog(collection, chroma_dir, collection_name: str) -> LessonCatalog:
+    """Construit le catalogue d'une collection et l'écrit à côté de ChromaDB.
+
+    Appelée à la fin de l'ingestion (après bump_collections_version), pour que
+    l'API charge directement un catalogue à jour.
+    """
+    version = read_collections_version(chroma_dir, collection_name)
+    catalog = LessonCatalog.from_collection(collection, version)
+    catalog.save(catalog_path(chroma_dir, collection_name))
+    return catalog
+
+
+class CatalogHolder:
+    """Garde le catalogue courant d'une collection et le recharge si elle a changé.
+
+    Au premier accès (ou quand la version de la collection ne correspond plus),
+    le catalogue est lu sur disque; s'il est absent ou périmé, il est reconstruit
+    depuis la collection puis sauvegardé. Thread-safe.
+    """
+
+    def __init__(self, collection, chroma_dir, collection_name: str):
+        self.collection = collection
+        self.chroma_dir = chroma_dir
+        self.collection_name = collection_name
+        self._catalog: Optional[LessonCatalog] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> LessonCatalog:
+        """Retourne le catalogue à jour."""
+        version = read_collections_version(self.chroma_dir, self.collection_name)
+        catalog = self._catalog
+        if catalog is not None and catalog.version == version:
+            return catalog
+
+        with self._lock:
+            if self._catalog is not None and self._catalog.version == version:
+                return self._catalog
+            path = catalog_path(self.chroma_dir, self.collection_name)
+            catalog = LessonCatalog.load(path) if path.exists() else None
+            if catalog is None or catalog.version != version:
+                logger.info(f"Catalogue absent ou périmé, reconstruction depuis '{self.collection_name}'")
+                catalog = LessonCatalog.from_collection(self.collection, version)
+                catalog.save(path)
+            self._catalog = catalog
+            return catalog
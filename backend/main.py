@@ -1,18 +1,26 @@
 """API FastAPI pour le chatbot scolaire."""
 
+import hashlib
+import json
 import logging
 import sys
-from typing import Optional
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 from rag import RAGChain
 from detection import auto_detect
+from lesson_catalog import PUBLIC_FIELDS, decode_cursor, encode_cursor
+from owners import OWNER_HEADER, validate_owner
+from pdf_jobs import PDFJobQueue, QueueFullError
 from pdf_service import PDFService
 from quiz_service import QuizService
 
@@ -45,24 +53,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+
+class SelectiveGZipMiddleware:
+    """Compression gzip des réponses, sauf les flux SSE (/stream).
+
+    GZipMiddleware bufferise le flux compressé, ce qui retarderait l'envoi
+    des tokens au navigateur.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1000)
+
 # Initialiser la chaîne RAG, le service PDF et le service Quiz au démarrage
 rag_chain: Optional[RAGChain] = None
 pdf_service: Optional[PDFService] = None
+pdf_jobs: Optional[PDFJobQueue] = None
 quiz_service: Optional[QuizService] = None
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialise la chaîne RAG, le service PDF et le service Quiz au démarrage de l'application."""
-    global rag_chain, pdf_service, quiz_service
+    global rag_chain, pdf_service, pdf_jobs, quiz_service
     logger.info("Démarrage de l'application...")
     try:
         rag_chain = RAGChain()
         logger.info("✅ RAG Chain initialisée avec succès")
 
         pdf_service = PDFService()
+        pdf_jobs = PDFJobQueue(pdf_service.process_pdf)
         logger.info("✅ PDF Service initialisé avec succès")
 
         quiz_service = QuizService(rag_chain)
@@ -72,6 +104,15 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrête les pools de traitement des PDFs (les tâches non démarrées sont annulées)."""
+    if pdf_jobs is not None:
+        pdf_jobs.shutdown(wait=False)
+    if pdf_service is not None:
+        pdf_service.close()
+
+
 # Modèles Pydantic pour validation des requêtes/réponses
 class ChatRequest(BaseModel):
     """Requête de chat."""
@@ -160,28 +201,48 @@ async def health_check():
     }
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Retourne les compteurs du cache de réponses (hits exacts/sémantiques, misses)."""
+    if rag_chain is None:
+        raise HTTPException(status_code=503, detail="RAG Chain non initialisée")
+
+    return rag_chain.answer_cache.stats()
+
+
+def _owner(x_owner_id: Optional[str]) -> Optional[str]:
+    """Élève propriétaire des PDFs (en-tête X-Owner-Id, voir owners) ; 400 si invalide."""
+    try:
+        return validate_owner(x_owner_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
     """Endpoint principal pour poser une question au chatbot.
 
     Args:
         request: Requête avec question, niveau et matière optionnelle.
+        x_owner_id: Élève dont les PDFs forment la source "mes_cours".
 
     Returns:
         Réponse avec answer, sources et métadonnées.
     """
     if rag_chain is None:
         raise HTTPException(status_code=503, detail="RAG Chain non initialisée")
+    owner = _owner(x_owner_id)
 
     try:
         logger.info(f"Question reçue: '{request.question}' (niveau={request.niveau}, matiere={request.matiere}, source={request.source})")
 
         # Exécuter la chaîne RAG
-        result = rag_chain.run(
+        result = await rag_chain.arun(
             question=request.question,
             matiere=request.matiere,
             niveau=request.niveau or "college",
-            source=request.source or "vikidia"
+            source=request.source or "vikidia",
+            owner=owner
         )
 
         logger.info(f"Réponse générée avec {result['nb_sources']} sources")
@@ -224,17 +285,19 @@ async def get_niveaux():
 
 
 @app.post("/api/chat/auto", response_model=ChatResponse)
-async def chat_auto(request: ChatRequest):
+async def chat_auto(request: ChatRequest, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
     """Endpoint chat avec auto-détection du niveau et de la matière.
 
     Args:
         request: Requête avec question (niveau/matiere sont optionnels et overridés si détectés).
+        x_owner_id: Élève dont les PDFs forment la source "mes_cours".
 
     Returns:
         Réponse avec answer, sources, + niveau_detecte, matiere_detectee, matieres_possibles si ambiguïté.
     """
     if rag_chain is None:
         raise HTTPException(status_code=503, detail="RAG Chain non initialisée")
+    owner = _owner(x_owner_id)
 
     try:
         question = request.question
@@ -250,11 +313,12 @@ async def chat_auto(request: ChatRequest):
                    f"ambigue={detection['ambigue']}")
 
         # Exécuter la chaîne RAG
-        result = rag_chain.run(
+        result = await rag_chain.arun(
             question=question,
             matiere=matiere_finale,
             niveau=niveau_final,
-            source=request.source or "vikidia"
+            source=request.source or "vikidia",
+            owner=owner
         )
 
         # Ajouter les infos de détection à la réponse
@@ -271,31 +335,211 @@ async def chat_auto(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 
+def _format_sse(event: str, data: Dict) -> str:
+    """Formate un événement Server-Sent Events (une ligne event + une ligne data JSON)."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_stream(
+    events: AsyncIterator[Dict],
+    first_event: Optional[Dict] = None
+) -> AsyncIterator[str]:
+    """Convertit les événements de RAGChain.astream en flux SSE.
+
+    Args:
+        events: Générateur asynchrone d'événements {"event", "data"}.
+        first_event: Événement optionnel émis avant ceux de la chaîne (ex: détection).
+
+    Yields:
+        Événements SSE formatés. Une erreur en cours de flux est envoyée
+        comme événement "error" (les en-têtes HTTP sont déjà partis).
+    """
+    if first_event is not None:
+        yield _format_sse(first_event["event"], first_event["data"])
+
+    try:
+        async for event in events:
+            yield _format_sse(event["event"], event["data"])
+    except Exception as e:
+        logger.error(f"Erreur pendant le streaming: {e}", exc_info=True)
+        yield _format_sse("error", {"detail": f"Erreur serveur: {str(e)}"})
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # Désactive le buffering des reverse proxies (nginx)
+}
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
+    """Variante streaming de /api/chat (Server-Sent Events).
+
+    Événements émis: "sources", puis "token" (morceaux de réponse), puis "done".
+
+    Args:
+        request: Requête avec question, niveau et matière optionnelle.
+        x_owner_id: Élève dont les PDFs forment la source "mes_cours".
+
+    Returns:
+        Flux text/event-stream.
+    """
+    if rag_chain is None:
+        raise HTTPException(status_code=503, detail="RAG Chain non initialisée")
+    owner = _owner(x_owner_id)
+
+    logger.info(f"Question reçue (stream): '{request.question}' (niveau={request.niveau}, matiere={request.matiere}, source={request.source})")
+
+    events = rag_chain.astream(
+        question=request.question,
+        matiere=request.matiere,
+        niveau=request.niveau or "college",
+        source=request.source or "vikidia",
+        owner=owner
+    )
+    return StreamingResponse(
+        _sse_stream(events),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+@app.post("/api/chat/auto/stream")
+async def chat_auto_stream(request: ChatRequest, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
+    """Variante streaming de /api/chat/auto (Server-Sent Events).
+
+    Événements émis: "detection" (niveau/matière détectés), "sources",
+    puis "token" (morceaux de réponse), puis "done".
+
+    Args:
+        request: Requête avec question (niveau/matiere sont optionnels et overridés si détectés).
+        x_owner_id: Élève dont les PDFs forment la source "mes_cours".
+
+    Returns:
+        Flux text/event-stream.
+    """
+    if rag_chain is None:
+        raise HTTPException(status_code=503, detail="RAG Chain non initialisée")
+    owner = _owner(x_owner_id)
+
+    question = request.question
+    logger.info(f"Question reçue (auto-detect, stream): '{question}'")
+
+    # Auto-détection
+    detection = auto_detect(question)
+    niveau_final = request.niveau or detection["niveau_detecte"]
+    matiere_finale = request.matiere or detection["matiere_detectee"]
+
+    logger.info(f"Auto-détection: niveau={detection['niveau_detecte']}, "
+               f"matiere={detection['matiere_detectee']}, "
+               f"ambigue={detection['ambigue']}")
+
+    events = rag_chain.astream(
+        question=question,
+        matiere=matiere_finale,
+        niveau=niveau_final,
+        source=request.source or "vikidia",
+        owner=owner
+    )
+    detection_event = {
+        "event": "detection",
+        "data": {
+            "niveau_detecte": detection["niveau_detecte"],
+            "matiere_detectee": detection["matiere_detectee"],
+            "matieres_possibles": detection["matieres_possibles"],
+            "ambigue": detection["ambigue"],
+        }
+    }
+    return StreamingResponse(
+        _sse_stream(events, first_event=detection_event),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+LECONS_PAGE_MAX = 50000  # Taille max d'une page de /api/lecons (ancienne limite par défaut)
+
+
+def _lecons_etag(version: str, *params) -> str:
+    """ETag fort d'une page de leçons: version du catalogue + paramètres de la requête."""
+    raw = json.dumps([version, *params], ensure_ascii=False)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Vérifie l'en-tête If-None-Match (liste d'ETags, préfixe W/ ou "*")."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag.removeprefix("W/") for tag in candidates]
+
+
 @app.get("/api/lecons/{matiere}")
-async def get_lecons(matiere: str, niveau: Optional[str] = None, limit: int = 50000):
+async def get_lecons(
+    matiere: str,
+    niveau: Optional[str] = None,
+    limit: int = Query(LECONS_PAGE_MAX, ge=1, le=LECONS_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
     """Retourne la liste des leçons disponibles pour une matière.
 
+    La réponse porte un ETag (version du catalogue + paramètres): un client
+    qui renvoie If-None-Match reçoit 304 sans corps si rien n'a changé.
+
     Args:
         matiere: ID de la matière (mathematiques, francais, etc.).
         niveau: Niveau optionnel pour filtrer (6eme, 5eme, 4eme, 3eme).
         limit: Nombre maximum de leçons (défaut: 50000 pour tout récupérer).
+        offset: Nombre de leçons à sauter (pagination, ignoré si cursor est donné).
+        cursor: Curseur next_cursor de la page précédente.
+        q: Recherche dans les titres (début de titre en premier, puis contenu).
+        fields: Champs à renvoyer, séparés par des virgules (ex: "titre,resume").
 
     Returns:
-        Liste de leçons avec titre, resume, url, niveau, nb_chunks.
+        Page de leçons avec titre, resume, url, niveau, nb_chunks.
     """
     if rag_chain is None:
         raise HTTPException(status_code=503, detail="RAG Chain non initialisée")
 
+    selected_fields = PUBLIC_FIELDS
+    if fields:
+        selected_fields = tuple(field.strip() for field in fields.split(",") if field.strip())
+        unknown = [field for field in selected_fields if field not in PUBLIC_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Champs inconnus: {', '.join(unknown)}")
+
     try:
-        logger.info(f"Récupération leçons: matiere={matiere}, niveau={niveau}")
-        lessons = rag_chain.get_all_lessons(matiere, niveau, limit)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return {
-            "matiere": matiere,
-            "niveau": niveau or "college",
-            "nb_lecons": len(lessons),
-            "lecons": lessons
-        }
+    try:
+        logger.info(f"Récupération leçons: matiere={matiere}, niveau={niveau}, q={q}")
+        catalog = await rag_chain.aget_lesson_catalog()
+
+        etag = _lecons_etag(catalog.version, matiere, niveau, limit, offset, cursor, q, selected_fields)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        page = catalog.query(matiere, niveau, q=q, limit=limit, offset=offset, after=after)
+        lessons = [{field: lesson[field] for field in selected_fields} for lesson in page["lecons"]]
+
+        return JSONResponse(
+            {
+                "matiere": matiere,
+                "niveau": niveau or "college",
+                "nb_lecons": len(lessons),
+                "total": page["total"],
+                "next_cursor": encode_cursor(page["next_key"]) if page["next_key"] else None,
+                "lecons": lessons
+            },
+            headers=headers
+        )
 
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des leçons: {e}", exc_info=True)
@@ -318,7 +562,7 @@ async def get_lecon_content(matiere: str, titre: str):
 
     try:
         logger.info(f"Récupération contenu leçon: {titre} (matiere={matiere})")
-        lesson = rag_chain.get_lesson_content(matiere, titre)
+        lesson = await rag_chain.aget_lesson_content(matiere, titre)
 
         if not lesson:
             raise HTTPException(status_code=404, detail="Leçon non trouvée")
@@ -334,18 +578,30 @@ async def get_lecon_content(matiere: str, titre: str):
 
 # ===== ENDPOINTS PDF / MES COURS =====
 
-@app.post("/api/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    """Upload et traite un PDF personnel.
+@app.post("/api/upload-pdf", status_code=202)
+async def upload_pdf(
+    response: Response,
+    file: UploadFile = File(...),
+    x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)
+):
+    """Upload un PDF personnel et lance son traitement en tâche de fond.
+
+    Le fichier est copié sur disque par blocs ; l'extraction, le chunking et
+    l'ajout à ChromaDB se font dans la file de traitement (voir pdf_jobs).
+    La progression se suit sur /api/jobs/{job_id}. Un PDF dont le contenu
+    est déjà importé (même SHA-256) n'est pas retraité.
 
     Args:
         file: Fichier PDF uploadé.
+        x_owner_id: Élève propriétaire du PDF (sa collection "mes_cours").
 
     Returns:
-        Infos sur le PDF traité (nb_pages, nb_chunks, etc.).
+        Tâche créée (job_id, filename, status), ou status "done" et le
+        PDF existant (result) pour un doublon.
     """
-    if pdf_service is None:
+    if pdf_service is None or pdf_jobs is None:
         raise HTTPException(status_code=503, detail="PDF Service non initialisé")
+    owner = _owner(x_owner_id)
 
     try:
         # Vérifier que c'est bien un PDF
@@ -354,20 +610,35 @@ async def upload_pdf(file: UploadFile = File(...)):
 
         logger.info(f"Upload PDF: {file.filename}")
 
-        # Lire le contenu du fichier
-        content = await file.read()
+        # Sauvegarder le PDF (copie par blocs, hors de la boucle d'événements)
+        try:
+            file_path, sha256 = await run_in_threadpool(pdf_service.save_pdf, file.file, file.filename, owner=owner)
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+        # Contenu déjà importé : rien à extraire ni à embedder
+        existing = await run_in_threadpool(pdf_service.reuse_duplicate, file_path, sha256, owner)
+        if existing is not None:
+            response.status_code = 200
+            return {
+                "status": "done",
+                "message": f"PDF '{file.filename}' déjà importé ({existing['filename']})",
+                "result": existing,
+                "filename": file.filename
+            }
+
+        # Traiter le PDF (extraction + chunking + ChromaDB) en tâche de fond
+        try:
+            job = pdf_jobs.submit(file_path, file.filename, sha256=sha256, owner=owner)
+        except QueueFullError as e:
+            Path(file_path).unlink(missing_ok=True)
+            raise HTTPException(status_code=429, detail=f"Trop d'imports en cours, réessaie plus tard ({e})")
 
-        # Sauvegarder le PDF
-        file_path = pdf_service.save_pdf(content, file.filename)
-
-        # Traiter le PDF (extraction + chunking + ChromaDB)
-        result = pdf_service.process_pdf(file_path)
-
-        logger.info(f"PDF traité avec succès: {result}")
         return {
-            "status": "success",
-            "message": f"PDF '{file.filename}' importé avec succès",
-            **result
+            "status": job.status,
+            "message": f"PDF '{file.filename}' reçu, traitement en cours",
+            "job_id": job.id,
+            "filename": file.filename
         }
 
     except HTTPException:
@@ -377,19 +648,46 @@ async def upload_pdf(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
+    """Retourne l'état d'une tâche de traitement de PDF.
+
+    Args:
+        job_id: Identifiant renvoyé par /api/upload-pdf.
+        x_owner_id: Élève qui a importé le PDF (404 pour un autre élève).
+
+    Returns:
+        status (queued, processing, done, error), progression (nb_pages,
+        nb_chunks, nb_chunks_embedded), puis le résultat ou l'erreur.
+    """
+    if pdf_jobs is None:
+        raise HTTPException(status_code=503, detail="PDF Service non initialisé")
+
+    owner = _owner(x_owner_id)
+
+    job = pdf_jobs.get(job_id)
+    if job is None or job.owner != owner:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    return job.to_dict()
+
+
 @app.get("/api/mes-cours")
-async def get_mes_cours():
-    """Retourne la liste des PDFs importés.
+async def get_mes_cours(x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
+    """Retourne la liste des PDFs importés par l'élève.
+
+    Args:
+        x_owner_id: Élève propriétaire des PDFs.
 
     Returns:
         Liste de PDFs avec infos (filename, size, uploaded_at).
     """
     if pdf_service is None:
         raise HTTPException(status_code=503, detail="PDF Service non initialisé")
+    owner = _owner(x_owner_id)
 
     try:
         logger.info("Récupération de la liste des PDFs")
-        pdfs = pdf_service.list_pdfs()
+        pdfs = await run_in_threadpool(pdf_service.list_pdfs, owner)
 
         return {
             "nb_pdfs": len(pdfs),
@@ -402,21 +700,23 @@ async def get_mes_cours():
 
 
 @app.delete("/api/mes-cours/{filename}")
-async def delete_cours(filename: str):
+async def delete_cours(filename: str, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
     """Supprime un PDF importé.
 
     Args:
         filename: Nom du fichier à supprimer.
+        x_owner_id: Élève propriétaire du PDF.
 
     Returns:
         Status de la suppression.
     """
     if pdf_service is None:
         raise HTTPException(status_code=503, detail="PDF Service non initialisé")
+    owner = _owner(x_owner_id)
 
     try:
         logger.info(f"Suppression du PDF: {filename}")
-        success = pdf_service.delete_pdf(filename)
+        success = await run_in_threadpool(pdf_service.delete_pdf, filename, owner)
 
         if not success:
             raise HTTPException(status_code=404, detail="PDF non trouvé")
@@ -433,25 +733,57 @@ async def delete_cours(filename: str):
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 
+@app.post("/api/mes-cours/compact")
+async def compact_mes_cours(x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
+    """Supprime de ChromaDB les chunks des PDFs qui n'existent plus.
+
+    Args:
+        x_owner_id: Élève dont la collection est compactée.
+
+    Returns:
+        Nombre de chunks et de PDFs supprimés, de PDFs réindexés.
+    """
+    if pdf_service is None:
+        raise HTTPException(status_code=503, detail="PDF Service non initialisé")
+    owner = _owner(x_owner_id)
+
+    try:
+        logger.info("Compaction de la collection des PDFs")
+        stats = await run_in_threadpool(pdf_service.compact, owner)
+
+        return {
+            "status": "success",
+            **stats
+        }
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la compaction: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
+
+
 @app.post("/api/search-mes-cours")
-async def search_mes_cours(request: ChatRequest):
+async def search_mes_cours(request: ChatRequest, x_owner_id: Optional[str] = Header(None, alias=OWNER_HEADER)):
     """Recherche dans les documents personnels uniquement.
 
     Args:
         request: Requête avec question.
+        x_owner_id: Élève dont les PDFs sont interrogés.
 
     Returns:
         Résultats de recherche dans les PDFs personnels.
     """
     if pdf_service is None:
         raise HTTPException(status_code=503, detail="PDF Service non initialisé")
+    owner = _owner(x_owner_id)
 
     try:
         logger.info(f"Recherche dans Mes Cours: '{request.question}'")
 
-        results = pdf_service.search_in_personal_docs(
+        results = await run_in_threadpool(
+            pdf_service.search_in_personal_docs,
             question=request.question,
-            top_k=5
+            top_k=5,
+            owner=owner
         )
 
         return {
@@ -539,7 +871,6 @@ async def validate_quiz(request: QuizValidateRequest):
 
 
 # Servir le frontend (fichiers statiques)
-from pathlib import Path
 frontend_dir = Path(__file__).parent.parent / "frontend"
 app.mount("/", StaticFiles(directory=str(frontend_dir), html=True), name="frontend")
 
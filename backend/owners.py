@@ -0,0 +1,113 @@
+"""Propriétaires des PDFs personnels ("Mes Cours").
+
+Chaque élève (identifiant envoyé par le frontend dans l'en-tête X-Owner-Id)
+a sa propre collection ChromaDB et son propre dossier d'upload : une
+recherche dans "mes_cours" ne parcourt que ses documents. Sans identifiant,
+la collection partagée historique "mes_cours" est utilisée.
+
+L'identifiant n'est PAS authentifié : il cloisonne les documents des élèves
+mais ne les protège pas. Quiconque connaît l'identifiant d'un élève peut
+lire, interroger et supprimer ses PDFs.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from chromadb.errors import ChromaError
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+PERSONAL_COLLECTION_NAME = "mes_cours"  # Collection sans propriétaire (historique)
+OWNER_HEADER = "X-Owner-Id"
+OWNER_KEY_LENGTH = 16  # Caractères hexadécimaux de l'empreinte de l'identifiant
+MAX_CACHED_OWNERS = 256  # Élèves dont la collection reste ouverte (LRU)
+
+_RE_OWNER = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def validate_owner(owner: Optional[str]) -> Optional[str]:
+    """Vérifie un identifiant de propriétaire ("" ou None : pas de propriétaire).
+
+    Raises:
+        ValueError: Si l'identifiant contient autre chose que lettres,
+            chiffres, "_" et "-", ou dépasse 64 caractères.
+    """
+    if not owner:
+        return None
+    if not _RE_OWNER.fullmatch(owner):
+        raise ValueError("Identifiant de propriétaire invalide")
+    return owner
+
+
+def owner_key(owner: str) -> str:
+    """Clé courte et sûre (noms de collection et de dossier) d'un propriétaire."""
+    return hashlib.sha256(owner.encode("utf-8")).hexdigest()[:OWNER_KEY_LENGTH]
+
+
+def personal_collection_name(owner: Optional[str] = None) -> str:
+    """Collection ChromaDB des PDFs d'un propriétaire ("mes_cours" sans propriétaire)."""
+    if owner is None:
+        return PERSONAL_COLLECTION_NAME
+    return f"{PERSONAL_COLLECTION_NAME}_{owner_key(owner)}"
+
+
+def open_personal_store(
+    owner: Optional[str],
+    embeddings: Embeddings,
+    chroma_dir: str,
+    create: bool = False
+) -> Optional[Chroma]:
+    """Ouvre la collection Mes Cours d'un élève.
+
+    Args:
+        owner: Élève (None : collection partagée).
+        embeddings: Fonction d'embedding de la collection.
+        chroma_dir: Dossier de persistance ChromaDB.
+        create: Créer la collection si elle n'existe pas (import d'un PDF
+            uniquement : une lecture avec un identifiant inconnu ne crée rien).
+
+    Returns:
+        La collection, ou None si elle n'existe pas (et create=False).
+    """
+    try:
+        return Chroma(
+            collection_name=personal_collection_name(owner),
+            embedding_function=embeddings,
+            persist_directory=chroma_dir,
+            create_collection_if_not_exists=create
+        )
+    except (ChromaError, ValueError):
+        if create:
+            raise
+        return None
+
+
+class OwnerLRU:
+    """Objets ouverts par élève (collections, index...), au plus `max_size` (LRU). Thread-safe."""
+
+    def __init__(self, max_size: int = MAX_CACHED_OWNERS):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, owner: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(owner)
+            if item is not None:
+                self._items.move_to_end(owner)
+            return item
+
+    def put(self, owner: str, item: Any) -> Any:
+        """Garde `item` pour `owner` ; renvoie celui déjà gardé si un autre thread l'a ouvert avant."""
+        with self._lock:
+            item = self._items.setdefault(owner, item)
+            self._items.move_to_end(owner)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            return item
+
+    def __len__(self) -> int:
+        return len(self._items)
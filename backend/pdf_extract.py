@@ -0,0 +1,100 @@
+"""Extraction du texte d'un PDF par tranches de pages, en parallèle.
+
+Chaque tâche ouvre le fichier en mémoire partagée (mmap, lecture seule) et
+extrait une tranche de pages avec pypdf ; les tranches sont réparties sur un
+pool de processus (l'extraction pypdf est du Python pur, limitée par le GIL
+dans des threads). Les pages sortent dans l'ordre, au fil de l'eau : le
+découpage et l'embedding des premières pages commencent pendant que les
+suivantes sont encore extraites.
+
+Module volontairement léger (pypdf seulement) : il est importé par chaque
+processus du pool.
+"""
+
+import mmap
+import os
+from collections import deque
+from concurrent.futures import Executor
+from typing import Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+# Configuration
+MIN_PAGES_PER_TASK = 16  # Pages extraites par tâche du pool, au minimum
+TASKS_PER_WORKER = 4  # Tranches par processus pour un PDF (chaque tâche relit la structure du PDF)
+MAX_WORKERS = min(4, os.cpu_count() or 1)  # Processus d'extraction
+MAX_TASKS_IN_FLIGHT = 2 * MAX_WORKERS  # Tranches extraites d'avance au plus
+
+
+def count_pages(file_path: str) -> int:
+    """Nombre de pages d'un PDF."""
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return len(PdfReader(data).pages)
+
+
+def extract_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Texte des pages [start, stop) d'un PDF (même extraction que PyPDFLoader).
+
+    Fonction de module pour pouvoir être exécutée dans un processus du pool.
+    """
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pages = PdfReader(data).pages
+        return [pages[i].extract_text() for i in range(start, stop)]
+
+
+def pages_per_task(total: int, workers: int = MAX_WORKERS) -> int:
+    """Taille des tranches : TASKS_PER_WORKER tranches par processus, MIN_PAGES_PER_TASK pages au moins.
+
+    Chaque tâche rouvre le PDF et relit sa structure (~0,1 s pour 1000
+    pages) : des tranches trop petites coûtent plus qu'elles ne rapportent.
+    """
+    return max(MIN_PAGES_PER_TASK, -(-total // (TASKS_PER_WORKER * max(1, workers))))
+
+
+def iter_pages(
+    file_path: str,
+    executor: Optional[Executor] = None,
+    workers: int = MAX_WORKERS,
+    max_in_flight: int = MAX_TASKS_IN_FLIGHT
+) -> Iterator[Tuple[int, str]]:
+    """Itère sur les pages d'un PDF, dans l'ordre.
+
+    Avec un pool (`executor`, de `workers` processus), les pages sont
+    extraites par tranches (voir pages_per_task) dans les processus du pool,
+    au plus `max_in_flight` tranches d'avance sur le consommateur (mémoire
+    bornée). Sans pool, ou pour un PDF d'une seule tranche, l'extraction se
+    fait ici, page par page.
+
+    Yields:
+        (numéro de page à partir de 0, texte de la page).
+    """
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pages = PdfReader(data).pages
+        total = len(pages)
+        size = pages_per_task(total, workers)
+        if executor is None or total <= size:
+            for number in range(total):
+                yield number, pages[number].extract_text()
+            return
+
+    ranges = iter(range(0, total, size))
+    pending = deque()
+
+    def submit_next() -> None:
+        start = next(ranges, None)
+        if start is not None:
+            stop = min(start + size, total)
+            pending.append((start, executor.submit(extract_pages, file_path, start, stop)))
+
+    try:
+        for _ in range(max(1, max_in_flight)):
+            submit_next()
+        while pending:
+            start, future = pending.popleft()
+            texts = future.result()
+            submit_next()
+            for offset, text in enumerate(texts):
+                yield start + offset, text
+    finally:
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,98 @@
+"""Index des PDFs importés : nom de fichier -> ids des chunks dans ChromaDB.
+
+Tenu à jour à l'import et à la suppression, il permet de retirer les chunks
+d'un PDF par id sans parcourir la collection, et de reconnaître un PDF déjà
+importé par l'empreinte SHA-256 de son contenu (champ "sha256"). Stocké en JSON à côté des PDFs
+(<upload_dir>/index.json), réécrit en entier à chaque modification
+(remplacement atomique) : quelques centaines de PDFs au plus.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.json"
+
+
+class PDFIndex:
+    """Index filename -> {"chunk_ids": [...], ...} persistant et thread-safe."""
+
+    def __init__(self, path):
+        """Charge l'index (vide s'il est absent ou illisible).
+
+        Args:
+            path: Fichier JSON de l'index.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Index des PDFs illisible ({self.path}), repart de zéro: {e}")
+        self._by_hash = self._hash_table()
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Entrée d'un PDF (copie), ou None."""
+        with self._lock:
+            entry = self._entries.get(filename)
+            return dict(entry) if entry is not None else None
+
+    def find_by_hash(self, sha256: str) -> Optional[str]:
+        """Nom du PDF importé avec ce contenu, ou None."""
+        with self._lock:
+            return self._by_hash.get(sha256)
+
+    def set(self, filename: str, chunk_ids: List[str], **info: Any) -> None:
+        """Enregistre (ou remplace) les chunks d'un PDF."""
+        with self._lock:
+            self._entries[filename] = {"chunk_ids": list(chunk_ids), **info}
+            if info.get("sha256"):
+                self._by_hash[info["sha256"]] = filename
+            self._save()
+
+    def pop(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Retire un PDF de l'index et renvoie son entrée (None si absent)."""
+        with self._lock:
+            entry = self._entries.pop(filename, None)
+            if entry is not None:
+                if self._by_hash.get(entry.get("sha256")) == filename:
+                    del self._by_hash[entry["sha256"]]
+                self._save()
+            return entry
+
+    def replace_all(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Remplace tout l'index (compaction)."""
+        with self._lock:
+            self._entries = {filename: dict(entry) for filename, entry in entries.items()}
+            self._by_hash = self._hash_table()
+            self._save()
+
+    def filenames(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _hash_table(self) -> Dict[str, str]:
+        """Empreinte -> nom de fichier, reconstruite depuis les entrées."""
+        return {
+            entry["sha256"]: filename
+            for filename, entry in self._entries.items() if entry.get("sha256")
+        }
+
+    def _save(self) -> None:
+        """Écrit l'index (appelé sous le verrou)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,168 @@
+"""File de traitement des PDFs importés (tâches de fond avec suivi de progression).
+
+L'upload enregistre le PDF sur disque puis crée une tâche : l'extraction, le
+chunking et l'embedding tournent dans un pool de threads borné, hors de la
+requête HTTP. Le client suit la tâche via /api/jobs/{id}.
+
+- Au plus `max_workers` PDFs traités en même temps (mémoire bornée même
+  avec plusieurs uploads simultanés).
+- Au plus `max_pending` tâches en attente ou en cours : au-delà, l'upload
+  est refusé (QueueFullError) plutôt que d'empiler des fichiers.
+- Les tâches terminées sont gardées en mémoire (les `max_finished` plus
+  récentes) pour que le client puisse lire le résultat.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MAX_WORKERS = 2  # PDFs traités simultanément
+MAX_PENDING = 20  # Tâches en attente + en cours acceptées
+MAX_FINISHED = 200  # Tâches terminées gardées pour /api/jobs/{id}
+
+# États d'une tâche
+QUEUED = "queued"
+PROCESSING = "processing"
+DONE = "done"
+ERROR = "error"
+
+
+class QueueFullError(Exception):
+    """Trop de PDFs en attente de traitement."""
+
+
+class PDFJob:
+    """Tâche de traitement d'un PDF ; mise à jour par le worker, lue par l'API."""
+
+    def __init__(self, file_path: str, filename: str, options: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.filename = filename
+        self.options = dict(options or {})  # Arguments supplémentaires du traitement
+        self.owner: Optional[str] = self.options.get("owner")  # Élève qui a importé le PDF
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        # Progression (mise à jour par le traitement via update)
+        self.progress: Dict[str, Any] = {"nb_pages": 0, "nb_chunks": 0, "nb_chunks_embedded": 0}
+        self.result: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def update(self, **progress: Any) -> None:
+        """Met à jour la progression (ex: update(nb_pages=12))."""
+        with self._lock:
+            self.progress.update(progress)
+
+    def finish(self, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        """Enregistre l'issue de la tâche (résultat, ou message d'erreur)."""
+        with self._lock:
+            self.result = dict(result or {})
+            self.error = error
+            self.status = ERROR if error is not None else DONE
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """État de la tâche pour l'API."""
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "status": self.status,
+                **self.progress,
+                **self.result,
+                "error": self.error,
+            }
+
+
+class PDFJobQueue:
+    """File de tâches PDF traitées par un pool de threads borné."""
+
+    def __init__(
+        self,
+        process: Callable[..., Dict[str, Any]],
+        max_workers: int = MAX_WORKERS,
+        max_pending: int = MAX_PENDING,
+        max_finished: int = MAX_FINISHED
+    ):
+        """Initialise la file.
+
+        Args:
+            process: Traitement d'un PDF, appelé avec (chemin, progress,
+                **options de submit) où progress(**champs) met à jour la
+                progression de la tâche (ex: PDFService.process_pdf).
+                Retourne le résultat final.
+            max_workers: PDFs traités simultanément.
+            max_pending: Tâches en attente ou en cours acceptées.
+            max_finished: Tâches terminées gardées en mémoire.
+        """
+        self.process = process
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="pdf")
+        self._jobs: "OrderedDict[str, PDFJob]" = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str, filename: str, **options: Any) -> PDFJob:
+        """Crée une tâche pour un PDF déjà enregistré sur disque.
+
+        Args:
+            file_path: Chemin du PDF.
+            filename: Nom d'origine (affiché).
+            **options: Passés au traitement (ex: sha256=...).
+
+        Raises:
+            QueueFullError: Si `max_pending` tâches sont déjà en attente ou en cours.
+        """
+        job = PDFJob(file_path, filename, options)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"{self._pending} PDFs déjà en cours de traitement")
+            self._pending += 1
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        logger.info(f"Tâche PDF {job.id} créée: {filename}")
+        return job
+
+    def get(self, job_id: str) -> Optional[PDFJob]:
+        """Tâche par id (None si inconnue ou oubliée)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Arrête le pool (les tâches en attente non démarrées sont annulées)."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: PDFJob) -> None:
+        """Exécute une tâche dans un thread du pool."""
+        job.status = PROCESSING
+        result, error = None, None
+        try:
+            result = self.process(job.file_path, job.update, **job.options)
+            logger.info(f"Tâche PDF {job.id} terminée: {job.filename}")
+        except Exception as e:
+            logger.error(f"Tâche PDF {job.id} en erreur ({job.filename}): {e}", exc_info=True)
+            error = str(e)
+        self._finish(job, result, error)
+
+    def _finish(self, job: PDFJob, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        """Termine la tâche, libère sa place et oublie les tâches terminées les plus anciennes.
+
+        Fait sous le verrou de la file : une tâche vue terminée a déjà libéré sa place.
+        """
+        with self._lock:
+            job.finish(result, error)
+            self._pending -= 1
+            finished = [
+                job_id for job_id, other in self._jobs.items() if other.status in (DONE, ERROR)
+            ]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
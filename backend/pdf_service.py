@@ -1,28 +1,48 @@
 """Service pour gérer l'import et le traitement de PDFs personnels."""
 
+import hashlib
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import BinaryIO, Callable, List, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime
 
-from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+
+from answer_cache import bump_collections_version
+from embedding_cache import get_shared_embeddings
+from owners import PERSONAL_COLLECTION_NAME, OwnerLRU, open_personal_store, owner_key, personal_collection_name
+from pdf_extract import MAX_WORKERS as EXTRACT_WORKERS, count_pages, iter_pages
+from pdf_index import INDEX_FILENAME, PDFIndex
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 UPLOAD_DIR = "../data/user_pdfs"  # Dossier pour stocker les PDFs uploadés
+OWNERS_DIR = "eleves"  # Sous-dossier d'UPLOAD_DIR : un dossier par élève (owners.owner_key)
 CHROMA_DIR = "../chromadb"
-PERSONAL_COLLECTION_NAME = "mes_cours"
 EMBEDDING_MODEL = "text-embedding-3-small"
+UPLOAD_CHUNK_BYTES = 1024 * 1024  # Taille des blocs copiés sur disque à l'upload
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024  # Taille max d'un PDF importé
+EMBED_BATCH_SIZE = 64  # Chunks embeddés et ajoutés à ChromaDB par appel
+SCAN_BATCH_SIZE = 5000  # Métadonnées lues / ids supprimés par appel à ChromaDB (compaction)
 
 # Créer le dossier d'upload s'il n'existe pas
 Path(UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
 
 
+class OwnerSpace(NamedTuple):
+    """PDFs d'un élève : dossier, index des chunks et collection ChromaDB."""
+    upload_dir: Path
+    index: PDFIndex
+    vector_store: Chroma
+    collection: str
+
+
 class PDFService:
     """Service pour gérer l'import de PDFs personnels."""
 
@@ -30,7 +50,8 @@ class PDFService:
         self,
         upload_dir: str = UPLOAD_DIR,
         chroma_dir: str = CHROMA_DIR,
-        embedding_model: str = EMBEDDING_MODEL
+        embedding_model: str = EMBEDDING_MODEL,
+        extract_workers: int = EXTRACT_WORKERS
     ):
         """Initialise le service PDF.
 
@@ -38,21 +59,28 @@ class PDFService:
             upload_dir: Dossier où stocker les PDFs uploadés.
             chroma_dir: Chemin vers la base ChromaDB.
             embedding_model: Modèle d'embedding OpenAI.
+            extract_workers: Processus d'extraction du texte (0 : extraction
+                dans le thread du traitement).
         """
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.chroma_dir = chroma_dir
 
-        # Initialiser embeddings
-        logger.info(f"Initialisation embeddings: {embedding_model}")
-        self.embeddings = OpenAIEmbeddings(model=embedding_model)
+        # Index filename -> ids des chunks, pour supprimer un PDF de ChromaDB
+        self.index = PDFIndex(self.upload_dir / INDEX_FILENAME)
 
-        # Initialiser ChromaDB pour la collection personnelle
+        # Initialiser embeddings (instance partagée avec RAGChain, avec cache persistant)
+        self.embeddings = get_shared_embeddings(embedding_model)
+
+        # Initialiser ChromaDB pour la collection personnelle partagée (sans propriétaire)
         logger.info(f"Connexion à ChromaDB: {chroma_dir}")
         self.vector_store = Chroma(
             collection_name=PERSONAL_COLLECTION_NAME,
             embedding_function=self.embeddings,
             persist_directory=chroma_dir
         )
+        # Dossier, index et collection de chaque élève, ouverts à sa première requête
+        self._spaces = OwnerLRU()
 
         # Text splitter pour chunker les PDFs
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -61,85 +89,266 @@ class PDFService:
             separators=["\n\n", "\n", ". ", " ", ""]
         )
 
+        # Pool d'extraction partagé par les traitements en cours (processus
+        # démarrés au premier PDF). "spawn" : pas de fork d'un serveur multi-thread
+        self.extract_workers = extract_workers
+        self.extract_pool = None
+        if extract_workers > 0:
+            self.extract_pool = ProcessPoolExecutor(
+                max_workers=extract_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
         logger.info("PDF Service initialisé avec succès")
 
-    def save_pdf(self, file_content: bytes, filename: str) -> str:
-        """Sauvegarde un PDF uploadé.
+    def space(self, owner: Optional[str] = None, create: bool = False) -> Optional[OwnerSpace]:
+        """Dossier, index et collection des PDFs d'un élève.
+
+        Sans propriétaire : dossier d'upload racine et collection "mes_cours"
+        (PDFs importés avant la séparation par élève).
+
+        Args:
+            owner: Élève (voir owners).
+            create: Créer dossier et collection s'ils n'existent pas (import
+                d'un PDF) ; en lecture, un identifiant inconnu ne crée rien.
+
+        Returns:
+            None si l'élève n'a encore rien importé (et create=False).
+        """
+        if owner is None:
+            return OwnerSpace(self.upload_dir, self.index, self.vector_store, PERSONAL_COLLECTION_NAME)
+        space = self._spaces.get(owner)
+        if space is not None:
+            return space
+
+        upload_dir = self.upload_dir / OWNERS_DIR / owner_key(owner)
+        if create:
+            upload_dir.mkdir(parents=True, exist_ok=True)
+        elif not upload_dir.is_dir():
+            return None
+        vector_store = open_personal_store(owner, self.embeddings, self.chroma_dir, create=create)
+        if vector_store is None:
+            return None
+        return self._spaces.put(owner, OwnerSpace(
+            upload_dir=upload_dir,
+            index=PDFIndex(upload_dir / INDEX_FILENAME),
+            vector_store=vector_store,
+            collection=personal_collection_name(owner)
+        ))
+
+    def close(self) -> None:
+        """Arrête le pool d'extraction."""
+        if self.extract_pool is not None:
+            self.extract_pool.shutdown(wait=False, cancel_futures=True)
+
+    def save_pdf(
+        self,
+        source: BinaryIO,
+        filename: str,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+        owner: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Sauvegarde un PDF uploadé, copié par blocs (jamais chargé en entier en mémoire).
+
+        L'empreinte SHA-256 du contenu est calculée pendant la copie (voir
+        reuse_duplicate).
 
         Args:
-            file_content: Contenu binaire du PDF.
+            source: Flux binaire du PDF (ex: UploadFile.file).
             filename: Nom du fichier.
+            max_bytes: Taille maximale acceptée.
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
 
         Returns:
-            Chemin du fichier sauvegardé.
+            (chemin du fichier sauvegardé, empreinte SHA-256 hexadécimale).
+
+        Raises:
+            ValueError: Si le fichier dépasse max_bytes (rien n'est gardé sur disque).
         """
+        space = self.space(owner, create=True)
+
         # Générer un nom de fichier unique avec timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{filename}"
-        file_path = self.upload_dir / safe_filename
+        safe_filename = f"{timestamp}_{Path(filename).name}"
+        file_path = space.upload_dir / safe_filename
+
+        # Copier le flux bloc par bloc
+        size = 0
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, "wb") as f:
+                while block := source.read(UPLOAD_CHUNK_BYTES):
+                    size += len(block)
+                    if size > max_bytes:
+                        raise ValueError(f"PDF trop volumineux (max {max_bytes // (1024 * 1024)} Mo)")
+                    digest.update(block)
+                    f.write(block)
+        except BaseException:
+            file_path.unlink(missing_ok=True)
+            raise
+
+        logger.info(f"PDF sauvegardé: {file_path} ({size} octets)")
+        return str(file_path), digest.hexdigest()
+
+    def reuse_duplicate(
+        self,
+        file_path: str,
+        sha256: str,
+        owner: Optional[str] = None
+    ) -> Optional[Dict[str, any]]:
+        """Reconnaît un PDF dont le contenu a déjà été importé.
+
+        Si un PDF de même empreinte est encore présent, la nouvelle copie
+        (`file_path`) est supprimée : ses chunks sont déjà dans ChromaDB, rien
+        n'est ré-extrait ni ré-embeddé.
 
-        # Sauvegarder le fichier
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        Args:
+            file_path: Chemin du PDF qui vient d'être sauvegardé.
+            sha256: Son empreinte (voir save_pdf).
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
 
-        logger.info(f"PDF sauvegardé: {file_path}")
-        return str(file_path)
+        Returns:
+            Infos du PDF déjà importé (comme process_pdf, avec duplicate=True),
+            ou None si le contenu est nouveau.
+        """
+        space = self.space(owner)
+        if space is None:
+            return None
+        existing = space.index.find_by_hash(sha256)
+        if existing is None or existing == Path(file_path).name:
+            return None
+        entry = space.index.get(existing)
+        if entry is None or not (space.upload_dir / existing).exists():
+            return None
+
+        Path(file_path).unlink(missing_ok=True)
+        logger.info(f"PDF déjà importé ({existing}), copie supprimée: {file_path}")
+        return {
+            "filename": existing,
+            "nb_pages": entry.get("nb_pages", 0),
+            "nb_chunks": len(entry["chunk_ids"]),
+            "uploaded_at": entry.get("uploaded_at"),
+            "duplicate": True
+        }
 
-    def process_pdf(self, file_path: str) -> Dict[str, any]:
+    def process_pdf(
+        self,
+        file_path: str,
+        progress: Optional[Callable[..., None]] = None,
+        sha256: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> Dict[str, any]:
         """Traite un PDF : extraction, chunking, et ajout à ChromaDB.
 
+        Les pages sont extraites en parallèle (voir pdf_extract) et traitées
+        au fil de l'eau : les premiers chunks sont embeddés pendant que les
+        pages suivantes sont encore extraites. Si le traitement échoue, les
+        chunks déjà ajoutés sont retirés de ChromaDB.
+
         Args:
             file_path: Chemin du fichier PDF.
+            progress: Appelé avec la progression (nb_pages_total, nb_pages,
+                nb_chunks, nb_chunks_embedded) au fil du traitement (ex: PDFJob.update).
+            sha256: Empreinte du contenu (voir save_pdf), enregistrée dans
+                l'index ; un PDF importé entre-temps avec le même contenu est
+                réutilisé au lieu d'être traité.
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
 
         Returns:
             Dict avec infos sur le traitement (nb_pages, nb_chunks, etc.).
+
+        Raises:
+            ValueError: Si aucun texte n'a pu être extrait du PDF.
         """
         logger.info(f"Traitement du PDF: {file_path}")
+        space = self.space(owner, create=True)
+        progress = progress or (lambda **_: None)
+        if sha256:
+            # Même PDF envoyé deux fois avant la fin du premier traitement
+            existing = self.reuse_duplicate(file_path, sha256, owner)
+            if existing is not None:
+                return existing
+        progress(nb_pages_total=count_pages(file_path))
 
-        # 1. Charger le PDF avec PyPDFLoader
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
-
-        logger.info(f"PDF chargé: {len(documents)} pages")
-
-        # 2. Chunker les documents
-        chunks = self.text_splitter.split_documents(documents)
-        logger.info(f"Chunking terminé: {len(chunks)} chunks créés")
-
-        # 3. Ajouter des métadonnées
         filename = Path(file_path).name
-        for i, chunk in enumerate(chunks):
-            chunk.metadata.update({
-                "filename": filename,
-                "source": "pdf_personnel",
-                "chunk_index": i,
-                "uploaded_at": datetime.now().isoformat()
-            })
-
-        # 4. Ajouter à ChromaDB
-        self.vector_store.add_documents(chunks)
-        logger.info(f"Chunks ajoutés à ChromaDB (collection: {PERSONAL_COLLECTION_NAME})")
+        uploaded_at = datetime.now().isoformat()
+        nb_pages = 0
+        nb_chunks = 0
+        batch: List[Document] = []
+        added_ids: List[str] = []
+
+        def flush() -> None:
+            added_ids.extend(space.vector_store.add_documents(batch))
+            batch.clear()
+            progress(nb_chunks_embedded=len(added_ids))
+
+        try:
+            # 1. Extraire les pages (dans l'ordre, au fil de l'eau)
+            for page_number, text in iter_pages(file_path, self.extract_pool, self.extract_workers):
+                nb_pages += 1
+                page = Document(page_content=text, metadata={"source": file_path, "page": page_number})
+
+                # 2. Chunker la page, 3. Ajouter des métadonnées
+                for chunk in self.text_splitter.split_documents([page]):
+                    chunk.metadata.update({
+                        "filename": filename,
+                        "source": "pdf_personnel",
+                        "chunk_index": nb_chunks,
+                        "uploaded_at": uploaded_at
+                    })
+                    batch.append(chunk)
+                    nb_chunks += 1
+                progress(nb_pages=nb_pages, nb_chunks=nb_chunks)
+
+                # 4. Ajouter à ChromaDB par lots, sans attendre la fin de l'extraction
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    flush()
+
+            if batch:
+                flush()
+        except BaseException:
+            if added_ids:
+                logger.warning(f"Traitement interrompu, retrait de {len(added_ids)} chunks de {filename}")
+                space.vector_store.delete(ids=added_ids)
+            raise
+
+        logger.info(f"PDF traité: {nb_pages} pages, {nb_chunks} chunks")
+        if not nb_chunks:
+            raise ValueError("Aucun texte extrait du PDF (document scanné ?)")
+        space.index.set(filename, added_ids, nb_pages=nb_pages, uploaded_at=uploaded_at, sha256=sha256)
+        logger.info(f"Chunks ajoutés à ChromaDB (collection: {space.collection})")
+
+        # Les réponses en cache sur "mes_cours"/"tous" ne sont plus à jour
+        bump_collections_version(self.chroma_dir, space.collection)
 
         return {
             "filename": filename,
-            "nb_pages": len(documents),
-            "nb_chunks": len(chunks),
-            "uploaded_at": chunks[0].metadata["uploaded_at"]
+            "nb_pages": nb_pages,
+            "nb_chunks": nb_chunks,
+            "uploaded_at": uploaded_at
         }
 
-    def list_pdfs(self) -> List[Dict[str, any]]:
-        """Liste tous les PDFs importés.
+    def list_pdfs(self, owner: Optional[str] = None) -> List[Dict[str, any]]:
+        """Liste les PDFs importés par un élève.
+
+        Args:
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
 
         Returns:
             Liste de dicts avec infos sur chaque PDF.
         """
+        space = self.space(owner)
+        if space is None:
+            return []
         pdfs = []
-        for pdf_file in self.upload_dir.glob("*.pdf"):
+        for pdf_file in space.upload_dir.glob("*.pdf"):
             stat = pdf_file.stat()
+            entry = space.index.get(pdf_file.name)
             pdfs.append({
                 "filename": pdf_file.name,
                 "size": stat.st_size,
                 "uploaded_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                "nb_chunks": len(entry["chunk_ids"]) if entry else None,
                 "path": str(pdf_file)
             })
 
@@ -147,46 +356,130 @@ class PDFService:
         pdfs.sort(key=lambda x: x["uploaded_at"], reverse=True)
         return pdfs
 
-    def delete_pdf(self, filename: str) -> bool:
+    def delete_pdf(self, filename: str, owner: Optional[str] = None) -> bool:
         """Supprime un PDF et ses chunks de ChromaDB.
 
+        Les chunks sont retrouvés par l'index (ids enregistrés à l'import) ;
+        pour un PDF absent de l'index (importé avant lui), par leur
+        métadonnée "filename".
+
         Args:
             filename: Nom du fichier à supprimer.
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
 
         Returns:
-            True si suppression réussie, False sinon.
+            True si le fichier ou des chunks ont été supprimés, False sinon.
         """
-        file_path = self.upload_dir / filename
-
-        if not file_path.exists():
+        space = self.space(owner)
+        if space is None:
+            logger.warning(f"PDF non trouvé: {filename}")
+            return False
+        file_path = space.upload_dir / Path(filename).name
+        file_existed = file_path.exists()
+        if file_existed:
+            file_path.unlink()
+            logger.info(f"PDF supprimé: {filename}")
+
+        entry = space.index.pop(filename)
+        if entry is not None:
+            chunk_ids = entry["chunk_ids"]
+        else:
+            chunk_ids = space.vector_store.get(where={"filename": filename}, include=[])["ids"]
+        self._delete_chunks(space.vector_store, chunk_ids)
+
+        if not file_existed and not chunk_ids:
             logger.warning(f"PDF non trouvé: {filename}")
             return False
 
-        # Supprimer le fichier
-        file_path.unlink()
-        logger.info(f"PDF supprimé: {filename}")
+        logger.info(f"{len(chunk_ids)} chunks supprimés de ChromaDB ({filename})")
+        bump_collections_version(self.chroma_dir, space.collection)
+        return True
 
-        # Supprimer les chunks de ChromaDB
-        # Note: ChromaDB ne permet pas de supprimer par metadata facilement
-        # On garde les chunks pour l'instant (optionnel: recréer la collection)
+    def compact(self, owner: Optional[str] = None) -> Dict[str, int]:
+        """Retire de ChromaDB les chunks orphelins et resynchronise l'index.
 
-        return True
+        Parcourt les métadonnées de la collection : les chunks d'un PDF qui
+        n'est plus sur disque (supprimé avant l'index, traitement interrompu
+        par un arrêt du serveur...) sont supprimés ; ceux d'un PDF présent
+        mais absent de l'index y sont ajoutés.
+
+        Args:
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
+
+        Returns:
+            Dict avec nb_chunks_deleted, nb_files_deleted, nb_files_indexed.
+        """
+        space = self.space(owner)
+        if space is None:
+            return {"nb_chunks_deleted": 0, "nb_files_deleted": 0, "nb_files_indexed": 0}
+        ids_by_filename: Dict[str, List[str]] = {}
+        offset = 0
+        while True:
+            page = space.vector_store.get(include=["metadatas"], limit=SCAN_BATCH_SIZE, offset=offset)
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"]):
+                filename = (metadata or {}).get("filename", "")
+                ids_by_filename.setdefault(filename, []).append(chunk_id)
+            if len(page["ids"]) < SCAN_BATCH_SIZE:
+                break
+            offset += SCAN_BATCH_SIZE
+
+        on_disk = {pdf_file.name for pdf_file in space.upload_dir.glob("*.pdf")}
+        entries = {}
+        orphan_ids: List[str] = []
+        nb_files_deleted = 0
+        nb_files_indexed = 0
+        for filename, chunk_ids in ids_by_filename.items():
+            if filename in on_disk:
+                entry = space.index.get(filename)
+                if entry is None or set(entry["chunk_ids"]) != set(chunk_ids):
+                    entry = {**(entry or {}), "chunk_ids": chunk_ids}
+                    nb_files_indexed += 1
+                entries[filename] = entry
+            else:
+                orphan_ids.extend(chunk_ids)
+                nb_files_deleted += 1
+
+        self._delete_chunks(space.vector_store, orphan_ids)
+        space.index.replace_all(entries)
+        if orphan_ids:
+            bump_collections_version(self.chroma_dir, space.collection)
+
+        logger.info(
+            f"Compaction: {len(orphan_ids)} chunks orphelins supprimés ({nb_files_deleted} PDFs), "
+            f"{nb_files_indexed} PDFs réindexés"
+        )
+        return {
+            "nb_chunks_deleted": len(orphan_ids),
+            "nb_files_deleted": nb_files_deleted,
+            "nb_files_indexed": nb_files_indexed
+        }
+
+    @staticmethod
+    def _delete_chunks(vector_store: Chroma, chunk_ids: List[str]) -> None:
+        """Supprime des chunks de ChromaDB par id, par lots."""
+        for start in range(0, len(chunk_ids), SCAN_BATCH_SIZE):
+            vector_store.delete(ids=chunk_ids[start:start + SCAN_BATCH_SIZE])
 
     def search_in_personal_docs(
         self,
         question: str,
-        top_k: int = 5
+        top_k: int = 5,
+        owner: Optional[str] = None
     ) -> List[Dict[str, any]]:
-        """Recherche dans les documents personnels.
+        """Recherche dans les documents personnels d'un élève.
 
         Args:
             question: Question de l'utilisateur.
             top_k: Nombre de résultats.
+            owner: Élève propriétaire (voir owners ; None : PDFs partagés).
 
         Returns:
             Liste de documents pertinents.
         """
-        results = self.vector_store.similarity_search_with_score(
+        space = self.space(owner)
+        if space is None:
+            return []
+        results = space.vector_store.similarity_search_with_score(
             question,
             k=top_k
         )
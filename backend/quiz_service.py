@@ -51,7 +51,7 @@ class QuizService:
 
         # 1. Récupérer le contenu complet de la leçon
         try:
-            lesson = self.rag_chain.get_lesson_content(matiere, titre)
+            lesson = await self.rag_chain.aget_lesson_content(matiere, titre)
         except Exception as e:
             logger.error(f"Leçon non trouvée: {e}")
             raise ValueError(f"Leçon '{titre}' non trouvée pour {matiere}")
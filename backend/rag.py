@@ -1,12 +1,32 @@
 """Chaîne RAG LangChain: retrieval + generation."""
 
+import asyncio
+import functools
+import heapq
+import itertools
 import logging
-from typing import List, Dict, Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Tuple
 
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
 
+from answer_cache import AnswerCache
+from embedding_cache import get_shared_embeddings
+from lesson_catalog import (
+    PUBLIC_FIELDS,
+    CatalogHolder,
+    LessonCatalog,
+    SECTION_SEPARATOR,
+    SECTIONS_LIST_SEPARATOR,
+    LessonContentCache,
+    fold_text,
+    merge_sections,
+    strip_title_prefix,
+)
+from owners import OwnerLRU, open_personal_store, personal_collection_name
 from prompts import get_prompt, REFUS_MESSAGE
 
 logger = logging.getLogger(__name__)
@@ -18,6 +38,14 @@ CHROMA_DIR = "../chromadb"  # Relatif au dossier backend -> remonte à la racine
 COLLECTION_NAME = "cours_college"
 SIMILARITY_THRESHOLD = 0.3  # Seuil minimum de similarité
 TOP_K = 5  # Nombre de chunks à récupérer
+SECTION_CANDIDATES = 2  # Candidats lus par collection (x top_k) avant le boost par section
+SECTION_BOOST = 0.1  # Distance réduite de 10% si le titre de section apparaît dans la question
+CHROMA_MAX_WORKERS = 4  # Threads dédiés aux appels ChromaDB (bloquants) depuis le code async
+
+
+def _significant_words(text: str) -> set:
+    """Mots de 4 lettres ou plus, sans casse ni accents (comparaison question / titre de section)."""
+    return set(re.findall(r"\w{4,}", fold_text(text)))
 
 
 class RAGChain:
@@ -29,7 +57,9 @@ class RAGChain:
         embedding_model: str = EMBEDDING_MODEL,
         llm_model: str = LLM_MODEL,
         top_k: int = TOP_K,
-        similarity_threshold: float = SIMILARITY_THRESHOLD
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        chroma_max_workers: int = CHROMA_MAX_WORKERS,
+        answer_cache: Optional[AnswerCache] = None
     ):
         """Initialise la chaîne RAG.
 
@@ -39,14 +69,21 @@ class RAGChain:
             llm_model: Modèle LLM OpenAI.
             top_k: Nombre de chunks à récupérer.
             similarity_threshold: Seuil minimum de similarité.
+            chroma_max_workers: Taille du pool de threads pour les appels ChromaDB async.
+            answer_cache: Cache de réponses (par défaut: AnswerCache surveillant chroma_dir).
         """
         self.top_k = top_k
         self.similarity_threshold = similarity_threshold
         self.chroma_dir = chroma_dir
 
-        # Initialiser embeddings
-        logger.info(f"Initialisation embeddings: {embedding_model}")
-        self.embeddings = OpenAIEmbeddings(model=embedding_model)
+        # Pool borné pour exécuter ChromaDB (synchrone) sans bloquer la boucle d'événements
+        self._chroma_executor = ThreadPoolExecutor(
+            max_workers=chroma_max_workers,
+            thread_name_prefix="chroma"
+        )
+
+        # Initialiser embeddings (instance partagée, avec cache persistant)
+        self.embeddings = get_shared_embeddings(embedding_model)
 
         # Initialiser ChromaDB - Collection Vikidia
         logger.info(f"Connexion à ChromaDB: {chroma_dir}")
@@ -56,12 +93,14 @@ class RAGChain:
             persist_directory=chroma_dir
         )
 
-        # Initialiser ChromaDB - Collection Mes Cours
+        # Initialiser ChromaDB - Collection Mes Cours (partagée, sans propriétaire)
         self.vector_store_personal = Chroma(
-            collection_name="mes_cours",
+            collection_name=personal_collection_name(),
             embedding_function=self.embeddings,
             persist_directory=chroma_dir
         )
+        # Collections Mes Cours par élève, ouvertes à leur première question
+        self._personal_stores = OwnerLRU()
 
         # Initialiser LLM
         logger.info(f"Initialisation LLM: {llm_model}")
@@ -70,6 +109,18 @@ class RAGChain:
             temperature=0.3,  # Peu créatif, reste sur les faits
         )
 
+        # Cache des réponses (exact + sémantique), invalidé quand les collections changent
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache(chroma_dir=chroma_dir)
+
+        # Catalogue des leçons (bibliothèque), chargé maintenant plutôt qu'au premier clic
+        self.lesson_catalog = CatalogHolder(self.vector_store._collection, chroma_dir, COLLECTION_NAME)
+        try:
+            logger.info(f"Catalogue des leçons: {len(self.lesson_catalog.get())} leçons")
+        except Exception as e:
+            logger.warning(f"Catalogue des leçons non chargé au démarrage: {e}")
+        # Leçons reconstruites (bibliothèque + quiz)
+        self.lesson_content_cache = LessonContentCache()
+
         logger.info("RAG Chain initialisée avec succès")
 
     def is_general_question(self, question: str) -> bool:
@@ -110,69 +161,200 @@ class RAGChain:
 
         return False
 
+    def personal_store(self, owner: Optional[str] = None) -> Optional[Chroma]:
+        """Collection Mes Cours d'un élève (la collection partagée sans propriétaire).
+
+        Returns:
+            None si l'élève n'a encore rien importé (rien n'est créé en lecture).
+        """
+        if owner is None:
+            return self.vector_store_personal
+        store = self._personal_stores.get(owner)
+        if store is None:
+            store = open_personal_store(owner, self.embeddings, self.chroma_dir)
+            if store is not None:
+                store = self._personal_stores.put(owner, store)
+        return store
+
     def retrieve(
         self,
         question: str,
         matiere: Optional[str] = None,
         niveau: Optional[str] = None,
-        source: str = "vikidia"
+        source: str = "vikidia",
+        query_embedding: Optional[List[float]] = None,
+        section: Optional[str] = None,
+        owner: Optional[str] = None
     ) -> List[Document]:
         """Récupère les chunks pertinents depuis ChromaDB.
 
+        La question est embeddée une seule fois, puis les collections ciblées
+        par `source` sont interrogées en parallèle avec ce vecteur. Les chunks
+        d'une section dont le titre apparaît dans la question sont favorisés.
+
+        Args:
+            question: Question de l'élève.
+            matiere: Filtre optionnel par matière.
+            niveau: Filtre optionnel par niveau.
+            source: Source des documents ("vikidia", "mes_cours", "tous").
+            query_embedding: Embedding déjà calculé de la question (évite de le recalculer).
+            section: Filtre optionnel par chemin de section ("Partie > Sous-partie").
+            owner: Élève dont la collection Mes Cours est interrogée (voir owners).
+
+        Returns:
+            Liste de documents pertinents.
+        """
+        if query_embedding is None:
+            query_embedding = self.embeddings.embed_query(question)
+
+        searches = self._collection_searches(matiere, niveau, source, section, owner)
+        futures = [
+            self._chroma_executor.submit(
+                store.similarity_search_by_vector_with_relevance_scores,
+                query_embedding,
+                k=self.top_k * SECTION_CANDIDATES,
+                filter=filters
+            )
+            for _, store, filters in searches
+        ]
+        results = [future.result() for future in futures]
+
+        return self._merge_results(searches, results, source, question)
+
+    async def aretrieve(
+        self,
+        question: str,
+        matiere: Optional[str] = None,
+        niveau: Optional[str] = None,
+        source: str = "vikidia",
+        query_embedding: Optional[List[float]] = None,
+        section: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> List[Document]:
+        """Version asynchrone de retrieve().
+
+        L'embedding de la question est calculé une seule fois via aembed_query,
+        puis les collections ChromaDB sont interrogées en parallèle par vecteur
+        dans le pool de threads dédié.
+
         Args:
             question: Question de l'élève.
             matiere: Filtre optionnel par matière.
             niveau: Filtre optionnel par niveau.
             source: Source des documents ("vikidia", "mes_cours", "tous").
+            query_embedding: Embedding déjà calculé de la question (évite de le recalculer).
+            section: Filtre optionnel par chemin de section ("Partie > Sous-partie").
+            owner: Élève dont la collection Mes Cours est interrogée (voir owners).
 
         Returns:
             Liste de documents pertinents.
         """
-        # Construire les filtres de métadonnées (seulement pour Vikidia)
+        if query_embedding is None:
+            query_embedding = await self.embeddings.aembed_query(question)
+
+        # Ouvrir la collection d'un élève interroge ChromaDB : hors de la boucle d'événements
+        searches = await self._run_in_chroma_pool(
+            self._collection_searches, matiere, niveau, source, section, owner
+        )
+        results = await asyncio.gather(*(
+            self._run_in_chroma_pool(
+                store.similarity_search_by_vector_with_relevance_scores,
+                query_embedding,
+                k=self.top_k * SECTION_CANDIDATES,
+                filter=filters
+            )
+            for _, store, filters in searches
+        ))
+
+        return self._merge_results(searches, results, source, question)
+
+    async def _run_in_chroma_pool(self, func: Callable, *args, **kwargs) -> Any:
+        """Exécute un appel ChromaDB bloquant dans le pool de threads borné."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._chroma_executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    def _collection_searches(
+        self,
+        matiere: Optional[str],
+        niveau: Optional[str],
+        source: str,
+        section: Optional[str] = None,
+        owner: Optional[str] = None
+    ) -> List[Tuple[str, Chroma, Optional[Dict[str, Any]]]]:
+        """Liste les collections à interroger pour une source, avec leurs filtres.
+
+        Returns:
+            Liste de (libellé, collection, filtre de métadonnées ou None).
+        """
+        # Filtres de métadonnées (seulement pour Vikidia)
         filters = {}
-        if matiere and source != "mes_cours":
+        if matiere:
             filters["matiere"] = matiere
-        if niveau and niveau != "college" and source != "mes_cours":
+        if section:
+            filters["section"] = section
+        if niveau and niveau != "college":
             # Chercher niveau exact OU college (fallback)
             # Note: ChromaDB ne supporte pas OR, donc on fait 2 requêtes
             pass
+        # Plusieurs conditions: ChromaDB attend un $and explicite
+        if len(filters) > 1:
+            filters = {"$and": [{key: value} for key, value in filters.items()]}
 
-        # Recherche de similarité selon la source
-        all_results = []
-
+        searches = []
         if source == "vikidia" or source == "tous":
-            # Rechercher dans Vikidia
-            if filters:
-                results = self.vector_store.similarity_search_with_score(
-                    question,
-                    k=self.top_k,
-                    filter=filters
-                )
-            else:
-                results = self.vector_store.similarity_search_with_score(
-                    question,
-                    k=self.top_k
-                )
-            all_results.extend(results)
-            logger.info(f"Vikidia: {len(results)} résultats")
-
+            searches.append(("Vikidia", self.vector_store, filters or None))
         if source == "mes_cours" or source == "tous":
-            # Rechercher dans Mes Cours
-            results_personal = self.vector_store_personal.similarity_search_with_score(
-                question,
-                k=self.top_k
-            )
-            all_results.extend(results_personal)
-            logger.info(f"Mes Cours: {len(results_personal)} résultats")
+            personal_store = self.personal_store(owner)
+            if personal_store is not None:
+                searches.append(("Mes Cours", personal_store, None))
+        return searches
+
+    def _merge_results(
+        self,
+        searches: List[Tuple[str, Chroma, Optional[Dict[str, Any]]]],
+        results: List[List[Tuple[Document, float]]],
+        source: str,
+        question: str = ""
+    ) -> List[Document]:
+        """Fusionne les résultats des collections et garde le top_k global.
 
-        # Si "tous", limiter au top_k global et trier par score
-        if source == "tous":
-            all_results.sort(key=lambda x: x[1])  # Trier par score (ascending = meilleur)
-            all_results = all_results[:self.top_k]
+        La distance d'un chunk dont un titre de section (parmi celles qu'il
+        couvre) partage un mot avec la question est réduite de SECTION_BOOST
+        avant le classement.
+
+        Args:
+            searches: Collections interrogées (voir _collection_searches).
+            results: Couples (document, distance) par collection, triés par distance.
+            source: Source des documents ("vikidia", "mes_cours", "tous").
+            question: Question de l'élève (boost par section).
+
+        Returns:
+            Liste de documents pertinents.
+        """
+        for (label, _, _), collection_results in zip(searches, results):
+            logger.info(f"{label}: {len(collection_results)} résultats")
+
+        question_words = _significant_words(question)
+
+        def boosted_distance(result: Tuple[Document, float]) -> float:
+            doc, distance = result
+            sections = doc.metadata.get("sections") or doc.metadata.get("section") or ""
+            for section in sections.split(SECTIONS_LIST_SEPARATOR):
+                section_title = section.rsplit(SECTION_SEPARATOR, 1)[-1]
+                if section_title and question_words & _significant_words(section_title):
+                    return distance * (1 - SECTION_BOOST)
+            return distance
+
+        # Top-k global par distance (plus petit = plus similaire)
+        all_results = heapq.nsmallest(
+            self.top_k,
+            itertools.chain.from_iterable(results),
+            key=boosted_distance
+        )
 
-        # Filtrer par seuil de similarité
-        # Note: ChromaDB retourne distance (plus petit = plus similaire)
-        # On garde seulement les résultats pertinents
         filtered_docs = []
         for doc, score in all_results:
             source_label = doc.metadata.get('source', 'unknown')
@@ -183,13 +365,13 @@ class RAGChain:
         logger.info(f"Retrieval ({source}): {len(filtered_docs)} chunks pertinents trouvés")
         return filtered_docs
 
-    def generate(
+    def _build_prompt(
         self,
         question: str,
         documents: List[Document],
         niveau: str = "college"
     ) -> str:
-        """Génère la réponse en utilisant les documents et le LLM.
+        """Construit le prompt LLM à partir des documents récupérés.
 
         Args:
             question: Question de l'élève.
@@ -197,17 +379,11 @@ class RAGChain:
             niveau: Niveau scolaire pour adapter le langage.
 
         Returns:
-            Réponse générée par le LLM.
+            Prompt complet (contexte + question) adapté au niveau.
         """
-        if not documents:
-            logger.warning("Aucun document pertinent trouvé")
-            return REFUS_MESSAGE
-
-        # Construire le contexte à partir des documents
         context_parts = []
         for i, doc in enumerate(documents, 1):
             titre = doc.metadata.get("titre", "Sans titre")
-            source = doc.metadata.get("source", "")
             matiere = doc.metadata.get("matiere", "")
 
             context_parts.append(
@@ -217,7 +393,29 @@ class RAGChain:
         context = "\n---\n".join(context_parts)
 
         # Construire le prompt avec niveau adapté
-        prompt = get_prompt(question, context, niveau)
+        return get_prompt(question, context, niveau)
+
+    def generate(
+        self,
+        question: str,
+        documents: List[Document],
+        niveau: str = "college"
+    ) -> str:
+        """Génère la réponse en utilisant les documents et le LLM.
+
+        Args:
+            question: Question de l'élève.
+            documents: Documents récupérés (contexte).
+            niveau: Niveau scolaire pour adapter le langage.
+
+        Returns:
+            Réponse générée par le LLM.
+        """
+        if not documents:
+            logger.warning("Aucun document pertinent trouvé")
+            return REFUS_MESSAGE
+
+        prompt = self._build_prompt(question, documents, niveau)
 
         # Appeler le LLM
         logger.info(f"Génération de la réponse (niveau: {niveau})")
@@ -225,12 +423,106 @@ class RAGChain:
 
         return response.content
 
+    async def agenerate(
+        self,
+        question: str,
+        documents: List[Document],
+        niveau: str = "college"
+    ) -> str:
+        """Version asynchrone de generate() (ChatOpenAI.ainvoke).
+
+        Args:
+            question: Question de l'élève.
+            documents: Documents récupérés (contexte).
+            niveau: Niveau scolaire pour adapter le langage.
+
+        Returns:
+            Réponse générée par le LLM.
+        """
+        if not documents:
+            logger.warning("Aucun document pertinent trouvé")
+            return REFUS_MESSAGE
+
+        prompt = self._build_prompt(question, documents, niveau)
+
+        logger.info(f"Génération async de la réponse (niveau: {niveau})")
+        response = await self.llm.ainvoke(prompt)
+
+        return response.content
+
+    def _general_answer(self, question: str) -> Dict[str, any]:
+        """Réponse amicale pour une question générale (salutations, etc.).
+
+        Args:
+            question: La question de l'utilisateur.
+
+        Returns:
+            Dict avec la réponse et des sources vides.
+        """
+        # Réponses amicales pour questions générales
+        general_responses = {
+            "salut": "Salut ! 👋 Je suis ton assistant scolaire. Pose-moi des questions sur tes cours de collège (maths, français, histoire-géo, SVT, physique-chimie, etc.) et je t'aiderai avec plaisir !",
+            "bonjour": "Bonjour ! 😊 Je suis là pour t'aider avec tes cours de collège. N'hésite pas à me poser des questions sur les matières que tu étudies !",
+            "merci": "De rien ! 😊 N'hésite pas si tu as d'autres questions sur tes cours !",
+            "ça va": "Je vais bien, merci ! 😊 Et toi, as-tu des questions sur tes cours ? Je suis là pour t'aider !",
+            "qui es-tu": "Je suis un assistant scolaire qui t'aide avec tes cours de collège ! 📚 Je peux répondre à tes questions sur toutes les matières : maths, français, histoire-géo, SVT, physique-chimie, technologie, anglais et espagnol. Pose-moi une question !",
+        }
+
+        # Trouver une réponse appropriée
+        question_lower = question.lower().strip()
+        answer = None
+        for key, response in general_responses.items():
+            if key in question_lower:
+                answer = response
+                break
+
+        # Réponse par défaut si aucun match
+        if not answer:
+            answer = "Bonjour ! 😊 Je suis ton assistant scolaire pour le collège. Pose-moi des questions sur tes cours et je t'aiderai !"
+
+        return {
+            "answer": answer,
+            "sources": [],
+            "nb_sources": 0
+        }
+
+    def _format_sources(self, documents: List[Document]) -> List[Dict[str, any]]:
+        """Prépare la liste des sources (dédupliquées par titre).
+
+        Args:
+            documents: Documents utilisés pour la réponse.
+
+        Returns:
+            Liste de dicts décrivant chaque source.
+        """
+        seen_titles = set()
+        sources = []
+        for doc in documents:
+            titre = doc.metadata.get("titre", doc.metadata.get("filename", "Sans titre"))
+
+            # Éviter les doublons : un seul lien par article
+            if titre in seen_titles:
+                continue
+            seen_titles.add(titre)
+
+            sources.append({
+                "titre": titre,
+                "url": doc.metadata.get("url", ""),
+                "matiere": doc.metadata.get("matiere", ""),
+                "source": doc.metadata.get("source", ""),
+                "filename": doc.metadata.get("filename", ""),
+                "page": doc.metadata.get("page", 0)
+            })
+
+        return sources
+
     def run(
         self,
         question: str,
         matiere: Optional[str] = None,
         niveau: str = "college",
-        source: str = "vikidia"
+        source: str = "vikidia",
+        owner: Optional[str] = None
     ) -> Dict[str, any]:
         """Exécute la chaîne RAG complète.
 
@@ -239,6 +531,7 @@ class RAGChain:
             matiere: Filtre optionnel par matière.
             niveau: Niveau scolaire (6eme, 5eme, 4eme, 3eme, college).
             source: Source des documents ("vikidia", "mes_cours", "tous").
+            owner: Élève dont les documents forment "mes_cours" (voir owners).
 
         Returns:
             Dict avec la réponse et les sources.
@@ -248,137 +541,214 @@ class RAGChain:
         # Vérifier si c'est une question générale (salutations, etc.)
         if self.is_general_question(question):
             logger.info("Question générale détectée - réponse sans sources")
-
-            # Réponses amicales pour questions générales
-            general_responses = {
-                "salut": "Salut ! 👋 Je suis ton assistant scolaire. Pose-moi des questions sur tes cours de collège (maths, français, histoire-géo, SVT, physique-chimie, etc.) et je t'aiderai avec plaisir !",
-                "bonjour": "Bonjour ! 😊 Je suis là pour t'aider avec tes cours de collège. N'hésite pas à me poser des questions sur les matières que tu étudies !",
-                "merci": "De rien ! 😊 N'hésite pas si tu as d'autres questions sur tes cours !",
-                "ça va": "Je vais bien, merci ! 😊 Et toi, as-tu des questions sur tes cours ? Je suis là pour t'aider !",
-                "qui es-tu": "Je suis un assistant scolaire qui t'aide avec tes cours de collège ! 📚 Je peux répondre à tes questions sur toutes les matières : maths, français, histoire-géo, SVT, physique-chimie, technologie, anglais et espagnol. Pose-moi une question !",
-            }
-
-            # Trouver une réponse appropriée
-            question_lower = question.lower().strip()
-            answer = None
-            for key, response in general_responses.items():
-                if key in question_lower:
-                    answer = response
-                    break
-
-            # Réponse par défaut si aucun match
-            if not answer:
-                answer = "Bonjour ! 😊 Je suis ton assistant scolaire pour le collège. Pose-moi des questions sur tes cours et je t'aiderai !"
-
-            return {
-                "answer": answer,
-                "sources": [],
-                "nb_sources": 0
-            }
+            return self._general_answer(question)
+
+        # Question thématique : cache exact d'abord (aucun appel API)
+        personal_collection = personal_collection_name(owner)
+        cached = self.answer_cache.get_exact(question, matiere, niveau, source, personal_collection)
+        if cached is not None:
+            logger.info("Réponse servie depuis le cache (exact)")
+            return cached
+
+        # Embedding de la question : cache sémantique puis retrieval
+        query_embedding = self.embeddings.embed_query(question)
+        cached = self.answer_cache.get_similar(question, query_embedding, matiere, niveau, source, personal_collection)
+        if cached is not None:
+            logger.info("Réponse servie depuis le cache (sémantique)")
+            return cached
 
         # Question thématique : procéder avec le RAG normal
         # 1. Retrieval
-        documents = self.retrieve(question, matiere, niveau, source)
+        documents = self.retrieve(question, matiere, niveau, source, query_embedding=query_embedding, owner=owner)
 
         # 2. Generation
         answer = self.generate(question, documents, niveau)
 
         # 3. Préparer les sources (dédupliquées par titre)
-        seen_titles = set()
-        sources = []
-        for doc in documents:
-            titre = doc.metadata.get("titre", doc.metadata.get("filename", "Sans titre"))
+        sources = self._format_sources(documents)
 
-            # Éviter les doublons : un seul lien par article
-            if titre in seen_titles:
-                continue
-            seen_titles.add(titre)
+        result = {
+            "answer": answer,
+            "sources": sources,
+            "nb_sources": len(sources)
+        }
+        self.answer_cache.set(question, matiere, niveau, source, result, query_embedding, personal_collection)
+        return result
 
-            sources.append({
-                "titre": titre,
-                "url": doc.metadata.get("url", ""),
-                "matiere": doc.metadata.get("matiere", ""),
-                "source": doc.metadata.get("source", ""),
-                "filename": doc.metadata.get("filename", ""),
-                "page": doc.metadata.get("page", 0)
-            })
+    async def arun(
+        self,
+        question: str,
+        matiere: Optional[str] = None,
+        niveau: str = "college",
+        source: str = "vikidia",
+        owner: Optional[str] = None
+    ) -> Dict[str, any]:
+        """Version asynchrone de run(): ne bloque pas la boucle d'événements.
 
-        return {
+        Args:
+            question: Question de l'élève.
+            matiere: Filtre optionnel par matière.
+            niveau: Niveau scolaire (6eme, 5eme, 4eme, 3eme, college).
+            source: Source des documents ("vikidia", "mes_cours", "tous").
+            owner: Élève dont les documents forment "mes_cours" (voir owners).
+
+        Returns:
+            Dict avec la réponse et les sources.
+        """
+        logger.info(f"RAG Query (async): '{question}' (matiere={matiere}, niveau={niveau}, source={source})")
+
+        if self.is_general_question(question):
+            logger.info("Question générale détectée - réponse sans sources")
+            return self._general_answer(question)
+
+        personal_collection = personal_collection_name(owner)
+        cached = self.answer_cache.get_exact(question, matiere, niveau, source, personal_collection)
+        if cached is not None:
+            logger.info("Réponse servie depuis le cache (exact)")
+            return cached
+
+        query_embedding = await self.embeddings.aembed_query(question)
+        cached = self.answer_cache.get_similar(question, query_embedding, matiere, niveau, source, personal_collection)
+        if cached is not None:
+            logger.info("Réponse servie depuis le cache (sémantique)")
+            return cached
+
+        documents = await self.aretrieve(question, matiere, niveau, source, query_embedding=query_embedding, owner=owner)
+        answer = await self.agenerate(question, documents, niveau)
+        sources = self._format_sources(documents)
+
+        result = {
             "answer": answer,
             "sources": sources,
             "nb_sources": len(sources)
         }
+        self.answer_cache.set(question, matiere, niveau, source, result, query_embedding, personal_collection)
+        return result
+
+    async def astream(
+        self,
+        question: str,
+        matiere: Optional[str] = None,
+        niveau: str = "college",
+        source: str = "vikidia",
+        owner: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, any]]:
+        """Variante streaming de run(): les sources d'abord, puis la réponse token par token.
+
+        Args:
+            question: Question de l'élève.
+            matiere: Filtre optionnel par matière.
+            niveau: Niveau scolaire (6eme, 5eme, 4eme, 3eme, college).
+            source: Source des documents ("vikidia", "mes_cours", "tous").
+            owner: Élève dont les documents forment "mes_cours" (voir owners).
+
+        Yields:
+            Événements {"event": ..., "data": ...} dans l'ordre:
+            "sources" (une fois), "token" (n fois), puis "done" avec la réponse complète.
+        """
+        logger.info(f"RAG Stream: '{question}' (matiere={matiere}, niveau={niveau}, source={source})")
+
+        # Question générale : pas de LLM, la réponse tient en un seul token
+        if self.is_general_question(question):
+            logger.info("Question générale détectée - réponse sans sources")
+            result = self._general_answer(question)
+            yield {"event": "sources", "data": {"sources": [], "nb_sources": 0}}
+            yield {"event": "token", "data": {"content": result["answer"]}}
+            yield {"event": "done", "data": {"answer": result["answer"]}}
+            return
+
+        # Réponse en cache : envoyée d'un bloc, sans retrieval ni LLM
+        personal_collection = personal_collection_name(owner)
+        cached = self.answer_cache.get_exact(question, matiere, niveau, source, personal_collection)
+        query_embedding = None
+        if cached is None:
+            query_embedding = await self.embeddings.aembed_query(question)
+            cached = self.answer_cache.get_similar(question, query_embedding, matiere, niveau, source, personal_collection)
+        if cached is not None:
+            logger.info("Réponse servie depuis le cache")
+            yield {"event": "sources", "data": {"sources": cached["sources"], "nb_sources": cached["nb_sources"]}}
+            yield {"event": "token", "data": {"content": cached["answer"]}}
+            yield {"event": "done", "data": {"answer": cached["answer"]}}
+            return
+
+        # 1. Retrieval
+        documents = await self.aretrieve(question, matiere, niveau, source, query_embedding=query_embedding, owner=owner)
+
+        # 2. Sources envoyées avant la génération
+        sources = self._format_sources(documents)
+        yield {"event": "sources", "data": {"sources": sources, "nb_sources": len(sources)}}
+
+        if not documents:
+            logger.warning("Aucun document pertinent trouvé")
+            yield {"event": "token", "data": {"content": REFUS_MESSAGE}}
+            yield {"event": "done", "data": {"answer": REFUS_MESSAGE}}
+            return
+
+        # 3. Generation en streaming
+        prompt = self._build_prompt(question, documents, niveau)
+        logger.info(f"Génération streaming de la réponse (niveau: {niveau})")
+        answer_parts = []
+        async for chunk in self.llm.astream(prompt):
+            if not chunk.content:
+                continue
+            answer_parts.append(chunk.content)
+            yield {"event": "token", "data": {"content": chunk.content}}
+
+        answer = "".join(answer_parts)
+        self.answer_cache.set(
+            question, matiere, niveau, source,
+            {"answer": answer, "sources": sources, "nb_sources": len(sources)},
+            query_embedding, personal_collection
+        )
+        yield {"event": "done", "data": {"answer": answer}}
 
     def get_all_lessons(
         self,
         matiere: str,
         niveau: Optional[str] = None,
-        limit: int = 50000
+        limit: int = 50000,
+        offset: int = 0
     ) -> List[Dict[str, any]]:
-        """Récupère la liste de toutes les leçons disponibles pour une matière.
+        """Récupère la liste des leçons disponibles pour une matière.
+
+        Lecture en mémoire dans le catalogue des leçons (construit à l'ingestion),
+        sans parcourir la collection ChromaDB.
 
         Args:
             matiere: Matière à filtrer.
             niveau: Niveau optionnel (6eme, 5eme, 4eme, 3eme).
             limit: Nombre maximum de leçons à retourner (défaut: 50000 pour tout récupérer).
+            offset: Nombre de leçons à sauter (pagination).
 
         Returns:
-            Liste de dicts avec titre, url, resume, niveau, nb_chunks.
+            Liste de dicts avec titre, url, resume, niveau, nb_chunks, triée par titre.
         """
         logger.info(f"Fetching lessons: matiere={matiere}, niveau={niveau}")
 
-        # Construire le filtre avec opérateur ChromaDB
-        if niveau and niveau != "college":
-            # Filtrer par matière ET niveau
-            filters = {
-                "$and": [
-                    {"matiere": {"$eq": matiere}},
-                    {"niveau": {"$eq": niveau}}
-                ]
-            }
-        else:
-            # Filtrer uniquement par matière
-            filters = {"matiere": {"$eq": matiere}}
-
-        # Récupérer tous les documents de la matière (sans query spécifique)
-        # On utilise une query générique pour obtenir tous les docs
         try:
-            collection = self.vector_store._collection
-            results = collection.get(
-                where=filters,
-                limit=100000  # Récupère beaucoup de chunks (plusieurs par leçon)
-            )
+            lessons = self.lesson_catalog.get().lessons(matiere, niveau)
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des leçons: {e}")
             return []
 
-        # Grouper par titre (chaque leçon a plusieurs chunks)
-        lessons_map = {}
-        if results and results.get("metadatas"):
-            for metadata, doc_id in zip(results["metadatas"], results["ids"]):
-                titre = metadata.get("titre", "Sans titre")
-                if titre not in lessons_map:
-                    # Prendre les 200 premiers caractères comme résumé
-                    page_content = results["documents"][results["ids"].index(doc_id)]
-                    resume = page_content[:200] + "..." if len(page_content) > 200 else page_content
-
-                    lessons_map[titre] = {
-                        "titre": titre,
-                        "url": metadata.get("url", ""),
-                        "resume": resume,
-                        "matiere": metadata.get("matiere", ""),
-                        "niveau": metadata.get("niveau", "college"),
-                        "source": metadata.get("source", ""),
-                        "nb_chunks": 1
-                    }
-                else:
-                    lessons_map[titre]["nb_chunks"] += 1
-
-        # Convertir en liste et trier par titre
-        lessons = sorted(lessons_map.values(), key=lambda x: x["titre"])
+        page = lessons[offset:offset + limit]
         logger.info(f"Found {len(lessons)} unique lessons")
 
-        return lessons[:limit]
+        return [{field: lesson[field] for field in PUBLIC_FIELDS} for lesson in page]
+
+    async def aget_all_lessons(
+        self,
+        matiere: str,
+        niveau: Optional[str] = None,
+        limit: int = 50000,
+        offset: int = 0
+    ) -> List[Dict[str, any]]:
+        """Version asynchrone de get_all_lessons() (exécutée dans le pool ChromaDB)."""
+        return await self._run_in_chroma_pool(self.get_all_lessons, matiere, niveau, limit, offset)
+
+    async def aget_lesson_catalog(self) -> LessonCatalog:
+        """Catalogue des leçons à jour (rechargé dans le pool ChromaDB si la collection a changé)."""
+        return await self._run_in_chroma_pool(self.lesson_catalog.get)
 
     def get_lesson_content(
         self,
@@ -387,61 +757,79 @@ class RAGChain:
     ) -> Optional[Dict[str, any]]:
         """Récupère le contenu complet d'une leçon spécifique.
 
+        Les chunks sont lus directement par id (ids du catalogue des leçons),
+        remis dans l'ordre de chunk_index et recollés sans le préfixe titre ni
+        les recouvrements, section par section. Le résultat est gardé en cache (LRU).
+
         Args:
             matiere: Matière de la leçon.
             titre: Titre exact de la leçon.
 
         Returns:
-            Dict avec titre, resume, contenu_complet, url, niveau, nb_chunks.
+            Dict avec titre, resume, contenu_complet, sommaire (titres des
+            sections et leur position dans contenu_complet), url, niveau, nb_chunks.
         """
         logger.info(f"Fetching lesson content: {titre} (matiere={matiere})")
 
-        # Récupérer tous les chunks de cette leçon
-        # ChromaDB nécessite l'opérateur $and pour plusieurs conditions
-        filters = {
-            "$and": [
-                {"matiere": {"$eq": matiere}},
-                {"titre": {"$eq": titre}}
-            ]
-        }
+        try:
+            catalog = self.lesson_catalog.get()
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du catalogue: {e}", exc_info=True)
+            return None
+
+        cache_key = (catalog.version, matiere, titre)
+        cached = self.lesson_content_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        entry = catalog.get(matiere, titre)
+        if entry is None:
+            logger.warning(f"Aucun contenu trouvé pour: {titre} dans {matiere}")
+            return None
 
         try:
             collection = self.vector_store._collection
-            logger.info(f"Querying ChromaDB with filters: {filters}")
-            results = collection.get(
-                where=filters,
-                limit=1000  # Une leçon peut avoir beaucoup de chunks
-            )
-            logger.info(f"ChromaDB returned {len(results.get('documents', []))} documents")
+            results = collection.get(ids=entry["chunk_ids"], include=["documents", "metadatas"])
+            logger.info(f"ChromaDB returned {len(results.get('documents') or [])} documents")
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du contenu: {e}", exc_info=True)
             return None
 
         if not results or not results.get("documents"):
             logger.warning(f"Aucun contenu trouvé pour: {titre} dans {matiere}")
-            logger.warning(f"Filters used: {filters}")
             return None
 
-        # Reconstruire le contenu complet en concaténant les chunks
-        chunks = []
-        metadata = None
-        for doc_content, meta in zip(results["documents"], results["metadatas"]):
-            chunks.append(doc_content)
-            if metadata is None:
-                metadata = meta
-
-        contenu_complet = "\n\n".join(chunks)
+        # Remettre les chunks dans l'ordre du texte d'origine
+        ordered = sorted(
+            zip(results["documents"], results["metadatas"]),
+            key=lambda item: int((item[1] or {}).get("chunk_index", 0) or 0)
+        )
+        chunks = [strip_title_prefix(document, titre) for document, _ in ordered]
+        contenu_complet, sommaire = merge_sections(
+            [(chunk, metadata) for chunk, (_, metadata) in zip(chunks, ordered)]
+        )
         resume = chunks[0][:300] + "..." if len(chunks[0]) > 300 else chunks[0]
 
         logger.info(f"Lesson content retrieved: {len(chunks)} chunks")
 
-        return {
+        lesson = {
             "titre": titre,
             "resume": resume,
             "contenu_complet": contenu_complet,
-            "url": metadata.get("url", "") if metadata else "",
-            "matiere": metadata.get("matiere", "") if metadata else matiere,
-            "niveau": metadata.get("niveau", "college") if metadata else "college",
-            "source": metadata.get("source", "") if metadata else "",
+            "sommaire": sommaire,
+            "url": entry.get("url", ""),
+            "matiere": entry.get("matiere", "") or matiere,
+            "niveau": entry.get("niveau", "college"),
+            "source": entry.get("source", ""),
             "nb_chunks": len(chunks)
         }
+        self.lesson_content_cache.set(cache_key, lesson)
+        return lesson
+
+    async def aget_lesson_content(
+        self,
+        matiere: str,
+        titre: str
+    ) -> Optional[Dict[str, any]]:
+        """Version asynchrone de get_lesson_content() (exécutée dans le pool ChromaDB)."""
+        return await self._run_in_chroma_pool(self.get_lesson_content, matiere, titre)
@@ -34,6 +34,23 @@ const state = {
     quizHistory: []              // Historique des quiz (localStorage)
 };
 
+// ===== IDENTIFIANT ÉLÈVE (MES COURS) =====
+
+// Chaque navigateur a son identifiant (localStorage) : le serveur range ses
+// PDFs dans sa propre collection "mes_cours" (en-tête X-Owner-Id)
+function getOwnerId() {
+    let ownerId = localStorage.getItem('owner_id');
+    if (!ownerId) {
+        ownerId = crypto.randomUUID();
+        localStorage.setItem('owner_id', ownerId);
+    }
+    return ownerId;
+}
+
+function ownerHeaders(headers = {}) {
+    return { ...headers, 'X-Owner-Id': getOwnerId() };
+}
+
 // ===== FAVORIS =====
 
 function loadFavorites() {
@@ -333,46 +350,38 @@ async function handleSendMessage() {
         const source = sourceSelect ? sourceSelect.value : 'vikidia';
         state.selectedSource = source;
 
-        // Call auto-detect API
-        const response = await fetch(`${API_URL}/api/chat/auto`, {
+        // Call auto-detect API (streaming SSE : détection, sources, puis tokens)
+        const response = await fetch(`${API_URL}/api/chat/auto/stream`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: ownerHeaders({ 'Content-Type': 'application/json' }),
             body: JSON.stringify({ question, source })
         });
 
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
-        const data = await response.json();
-
-        // Update detected info
-        state.detectedNiveau = data.niveau_detecte;
-        state.detectedMatiere = data.matiere_detectee;
-
-        // Remove loading
-        loadingEl.remove();
-
-        // Check if ambiguous
-        if (data.ambigue && data.matieres_possibles && data.matieres_possibles.length > 1) {
-            // Show choice buttons
-            const choiceEl = createMatiereChoiceMessage(data.matieres_possibles, question);
-            messagesContainer.appendChild(choiceEl);
-        } else {
-            // Add bot response
-            const botEl = createBotMessage(data.answer, data.sources, {
-                niveau: data.niveau_detecte,
-                matiere: data.matiere_detectee
-            });
-            messagesContainer.appendChild(botEl);
+        const result = await streamBotAnswer(response, messagesContainer, loadingEl, {
+            onDetection: (detection) => {
+                // Update detected info
+                state.detectedNiveau = detection.niveau_detecte;
+                state.detectedMatiere = detection.matiere_detectee;
+
+                // Check if ambiguous : on arrête le flux et on propose les matières
+                if (detection.ambigue && detection.matieres_possibles && detection.matieres_possibles.length > 1) {
+                    const choiceEl = createMatiereChoiceMessage(detection.matieres_possibles, question);
+                    messagesContainer.appendChild(choiceEl);
+                    return false;
+                }
+                return true;
+            }
+        });
 
+        if (result) {
             // Save to history
             state.chatHistory.push({
                 type: 'bot',
-                content: data.answer,
-                sources: data.sources,
-                detection: {
-                    niveau: data.niveau_detecte,
-                    matiere: data.matiere_detectee
-                }
+                content: result.answer,
+                sources: result.sources,
+                detection: result.detection
             });
         }
 
@@ -471,7 +480,10 @@ async function renderLibraryView(mainContainer) {
                 </div>
             `;
 
-            const response = await fetch(`${API_URL}/api/lecons/${state.selectedMatiere}`);
+            // Seuls les champs affichés par les cartes ; l'ETag permet au navigateur
+            // de revalider sa copie (304) au lieu de retélécharger la liste
+            const fields = 'titre,resume,matiere,niveau,nb_chunks';
+            const response = await fetch(`${API_URL}/api/lecons/${state.selectedMatiere}?fields=${fields}`);
             if (!response.ok) throw new Error(`HTTP ${response.status}`);
             const data = await response.json();
             lessons = data.lecons;
@@ -873,15 +885,31 @@ async function uploadPDF(file) {
 
         const response = await fetch(`${API_URL}/api/upload-pdf`, {
             method: 'POST',
+            headers: ownerHeaders(),
             body: formData
         });
 
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
-        const result = await response.json();
+        // Le traitement continue côté serveur : suivre la tâche (sauf PDF déjà importé)
+        const upload = await response.json();
+        const result = upload.status === 'done' ? upload.result : await waitForPDFJob(upload.job_id, (job) => {
+            // Pages lues et chunks indexés avancent en même temps
+            if (job.nb_pages_total && job.nb_pages < job.nb_pages_total) {
+                const percent = Math.round(100 * job.nb_pages / job.nb_pages_total);
+                progressFill.style.width = `${percent}%`;
+                progressText.textContent = `Lecture de ${file.name}... ${job.nb_pages}/${job.nb_pages_total} pages, ${job.nb_chunks_embedded} chunks indexés`;
+            } else if (job.nb_chunks > 0) {
+                const percent = Math.round(100 * job.nb_chunks_embedded / job.nb_chunks);
+                progressFill.style.width = `${percent}%`;
+                progressText.textContent = `Indexation de ${file.name}... ${job.nb_chunks_embedded}/${job.nb_chunks} chunks`;
+            }
+        });
 
         progressFill.style.width = '100%';
-        progressText.textContent = `✅ ${result.message} (${result.nb_pages} pages, ${result.nb_chunks} chunks)`;
+        progressText.textContent = result.duplicate
+            ? `✅ PDF '${file.name}' déjà importé (${result.filename})`
+            : `✅ PDF '${file.name}' importé avec succès (${result.nb_pages} pages, ${result.nb_chunks} chunks)`;
 
         // Recharger la liste après 2 secondes
         setTimeout(async () => {
@@ -902,11 +930,28 @@ async function uploadPDF(file) {
     }
 }
 
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Attend la fin d'une tâche d'import PDF en interrogeant /api/jobs/{id}
+async function waitForPDFJob(jobId, onProgress) {
+    while (true) {
+        const response = await fetch(`${API_URL}/api/jobs/${jobId}`, { headers: ownerHeaders() });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        const job = await response.json();
+        if (job.status === 'done') return job;
+        if (job.status === 'error') throw new Error(job.error);
+        onProgress(job);
+
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+}
+
 async function loadPDFList() {
     const pdfList = document.getElementById('pdf-list');
 
     try {
-        const response = await fetch(`${API_URL}/api/mes-cours`);
+        const response = await fetch(`${API_URL}/api/mes-cours`, { headers: ownerHeaders() });
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
         const data = await response.json();
@@ -949,7 +994,8 @@ async function deletePDF(filename) {
 
     try {
         const response = await fetch(`${API_URL}/api/mes-cours/${encodeURIComponent(filename)}`, {
-            method: 'DELETE'
+            method: 'DELETE',
+            headers: ownerHeaders()
         });
 
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
@@ -1259,7 +1305,7 @@ async function sendQuestionWithMatiere(question, matiere) {
     scrollToBottom();
 
     try {
-        const response = await fetch(`${API_URL}/api/chat/auto`, {
+        const response = await fetch(`${API_URL}/api/chat/auto/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ question, matiere })
@@ -1267,23 +1313,13 @@ async function sendQuestionWithMatiere(question, matiere) {
 
         if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
-        const data = await response.json();
-        loadingEl.remove();
-
-        const botEl = createBotMessage(data.answer, data.sources, {
-            niveau: data.niveau_detecte,
-            matiere: data.matiere_detectee
-        });
-        messagesContainer.appendChild(botEl);
+        const result = await streamBotAnswer(response, messagesContainer, loadingEl);
 
         state.chatHistory.push({
             type: 'bot',
-            content: data.answer,
-            sources: data.sources,
-            detection: {
-                niveau: data.niveau_detecte,
-                matiere: data.matiere_detectee
-            }
+            content: result.answer,
+            sources: result.sources,
+            detection: result.detection
         });
 
         scrollToBottom();
@@ -1293,6 +1329,80 @@ async function sendQuestionWithMatiere(question, matiere) {
     }
 }
 
+async function readEventStream(response, onEvent) {
+    // Lit un flux Server-Sent Events (fetch + ReadableStream) et appelle onEvent(event, data).
+    // onEvent peut retourner false pour interrompre la lecture.
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let separatorIndex;
+        while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, separatorIndex);
+            buffer = buffer.slice(separatorIndex + 2);
+
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+
+            if (onEvent(event, data ? JSON.parse(data) : {}) === false) {
+                await reader.cancel();
+                return;
+            }
+        }
+    }
+}
+
+async function streamBotAnswer(response, messagesContainer, loadingEl, { onDetection } = {}) {
+    // Affiche la réponse du bot au fur et à mesure des événements SSE.
+    // Retourne { answer, sources, detection } ou null si le flux a été interrompu.
+    let detection = null;
+    let sources = [];
+    let answer = '';
+    let botEl = null;
+    let contentEl = null;
+    let interrupted = false;
+
+    await readEventStream(response, (event, data) => {
+        if (event === 'detection') {
+            detection = { niveau: data.niveau_detecte, matiere: data.matiere_detectee };
+            if (onDetection && onDetection(data) === false) {
+                loadingEl.remove();
+                interrupted = true;
+                return false;
+            }
+        } else if (event === 'sources') {
+            sources = data.sources || [];
+            loadingEl.remove();
+            botEl = createBotMessage('', sources, detection);
+            contentEl = botEl.querySelector('.message-content');
+            messagesContainer.appendChild(botEl);
+        } else if (event === 'token') {
+            answer += data.content;
+            contentEl.innerHTML = formatMarkdown(answer);
+            scrollToBottom();
+        } else if (event === 'done') {
+            answer = data.answer;
+            contentEl.innerHTML = formatMarkdown(answer);
+        } else if (event === 'error') {
+            throw new Error(data.detail);
+        }
+        return true;
+    });
+
+    if (interrupted) return null;
+    if (!botEl) throw new Error('Flux SSE terminé sans réponse');
+    return { answer, sources, detection };
+}
+
 function createSkeletonCard() {
     return `
         <div class="skeleton-card">
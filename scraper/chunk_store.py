@@ -0,0 +1,354 @@
+"""Fichiers de chunks : JSONL écrit au fil de l'eau, lu paresseusement.
+
+Format : un chunk JSON ({"text", "metadata"}) par ligne, dans
+data/processed/<matiere>/chunks.jsonl, ou chunks.jsonl.zst si la compression
+zstd est demandée (module optionnel `zstandard`).
+
+Ni l'écriture ni la lecture ne gardent la liste complète des chunks en
+mémoire. L'ancien format (chunks.json, un tableau JSON) reste lisible.
+
+Deux façons d'écrire :
+- EcrivainChunks réécrit le fichier d'une matière (ex: run Vikidia) ;
+- MagasinChunks ajoute en fin de fichier les seuls chunks nouveaux ou
+  modifiés (ex: fusion Wikiversité), dédupliqués par url + chunk_index grâce
+  à un index chunks.index.jsonl (clé -> empreinte du texte, en ajout seul lui
+  aussi). Une version remplacée reste dans le fichier mais n'est plus lue ;
+  les chunks d'une url qui ne sont plus produits (leçon raccourcie) sont
+  marqués supprimés dans l'index (empreinte null), comme ceux des articles
+  supprimés de la source (delta du scraping incrémental). Le fichier est compacté
+  quand les versions obsolètes deviennent majoritaires.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # compression optionnelle
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FICHIER_JSONL = "chunks.jsonl"
+FICHIER_ZSTD = "chunks.jsonl.zst"
+FICHIER_LEGACY = "chunks.json"
+FICHIER_INDEX = "chunks.index.jsonl"
+NIVEAU_ZSTD = 10
+
+
+def source_chunks(metadata: dict) -> str:
+    """url (ou source/titre) d'un article : partie commune des clés de ses chunks."""
+    return metadata.get("url") or f"{metadata.get('source', '')}/{metadata.get('titre', '')}"
+
+
+def cle_chunk(chunk: dict) -> str:
+    """Clé de déduplication d'un chunk : url (ou source/titre) + chunk_index."""
+    metadata = chunk.get("metadata", {})
+    return f"{source_chunks(metadata)}|{metadata.get('chunk_index', 0)}"
+
+
+def _source_cle(cle: str) -> str:
+    """Partie url (ou source/titre) d'une clé de chunk."""
+    return cle.rsplit("|", 1)[0]
+
+
+def empreinte(texte: str) -> str:
+    """Empreinte SHA-256 du texte d'un chunk."""
+    return hashlib.sha256(texte.encode("utf-8")).hexdigest()
+
+
+def _ouvrir_ecriture(brut, compresser: bool) -> io.TextIOWrapper:
+    """Flux texte UTF-8 sur un fichier binaire ouvert, compressé zstd si demandé.
+
+    En ajout (mode "ab"), la compression ajoute une nouvelle trame zstd.
+    """
+    if compresser:
+        if zstandard is None:
+            raise RuntimeError("Compression zstd demandée mais le module 'zstandard' n'est pas installé")
+        brut = zstandard.ZstdCompressor(level=NIVEAU_ZSTD).stream_writer(brut)
+    return io.TextIOWrapper(brut, encoding="utf-8", newline="\n")
+
+
+def _charger_index(chemin: Path) -> tuple[dict[str, str], int]:
+    """Relit un index JSONL (la dernière ligne d'une clé l'emporte).
+
+    Une empreinte null marque un chunk supprimé : la clé sort de l'index.
+
+    Returns:
+        ({clé: empreinte}, nombre de lignes = versions écrites).
+    """
+    index: dict[str, str] = {}
+    nb_lignes = 0
+    with open(chemin, "r", encoding="utf-8") as f:
+        for ligne in f:
+            try:
+                entree = json.loads(ligne)
+            except json.JSONDecodeError:
+                continue  # dernière ligne tronquée par une interruption
+            if entree["h"] is None:
+                index.pop(entree["k"], None)
+            else:
+                index[entree["k"]] = entree["h"]
+            nb_lignes += 1
+    return index, nb_lignes
+
+
+def fichier_chunks(dossier: Path) -> Optional[Path]:
+    """Fichier de chunks d'une matière (zstd, puis JSONL, puis ancien JSON), ou None."""
+    for nom in (FICHIER_ZSTD, FICHIER_JSONL, FICHIER_LEGACY):
+        chemin = Path(dossier) / nom
+        if chemin.exists():
+            return chemin
+    return None
+
+
+class EcrivainChunks:
+    """Écrit des chunks un par un dans un fichier JSONL (compressé ou non).
+
+    Le fichier est écrit à côté sous un nom temporaire puis renommé à la
+    fermeture : un run interrompu ne laisse pas de fichier tronqué, et
+    l'ancien fichier peut être relu pendant l'écriture du nouveau.
+    """
+
+    def __init__(self, dossier: Path, compresser: bool = False):
+        """Ouvre le fichier de sortie.
+
+        Args:
+            dossier: Dossier de la matière (créé si besoin).
+            compresser: Écrire chunks.jsonl.zst (nécessite `zstandard`).
+
+        Raises:
+            RuntimeError: Compression demandée sans le module zstandard.
+        """
+        if compresser and zstandard is None:
+            raise RuntimeError("Compression zstd demandée mais le module 'zstandard' n'est pas installé")
+        self.dossier = Path(dossier)
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        self.chemin = self.dossier / (FICHIER_ZSTD if compresser else FICHIER_JSONL)
+        self._tmp = self.chemin.with_name(self.chemin.name + ".tmp")
+        self._texte = _ouvrir_ecriture(open(self._tmp, "wb"), compresser)
+        self.nb_chunks = 0
+
+    def ecrire(self, chunk: dict) -> None:
+        self._texte.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+        self.nb_chunks += 1
+
+    def ecrire_tout(self, chunks: Iterable[dict]) -> int:
+        for chunk in chunks:
+            self.ecrire(chunk)
+        return self.nb_chunks
+
+    def fermer(self) -> Path:
+        """Termine l'écriture et remplace les fichiers de chunks précédents."""
+        self._texte.close()  # ferme aussi le compresseur et le fichier
+        os.replace(self._tmp, self.chemin)
+        # Une seule version des chunks par matière ; l'index de MagasinChunks
+        # ne correspond plus au nouveau fichier (il sera reconstruit)
+        for nom in (FICHIER_ZSTD, FICHIER_JSONL, FICHIER_LEGACY, FICHIER_INDEX):
+            autre = self.dossier / nom
+            if autre != self.chemin:
+                autre.unlink(missing_ok=True)
+        return self.chemin
+
+    def abandonner(self) -> None:
+        """Supprime le fichier temporaire sans toucher aux chunks existants."""
+        self._texte.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.fermer()
+        else:
+            self.abandonner()
+
+
+class MagasinChunks:
+    """Fichier de chunks d'une matière en ajout seul, dédupliqué par url + chunk_index.
+
+    Ajouter des chunks coûte O(chunks ajoutés) : seul l'index (clés et
+    empreintes, pas les textes) est relu, et les chunks déjà présents à
+    l'identique ne sont pas réécrits. Ré-ajouter les mêmes chunks ne change rien.
+
+    Chaque url présente dans un ajout est remplacée en entier : ses chunks
+    absents du nouvel ajout (leçon raccourcie) sont supprimés.
+    """
+
+    def __init__(self, dossier: Path, compresser: bool = False):
+        """Ouvre (ou crée) le magasin d'une matière.
+
+        Args:
+            dossier: Dossier de la matière.
+            compresser: Format zstd si le fichier n'existe pas encore (sinon
+                le format du fichier existant est gardé).
+        """
+        self.dossier = Path(dossier)
+        self.dossier.mkdir(parents=True, exist_ok=True)
+        self.chemin_index = self.dossier / FICHIER_INDEX
+
+        fichier = fichier_chunks(self.dossier)
+        if fichier is not None and fichier.name == FICHIER_LEGACY:
+            # Conversion unique de l'ancien tableau JSON
+            with EcrivainChunks(self.dossier, compresser=compresser) as ecrivain:
+                ecrivain.ecrire_tout(lire_chunks(fichier))
+            fichier = ecrivain.chemin
+        self.chemin = fichier or self.dossier / (FICHIER_ZSTD if compresser else FICHIER_JSONL)
+        self.compresse = self.chemin.name == FICHIER_ZSTD
+
+        if self.chemin_index.exists():
+            self.index, self.nb_versions = _charger_index(self.chemin_index)
+        else:
+            self._reconstruire_index()
+        # url -> clés de ses chunks, pour retrouver ceux qui ne sont plus produits
+        self.cles_par_source: dict[str, set[str]] = {}
+        for cle in self.index:
+            self.cles_par_source.setdefault(_source_cle(cle), set()).add(cle)
+
+    @property
+    def nb_obsoletes(self) -> int:
+        """Versions remplacées encore présentes dans le fichier."""
+        return self.nb_versions - len(self.index)
+
+    def ajouter(self, chunks: Iterable[dict], sources: Iterable[str] = ()) -> dict:
+        """Ajoute les chunks nouveaux ou modifiés en fin de fichier.
+
+        Les chunks d'une url de l'ajout qui n'y figurent plus (chunk_index
+        au-delà du nouveau nombre de chunks) sont marqués supprimés.
+
+        Args:
+            chunks: Chunks à ajouter.
+            sources: urls (voir source_chunks) remplacées elles aussi, même
+                sans aucun chunk dans l'ajout : leurs chunks sont supprimés
+                (article supprimé, ou devenu trop court).
+
+        Returns:
+            {"ajoutes": int, "modifies": int, "inchanges": int, "supprimes": int}
+        """
+        stats = {"ajoutes": 0, "modifies": 0, "inchanges": 0, "supprimes": 0}
+        donnees = index = None
+        vues: dict[str, set[str]] = {source: set() for source in sources}  # url -> clés de cet ajout
+        try:
+            for chunk in chunks:
+                cle, hash_texte = cle_chunk(chunk), empreinte(chunk["text"])
+                vues.setdefault(_source_cle(cle), set()).add(cle)
+                ancien = self.index.get(cle)
+                if ancien == hash_texte:
+                    stats["inchanges"] += 1
+                    continue
+                if donnees is None:
+                    donnees = _ouvrir_ecriture(open(self.chemin, "ab"), self.compresse)
+                    index = open(self.chemin_index, "a", encoding="utf-8")
+                # Données d'abord : une ligne sans entrée d'index n'est jamais lue
+                donnees.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                index.write(json.dumps({"k": cle, "h": hash_texte}, ensure_ascii=False) + "\n")
+                self.index[cle] = hash_texte
+                self.cles_par_source.setdefault(_source_cle(cle), set()).add(cle)
+                self.nb_versions += 1
+                stats["modifies" if ancien else "ajoutes"] += 1
+
+            # Chunks des urls ajoutées qui ne sont plus produits
+            for source, cles in vues.items():
+                disparues = self.cles_par_source.get(source, set()) - cles
+                if not disparues:
+                    continue
+                if index is None:
+                    index = open(self.chemin_index, "a", encoding="utf-8")
+                for cle in sorted(disparues):
+                    index.write(json.dumps({"k": cle, "h": None}, ensure_ascii=False) + "\n")
+                    del self.index[cle]
+                    self.nb_versions += 1
+                    stats["supprimes"] += 1
+                if cles:
+                    self.cles_par_source[source] = set(cles)
+                else:
+                    del self.cles_par_source[source]
+        finally:
+            if donnees is not None:
+                donnees.close()
+            if index is not None:
+                index.close()
+
+        logger.info(
+            "[CHUNKS] %s : %d ajoutes, %d modifies, %d supprimes, %d deja presents",
+            self.dossier.name,
+            stats["ajoutes"],
+            stats["modifies"],
+            stats["supprimes"],
+            stats["inchanges"],
+        )
+        if self.nb_obsoletes > len(self.index):
+            self.compacter()
+        return stats
+
+    def compacter(self) -> None:
+        """Réécrit le fichier sans les versions remplacées."""
+        with EcrivainChunks(self.dossier, compresser=self.compresse) as ecrivain:
+            ecrivain.ecrire_tout(lire_chunks(self.chemin))
+        self._ecrire_index()
+        logger.info("[CHUNKS] %s compacte : %d chunks", self.dossier.name, len(self.index))
+
+    def _reconstruire_index(self) -> None:
+        """Index d'un fichier écrit par EcrivainChunks (un seul parcours)."""
+        self.index = {}
+        if self.chemin.exists():
+            for chunk in lire_chunks(self.chemin):
+                self.index[cle_chunk(chunk)] = empreinte(chunk["text"])
+        self._ecrire_index()
+
+    def _ecrire_index(self) -> None:
+        with open(self.chemin_index, "w", encoding="utf-8") as f:
+            for cle, hash_texte in self.index.items():
+                f.write(json.dumps({"k": cle, "h": hash_texte}, ensure_ascii=False) + "\n")
+        self.nb_versions = len(self.index)
+
+
+def lire_chunks(chemin: Path) -> Iterator[dict]:
+    """Itère sur les chunks d'un fichier (.jsonl, .jsonl.zst ou ancien .json).
+
+    Si le dossier contient un index MagasinChunks, seule la dernière version
+    de chaque chunk (url + chunk_index) est renvoyée.
+
+    Args:
+        chemin: Fichier de chunks, ou dossier d'une matière.
+    """
+    chemin = Path(chemin)
+    if chemin.is_dir():
+        chemin = fichier_chunks(chemin)
+        if chemin is None:
+            return
+
+    if chemin.suffix == ".json":
+        # Ancien format : tableau JSON chargé en entier
+        with open(chemin, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    chemin_index = chemin.parent / FICHIER_INDEX
+    index = _charger_index(chemin_index)[0] if chemin_index.exists() else None
+    deja_lus = set()
+
+    with open(chemin, "rb") as brut:
+        if chemin.suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError(f"{chemin} est compressé mais le module 'zstandard' n'est pas installé")
+            # Une trame zstd par ajout de MagasinChunks
+            flux = zstandard.ZstdDecompressor().stream_reader(brut, read_across_frames=True)
+        else:
+            flux = brut
+        for ligne in io.TextIOWrapper(flux, encoding="utf-8"):
+            if not ligne.strip():
+                continue
+            chunk = json.loads(ligne)
+            if index is not None:
+                cle = cle_chunk(chunk)
+                if cle in deja_lus or index.get(cle) != empreinte(chunk["text"]):
+                    continue  # version remplacée
+                deja_lus.add(cle)
+            yield chunk
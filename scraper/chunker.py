@@ -1,6 +1,22 @@
-"""Découpage du texte en chunks pour l'embedding et le stockage vectoriel."""
+"""Découpage du texte en chunks pour l'embedding et le stockage vectoriel.
+
+Deux modes de découpage :
+- "caracteres" (défaut) : taille mesurée en caractères (1 token ≈ 4 caractères) ;
+- "tokens" : taille mesurée avec le tokenizer de text-embedding-3-small
+  (tiktoken), chaque chunk tient dans TAILLE_CHUNK_TOKENS tokens, titre compris.
+
+decouper_sections_en_chunks découpe une leçon section par section (sortie de
+cleaner.nettoyer_en_sections) : les sections courtes consécutives partagent un
+chunk, qui porte le chemin de la plus longue ("Partie > Sous-partie") et la liste
+des sections couvertes.
+"""
 
 import logging
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import Iterable, Iterator, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -12,9 +28,16 @@ OVERLAP_TOKENS = 50
 TAILLE_CHUNK_CHARS = TAILLE_CHUNK_TOKENS * CHARS_PAR_TOKEN  # ~2000 caractères
 OVERLAP_CHARS = OVERLAP_TOKENS * CHARS_PAR_TOKEN  # ~200 caractères
 TAILLE_MIN_CHUNK_CHARS = 100  # Ignorer les chunks trop petits
+TAILLE_MIN_CHUNK_TOKENS = TAILLE_MIN_CHUNK_CHARS // CHARS_PAR_TOKEN
 
+MODES_DECOUPAGE = ("caracteres", "tokens")
+ENCODAGE_TOKENS = "cl100k_base"  # tokenizer de text-embedding-3-small
+SEPARATEUR_SECTIONS = "\n\n"
+SEPARATEUR_CHEMIN = " > "  # chemin de section : "Partie > Sous-partie"
+SEPARATEUR_LISTE_SECTIONS = "\n"  # métadonnée "sections" (ChromaDB : valeurs scalaires)
 
-def decouper_en_chunks(texte: str, titre: str = "") -> list[dict]:
+
+def decouper_en_chunks(texte: str, titre: str = "", mode: str = "caracteres") -> list[dict]:
     """Découpe un texte en chunks de taille appropriée pour l'embedding.
 
     Stratégie : découpage par paragraphes/sections d'abord, puis par phrases
@@ -23,74 +46,246 @@ def decouper_en_chunks(texte: str, titre: str = "") -> list[dict]:
     Args:
         texte: Texte nettoyé à découper.
         titre: Titre de la page source (ajouté en contexte dans chaque chunk).
+        mode: "caracteres" ou "tokens" (voir MODES_DECOUPAGE).
 
     Returns:
         Liste de dicts avec 'text' et 'index' (position du chunk).
     """
+    resultats = list(generer_chunks(texte, titre, mode))
+    logger.info("Texte découpé en %d chunks (titre: %s)", len(resultats), titre)
+    return resultats
+
+
+def generer_chunks(texte: str, titre: str = "", mode: str = "caracteres") -> Iterator[dict]:
+    """Comme decouper_en_chunks, mais produit les chunks au fur et à mesure."""
     if not texte or len(texte.strip()) < TAILLE_MIN_CHUNK_CHARS:
         if texte and texte.strip():
-            return [{"text": _prepend_titre(texte.strip(), titre), "index": 0}]
-        return []
+            yield {"text": _prepend_titre(texte.strip(), titre), "index": 0}
+        return
 
-    # Découper par sections (double saut de ligne)
-    sections = texte.split("\n\n")
-    sections = [s.strip() for s in sections if s.strip()]
+    if mode == "tokens":
+        chunks = _decouper_par_tokens(texte, titre)
+    elif mode == "caracteres":
+        chunks = _decouper_par_caracteres(texte)
+    else:
+        raise ValueError(f"Mode de découpage inconnu: {mode} (attendu: {', '.join(MODES_DECOUPAGE)})")
 
-    chunks = []
-    buffer = ""
+    # Ajouter le titre et l'index à chaque chunk
+    for i, chunk in enumerate(chunks):
+        yield {"text": _prepend_titre(chunk, titre), "index": i}
 
-    for section in sections:
-        # Si ajouter cette section dépasse la taille max
-        if len(buffer) + len(section) + 2 > TAILLE_CHUNK_CHARS:
-            if buffer:
-                chunks.append(buffer.strip())
 
-            # Si la section elle-même est trop longue, la découper par phrases
-            if len(section) > TAILLE_CHUNK_CHARS:
-                sous_chunks = _decouper_par_phrases(section)
-                chunks.extend(sous_chunks)
-                buffer = ""
-            else:
-                # Commencer un nouveau buffer avec overlap
-                buffer = _extraire_overlap(buffer) + "\n\n" + section if buffer else section
-        else:
-            buffer = buffer + "\n\n" + section if buffer else section
+def decouper_sections_en_chunks(
+    sections: Iterable[dict], titre: str = "", mode: str = "caracteres"
+) -> list[dict]:
+    """Découpe une leçon section par section.
 
-    # Dernier buffer
-    if buffer and len(buffer.strip()) >= TAILLE_MIN_CHUNK_CHARS:
-        chunks.append(buffer.strip())
+    Chaque section est précédée de son titre. Les sections consécutives sont
+    regroupées tant qu'elles tiennent ensemble dans un chunk (voir
+    _regrouper_sections) ; une section trop longue est découpée à part. Les
+    index sont numérotés sur toute la leçon.
 
-    # Ajouter le titre et l'index à chaque chunk
-    resultats = []
-    for i, chunk in enumerate(chunks):
-        texte_chunk = _prepend_titre(chunk, titre)
-        resultats.append({"text": texte_chunk, "index": i})
+    Args:
+        sections: Sections nettoyées ({"titres": [...], "texte": str}, voir
+            cleaner.nettoyer_en_sections).
+        titre: Titre de la page source (ajouté en contexte dans chaque chunk).
+        mode: "caracteres" ou "tokens" (voir MODES_DECOUPAGE).
 
+    Returns:
+        Liste de dicts avec 'text', 'index', 'section' (chemin des titres de
+        la section qui occupe le plus de texte dans le groupe, "" pour
+        l'introduction), 'section_niveau' (profondeur, 0 pour
+        l'introduction), 'section_index' (position de cette section) et
+        'sections' (chemins de toutes les sections couvertes, dans l'ordre).
+    """
+    resultats = []
+    for groupe in _regrouper_sections(sections, titre, mode):
+        # Étiquette : la section majoritaire, pour qu'un filtre exact sur une
+        # section longue retrouve tous ses chunks même si une courte la précède
+        position, titres, _, _ = max(groupe, key=lambda section: section[3])
+        corps = SEPARATEUR_SECTIONS.join(corps for _, _, corps, _ in groupe)
+        for chunk in generer_chunks(corps, titre, mode):
+            resultats.append({
+                "text": chunk["text"],
+                "index": len(resultats),
+                "section": SEPARATEUR_CHEMIN.join(titres),
+                "section_niveau": len(titres),
+                "section_index": position,
+                "sections": [SEPARATEUR_CHEMIN.join(t) for _, t, _, _ in groupe],
+            })
     logger.info("Texte découpé en %d chunks (titre: %s)", len(resultats), titre)
     return resultats
 
 
-def _decouper_par_phrases(texte: str) -> list[str]:
-    """Découpe un texte long par phrases pour respecter la taille max."""
-    # Séparer par phrases (point + espace + majuscule ou fin de ligne)
-    import re
-    phrases = re.split(r"(?<=[.!?])\s+", texte)
+def _regrouper_sections(sections: Iterable[dict], titre: str, mode: str) -> list[list[tuple]]:
+    """Regroupe les sections consécutives qui tiennent ensemble dans un chunk.
 
-    chunks = []
-    buffer = ""
+    Une leçon faite de nombreuses sections courtes donne ainsi quelques
+    chunks pleins plutôt qu'un chunk minuscule par section. Un groupe plus
+    court que le minimum (section courte qui suit une section longue)
+    accueille la section suivante, même longue : il ouvre alors son premier
+    chunk.
 
-    for phrase in phrases:
-        if len(buffer) + len(phrase) + 1 > TAILLE_CHUNK_CHARS:
-            if buffer:
-                chunks.append(buffer.strip())
-            buffer = _extraire_overlap(buffer) + " " + phrase if buffer else phrase
+    Returns:
+        Groupes de (position, titres, corps, taille), taille mesurée dans
+        l'unité du mode (caractères ou tokens).
+    """
+    if mode == "tokens":
+        limite = TAILLE_CHUNK_TOKENS - compter_tokens(_prepend_titre("", titre))
+        minimum = TAILLE_MIN_CHUNK_TOKENS
+        mesurer = compter_tokens
+    else:
+        limite, minimum, mesurer = TAILLE_CHUNK_CHARS, TAILLE_MIN_CHUNK_CHARS, len
+    n_separateur = mesurer(SEPARATEUR_SECTIONS)
+
+    groupes: list[list[tuple]] = []
+    tailles: list[int] = []
+    for position, section in enumerate(sections):
+        titres = section["titres"]
+        corps = f"{titres[-1]}{SEPARATEUR_SECTIONS}{section['texte']}" if titres else section["texte"]
+        taille = mesurer(corps)
+        if groupes and tailles[-1] + n_separateur + taille <= limite:
+            groupes[-1].append((position, titres, corps, taille))
+            tailles[-1] += n_separateur + taille
+        elif groupes and tailles[-1] < minimum:
+            # Groupe précédent trop court pour un chunk à lui seul
+            groupes[-1].append((position, titres, corps, taille))
+            tailles[-1] += n_separateur + taille
         else:
-            buffer = buffer + " " + phrase if buffer else phrase
+            groupes.append([(position, titres, corps, taille)])
+            tailles.append(taille)
+    return groupes
 
-    if buffer and len(buffer.strip()) >= TAILLE_MIN_CHUNK_CHARS:
-        chunks.append(buffer.strip())
 
-    return chunks
+# Fin de phrase : ponctuation puis espaces (la ponctuation reste dans la phrase)
+_RE_FIN_PHRASE = re.compile(r"[.!?]\s+")
+
+
+def _sans_espaces(texte: str, debut: int, fin: int) -> tuple[int, int]:
+    """Bornes de texte[debut:fin] sans les espaces de début et de fin (comme strip())."""
+    while debut < fin and texte[debut].isspace():
+        debut += 1
+    while fin > debut and texte[fin - 1].isspace():
+        fin -= 1
+    return debut, fin
+
+
+def _sections(texte: str) -> Iterator[tuple[int, int]]:
+    """Bornes des sections non vides (double saut de ligne), sans espaces autour."""
+    debut = 0
+    while debut <= len(texte):
+        fin = texte.find(SEPARATEUR_SECTIONS, debut)
+        if fin == -1:
+            fin = len(texte)
+        a, b = _sans_espaces(texte, debut, fin)
+        if a < b:
+            yield a, b
+        debut = fin + len(SEPARATEUR_SECTIONS)
+
+
+def _bornes_phrases(texte: str, debut: int, fin: int) -> tuple[list[int], list[int]]:
+    """Bornes (débuts, fins) des phrases de texte[debut:fin], ponctuation finale incluse."""
+    separateurs = [m.span() for m in _RE_FIN_PHRASE.finditer(texte, debut, fin)]
+    debuts = [debut, *(b for _, b in separateurs)]
+    fins = [a + 1 for a, _ in separateurs] + [fin]
+    return debuts, fins
+
+
+class _Tampon:
+    """Chunk en cours : overlap repris du chunk précédent puis morceaux du texte.
+
+    Les morceaux sont gardés sous forme de bornes dans le texte d'origine et
+    ne sont copiés qu'à l'émission du chunk.
+    """
+
+    def __init__(self, texte: str, separateur: str):
+        self.texte = texte
+        self.separateur = separateur
+        self.vider()
+
+    def vider(self, overlap: Optional[str] = None) -> None:
+        """Vide le tampon, en le commençant par `overlap` s'il est donné."""
+        self.morceaux: list = [] if overlap is None else [overlap]
+        self.taille = 0 if overlap is None else len(overlap)
+
+    def ajouter(self, debut: int, fin: int) -> None:
+        if self.morceaux:
+            self.taille += len(self.separateur)
+        self.morceaux.append((debut, fin))
+        self.taille += fin - debut
+
+    def assembler(self) -> str:
+        return self.separateur.join(
+            m if isinstance(m, str) else self.texte[m[0]:m[1]] for m in self.morceaux
+        )
+
+    def __bool__(self) -> bool:
+        return self.taille > 0
+
+
+def _decouper_par_caracteres(texte: str) -> Iterator[str]:
+    """Regroupe les sections en chunks d'environ TAILLE_CHUNK_CHARS caractères."""
+    tampon = _Tampon(texte, SEPARATEUR_SECTIONS)
+
+    for debut, fin in _sections(texte):
+        # Si ajouter cette section dépasse la taille max
+        if tampon.taille + (fin - debut) + 2 > TAILLE_CHUNK_CHARS:
+            precedent = tampon.assembler() if tampon else ""
+            if fin - debut > TAILLE_CHUNK_CHARS and len(precedent.strip()) < TAILLE_MIN_CHUNK_CHARS:
+                # Début trop court pour un chunk (ex: titre de section) : gardé en tête de la section
+                yield from _decouper_par_phrases(texte, debut, fin, precedent.strip())
+                tampon.vider()
+                continue
+            if precedent:
+                yield precedent.strip()
+
+            # Si la section elle-même est trop longue, la découper par phrases
+            if fin - debut > TAILLE_CHUNK_CHARS:
+                yield from _decouper_par_phrases(texte, debut, fin)
+                tampon.vider()
+            else:
+                # Commencer un nouveau chunk avec overlap
+                tampon.vider(_extraire_overlap(precedent) if precedent else None)
+                tampon.ajouter(debut, fin)
+        else:
+            tampon.ajouter(debut, fin)
+
+    # Dernier chunk
+    dernier = tampon.assembler().strip()
+    if len(dernier) >= TAILLE_MIN_CHUNK_CHARS:
+        yield dernier
+
+
+def _decouper_par_phrases(texte: str, debut: int, fin: int, entete: str = "") -> Iterator[str]:
+    """Découpe une section trop longue (texte[debut:fin]) par phrases.
+
+    Les phrases sont jointes par un espace. Le nombre de phrases de chaque
+    chunk est trouvé par dichotomie sur leurs longueurs cumulées, sans
+    parcourir le chunk phrase par phrase. `entete` (texte court qui précède
+    la section) ouvre le premier chunk, séparé par SEPARATEUR_SECTIONS.
+    """
+    debuts, fins = _bornes_phrases(texte, debut, fin)
+    # cumul[i] : longueur des i premières phrases, + 1 espace après chacune
+    cumul = [0, *accumulate(b - a + 1 for a, b in zip(debuts, fins))]
+
+    i = 0
+    overlap, separateur = (entete, SEPARATEUR_SECTIONS) if entete else (None, " ")
+    while i < len(debuts):
+        # Une phrase de plus tient si : overlap + séparateur + phrases jointes <= TAILLE_CHUNK_CHARS
+        base = len(overlap) + len(separateur) if overlap is not None else 0
+        limite = TAILLE_CHUNK_CHARS + 1 + cumul[i] - base
+        k = max(i, bisect_right(cumul, limite) - 2)
+
+        chunk = " ".join(texte[debuts[j]:fins[j]] for j in range(i, k + 1))
+        if overlap is not None:
+            chunk = overlap + separateur + chunk
+        i = k + 1
+
+        if i < len(debuts):
+            yield chunk.strip()
+            overlap, separateur = _extraire_overlap(chunk), " "
+        elif len(chunk.strip()) >= TAILLE_MIN_CHUNK_CHARS:
+            yield chunk.strip()
 
 
 def _extraire_overlap(texte: str) -> str:
@@ -110,3 +305,180 @@ def _prepend_titre(texte: str, titre: str) -> str:
     if titre:
         return f"[{titre}]\n{texte}"
     return texte
+
+
+# --- Mode "tokens" ---
+
+
+@lru_cache(maxsize=None)
+def _encodeur():
+    """Tokenizer de text-embedding-3-small, chargé une seule fois par processus.
+
+    None si tiktoken est absent ou si son vocabulaire n'a pas pu être chargé
+    (téléchargé au premier usage) : les tokens sont alors estimés à
+    CHARS_PAR_TOKEN caractères par token.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(ENCODAGE_TOKENS)
+    except Exception as e:
+        logger.warning(
+            "Tokenizer %s indisponible (%s) : tokens estimés à %d caractères",
+            ENCODAGE_TOKENS, e, CHARS_PAR_TOKEN,
+        )
+        return None
+
+
+def compter_tokens(texte: str) -> int:
+    """Nombre de tokens d'un texte pour text-embedding-3-small."""
+    encodeur = _encodeur()
+    if encodeur is None:
+        return -(-len(texte) // CHARS_PAR_TOKEN)
+    return len(encodeur.encode(texte, disallowed_special=()))
+
+
+def _couper_en_tokens(texte: str, taille: int) -> list[str]:
+    """Coupe un texte en morceaux d'au plus `taille` tokens (phrase trop longue)."""
+    encodeur = _encodeur()
+    if encodeur is None:
+        pas = taille * CHARS_PAR_TOKEN
+        return [texte[i:i + pas] for i in range(0, len(texte), pas)]
+    tokens = encodeur.encode(texte, disallowed_special=())
+    return [encodeur.decode(tokens[i:i + taille]) for i in range(0, len(tokens), taille)]
+
+
+class _Paquet:
+    """Chunk en cours de remplissage, avec son nombre de tokens."""
+
+    def __init__(self, budget: int, separateur: str):
+        self.budget = budget
+        self.separateur = separateur
+        self.n_separateur = compter_tokens(separateur)
+        self.morceaux: list[str] = []
+        self.tokens = 0
+
+    def tient(self, n: int) -> bool:
+        """True si un morceau de `n` tokens peut encore être ajouté."""
+        if not self.morceaux:
+            return n <= self.budget
+        return self.tokens + self.n_separateur + n <= self.budget
+
+    def ajouter(self, morceau: str, n: int) -> None:
+        if self.morceaux:
+            self.tokens += self.n_separateur
+        self.morceaux.append(morceau)
+        self.tokens += n
+
+    def vider(self, chunks: list[str], minimum: int = 0) -> str:
+        """Ajoute le paquet à `chunks` (s'il atteint `minimum` tokens) et le vide.
+
+        Returns:
+            Texte du paquet vidé ("" s'il était vide).
+        """
+        texte = self.separateur.join(self.morceaux).strip()
+        if texte and self.tokens >= minimum:
+            chunks.append(texte)
+        self.morceaux, self.tokens = [], 0
+        return texte
+
+    def reprendre_overlap(self, precedent: str, n_suivant: int) -> None:
+        """Commence le paquet par la fin du chunk précédent, si elle tient avec le morceau suivant."""
+        if not precedent:
+            return
+        overlap = _extraire_overlap_tokens(precedent)
+        n = compter_tokens(overlap)
+        if overlap and n + self.n_separateur + n_suivant <= self.budget:
+            self.ajouter(overlap, n)
+
+
+def _decouper_par_tokens(texte: str, titre: str) -> list[str]:
+    """Regroupe sections puis phrases en chunks d'au plus TAILLE_CHUNK_TOKENS tokens.
+
+    Les tokens sont comptés une fois par section (ou phrase) puis additionnés,
+    séparateurs compris. L'overlap (OVERLAP_TOKENS) n'est repris que s'il tient
+    dans le budget.
+    """
+    budget = TAILLE_CHUNK_TOKENS - compter_tokens(_prepend_titre("", titre))
+    sections = [s.strip() for s in texte.split(SEPARATEUR_SECTIONS) if s.strip()]
+
+    chunks = []
+    paquet = _Paquet(budget, SEPARATEUR_SECTIONS)
+
+    for section in sections:
+        n = compter_tokens(section)
+        if paquet.tient(n):
+            paquet.ajouter(section, n)
+            continue
+        if n > budget and paquet.tokens < TAILLE_MIN_CHUNK_TOKENS:
+            # Début trop court pour un chunk (ex: titre de section) : gardé en tête de la section
+            chunks.extend(_decouper_par_phrases_tokens(section, budget, paquet.vider([])))
+            continue
+        precedent = paquet.vider(chunks)
+        if n > budget:
+            # Section trop longue : découpée par phrases, en chunks à part
+            chunks.extend(_decouper_par_phrases_tokens(section, budget))
+        else:
+            paquet.reprendre_overlap(precedent, n)
+            paquet.ajouter(section, n)
+
+    paquet.vider(chunks, TAILLE_MIN_CHUNK_TOKENS)
+    return chunks
+
+
+def _decouper_par_phrases_tokens(texte: str, budget: int, entete: str = "") -> list[str]:
+    """Découpe une section trop longue par phrases, au budget de tokens.
+
+    `entete` (texte court qui précède la section) ouvre la première phrase.
+    """
+    chunks = []
+    paquet = _Paquet(budget, " ")
+
+    for a, b in zip(*_bornes_phrases(texte, 0, len(texte))):
+        phrase = texte[a:b]
+        if entete:
+            phrase, entete = f"{entete}{SEPARATEUR_SECTIONS}{phrase}", ""
+        n = compter_tokens(phrase)
+        if n <= budget:
+            morceaux = [(phrase, n)]
+        else:
+            # Phrase plus longue que le budget : coupée entre deux tokens
+            morceaux = [(m, compter_tokens(m)) for m in _couper_en_tokens(phrase, budget)]
+        for morceau, n in morceaux:
+            if paquet.tient(n):
+                paquet.ajouter(morceau, n)
+                continue
+            precedent = paquet.vider(chunks)
+            paquet.reprendre_overlap(precedent, n)
+            paquet.ajouter(morceau, n)
+
+    paquet.vider(chunks, TAILLE_MIN_CHUNK_TOKENS)
+    return chunks
+
+
+def _extraire_overlap_tokens(texte: str) -> str:
+    """Derniers OVERLAP_TOKENS tokens d'un texte, coupés au premier espace."""
+    encodeur = _encodeur()
+    if encodeur is None:
+        return _extraire_overlap(texte)
+    tokens = encodeur.encode(texte, disallowed_special=())
+    if len(tokens) <= OVERLAP_TOKENS:
+        return texte
+    overlap = encodeur.decode(tokens[-OVERLAP_TOKENS:])
+    espace = overlap.find(" ")
+    if espace > 0:
+        overlap = overlap[espace + 1:]
+    return overlap
+
+
+def histogramme_tokens(textes, largeur: int = 50) -> dict[int, int]:
+    """Nombre de chunks par tranche de `largeur` tokens.
+
+    Returns:
+        {début de tranche: nombre de chunks}, trié par tranche.
+    """
+    histogramme: dict[int, int] = {}
+    for texte in textes:
+        tranche = compter_tokens(texte) // largeur * largeur
+        histogramme[tranche] = histogramme.get(tranche, 0) + 1
+    return dict(sorted(histogramme.items()))
@@ -5,31 +5,22 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Sections wiki à supprimer (non pertinentes pour l'apprentissage)
+# Sections wiki à supprimer (non pertinentes pour l'apprentissage),
+# reconnues sans tenir compte de la casse
 SECTIONS_A_SUPPRIMER = [
     "Voir aussi",
-    "voir aussi",
     "Liens externes",
-    "liens externes",
     "Références",
-    "références",
     "Notes et références",
-    "notes et références",
     "Notes",
-    "notes",
     "Bibliographie",
-    "bibliographie",
     "Sources",
-    "sources",
     "Liens internes",
-    "liens internes",
     "Articles connexes",
-    "articles connexes",
     "Lien externe",
-    "lien externe",
 ]
 
-# Pattern LaTeX courants dans les extraits MediaWiki
+# Pattern LaTeX courants dans les extraits MediaWiki, par ordre de priorité
 LATEX_PATTERNS = [
     r"\{\\displaystyle[^}]*\}",
     r"\{\\scriptstyle[^}]*\}",
@@ -49,6 +40,54 @@ LATEX_PATTERNS = [
 ]
 
 
+def _compiler_latex(patterns: list[str]) -> re.Pattern:
+    """Combine des motifs LaTeX en une regex, au même résultat que leur application successive.
+
+    Appliqués un par un, les motifs précédents ont déjà remplacé leurs
+    fragments par un espace quand un motif est cherché : un argument `[^}]*`
+    ne s'arrête pas à l'accolade fermante d'un fragment déjà retiré (ex:
+    {\\textstyle {\\scriptstyle x}} est retiré en entier), et un `\\s*` avale
+    les fragments retirés qui suivent. Dans la regex combinée, ces
+    répétitions sautent donc d'un bloc (possessif) les motifs précédents.
+
+    Non reproduit : certains LaTeX mal formés, absents des extraits MediaWiki
+    (ex: accolade non fermée, \\text{\\displaystyle x}), où le résultat peut
+    légèrement différer.
+    """
+    motifs = []
+    for pattern in patterns:
+        precedents = [f"(?:{m})" for m in motifs]
+        a_accolade = [m for m in precedents if r"\}" in m]
+        if a_accolade:
+            pattern = pattern.replace("[^}]*", "(?:" + "|".join(a_accolade) + "|[^}])*+")
+        if precedents:
+            pattern = pattern.replace(r"\s*", "(?:" + "|".join(precedents) + r"|\s)*+")
+        motifs.append(pattern)
+    return re.compile("|".join(f"(?:{m})" for m in motifs))
+
+
+# Regex compilées une fois à l'import. Les sections et le LaTeX sont chacun
+# retirés en un seul parcours du texte.
+_RE_SECTIONS = re.compile(
+    r"==+\s*(?:" + "|".join(re.escape(s) for s in SECTIONS_A_SUPPRIMER) + r")\s*==+.*?(?===|\Z)",
+    re.DOTALL | re.IGNORECASE,
+)
+_RE_LATEX = _compiler_latex(LATEX_PATTERNS)
+_RE_ACCOLADES_VIDES = re.compile(r"\{[\s,]*\}")
+_RE_ACCOLADES_OUVRANTES = re.compile(r"\{\s*\{")
+_RE_ACCOLADES_FERMANTES = re.compile(r"\}\s*\}")
+
+_RE_TITRE_SECTION = re.compile(r"(={2,})\s*(.+?)\s*={2,}")
+_RE_HTML = re.compile(r"<[^>]+>")
+_RE_MODELE = re.compile(r"\{\{[^}]*\}\}")
+_RE_LIEN_INTERNE = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_RE_LIEN_EXTERNE_TEXTE = re.compile(r"\[https?://\S+\s+([^\]]*)\]")
+_RE_LIEN_EXTERNE = re.compile(r"\[https?://\S+\]")
+_RE_PUCE = re.compile(r"^\*+\s*", re.MULTILINE)
+
+_RE_SAUTS_DE_LIGNE = re.compile(r"\n{3,}")
+
+
 def nettoyer_texte(texte: str) -> str:
     """Nettoie le texte brut extrait d'une page wiki.
 
@@ -76,24 +115,56 @@ def nettoyer_texte(texte: str) -> str:
     return texte.strip()
 
 
+def nettoyer_en_sections(texte: str) -> list[dict]:
+    """Nettoie le texte brut d'une page wiki en gardant la hiérarchie des titres.
+
+    Même nettoyage que nettoyer_texte, mais le texte est rendu section par
+    section au lieu d'aplatir les titres (== Titre ==) en simples lignes.
+
+    Args:
+        texte: Texte brut extrait via l'API MediaWiki (explaintext).
+
+    Returns:
+        Sections non vides dans l'ordre du texte :
+        {"titres": [titre de niveau 1, ..., titre de la section], "texte": str}.
+        L'introduction (avant le premier titre) a une liste de titres vide.
+    """
+    if not texte:
+        return []
+
+    texte = _nettoyer_latex(_supprimer_sections(texte))
+
+    # [intro, "==", titre, corps, "===", titre, corps, ...]
+    morceaux = _RE_TITRE_SECTION.split(texte)
+    sections = []
+    titres: list[str] = []
+    for i in range(0, len(morceaux), 3):
+        if i:
+            niveau = len(morceaux[i - 2]) - 1  # == Titre == : niveau 1
+            titre = _normaliser_espaces(_nettoyer_wiki(morceaux[i - 1])).strip()
+            titres = titres[:niveau - 1] + [titre]
+        corps = _normaliser_espaces(_nettoyer_wiki(morceaux[i])).strip()
+        if corps:
+            sections.append({"titres": titres, "texte": corps})
+    return sections
+
+
 def _supprimer_sections(texte: str) -> str:
-    """Supprime les sections non pertinentes (Voir aussi, Références, etc.)."""
-    for section in SECTIONS_A_SUPPRIMER:
-        # Trouver la section et supprimer tout jusqu'à la prochaine section de même niveau ou fin
-        pattern = rf"==+\s*{re.escape(section)}\s*==+.*?(?===|\Z)"
-        texte = re.sub(pattern, "", texte, flags=re.DOTALL | re.IGNORECASE)
-    return texte
+    """Supprime les sections non pertinentes (Voir aussi, Références, etc.).
+
+    Chaque section est supprimée de son titre jusqu'au prochain titre (ou la fin).
+    """
+    return _RE_SECTIONS.sub("", texte)
 
 
 def _nettoyer_latex(texte: str) -> str:
     """Supprime les fragments LaTeX des extraits MediaWiki."""
-    for pattern in LATEX_PATTERNS:
-        texte = re.sub(pattern, " ", texte)
+    texte = _RE_LATEX.sub(" ", texte)
 
     # Supprimer les accolades orphelines laissées par le nettoyage LaTeX
-    texte = re.sub(r"\{[\s,]*\}", "", texte)
-    texte = re.sub(r"\{\s*\{", "", texte)
-    texte = re.sub(r"\}\s*\}", "", texte)
+    texte = _RE_ACCOLADES_VIDES.sub("", texte)
+    texte = _RE_ACCOLADES_OUVRANTES.sub("", texte)
+    texte = _RE_ACCOLADES_FERMANTES.sub("", texte)
 
     return texte
 
@@ -101,36 +172,37 @@ def _nettoyer_latex(texte: str) -> str:
 def _nettoyer_wiki(texte: str) -> str:
     """Supprime les marqueurs wiki résiduels."""
     # Supprimer les titres de sections (== Titre ==) mais garder le texte
-    texte = re.sub(r"={2,}\s*(.+?)\s*={2,}", r"\n\1\n", texte)
+    texte = _RE_TITRE_SECTION.sub(r"\n\2\n", texte)
 
     # Supprimer les balises HTML résiduelles
-    texte = re.sub(r"<[^>]+>", "", texte)
+    texte = _RE_HTML.sub("", texte)
 
     # Supprimer les modèles wiki {{...}}
-    texte = re.sub(r"\{\{[^}]*\}\}", "", texte)
+    texte = _RE_MODELE.sub("", texte)
 
     # Supprimer les crochets de liens internes [[...]] en gardant le texte affiché
-    texte = re.sub(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]", r"\1", texte)
+    texte = _RE_LIEN_INTERNE.sub(r"\1", texte)
 
     # Supprimer les crochets de liens externes [http... texte]
-    texte = re.sub(r"\[https?://\S+\s+([^\]]*)\]", r"\1", texte)
-    texte = re.sub(r"\[https?://\S+\]", "", texte)
+    texte = _RE_LIEN_EXTERNE_TEXTE.sub(r"\1", texte)
+    texte = _RE_LIEN_EXTERNE.sub("", texte)
 
     # Supprimer les puces wiki
-    texte = re.sub(r"^\*+\s*", "- ", texte, flags=re.MULTILINE)
+    texte = _RE_PUCE.sub("- ", texte)
 
     return texte
 
 
 def _normaliser_espaces(texte: str) -> str:
     """Normalise les espaces et les sauts de ligne."""
-    # Remplacer les espaces multiples par un seul
-    texte = re.sub(r"[ \t]+", " ", texte)
+    # Remplacer les espaces multiples par un seul (méthodes str, plus rapides
+    # qu'une regex appliquée à chaque espace)
+    texte = texte.replace("\t", " ")
+    while "  " in texte:
+        texte = texte.replace("  ", " ")
 
     # Remplacer 3+ sauts de ligne par 2
-    texte = re.sub(r"\n{3,}", "\n\n", texte)
+    texte = _RE_SAUTS_DE_LIGNE.sub("\n\n", texte)
 
-    # Supprimer les espaces en début/fin de ligne
-    texte = re.sub(r"^ +| +$", "", texte, flags=re.MULTILINE)
-
-    return texte
+    # Supprimer les espaces en début/fin de ligne (il en reste au plus un)
+    return texte.replace(" \n", "\n").replace("\n ", "\n").strip(" ")
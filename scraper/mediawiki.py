@@ -0,0 +1,116 @@
+"""Requêtes MediaWiki groupées : plusieurs titres par requête, suite (`continue`) générique.
+
+Utilisé par les scrapers Vikidia et Wikiversité pour extraire les pages par
+lots de TITRES_PAR_REQUETE au lieu d'une requête par titre.
+
+Limite côté serveur : l'extension TextExtracts ne renvoie qu'un extrait
+complet (explaintext sans exintro) par réponse sur les wikis Wikimedia ;
+les extraits suivants arrivent via `excontinue`. La suite est suivie
+automatiquement, donc le résultat est le même quelle que soit la limite du
+serveur ; seul le nombre de requêtes varie.
+"""
+
+import logging
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TITRES_PAR_REQUETE = 50  # Limite de l'API pour `titles` (utilisateurs non-bot)
+MAX_REDIRECTIONS = 5  # Chaîne max normalisation -> redirection suivie
+
+
+def decouper_en_lots(titres: list[str], taille: int = TITRES_PAR_REQUETE) -> Iterator[list[str]]:
+    """Découpe une liste de titres en lots de `taille` titres."""
+    for i in range(0, len(titres), taille):
+        yield titres[i:i + taille]
+
+
+def parametres_suivants(params: dict, data: dict) -> Optional[dict]:
+    """Paramètres de la requête suivante si la réponse indique une suite, sinon None.
+
+    Args:
+        params: Paramètres de la requête d'origine (sans valeurs de suite).
+        data: Réponse JSON.
+
+    Returns:
+        `params` complétés par le bloc `continue` de la réponse, ou None.
+    """
+    if "continue" not in data:
+        return None
+    return {**params, **data["continue"]}
+
+
+class ResultatPages:
+    """Pages d'une ou plusieurs réponses `action=query&prop=...`, fusionnées par titre.
+
+    Les listes (ex: categories) reçues en plusieurs morceaux sont concaténées,
+    les autres champs (ex: extract) sont complétés au fil des réponses.
+    """
+
+    def __init__(self):
+        self.pages: dict[str, dict] = {}  # titre réel -> page fusionnée
+        self.manquantes: set[str] = set()  # titres inexistants
+        self._alias: dict[str, str] = {}  # titre demandé -> titre normalisé / cible de redirection
+
+    def ajouter(self, data: dict) -> None:
+        """Intègre une réponse de l'API."""
+        query = data.get("query", {})
+        for correspondance in query.get("normalized", []) + query.get("redirects", []):
+            self._alias[correspondance["from"]] = correspondance["to"]
+
+        for page_id, page in query.get("pages", {}).items():
+            titre = page.get("title", "")
+            if int(page_id) < 0 or "missing" in page or "invalid" in page:
+                self.manquantes.add(titre)
+                continue
+            fusion = self.pages.setdefault(titre, {"pageid": int(page_id)})
+            for cle, valeur in page.items():
+                if isinstance(valeur, list):
+                    fusion.setdefault(cle, []).extend(valeur)
+                else:
+                    fusion[cle] = valeur
+
+    def page(self, titre: str) -> Optional[tuple[str, dict]]:
+        """(page_id, page) pour un titre demandé (après normalisation et redirection).
+
+        Returns:
+            None si la page n'existe pas ou n'est pas dans les réponses.
+        """
+        for _ in range(MAX_REDIRECTIONS):
+            if titre in self.pages:
+                page = self.pages[titre]
+                return str(page["pageid"]), page
+            if titre not in self._alias:
+                return None
+            titre = self._alias[titre]
+        return None
+
+
+def interroger_pages(
+    get_json: Callable[[dict], Optional[dict]],
+    titres: list[str],
+    params: dict,
+    taille_lot: int = TITRES_PAR_REQUETE,
+) -> ResultatPages:
+    """Interroge l'API pour une liste de titres, par lots, en suivant les suites.
+
+    Args:
+        get_json: Fonction qui envoie une requête GET et renvoie le JSON (None si échec).
+        titres: Titres à interroger.
+        params: Paramètres de la requête (sans `titles`).
+        taille_lot: Nombre de titres par requête.
+
+    Returns:
+        Pages fusionnées de toutes les réponses.
+    """
+    resultat = ResultatPages()
+    for lot in decouper_en_lots(titres, taille_lot):
+        params_lot = {**params, "titles": "|".join(lot)}
+        suite = params_lot
+        while suite is not None:
+            data = get_json(suite)
+            if data is None:
+                break
+            resultat.ajouter(data)
+            suite = parametres_suivants(params_lot, data)
+    return resultat
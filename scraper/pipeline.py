@@ -1,18 +1,24 @@
 """Pipeline d'orchestration : scrape → clean → chunk → sauvegarde.
 
 Point d'entrée principal pour le scraping.
-Usage: python -m scraper.pipeline [--matiere MATIERE] [--source SOURCE]
+Usage: python -m scraper.pipeline [--matiere MATIERE] [--source SOURCE] [--async] [--complet] [--zstd]
+                                  [--workers N] [--decoupage {caracteres,tokens}]
 """
 
 import argparse
-import json
 import logging
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from .cleaner import nettoyer_texte
-from .chunker import decouper_en_chunks
+from .chunk_store import EcrivainChunks, MagasinChunks, fichier_chunks, source_chunks
+from .cleaner import nettoyer_en_sections
+from .chunker import MODES_DECOUPAGE, SEPARATEUR_LISTE_SECTIONS, decouper_sections_en_chunks
+from . import vikidia, wikiversite
 from .vikidia import VikidiaScraper
+from .vikidia_async import CONCURRENCE, DEBIT_MAX, VikidiaCrawlerAsync
 from .wikiversite import WikiversiteScraper
 
 # Configuration du logging
@@ -28,6 +34,82 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DOSSIER_PROCESSED = Path("data/processed")
+TAILLE_PAQUET = 16  # articles envoyés à la fois à un processus (--workers)
+
+
+def _chunks_article(article: dict, decoupage: str = "caracteres") -> list[dict]:
+    """clean → chunk d'un article brut.
+
+    Fonction de module (et non locale) pour pouvoir être exécutée dans un
+    processus du pool de iterer_chunks.
+    """
+    titre = article["titre"]
+
+    # 1. Nettoyage, titres de sections gardés
+    sections = nettoyer_en_sections(article["texte"])
+    if sum(len(section["texte"]) for section in sections) < 50:
+        logger.debug("Article trop court après nettoyage: %s", titre)
+        return []
+
+    # 2. Chunking par section, 3. Attacher les métadonnées à chaque chunk
+    return [
+        {
+            "text": chunk["text"],
+            "metadata": {
+                **article["metadata"],
+                "chunk_index": chunk["index"],
+                "section": chunk["section"],
+                "section_niveau": chunk["section_niveau"],
+                "section_index": chunk["section_index"],
+                "sections": SEPARATEUR_LISTE_SECTIONS.join(chunk["sections"]),
+            },
+        }
+        for chunk in decouper_sections_en_chunks(sections, titre=titre, mode=decoupage)
+    ]
+
+
+def iterer_chunks(
+    articles: Iterable[dict],
+    workers: int = 1,
+    taille_paquet: int = TAILLE_PAQUET,
+    decoupage: str = "caracteres",
+) -> Iterator[dict]:
+    """Applique le pipeline clean → chunk sur des articles bruts, chunk par chunk.
+
+    Avec plusieurs workers, les articles sont traités dans un pool de
+    processus, envoyés par paquets de `taille_paquet` ; les chunks sortent
+    dans l'ordre des articles, comme en séquentiel.
+
+    Args:
+        articles: Articles bruts (dict avec 'titre', 'texte', 'metadata').
+        workers: Nombre de processus (1 : dans le processus courant).
+        taille_paquet: Articles envoyés à la fois à un processus.
+        decoupage: Mesure de la taille des chunks, "caracteres" ou "tokens".
+
+    Yields:
+        Chunks prêts pour l'embedding.
+    """
+    nb_articles = 0
+    nb_chunks = 0
+    pool = None
+    traiter = partial(_chunks_article, decoupage=decoupage)
+
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        resultats = pool.map(traiter, articles, chunksize=taille_paquet)
+    else:
+        resultats = map(traiter, articles)
+
+    try:
+        for chunks in resultats:
+            nb_articles += 1
+            nb_chunks += len(chunks)
+            yield from chunks
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    logger.info("%d articles traites -> %d chunks generes", nb_articles, nb_chunks)
 
 
 def traiter_articles(articles: list[dict]) -> list[dict]:
@@ -39,140 +121,185 @@ def traiter_articles(articles: list[dict]) -> list[dict]:
     Returns:
         Liste de chunks prêts pour l'embedding.
     """
-    tous_chunks = []
+    return list(iterer_chunks(articles))
 
-    for article in articles:
-        titre = article["titre"]
-        texte_brut = article["texte"]
-        metadata = article["metadata"]
-
-        # 1. Nettoyage
-        texte_propre = nettoyer_texte(texte_brut)
-        if not texte_propre or len(texte_propre) < 50:
-            logger.debug("Article trop court après nettoyage: %s", titre)
-            continue
-
-        # 2. Chunking
-        chunks = decouper_en_chunks(texte_propre, titre=titre)
-
-        # 3. Attacher les métadonnées à chaque chunk
-        for chunk in chunks:
-            tous_chunks.append({
-                "text": chunk["text"],
-                "metadata": {
-                    **metadata,
-                    "chunk_index": chunk["index"],
-                },
-            })
-
-    logger.info(
-        "%d articles traites -> %d chunks generes", len(articles), len(tous_chunks)
-    )
-    return tous_chunks
 
-
-def sauvegarder_chunks(chunks: list[dict], matiere: str) -> Path:
-    """Sauvegarde les chunks traités en JSON.
+def sauvegarder_chunks(chunks: Iterable[dict], matiere: str, compresser: bool = False) -> Path:
+    """Écrit les chunks d'une matière en JSONL, au fil de l'itération.
 
     Args:
-        chunks: Liste de chunks avec texte et métadonnées.
+        chunks: Chunks avec texte et métadonnées (liste ou générateur).
         matiere: Nom de la matière (pour organiser les fichiers).
+        compresser: Écrire chunks.jsonl.zst au lieu de chunks.jsonl.
 
     Returns:
         Chemin du fichier sauvegardé.
     """
-    dossier = DOSSIER_PROCESSED / matiere
-    dossier.mkdir(parents=True, exist_ok=True)
+    with EcrivainChunks(DOSSIER_PROCESSED / matiere, compresser=compresser) as ecrivain:
+        ecrivain.ecrire_tout(chunks)
+
+    logger.info("Sauvegardé %d chunks dans %s", ecrivain.nb_chunks, ecrivain.chemin)
+    return ecrivain.chemin
+
+
+def grouper_par_matiere(articles: list[dict]) -> dict[str, list[dict]]:
+    """Groupe des articles bruts par matière (metadata['matiere'])."""
+    par_matiere: dict[str, list[dict]] = {}
+    for article in articles:
+        par_matiere.setdefault(article["metadata"]["matiere"], []).append(article)
+    return par_matiere
+
+
+def ajouter_aux_chunks_existants(
+    articles: list[dict],
+    matiere: str,
+    compresser: bool = False,
+    workers: int = 1,
+    decoupage: str = "caracteres",
+) -> dict:
+    """Ajoute aux chunks d'une matière (ex: Vikidia) les chunks nouveaux ou modifiés.
+
+    Les chunks existants ne sont ni relus ni réécrits ; relancer avec les
+    mêmes articles n'ajoute rien (voir MagasinChunks). Les chunks d'un
+    article qui en produit moins qu'avant sont supprimés.
+
+    Returns:
+        {"ajoutes", "modifies", "inchanges", "supprimes"}
+    """
+    return MagasinChunks(DOSSIER_PROCESSED / matiere, compresser).ajouter(
+        iterer_chunks(articles, workers, decoupage=decoupage)
+    )
 
-    fichier = dossier / "chunks.json"
-    with open(fichier, "w", encoding="utf-8") as f:
-        json.dump(chunks, f, ensure_ascii=False, indent=2)
 
-    logger.info("Sauvegardé %d chunks dans %s", len(chunks), fichier)
-    return fichier
+def appliquer_delta(
+    articles: list[dict],
+    delta: dict,
+    base_url: str,
+    matieres: Iterable[str],
+    compresser: bool = False,
+    workers: int = 1,
+    decoupage: str = "caracteres",
+) -> None:
+    """Met à jour les chunks d'après le delta d'un scraping incrémental.
 
+    Seuls les articles ajoutés ou modifiés sont redécoupés ; les chunks des
+    articles inchangés ne sont pas recalculés. Les chunks des titres supprimés
+    sont retirés de chaque matière de `matieres`.
 
-def run_vikidia(matiere: str | None = None) -> None:
+    Args:
+        articles: Articles du run (inchangés compris).
+        delta: {"ajoutes", "modifies", "supprimes"} (voir SuiviRevisions.terminer).
+        base_url: Préfixe des urls d'articles de la source (titre -> url).
+        matieres: Matières où chercher les chunks des titres supprimés.
+    """
+    a_decouper = set(delta["ajoutes"]) | set(delta["modifies"])
+    supprimes = [base_url + titre.replace(" ", "_") for titre in delta["supprimes"]]
+    par_matiere = grouper_par_matiere([a for a in articles if a["titre"] in a_decouper])
+
+    for matiere in sorted(set(matieres) | set(par_matiere)):
+        arts = par_matiere.get(matiere, [])
+        # Un article modifié devenu trop court ne produit plus de chunks : ses
+        # anciens chunks partent avec ceux des titres supprimés
+        MagasinChunks(DOSSIER_PROCESSED / matiere, compresser).ajouter(
+            iterer_chunks(arts, workers, decoupage=decoupage),
+            sources=[source_chunks(a["metadata"]) for a in arts] + supprimes,
+        )
+
+
+def matieres_existantes() -> list[str]:
+    """Matières ayant déjà un fichier de chunks dans DOSSIER_PROCESSED."""
+    if not DOSSIER_PROCESSED.is_dir():
+        return []
+    return sorted(d.name for d in DOSSIER_PROCESSED.iterdir() if d.is_dir() and fichier_chunks(d))
+
+
+def run_vikidia(
+    matiere: str | None = None,
+    asynchrone: bool = False,
+    concurrence: int = CONCURRENCE,
+    debit: float = DEBIT_MAX,
+    incremental: bool = True,
+    compresser: bool = False,
+    workers: int = 1,
+    decoupage: str = "caracteres",
+) -> None:
     """Lance le pipeline complet pour Vikidia.
 
     Args:
         matiere: Si spécifié, ne scrape que cette matière.
+        asynchrone: Utiliser le crawler asynchrone (parallèle, avec reprise).
+        concurrence: Crawler asynchrone: requêtes simultanées max.
+        debit: Crawler asynchrone: requêtes par seconde max.
+        incremental: Ne retélécharger que les articles dont la révision a
+            changé, et ne redécouper que ceux du delta (si la matière a déjà
+            ses chunks) ; sinon les chunks de la matière sont réécrits.
+        compresser: Écrire les chunks en JSONL compressé zstd.
+        workers: Processus pour l'étape clean → chunk.
+        decoupage: Taille des chunks mesurée en "caracteres" ou en "tokens".
     """
-    scraper = VikidiaScraper()
+    def chunker(arts: list[dict], m: str) -> None:
+        delta = scraper.deltas.get(m)
+        if incremental and delta is not None and fichier_chunks(DOSSIER_PROCESSED / m):
+            appliquer_delta(arts, delta, vikidia.BASE_URL, [m], compresser, workers, decoupage)
+        else:
+            sauvegarder_chunks(iterer_chunks(arts, workers, decoupage=decoupage), m, compresser)
+
+    if asynchrone:
+        scraper = VikidiaCrawlerAsync(concurrence=concurrence, debit=debit, incremental=incremental)
+    else:
+        scraper = VikidiaScraper(incremental=incremental)
 
     if matiere:
         logger.info("Scraping Vikidia - matière: %s", matiere)
         articles = scraper.scraper_matiere(matiere)
-        chunks = traiter_articles(articles)
-        sauvegarder_chunks(chunks, matiere)
+        chunker(articles, matiere)
     else:
         logger.info("Scraping Vikidia - toutes les matières")
         articles = scraper.scraper_tout()
 
         # Grouper les articles par matière pour la sauvegarde des chunks
-        par_matiere: dict[str, list[dict]] = {}
-        for article in articles:
-            m = article["metadata"]["matiere"]
-            par_matiere.setdefault(m, []).append(article)
-
-        for m, arts in par_matiere.items():
-            chunks = traiter_articles(arts)
-            sauvegarder_chunks(chunks, m)
+        for m, arts in grouper_par_matiere(articles).items():
+            chunker(arts, m)
 
 
-def run_wikiversite(niveau: int | None = None) -> None:
+def run_wikiversite(
+    niveau: int | None = None,
+    incremental: bool = True,
+    compresser: bool = False,
+    workers: int = 1,
+    decoupage: str = "caracteres",
+) -> None:
     """Lance le pipeline complet pour Wikiversité.
 
     Args:
         niveau: Si spécifié, ne scrape que ce niveau (7-13).
+        incremental: Ne retélécharger que les leçons dont la révision a
+            changé, et ne redécouper que celles du delta.
+        compresser: Écrire les chunks en JSONL compressé zstd.
+        workers: Processus pour l'étape clean → chunk.
+        decoupage: Taille des chunks mesurée en "caracteres" ou en "tokens".
     """
-    scraper = WikiversiteScraper()
+    scraper = WikiversiteScraper(incremental=incremental)
 
     if niveau:
         logger.info("Scraping Wikiversité - niveau: %d", niveau)
         lecons = scraper.scraper_niveau(niveau)
-        chunks = traiter_articles(lecons)
-
-        # Grouper par matière pour sauvegarde
-        par_matiere: dict[str, list[dict]] = {}
-        for chunk in chunks:
-            m = chunk["metadata"]["matiere"]
-            par_matiere.setdefault(m, []).append(chunk)
-
-        for m, chks in par_matiere.items():
-            # Charger les chunks existants si présents
-            fichier_existant = DOSSIER_PROCESSED / m / "chunks.json"
-            chunks_existants = []
-            if fichier_existant.exists():
-                with open(fichier_existant, "r", encoding="utf-8") as f:
-                    chunks_existants = json.load(f)
-
-            # Combiner avec les nouveaux chunks
-            tous_chunks = chunks_existants + chks
-            sauvegarder_chunks(tous_chunks, m)
     else:
         logger.info("Scraping Wikiversité - tous les niveaux collège")
         lecons = scraper.scraper_tout()
 
-        # Grouper par matière
-        par_matiere: dict[str, list[dict]] = {}
-        chunks = traiter_articles(lecons)
-        for chunk in chunks:
-            m = chunk["metadata"]["matiere"]
-            par_matiere.setdefault(m, []).append(chunk)
+    if incremental and scraper.deltas:
+        # Un seul fichier brut par run ; une leçon supprimée peut être dans
+        # n'importe quelle matière
+        delta = next(iter(scraper.deltas.values()))
+        appliquer_delta(
+            lecons, delta, wikiversite.BASE_URL, matieres_existantes(), compresser, workers, decoupage
+        )
+        return
 
-        for m, chks in par_matiere.items():
-            # Charger les chunks existants de Vikidia si présents
-            fichier_existant = DOSSIER_PROCESSED / m / "chunks.json"
-            chunks_existants = []
-            if fichier_existant.exists():
-                with open(fichier_existant, "r", encoding="utf-8") as f:
-                    chunks_existants = json.load(f)
-                logger.info("Fusion avec %d chunks existants pour %s", len(chunks_existants), m)
-
-            # Combiner Vikidia + Wikiversité
-            tous_chunks = chunks_existants + chks
-            sauvegarder_chunks(tous_chunks, m)
+    # Ajouter aux chunks existants de chaque matière (ex: Vikidia)
+    for m, lecons_matiere in grouper_par_matiere(lecons).items():
+        ajouter_aux_chunks_existants(lecons_matiere, m, compresser, workers, decoupage)
 
 
 def main():
@@ -196,13 +323,68 @@ def main():
         choices=[7, 8, 9, 10, 11, 12, 13],
         help="Pour Wikiversité: scraper un seul niveau (7-13)",
     )
+    parser.add_argument(
+        "--async",
+        dest="asynchrone",
+        action="store_true",
+        help="Pour Vikidia: crawler asynchrone (requêtes parallèles, reprise après interruption)",
+    )
+    parser.add_argument(
+        "--concurrence",
+        type=int,
+        default=CONCURRENCE,
+        help=f"Avec --async: requêtes simultanées max (défaut: {CONCURRENCE})",
+    )
+    parser.add_argument(
+        "--debit",
+        type=float,
+        default=DEBIT_MAX,
+        help=f"Avec --async: requêtes par seconde max (défaut: {DEBIT_MAX})",
+    )
+
+    parser.add_argument(
+        "--complet",
+        action="store_true",
+        help="Retélécharger tous les articles, même ceux dont la révision n'a pas changé",
+    )
+
+    parser.add_argument(
+        "--zstd",
+        action="store_true",
+        help="Compresser les chunks (chunks.jsonl.zst, nécessite le module zstandard)",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processus pour le nettoyage et le découpage en chunks (défaut: 1)",
+    )
+
+    parser.add_argument(
+        "--decoupage",
+        choices=MODES_DECOUPAGE,
+        default="caracteres",
+        help="Taille des chunks mesurée en caractères (estimation) ou en tokens réels "
+        "(tokenizer de text-embedding-3-small, via tiktoken)",
+    )
 
     args = parser.parse_args()
+    incremental = not args.complet
 
     if args.source == "vikidia":
-        run_vikidia(args.matiere)
+        run_vikidia(
+            args.matiere,
+            args.asynchrone,
+            args.concurrence,
+            args.debit,
+            incremental,
+            args.zstd,
+            args.workers,
+            args.decoupage,
+        )
     elif args.source == "wikiversite":
-        run_wikiversite(args.niveau)
+        run_wikiversite(args.niveau, incremental, args.zstd, args.workers, args.decoupage)
     elif args.source == "eduscol":
         logger.error("Scraper Éduscol pas encore implémenté")
 
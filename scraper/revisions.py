@@ -0,0 +1,164 @@
+"""Scraping incrémental : manifeste des révisions et delta entre deux runs.
+
+Pour chaque fichier brut (<nom>.json), un manifeste <nom>.manifeste.json garde
+la révision (revid, touched) de chaque article sauvegardé. Au run suivant,
+les révisions sont demandées en bloc (prop=info, 50 titres par requête) :
+un article dont le revid n'a pas changé est repris du fichier brut précédent
+au lieu d'être retéléchargé.
+
+À la fin du run, <nom>.delta.json liste les titres ajoutés, modifiés et
+supprimés depuis le run précédent :
+    {"ajoutes": [...], "modifies": [...], "supprimes": [...]}
+Le pipeline ne redécoupe en chunks que les titres ajoutés ou modifiés et
+retire les chunks des titres supprimés (pipeline.appliquer_delta).
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+from .mediawiki import ResultatPages
+
+logger = logging.getLogger(__name__)
+
+PARAMS_INFO = {
+    "action": "query",
+    "prop": "info",
+    "redirects": "1",
+    "format": "json",
+}
+
+
+def _charger_json(chemin: Path, defaut):
+    if not chemin.exists():
+        return defaut
+    try:
+        with open(chemin, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("[REVISIONS] %s illisible, ignore: %s", chemin, e)
+        return defaut
+
+
+class SuiviRevisions:
+    """Manifeste des révisions d'un fichier brut et delta du run en cours."""
+
+    def __init__(self, dossier: Path, nom: str, reutiliser: bool = True):
+        """Charge le manifeste et les articles du run précédent.
+
+        Args:
+            dossier: Dossier des fichiers bruts.
+            nom: Nom de base du fichier brut (ex: "mathematiques", "niveau_9").
+            reutiliser: Si False, tout est retéléchargé (le delta est quand
+                même calculé par rapport au manifeste précédent).
+        """
+        dossier = Path(dossier)
+        self.chemin_manifeste = dossier / f"{nom}.manifeste.json"
+        self.chemin_delta = dossier / f"{nom}.delta.json"
+        self.ancien: dict[str, dict] = _charger_json(self.chemin_manifeste, {})
+        self.nouveau: dict[str, dict] = {}
+        # Articles du run précédent, réutilisables si leur révision n'a pas changé
+        self.precedents: dict[str, dict] = {}
+        if reutiliser and self.ancien:
+            for article in _charger_json(dossier / f"{nom}.json", []):
+                self.precedents[article["titre"]] = article
+        # Révisions vues par prop=info, en attente de l'extraction
+        self._revisions: dict[str, dict] = {}
+        self.nb_reutilises = 0
+
+    def trier(
+        self, resultat: ResultatPages, titres: list[str]
+    ) -> tuple[list[str], dict[str, dict]]:
+        """Sépare un lot de titres entre ceux à extraire et les articles inchangés.
+
+        Args:
+            resultat: Réponse(s) prop=info pour ces titres.
+            titres: Titres demandés.
+
+        Returns:
+            (titres à extraire, {titre demandé: article repris du run
+            précédent}). Un titre sans réponse prop=info (requête échouée)
+            est extrait.
+        """
+        a_extraire = []
+        reutilises = {}
+        for titre in titres:
+            trouve = resultat.page(titre)
+            if trouve is None:
+                a_extraire.append(titre)
+                continue
+            page_id, page = trouve
+            titre_reel = page.get("title", titre)
+            revision = {
+                "pageid": int(page_id),
+                "revid": page.get("lastrevid"),
+                "touched": page.get("touched"),
+            }
+            ancienne = self.ancien.get(titre_reel)
+            precedent = self.precedents.get(titre_reel)
+            if precedent and ancienne and ancienne.get("revid") == revision["revid"]:
+                self.nouveau[titre_reel] = revision
+                reutilises[titre] = precedent
+                self.nb_reutilises += 1
+            else:
+                self._revisions[titre_reel] = revision
+                a_extraire.append(titre)
+        return a_extraire, reutilises
+
+    def revision(self, titre: str) -> Optional[dict]:
+        """Révision vue par prop=info pour un titre réel (None si inconnue)."""
+        return self._revisions.get(titre) or self.nouveau.get(titre)
+
+    def enregistrer(self, articles: list[dict], revisions: Optional[dict[str, dict]] = None) -> None:
+        """Inscrit au manifeste les articles extraits (titre réel -> révision).
+
+        Args:
+            articles: Articles extraits.
+            revisions: Révisions connues par ailleurs (ex: journal de reprise),
+                prioritaires sur celles vues par trier().
+        """
+        for article in articles:
+            titre = article["titre"]
+            revision = (revisions or {}).get(titre) or self._revisions.get(titre)
+            if revision:
+                self.nouveau[titre] = revision
+
+    def terminer(self, complet: bool = True) -> dict:
+        """Calcule le delta, écrit le manifeste et le delta.
+
+        Args:
+            complet: False si des requêtes ont échoué : les titres non revus
+                sont alors gardés au manifeste et pas signalés comme supprimés.
+
+        Returns:
+            {"ajoutes": [...], "modifies": [...], "supprimes": [...]}
+        """
+        anciens, nouveaux = set(self.ancien), set(self.nouveau)
+        supprimes = sorted(anciens - nouveaux) if complet else []
+        if not complet:
+            for titre in anciens - nouveaux:
+                self.nouveau[titre] = self.ancien[titre]
+
+        delta = {
+            "ajoutes": sorted(nouveaux - anciens),
+            "modifies": sorted(
+                t for t in nouveaux & anciens
+                if self.nouveau[t].get("revid") != self.ancien[t].get("revid")
+            ),
+            "supprimes": supprimes,
+        }
+
+        for chemin, contenu in ((self.chemin_manifeste, self.nouveau), (self.chemin_delta, delta)):
+            with open(chemin, "w", encoding="utf-8") as f:
+                json.dump(contenu, f, ensure_ascii=False, indent=2)
+
+        logger.info(
+            "[DELTA] %s : %d ajoutes, %d modifies, %d supprimes, %d inchanges (non retelecharges)",
+            self.chemin_delta.name,
+            len(delta["ajoutes"]),
+            len(delta["modifies"]),
+            len(delta["supprimes"]),
+            self.nb_reutilises,
+        )
+        return delta
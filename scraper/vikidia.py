@@ -12,12 +12,14 @@ from pathlib import Path
 import cloudscraper
 import requests
 
+from .mediawiki import decouper_en_lots, interroger_pages
 from .metadata import (
     CATEGORIES_RACINES,
     determiner_matiere,
     est_categorie_ignoree,
     creer_metadata,
 )
+from .revisions import PARAMS_INFO, SuiviRevisions
 
 logger = logging.getLogger(__name__)
 
@@ -29,19 +31,86 @@ USER_AGENT = (
     "ChatbotScolaireRAG/1.0 (educational project)"
 )
 DELAI_REQUETE = 1.0  # secondes entre chaque requête
+
+# Extraction groupée : plusieurs titres par requête (voir scraper/mediawiki.py)
+PARAMS_EXTRAITS = {
+    "action": "query",
+    "prop": "extracts",
+    "explaintext": "1",
+    "exlimit": "max",
+    "redirects": "1",
+    "format": "json",
+}
 MAX_PROFONDEUR = 3  # profondeur max du crawl récursif des catégories
 
 
+def construire_article(
+    page_id: str, page: dict, titre: str, matiere: str, categorie: str
+) -> dict | None:
+    """Construit un article à partir d'une page de réponse `prop=extracts`.
+
+    Args:
+        page_id: Identifiant de la page (négatif si la page n'existe pas).
+        page: Entrée de `query.pages` (avec 'title' et 'extract').
+        titre: Titre demandé.
+        matiere: Matière associée.
+        categorie: Catégorie d'origine.
+
+    Returns:
+        Dict avec 'titre', 'texte', 'url', 'metadata' ou None si la page
+        n'existe pas ou est trop courte.
+    """
+    # Pages inexistantes ont un id négatif
+    if int(page_id) < 0:
+        logger.debug("Page inexistante: %s", titre)
+        return None
+
+    extrait = page.get("extract", "")
+    titre_reel = page.get("title", titre)
+
+    if not extrait or len(extrait.strip()) < 50:
+        logger.debug("Article trop court ou vide: %s", titre_reel)
+        return None
+
+    url = BASE_URL + titre_reel.replace(" ", "_")
+    metadata = creer_metadata(
+        source="vikidia",
+        matiere=matiere,
+        titre=titre_reel,
+        url=url,
+        categorie=categorie,
+    )
+
+    logger.debug("Article extrait: %s (%d chars)", titre_reel, len(extrait))
+    return {
+        "titre": titre_reel,
+        "texte": extrait,
+        "url": url,
+        "metadata": metadata,
+    }
+
+
 class VikidiaScraper:
     """Scraper pour les articles Vikidia via l'API MediaWiki."""
 
-    def __init__(self, dossier_sortie: str = "data/raw/vikidia"):
+    def __init__(self, dossier_sortie: str = "data/raw/vikidia", incremental: bool = True):
+        """Initialise le scraper.
+
+        Args:
+            dossier_sortie: Dossier des fichiers bruts <matiere>.json.
+            incremental: Reprendre du run précédent les articles dont la
+                révision n'a pas changé (voir scraper/revisions.py).
+        """
         self.dossier_sortie = Path(dossier_sortie)
         self.dossier_sortie.mkdir(parents=True, exist_ok=True)
         self.session = cloudscraper.create_scraper()
+        self.incremental = incremental
         self.articles_vus: set[str] = set()  # éviter les doublons
+        self.deltas: dict[str, dict] = {}  # matière -> delta du dernier run
+        self._suivi: SuiviRevisions | None = None
         # Compteurs de progression
         self._articles_ok = 0
+        self._articles_inchanges = 0
         self._articles_skip = 0
         self._articles_err = 0
         self._categories_traitees = 0
@@ -53,12 +122,15 @@ class VikidiaScraper:
         if not force and (now - self._derniere_progression) < 10:
             return
         self._derniere_progression = now
-        total = self._articles_ok + self._articles_skip + self._articles_err
+        total = (
+            self._articles_ok + self._articles_inchanges + self._articles_skip + self._articles_err
+        )
         logger.info(
-            "[PROGRESSION] %d categories | %d articles extraits | "
+            "[PROGRESSION] %d categories | %d articles extraits | %d inchanges | "
             "%d ignores | %d erreurs | %d total traites",
             self._categories_traitees,
             self._articles_ok,
+            self._articles_inchanges,
             self._articles_skip,
             self._articles_err,
             total,
@@ -77,6 +149,8 @@ class VikidiaScraper:
             logger.info("=== Scraping matiere: %s ===", matiere)
             logger.info("========================================")
             articles_matiere = []
+            self._suivi = SuiviRevisions(self.dossier_sortie, matiere, self.incremental)
+            erreurs = self._articles_err
 
             for categorie in categories:
                 articles = self._scraper_categorie(
@@ -86,6 +160,7 @@ class VikidiaScraper:
 
             # Sauvegarder les articles bruts par matière
             self._sauvegarder(articles_matiere, matiere)
+            self.deltas[matiere] = self._suivi.terminer(complet=self._articles_err == erreurs)
             tous_articles.extend(articles_matiere)
             logger.info(
                 "[RESULTAT] Matiere %s: %d articles scrapes",
@@ -113,12 +188,15 @@ class VikidiaScraper:
             return []
 
         articles = []
+        self._suivi = SuiviRevisions(self.dossier_sortie, matiere, self.incremental)
+        erreurs = self._articles_err
         for categorie in categories:
             articles.extend(
                 self._scraper_categorie(categorie, matiere, profondeur=0)
             )
 
         self._sauvegarder(articles, matiere)
+        self.deltas[matiere] = self._suivi.terminer(complet=self._articles_err == erreurs)
         logger.info(
             "[RESULTAT] Matiere %s: %d articles scrapes", matiere, len(articles)
         )
@@ -164,19 +242,26 @@ class VikidiaScraper:
             len(titres_articles),
         )
 
-        for i, titre in enumerate(titres_articles):
+        nouveaux = []
+        for titre in titres_articles:
             if titre in self.articles_vus:
                 self._articles_skip += 1
                 continue
             self.articles_vus.add(titre)
+            nouveaux.append(titre)
 
-            article = self._extraire_article(titre, matiere, categorie)
-            if article:
-                articles.append(article)
-                self._articles_ok += 1
-            else:
-                self._articles_skip += 1
-
+        for lot in decouper_en_lots(nouveaux):
+            # Révisions en bloc : seuls les articles modifiés ou nouveaux sont extraits
+            a_extraire, inchanges = self._suivi.trier(
+                interroger_pages(self._get_json, lot, PARAMS_INFO), lot
+            )
+            extraits = self._extraire_articles(a_extraire, matiere, categorie)
+            self._suivi.enregistrer(extraits)
+            articles.extend(inchanges.values())
+            articles.extend(extraits)
+            self._articles_inchanges += len(inchanges)
+            self._articles_ok += len(extraits)
+            self._articles_skip += len(a_extraire) - len(extraits)
             self._afficher_progression()
 
         # 2. Crawl récursif des sous-catégories
@@ -257,60 +342,51 @@ class VikidiaScraper:
         Returns:
             Dict avec 'titre', 'texte', 'url', 'metadata' ou None si échec.
         """
-        params = {
-            "action": "query",
-            "prop": "extracts",
-            "explaintext": "1",
-            "redirects": "1",
-            "titles": titre,
-            "format": "json",
-        }
+        articles = self._extraire_articles([titre], matiere, categorie)
+        return articles[0] if articles else None
+
+    def _extraire_articles(
+        self, titres: list[str], matiere: str, categorie: str
+    ) -> list[dict]:
+        """Extrait plusieurs articles avec des requêtes groupées (jusqu'à 50 titres).
+
+        Args:
+            titres: Titres des pages à extraire.
+            matiere: Matière associée.
+            categorie: Catégorie d'origine.
+
+        Returns:
+            Articles extraits, dans l'ordre des titres (pages absentes ou trop
+            courtes omises).
+        """
+        if not titres:
+            return []
+
+        resultat = interroger_pages(self._get_json, titres, PARAMS_EXTRAITS)
+
+        articles = []
+        for titre in titres:
+            trouve = resultat.page(titre)
+            if trouve is None:
+                logger.debug("Page inexistante: %s", titre)
+                continue
+            article = construire_article(*trouve, titre, matiere, categorie)
+            if article:
+                articles.append(article)
+        return articles
 
+    def _get_json(self, params: dict) -> dict | None:
+        """Envoie une requête à l'API (après DELAI_REQUETE) et renvoie le JSON, ou None."""
         time.sleep(DELAI_REQUETE)
         try:
             response = self.session.get(API_URL, params=params, timeout=30)
             response.raise_for_status()
-            data = response.json()
+            return response.json()
         except (requests.RequestException, json.JSONDecodeError) as e:
-            logger.error("[ERREUR] Article '%s': %s", titre, e)
+            logger.error("[ERREUR] Requete API (%s): %s", params.get("titles", "")[:80], e)
             self._articles_err += 1
             return None
 
-        pages = data.get("query", {}).get("pages", {})
-        for page_id, page in pages.items():
-            # Pages inexistantes ont un id négatif
-            if int(page_id) < 0:
-                logger.debug("Page inexistante: %s", titre)
-                return None
-
-            extrait = page.get("extract", "")
-            titre_reel = page.get("title", titre)
-
-            if not extrait or len(extrait.strip()) < 50:
-                logger.debug("Article trop court ou vide: %s", titre_reel)
-                return None
-
-            url = BASE_URL + titre_reel.replace(" ", "_")
-            metadata = creer_metadata(
-                source="vikidia",
-                matiere=matiere,
-                titre=titre_reel,
-                url=url,
-                categorie=categorie,
-            )
-
-            logger.debug(
-                "Article extrait: %s (%d chars)", titre_reel, len(extrait)
-            )
-            return {
-                "titre": titre_reel,
-                "texte": extrait,
-                "url": url,
-                "metadata": metadata,
-            }
-
-        return None
-
     def _sauvegarder(self, articles: list[dict], matiere: str) -> None:
         """Sauvegarde les articles bruts en JSON.
 
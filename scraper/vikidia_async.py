@@ -0,0 +1,485 @@
+"""Crawler Vikidia asynchrone : requêtes parallèles, débit limité, reprise sur interruption.
+
+Même résultat que VikidiaScraper (mêmes catégories, mêmes articles), mais :
+- plusieurs requêtes en vol (sémaphore) au lieu d'une pause fixe avant chacune ;
+- débit global borné par un seau à jetons, mis en pause quand l'API répond
+  `maxlag` ou 429/503 avec `Retry-After` ;
+- session HTTP unique avec pool de connexions (keep-alive) ;
+- journal de reprise : catégories terminées et titres traités sont ajoutés à
+  un fichier JSONL ; relancer le crawl après une interruption (ou un run
+  terminé avec des erreurs, dont le journal est gardé) repart de là ;
+- scraping incrémental (scraper/revisions.py) : révisions demandées en bloc,
+  articles inchangés repris du run précédent.
+
+La session cloudscraper (nécessaire pour Vikidia) est synchrone : chaque
+requête s'exécute dans un thread via asyncio.to_thread.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+
+import cloudscraper
+import requests
+from requests.adapters import DEFAULT_POOLSIZE
+
+from .mediawiki import ResultatPages, decouper_en_lots, parametres_suivants
+from .metadata import CATEGORIES_RACINES, est_categorie_ignoree
+from .revisions import PARAMS_INFO, SuiviRevisions
+from .vikidia import API_URL, MAX_PROFONDEUR, PARAMS_EXTRAITS, construire_article
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCE = 8  # requêtes HTTP simultanées max
+DEBIT_MAX = 5.0  # requêtes par seconde (moyenne)
+RAFALE_MAX = 5  # requêtes pouvant partir d'un coup après une période calme
+MAXLAG = 5  # secondes : l'API refuse la requête si la réplication est plus en retard
+MAX_TENTATIVES = 5  # tentatives par requête (maxlag, 429, 503, erreurs réseau)
+ATTENTE_PAR_DEFAUT = 5.0  # secondes si l'API ne donne pas de Retry-After
+
+
+class SeauAJetons:
+    """Limiteur de débit (token bucket) partagé par toutes les requêtes."""
+
+    def __init__(self, debit: float, capacite: int):
+        """Initialise le seau.
+
+        Args:
+            debit: Jetons ajoutés par seconde.
+            capacite: Nombre max de jetons accumulés (taille des rafales).
+        """
+        self.debit = debit
+        self.capacite = capacite
+        self._jetons = float(capacite)
+        self._dernier = time.monotonic()
+        self._pause_jusqua = 0.0
+        self._verrou = asyncio.Lock()
+
+    async def acquerir(self) -> None:
+        """Attend qu'un jeton soit disponible et le consomme."""
+        async with self._verrou:
+            while True:
+                maintenant = time.monotonic()
+                if maintenant < self._pause_jusqua:
+                    await asyncio.sleep(self._pause_jusqua - maintenant)
+                    continue
+                self._jetons = min(
+                    self.capacite, self._jetons + (maintenant - self._dernier) * self.debit
+                )
+                self._dernier = maintenant
+                if self._jetons >= 1:
+                    self._jetons -= 1
+                    return
+                await asyncio.sleep((1 - self._jetons) / self.debit)
+
+    def suspendre(self, secondes: float) -> None:
+        """Bloque toutes les requêtes pendant `secondes` (Retry-After, maxlag)."""
+        self._pause_jusqua = max(self._pause_jusqua, time.monotonic() + secondes)
+        self._jetons = 0.0
+
+
+class JournalReprise:
+    """Journal JSONL des catégories terminées et des titres traités d'une matière.
+
+    Chaque ligne est un événement :
+    - {"categorie": nom} : catégorie et sous-catégories entièrement crawlées ;
+    - {"titre": titre, "article": {...} | null, "revision": {...} | null} :
+      titre traité (article extrait ou ignoré) et sa révision.
+    """
+
+    def __init__(self, chemin: Path):
+        self.chemin = Path(chemin)
+        self.categories: set[str] = set()
+        self.titres: set[str] = set()
+        self.articles: list[dict] = []
+        self.revisions: dict[str, dict] = {}  # titre de l'article -> révision
+        self._fichier = None
+
+    def charger(self) -> None:
+        """Relit le journal d'un crawl interrompu (s'il existe)."""
+        if not self.chemin.exists():
+            return
+        with open(self.chemin, "r", encoding="utf-8") as f:
+            for ligne in f:
+                try:
+                    evenement = json.loads(ligne)
+                except json.JSONDecodeError:
+                    continue  # dernière ligne tronquée par l'interruption
+                if "categorie" in evenement:
+                    self.categories.add(evenement["categorie"])
+                elif "titre" in evenement:
+                    self.titres.add(evenement["titre"])
+                    if evenement.get("article"):
+                        self.articles.append(evenement["article"])
+                        if evenement.get("revision"):
+                            self.revisions[evenement["article"]["titre"]] = evenement["revision"]
+        logger.info(
+            "[REPRISE] %s : %d categories terminees, %d titres deja traites",
+            self.chemin.name,
+            len(self.categories),
+            len(self.titres),
+        )
+
+    def categorie_terminee(self, categorie: str) -> None:
+        self.categories.add(categorie)
+        self._ecrire({"categorie": categorie})
+
+    def titre_traite(self, titre: str, article: dict | None, revision: dict | None = None) -> None:
+        self.titres.add(titre)
+        if article:
+            self.articles.append(article)
+            if revision:
+                self.revisions[article["titre"]] = revision
+        self._ecrire({"titre": titre, "article": article, "revision": revision})
+
+    def supprimer(self) -> None:
+        """Supprime le journal (crawl de la matière terminé et sauvegardé)."""
+        self.fermer()
+        self.chemin.unlink(missing_ok=True)
+
+    def fermer(self) -> None:
+        if self._fichier:
+            self._fichier.close()
+            self._fichier = None
+
+    def _ecrire(self, evenement: dict) -> None:
+        if self._fichier is None:
+            self.chemin.parent.mkdir(parents=True, exist_ok=True)
+            self._fichier = open(self.chemin, "a", encoding="utf-8")
+        self._fichier.write(json.dumps(evenement, ensure_ascii=False) + "\n")
+        self._fichier.flush()
+
+
+class VikidiaCrawlerAsync:
+    """Crawler Vikidia asynchrone avec reprise (voir docstring du module)."""
+
+    def __init__(
+        self,
+        dossier_sortie: str = "data/raw/vikidia",
+        api_url: str = API_URL,
+        concurrence: int = CONCURRENCE,
+        debit: float = DEBIT_MAX,
+        rafale: int = RAFALE_MAX,
+        session: requests.Session | None = None,
+        incremental: bool = True,
+    ):
+        """Initialise le crawler.
+
+        Args:
+            dossier_sortie: Dossier des fichiers <matiere>.json et des journaux de reprise.
+            api_url: URL de l'API MediaWiki (modifiable pour les tests).
+            concurrence: Nombre max de requêtes simultanées.
+            debit: Requêtes par seconde max (moyenne).
+            rafale: Taille max d'une rafale de requêtes.
+            session: Session HTTP (par défaut: cloudscraper avec pool de connexions).
+            incremental: Reprendre du run précédent les articles dont la
+                révision n'a pas changé.
+        """
+        self.dossier_sortie = Path(dossier_sortie)
+        self.dossier_sortie.mkdir(parents=True, exist_ok=True)
+        self.api_url = api_url
+        self.concurrence = concurrence
+        self.debit = debit
+        self.rafale = rafale
+        self.session = session or self._creer_session(concurrence)
+        self.incremental = incremental
+        self.nb_requetes = 0
+        self.deltas: dict[str, dict] = {}  # matière -> delta du dernier run
+        # Compteurs de progression
+        self._articles_ok = 0
+        self._articles_inchanges = 0
+        self._articles_skip = 0
+        self._articles_err = 0
+        self._categories_traitees = 0
+        self._derniere_progression = time.time()
+
+    @staticmethod
+    def _creer_session(concurrence: int) -> requests.Session:
+        """Session cloudscraper dont le pool garde `concurrence` connexions ouvertes."""
+        session = cloudscraper.create_scraper()
+        # Nouvel adaptateur HTTPS au pool agrandi ; il reprend le contexte TLS
+        # de celui de cloudscraper, nécessaire pour passer la protection anti-bot
+        tls = session.get_adapter("https://")
+        session.mount(
+            "https://",
+            cloudscraper.CipherSuiteAdapter(
+                ssl_context=tls.ssl_context,
+                source_address=tls.source_address,
+                pool_connections=DEFAULT_POOLSIZE,
+                pool_maxsize=concurrence,
+            ),
+        )
+        return session
+
+    def scraper_tout(self) -> list[dict]:
+        """Crawl toutes les matières configurées (voir VikidiaScraper.scraper_tout)."""
+        tous_articles = []
+        for matiere in CATEGORIES_RACINES:
+            tous_articles.extend(self.scraper_matiere(matiere))
+        logger.info("[TERMINE] Total: %d articles scrapes", len(tous_articles))
+        return tous_articles
+
+    def scraper_matiere(self, matiere: str) -> list[dict]:
+        """Crawl une matière (reprend le journal s'il existe) et sauvegarde <matiere>.json.
+
+        Args:
+            matiere: Identifiant de la matière.
+
+        Returns:
+            Liste des articles scrapés.
+        """
+        return asyncio.run(self.crawler_matiere(matiere))
+
+    async def crawler_matiere(self, matiere: str) -> list[dict]:
+        """Version coroutine de scraper_matiere()."""
+        categories = CATEGORIES_RACINES.get(matiere, [])
+        if not categories:
+            logger.error("Matiere inconnue: %s", matiere)
+            return []
+
+        logger.info("=== Crawl asynchrone matiere: %s ===", matiere)
+        journal = JournalReprise(self.dossier_sortie / f".reprise_{matiere}.jsonl")
+        journal.charger()
+
+        self._journal = journal
+        self._matiere = matiere
+        self._suivi = SuiviRevisions(self.dossier_sortie, matiere, self.incremental)
+        erreurs = self._articles_err
+        self._seau = SeauAJetons(self.debit, self.rafale)
+        self._semaphore = asyncio.Semaphore(self.concurrence)
+        # Titres et catégories déjà planifiés dans ce run (en plus du journal)
+        self._titres_planifies = set(journal.titres)
+        self._categories_planifiees = set(journal.categories)
+
+        try:
+            await asyncio.gather(*(
+                self._crawler_categorie(categorie, profondeur=0)
+                for categorie in categories
+            ))
+        finally:
+            journal.fermer()
+
+        articles = journal.articles
+        self._sauvegarder(articles, matiere)
+        self._suivi.enregistrer(articles, journal.revisions)
+        complet = self._articles_err == erreurs
+        self.deltas[matiere] = self._suivi.terminer(complet=complet)
+        if complet:
+            journal.supprimer()
+        else:
+            # Journal gardé : le prochain run reprend les lots et catégories en erreur
+            logger.warning(
+                "[REPRISE] %d erreurs, journal %s garde pour le prochain run",
+                self._articles_err - erreurs,
+                journal.chemin.name,
+            )
+        logger.info("[RESULTAT] Matiere %s: %d articles scrapes", matiere, len(articles))
+        self._afficher_progression(force=True)
+        return articles
+
+    async def _crawler_categorie(self, categorie: str, profondeur: int) -> bool:
+        """Crawl une catégorie : ses articles et ses sous-catégories en parallèle.
+
+        Returns:
+            False si une liste, un lot ou une sous-catégorie est en erreur : la
+            catégorie n'est alors pas inscrite au journal et sera reprise.
+        """
+        if profondeur > MAX_PROFONDEUR or est_categorie_ignoree(categorie):
+            return True
+        if categorie in self._categories_planifiees:
+            return True
+        self._categories_planifiees.add(categorie)
+        self._categories_traitees += 1
+
+        (titres, titres_ok), (sous_categories, sous_categories_ok) = await asyncio.gather(
+            self._lister_pages_categorie(categorie, "page"),
+            self._lister_pages_categorie(categorie, "subcat"),
+        )
+        logger.info(
+            "%s[CAT %d] %s : %d articles, %d sous-categories",
+            "  " * profondeur,
+            self._categories_traitees,
+            categorie,
+            len(titres),
+            len(sous_categories),
+        )
+
+        nouveaux = []
+        for titre in titres:
+            if titre in self._titres_planifies:
+                self._articles_skip += 1
+            else:
+                self._titres_planifies.add(titre)
+                nouveaux.append(titre)
+
+        resultats = await asyncio.gather(
+            *(self._extraire_lot(lot, categorie) for lot in decouper_en_lots(nouveaux)),
+            *(self._crawler_categorie(sous_cat, profondeur + 1) for sous_cat in sous_categories),
+        )
+        complete = titres_ok and sous_categories_ok and all(resultats)
+        if complete:
+            self._journal.categorie_terminee(categorie)
+        return complete
+
+    async def _lister_pages_categorie(self, categorie: str, type_page: str) -> tuple[list[str], bool]:
+        """Liste les pages ou sous-catégories d'une catégorie (toutes les pages de résultats).
+
+        Returns:
+            (titres, complet) : complet est False si une requête a échoué
+            (titres lus jusque-là).
+        """
+        titres = []
+        params = {
+            "action": "query",
+            "list": "categorymembers",
+            "cmtitle": categorie,
+            "cmtype": type_page,
+            "cmlimit": "50",
+            "format": "json",
+        }
+        while True:
+            data = await self._requete(params)
+            if data is None:
+                logger.error("Erreur API pour categorie %s", categorie)
+                self._articles_err += 1
+                return titres, False
+
+            for membre in data.get("query", {}).get("categorymembers", []):
+                # Ne garder que les articles (namespace 0) ou catégories (namespace 14)
+                if membre.get("ns") in (0, 14):
+                    titres.append(membre["title"])
+
+            if "continue" in data:
+                params = {**params, "cmcontinue": data["continue"]["cmcontinue"]}
+            else:
+                break
+        return titres, True
+
+    async def _extraire_lot(self, titres: list[str], categorie: str) -> bool:
+        """Extrait un lot d'articles modifiés (requêtes groupées + suites) et l'inscrit au journal.
+
+        Returns:
+            False si l'extraction du lot a échoué.
+        """
+        # Révisions en bloc : les articles inchangés sont repris du run précédent
+        infos = await self._interroger(titres, PARAMS_INFO) or ResultatPages()
+        a_extraire, inchanges = self._suivi.trier(infos, titres)
+        for titre, article in inchanges.items():
+            self._journal.titre_traite(titre, article, self._suivi.revision(article["titre"]))
+        self._articles_inchanges += len(inchanges)
+        if not a_extraire:
+            return True
+
+        resultat = await self._interroger(a_extraire, PARAMS_EXTRAITS)
+        if resultat is None:
+            # Pas inscrit au journal (ni sa catégorie) : le lot sera retenté à la reprise
+            logger.error("[ERREUR] Lot de %d articles (%s...)", len(a_extraire), a_extraire[0])
+            self._articles_err += len(a_extraire)
+            return False
+
+        for titre in a_extraire:
+            trouve = resultat.page(titre)
+            article = construire_article(*trouve, titre, self._matiere, categorie) if trouve else None
+            revision = self._suivi.revision(article["titre"]) if article else None
+            self._journal.titre_traite(titre, article, revision)
+            if article:
+                self._articles_ok += 1
+            else:
+                self._articles_skip += 1
+        self._afficher_progression()
+        return True
+
+    async def _interroger(self, titres: list[str], params: dict) -> ResultatPages | None:
+        """Requête groupée sur un lot de titres, suites comprises (None si une requête échoue)."""
+        params = {**params, "titles": "|".join(titres)}
+        resultat = ResultatPages()
+        suite = params
+        while suite is not None:
+            data = await self._requete(suite)
+            if data is None:
+                return None
+            resultat.ajouter(data)
+            suite = parametres_suivants(params, data)
+        return resultat
+
+    async def _requete(self, params: dict) -> dict | None:
+        """Requête GET sur l'API, avec limite de débit et nouvelles tentatives.
+
+        Returns:
+            Réponse JSON, ou None après MAX_TENTATIVES échecs.
+        """
+        params = {**params, "maxlag": str(MAXLAG)}
+        for tentative in range(1, MAX_TENTATIVES + 1):
+            await self._seau.acquerir()
+            async with self._semaphore:
+                self.nb_requetes += 1
+                try:
+                    response = await asyncio.to_thread(
+                        self.session.get, self.api_url, params=params, timeout=30
+                    )
+                except requests.RequestException as e:
+                    logger.warning("Erreur reseau (tentative %d): %s", tentative, e)
+                    self._seau.suspendre(ATTENTE_PAR_DEFAUT * tentative)
+                    continue
+
+            if response.status_code in (429, 503):
+                self._pause_demandee(response, tentative)
+                continue
+
+            try:
+                response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                logger.error("Reponse API invalide: %s", e)
+                return None
+
+            # maxlag : HTTP 200 avec un code d'erreur et un Retry-After
+            if data.get("error", {}).get("code") == "maxlag":
+                self._pause_demandee(response, tentative)
+                continue
+            return data
+        return None
+
+    def _pause_demandee(self, response: requests.Response, tentative: int) -> None:
+        """Suspend toutes les requêtes pendant le Retry-After renvoyé par l'API."""
+        try:
+            attente = float(response.headers.get("Retry-After", ATTENTE_PAR_DEFAUT))
+        except ValueError:
+            attente = ATTENTE_PAR_DEFAUT
+        logger.warning(
+            "API surchargee (HTTP %d), pause de %.1fs (tentative %d)",
+            response.status_code,
+            attente,
+            tentative,
+        )
+        self._seau.suspendre(attente)
+
+    def _afficher_progression(self, force: bool = False) -> None:
+        """Affiche la progression toutes les 10 secondes ou si force=True."""
+        now = time.time()
+        if not force and (now - self._derniere_progression) < 10:
+            return
+        self._derniere_progression = now
+        logger.info(
+            "[PROGRESSION] %d categories | %d articles extraits | %d inchanges | "
+            "%d ignores | %d erreurs | %d requetes",
+            self._categories_traitees,
+            self._articles_ok,
+            self._articles_inchanges,
+            self._articles_skip,
+            self._articles_err,
+            self.nb_requetes,
+        )
+
+    def _sauvegarder(self, articles: list[dict], matiere: str) -> None:
+        """Sauvegarde les articles bruts en JSON (même format que VikidiaScraper)."""
+        if not articles:
+            return
+
+        fichier = self.dossier_sortie / f"{matiere}.json"
+        with open(fichier, "w", encoding="utf-8") as f:
+            json.dump(articles, f, ensure_ascii=False, indent=2)
+
+        logger.info("[SAUVEGARDE] %d articles -> %s", len(articles), fichier)
@@ -13,7 +13,9 @@ from typing import Optional
 import cloudscraper
 import requests
 
+from .mediawiki import decouper_en_lots, interroger_pages
 from .metadata import creer_metadata
+from .revisions import PARAMS_INFO, SuiviRevisions
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,17 @@ USER_AGENT = (
 )
 DELAI_REQUETE = 1.0  # secondes entre chaque requête
 
+# Extraction groupée : plusieurs titres par requête (voir scraper/mediawiki.py)
+PARAMS_LECONS = {
+    "action": "query",
+    "prop": "extracts|categories",
+    "explaintext": "1",
+    "exlimit": "max",
+    "redirects": "1",
+    "cllimit": "max",
+    "format": "json",
+}
+
 # Mapping niveau Wikiversité → niveau scolaire français
 # Basé sur l'analyse: Pythagore=niveau 9 (4ème), Fraction=niveau 8 (6ème)
 NIVEAU_MAPPING = {
@@ -61,13 +74,24 @@ FACULTES_MATIERES = {
 class WikiversiteScraper:
     """Scraper pour les leçons Wikiversité via l'API MediaWiki."""
 
-    def __init__(self, dossier_sortie: str = "data/raw/wikiversite"):
+    def __init__(self, dossier_sortie: str = "data/raw/wikiversite", incremental: bool = True):
+        """Initialise le scraper.
+
+        Args:
+            dossier_sortie: Dossier des fichiers bruts.
+            incremental: Reprendre du run précédent les leçons dont la
+                révision n'a pas changé (voir scraper/revisions.py).
+        """
         self.dossier_sortie = Path(dossier_sortie)
         self.dossier_sortie.mkdir(parents=True, exist_ok=True)
         self.session = cloudscraper.create_scraper()
+        self.incremental = incremental
         self.lecons_vues: set[str] = set()  # éviter les doublons
+        self.deltas: dict[str, dict] = {}  # fichier brut -> delta du dernier run
+        self._suivi: Optional[SuiviRevisions] = None
         # Compteurs de progression
         self._lecons_ok = 0
+        self._lecons_inchangees = 0
         self._lecons_skip = 0
         self._lecons_err = 0
         self._niveaux_traites = 0
@@ -79,12 +103,13 @@ class WikiversiteScraper:
         if not force and (now - self._derniere_progression) < 10:
             return
         self._derniere_progression = now
-        total = self._lecons_ok + self._lecons_skip + self._lecons_err
+        total = self._lecons_ok + self._lecons_inchangees + self._lecons_skip + self._lecons_err
         logger.info(
-            "[PROGRESSION] %d niveaux | %d lecons extraites | "
+            "[PROGRESSION] %d niveaux | %d lecons extraites | %d inchangees | "
             "%d ignorees | %d erreurs | %d total traitees",
             self._niveaux_traites,
             self._lecons_ok,
+            self._lecons_inchangees,
             self._lecons_skip,
             self._lecons_err,
             total,
@@ -97,6 +122,8 @@ class WikiversiteScraper:
             Liste de toutes les leçons scrapées (dict avec 'titre', 'texte', 'metadata').
         """
         toutes_lecons = []
+        self._suivi = SuiviRevisions(self.dossier_sortie, "toutes_lecons", self.incremental)
+        erreurs = self._lecons_err
 
         for niveau_wv in NIVEAUX_COLLEGE:
             logger.info("========================================")
@@ -114,6 +141,7 @@ class WikiversiteScraper:
 
         # Sauvegarder toutes les leçons
         self._sauvegarder(toutes_lecons, "toutes_lecons")
+        self.deltas["toutes_lecons"] = self._suivi.terminer(complet=self._lecons_err == erreurs)
         logger.info("========================================")
         logger.info("[TERMINE] Total: %d lecons scrapees", len(toutes_lecons))
         self._afficher_progression(force=True)
@@ -132,8 +160,12 @@ class WikiversiteScraper:
             logger.error("Niveau invalide: %d (attendu: 7-13)", niveau_wv)
             return []
 
+        nom = f"niveau_{niveau_wv}"
+        self._suivi = SuiviRevisions(self.dossier_sortie, nom, self.incremental)
+        erreurs = self._lecons_err
         lecons = self._scraper_niveau(niveau_wv)
-        self._sauvegarder(lecons, f"niveau_{niveau_wv}")
+        self._sauvegarder(lecons, nom)
+        self.deltas[nom] = self._suivi.terminer(complet=self._lecons_err == erreurs)
         logger.info("[RESULTAT] Niveau %d: %d lecons scrapees", niveau_wv, len(lecons))
         self._afficher_progression(force=True)
         return lecons
@@ -157,20 +189,27 @@ class WikiversiteScraper:
         titres_lecons = self._lister_lecons_niveau(categorie)
         logger.info("  -> %d lecons trouvees", len(titres_lecons))
 
-        lecons = []
-        for i, titre in enumerate(titres_lecons):
+        nouveaux = []
+        for titre in titres_lecons:
             if titre in self.lecons_vues:
                 self._lecons_skip += 1
                 continue
             self.lecons_vues.add(titre)
+            nouveaux.append(titre)
 
-            lecon = self._extraire_lecon(titre, niveau_scolaire, niveau_wv)
-            if lecon:
-                lecons.append(lecon)
-                self._lecons_ok += 1
-            else:
-                self._lecons_skip += 1
-
+        lecons = []
+        for lot in decouper_en_lots(nouveaux):
+            # Révisions en bloc : seules les leçons modifiées ou nouvelles sont extraites
+            a_extraire, inchangees = self._suivi.trier(
+                interroger_pages(self._get_json, lot, PARAMS_INFO), lot
+            )
+            extraites = self._extraire_lecons(a_extraire, niveau_scolaire, niveau_wv)
+            self._suivi.enregistrer(extraites)
+            lecons.extend(inchangees.values())
+            lecons.extend(extraites)
+            self._lecons_inchangees += len(inchangees)
+            self._lecons_ok += len(extraites)
+            self._lecons_skip += len(a_extraire) - len(extraites)
             self._afficher_progression()
 
         return lecons
@@ -232,74 +271,93 @@ class WikiversiteScraper:
         Returns:
             Dict avec 'titre', 'texte', 'url', 'metadata' ou None si échec.
         """
-        # 1. Récupérer le contenu texte
-        params = {
-            "action": "query",
-            "prop": "extracts|categories",
-            "explaintext": "1",
-            "redirects": "1",
-            "titles": titre,
-            "cllimit": "100",
-            "format": "json",
+        lecons = self._extraire_lecons([titre], niveau_scolaire, niveau_wv)
+        return lecons[0] if lecons else None
+
+    def _extraire_lecons(
+        self, titres: list[str], niveau_scolaire: str, niveau_wv: int
+    ) -> list[dict]:
+        """Extrait plusieurs leçons avec des requêtes groupées (jusqu'à 50 titres).
+
+        Args:
+            titres: Titres des leçons.
+            niveau_scolaire: Niveau scolaire français (6eme, 5eme, etc.).
+            niveau_wv: Niveau Wikiversité original.
+
+        Returns:
+            Leçons extraites, dans l'ordre des titres (pages absentes ou trop
+            courtes omises).
+        """
+        if not titres:
+            return []
+
+        resultat = interroger_pages(self._get_json, titres, PARAMS_LECONS)
+
+        lecons = []
+        for titre in titres:
+            trouve = resultat.page(titre)
+            if trouve is None:
+                logger.debug("Page inexistante: %s", titre)
+                continue
+            lecon = self._construire_lecon(trouve[1], titre, niveau_scolaire, niveau_wv)
+            if lecon:
+                lecons.append(lecon)
+        return lecons
+
+    def _construire_lecon(
+        self, page: dict, titre: str, niveau_scolaire: str, niveau_wv: int
+    ) -> Optional[dict]:
+        """Construit une leçon à partir d'une page (extract + categories)."""
+        extrait = page.get("extract", "")
+        titre_reel = page.get("title", titre)
+        categories = page.get("categories", [])
+
+        if not extrait or len(extrait.strip()) < 50:
+            logger.debug("Lecon trop courte ou vide: %s", titre_reel)
+            return None
+
+        # Déterminer la matière depuis les catégories
+        matiere = self._detecter_matiere(categories)
+
+        # Créer les métadonnées
+        url = BASE_URL + titre_reel.replace(" ", "_")
+        metadata = creer_metadata(
+            source="wikiversite",
+            matiere=matiere,
+            titre=titre_reel,
+            url=url,
+            categorie=f"Niveau {niveau_wv}",
+            niveau=niveau_scolaire,
+        )
+        # Ajouter le niveau Wikiversité original pour référence
+        metadata["niveau_wikiversite"] = niveau_wv
+
+        logger.debug(
+            "Lecon extraite: %s [%s - %s] (%d chars)",
+            titre_reel,
+            matiere,
+            niveau_scolaire,
+            len(extrait),
+        )
+        return {
+            "titre": titre_reel,
+            "texte": extrait,
+            "url": url,
+            "metadata": metadata,
         }
 
+    def _get_json(self, params: dict) -> Optional[dict]:
+        """Envoie une requête à l'API (après DELAI_REQUETE) et renvoie le JSON, ou None."""
         time.sleep(DELAI_REQUETE)
         try:
             response = self.session.get(API_URL, params=params, timeout=30)
             response.raise_for_status()
-            data = response.json()
+            return response.json()
         except (requests.RequestException, json.JSONDecodeError) as e:
-            logger.error("[ERREUR] Lecon '%s': %s", titre, e)
+            logger.error("[ERREUR] Requete API (%s): %s", params.get("titles", "")[:80], e)
             self._lecons_err += 1
             return None
 
-        pages = data.get("query", {}).get("pages", {})
-        for page_id, page in pages.items():
-            # Pages inexistantes ont un id négatif
-            if int(page_id) < 0:
-                logger.debug("Page inexistante: %s", titre)
-                return None
-
-            extrait = page.get("extract", "")
-            titre_reel = page.get("title", titre)
-            categories = page.get("categories", [])
-
-            if not extrait or len(extrait.strip()) < 50:
-                logger.debug("Lecon trop courte ou vide: %s", titre_reel)
-                return None
-
-            # 2. Déterminer la matière depuis les catégories
-            matiere = self._detecter_matiere(categories)
-
-            # 3. Créer les métadonnées
-            url = BASE_URL + titre_reel.replace(" ", "_")
-            metadata = creer_metadata(
-                source="wikiversite",
-                matiere=matiere,
-                titre=titre_reel,
-                url=url,
-                categorie=f"Niveau {niveau_wv}",
-                niveau=niveau_scolaire,
-            )
-            # Ajouter le niveau Wikiversité original pour référence
-            metadata["niveau_wikiversite"] = niveau_wv
-
-            logger.debug(
-                "Lecon extraite: %s [%s - %s] (%d chars)",
-                titre_reel,
-                matiere,
-                niveau_scolaire,
-                len(extrait),
-            )
-            return {
-                "titre": titre_reel,
-                "texte": extrait,
-                "url": url,
-                "metadata": metadata,
-            }
-
-        return None
-
     def _detecter_matiere(self, categories: list[dict]) -> str:
         """Détecte la matière depuis les catégories de la page.
 
@@ -0,0 +1,115 @@
+"""
+Benchmark du découpage en chunks (mode "caracteres") sur de très longues leçons.
+
+Génère des leçons de type Wikiversité (nombreuses sections, dont de longs
+paragraphes découpés par phrases) de taille croissante et compare :
+- ancien chemin : tampon agrandi par concaténation à chaque section/phrase
+- chemin actuel : scraper.chunker.decouper_en_chunks (bornes dans le texte
+  d'origine, copie à l'émission de chaque chunk)
+
+Vérifie que les chunks produits sont identiques.
+
+Usage:
+    python scripts/bench_chunker.py [--tailles 100000 1000000 10000000]
+"""
+
+import argparse
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+RACINE = Path(__file__).parent.parent
+sys.path.insert(0, str(RACINE))
+
+from scraper import chunker  # noqa: E402
+from scraper.chunker import TAILLE_CHUNK_CHARS, TAILLE_MIN_CHUNK_CHARS, _extraire_overlap  # noqa: E402
+
+PHRASES = [
+    "Une équation du premier degré se résout en isolant l'inconnue.",
+    "On vérifie la solution en la remplaçant dans l'équation de départ !",
+    "Pourquoi le produit de deux nombres négatifs est-il positif ?",
+    "Exemple : 3x + 5 = 11 donne x = 2.",
+    "Cette propriété découle de la distributivité de la multiplication sur l'addition.",
+]
+
+
+def lecon_synthetique(taille: int, rng: random.Random) -> str:
+    sections = []
+    total = 0
+    while total < taille:
+        # 1 paragraphe sur 5 dépasse TAILLE_CHUNK_CHARS (découpé par phrases)
+        nb_phrases = rng.randint(40, 120) if rng.random() < 0.2 else rng.randint(1, 12)
+        section = " ".join(rng.choice(PHRASES) for _ in range(nb_phrases))
+        sections.append(section)
+        total += len(section) + 2
+    return "\n\n".join(sections)
+
+
+def decouper_ancien(texte):
+    sections = [s.strip() for s in texte.split("\n\n") if s.strip()]
+    chunks = []
+    buffer = ""
+    for section in sections:
+        if len(buffer) + len(section) + 2 > TAILLE_CHUNK_CHARS:
+            if buffer:
+                chunks.append(buffer.strip())
+            if len(section) > TAILLE_CHUNK_CHARS:
+                chunks.extend(decouper_par_phrases_ancien(section))
+                buffer = ""
+            else:
+                buffer = _extraire_overlap(buffer) + "\n\n" + section if buffer else section
+        else:
+            buffer = buffer + "\n\n" + section if buffer else section
+    if buffer and len(buffer.strip()) >= TAILLE_MIN_CHUNK_CHARS:
+        chunks.append(buffer.strip())
+    return chunks
+
+
+def decouper_par_phrases_ancien(texte):
+    phrases = re.split(r"(?<=[.!?])\s+", texte)
+    chunks = []
+    buffer = ""
+    for phrase in phrases:
+        if len(buffer) + len(phrase) + 1 > TAILLE_CHUNK_CHARS:
+            if buffer:
+                chunks.append(buffer.strip())
+            buffer = _extraire_overlap(buffer) + " " + phrase if buffer else phrase
+        else:
+            buffer = buffer + " " + phrase if buffer else phrase
+    if buffer and len(buffer.strip()) >= TAILLE_MIN_CHUNK_CHARS:
+        chunks.append(buffer.strip())
+    return chunks
+
+
+def mesurer(fonction, texte):
+    debut = time.perf_counter()
+    chunks = fonction(texte)
+    return time.perf_counter() - debut, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tailles", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    actuel = lambda texte: [c["text"] for c in chunker.decouper_en_chunks(texte)]  # noqa: E731
+
+    print(f"{'caractères':>11} | {'chunks':>7} | {'ancien':>8} | {'actuel':>8} | {'gain':>5}")
+    for taille in args.tailles:
+        texte = lecon_synthetique(taille, random.Random(taille))
+        duree_ancien, chunks_ancien = mesurer(decouper_ancien, texte)
+        duree_actuel, chunks_actuel = mesurer(actuel, texte)
+        if chunks_actuel != chunks_ancien:
+            raise SystemExit(f"Chunks différents pour {taille} caractères")
+        print(
+            f"{len(texte):>11} | {len(chunks_actuel):>7} | {duree_ancien:>7.3f}s | {duree_actuel:>7.3f}s"
+            f" | {duree_ancien / duree_actuel:>4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark de l'étape clean → chunk du pipeline de scraping, selon le nombre de processus.
+
+Génère un corpus synthétique d'articles au format des extraits MediaWiki
+(sections == ... ==, LaTeX, modèles, liens, sections à supprimer) puis
+mesure scraper.pipeline.iterer_chunks avec 1, 2, 4... workers (jusqu'au
+nombre de cœurs). Vérifie que les chunks produits sont identiques au
+séquentiel.
+
+Usage:
+    python scripts/bench_chunking.py [--articles 5000] [--paquet 16] [--workers 1 2 4]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+RACINE = Path(__file__).parent.parent
+sys.path.insert(0, str(RACINE))
+
+from scraper.pipeline import TAILLE_PAQUET, iterer_chunks  # noqa: E402
+
+PHRASES = [
+    "La photosynthèse permet aux plantes de fabriquer leur matière organique.",
+    "Le théorème de Pythagore relie les côtés d'un triangle rectangle {\\displaystyle a^{2}+b^{2}=c^{2}}.",
+    "Voir la [[Révolution française|Révolution]] et le [https://fr.vikidia.org site].",
+    "La vitesse s'exprime en mètres par seconde {\\displaystyle v={\\frac {d}{t}}}.",
+    "{{Article détaillé|Fraction}} Une fraction représente une partie d'un tout.",
+    "Les verbes du premier groupe se terminent par -er à l'infinitif.",
+    "L'énergie se conserve : elle ne peut être ni créée ni détruite.",
+]
+
+
+def article_synthetique(i: int, rng: random.Random) -> dict:
+    sections = []
+    for s in range(rng.randint(2, 8)):
+        paragraphes = [
+            " ".join(rng.choice(PHRASES) for _ in range(rng.randint(3, 12)))
+            for _ in range(rng.randint(1, 4))
+        ]
+        sections.append(f"== Section {s} ==\n" + "\n\n".join(paragraphes))
+    sections.append("== Voir aussi ==\n* [[Article lié]]\n* [[Autre article]]")
+    return {
+        "titre": f"Article {i}",
+        "texte": "\n\n".join(sections),
+        "metadata": {"source": "vikidia", "matiere": "svt", "titre": f"Article {i}"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--paquet", type=int, default=TAILLE_PAQUET, help="articles par envoi à un processus")
+    parser.add_argument("--workers", type=int, nargs="+", help="nombres de processus à mesurer")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)  # scraper.pipeline logue chaque article
+    coeurs = os.cpu_count() or 1
+    workers = args.workers or sorted({1, *(2 ** k for k in range(1, 6) if 2 ** k <= coeurs), coeurs})
+
+    rng = random.Random(0)
+    articles = [article_synthetique(i, rng) for i in range(args.articles)]
+    taille_mo = sum(len(a["texte"].encode("utf-8")) for a in articles) / 1e6
+    print(f"{args.articles} articles ({taille_mo:.1f} Mo), {coeurs} cœur(s), paquets de {args.paquet}\n")
+    print(f"{'workers':>7} | {'durée':>8} | {'articles/s':>10} | {'accélération':>12}")
+
+    reference = None
+    for n in workers:
+        debut = time.perf_counter()
+        chunks = list(iterer_chunks(articles, workers=n, taille_paquet=args.paquet))
+        duree = time.perf_counter() - debut
+        if reference is None:
+            reference, duree_ref = chunks, duree
+        elif chunks != reference:
+            raise SystemExit(f"Chunks différents du séquentiel avec {n} workers")
+        print(f"{n:>7} | {duree:>7.2f}s | {args.articles / duree:>10.0f} | {duree_ref / duree:>11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark du nettoyage des extraits MediaWiki (scraper/cleaner.py), en Mo/s.
+
+Compare sur un corpus synthétique (celui de bench_chunking.py) :
+- ancien chemin : une regex par section à supprimer (20 parcours DOTALL du
+  texte) et une par motif LaTeX, recompilées/recherchées dans le cache de re
+  à chaque appel, espaces normalisés par regex
+- chemin actuel : scraper.cleaner.nettoyer_texte (regex combinées compilées
+  à l'import, sections et LaTeX en un parcours chacun)
+
+Vérifie que les deux donnent le même texte, et détaille le débit par étape.
+
+Usage:
+    python scripts/bench_cleaner.py [--articles 3000]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+RACINE = Path(__file__).parent.parent
+sys.path.insert(0, str(RACINE))
+
+from bench_chunking import article_synthetique  # noqa: E402
+from scraper import cleaner  # noqa: E402
+
+SECTIONS_ANCIENNES = [
+    casse(section) for section in cleaner.SECTIONS_A_SUPPRIMER for casse in (str, str.lower)
+]
+
+
+def supprimer_sections_ancien(texte):
+    for section in SECTIONS_ANCIENNES:
+        pattern = rf"==+\s*{re.escape(section)}\s*==+.*?(?===|\Z)"
+        texte = re.sub(pattern, "", texte, flags=re.DOTALL | re.IGNORECASE)
+    return texte
+
+
+def nettoyer_latex_ancien(texte):
+    for pattern in cleaner.LATEX_PATTERNS:
+        texte = re.sub(pattern, " ", texte)
+    texte = re.sub(r"\{[\s,]*\}", "", texte)
+    texte = re.sub(r"\{\s*\{", "", texte)
+    return re.sub(r"\}\s*\}", "", texte)
+
+
+def normaliser_espaces_ancien(texte):
+    texte = re.sub(r"[ \t]+", " ", texte)
+    texte = re.sub(r"\n{3,}", "\n\n", texte)
+    return re.sub(r"^ +| +$", "", texte, flags=re.MULTILINE)
+
+
+def nettoyer_texte_ancien(texte):
+    texte = supprimer_sections_ancien(texte)
+    texte = nettoyer_latex_ancien(texte)
+    texte = cleaner._nettoyer_wiki(texte)
+    return normaliser_espaces_ancien(texte).strip()
+
+
+def debit(fonction, textes, taille_mo):
+    debut = time.perf_counter()
+    sorties = [fonction(texte) for texte in textes]
+    return taille_mo / (time.perf_counter() - debut), sorties
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--articles", type=int, default=3000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    textes = [article_synthetique(i, rng)["texte"] for i in range(args.articles)]
+    taille_mo = sum(len(t.encode("utf-8")) for t in textes) / 1e6
+    print(f"{args.articles} articles ({taille_mo:.1f} Mo)\n")
+
+    etapes = [
+        ("sections", supprimer_sections_ancien, cleaner._supprimer_sections),
+        ("latex", nettoyer_latex_ancien, cleaner._nettoyer_latex),
+        ("espaces", normaliser_espaces_ancien, cleaner._normaliser_espaces),
+        ("total", nettoyer_texte_ancien, cleaner.nettoyer_texte),
+    ]
+    print(f"{'étape':<9} | {'ancien':>10} | {'actuel':>10} | {'gain':>6}")
+    for nom, ancien, actuel in etapes:
+        debit_ancien, sorties_ancien = debit(ancien, textes, taille_mo)
+        debit_actuel, sorties_actuel = debit(actuel, textes, taille_mo)
+        if sorties_actuel != sorties_ancien:
+            raise SystemExit(f"Sorties différentes à l'étape {nom}")
+        print(f"{nom:<9} | {debit_ancien:>6.1f} Mo/s | {debit_actuel:>6.1f} Mo/s | {debit_actuel / debit_ancien:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
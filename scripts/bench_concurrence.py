@@ -0,0 +1,187 @@
+"""
+Benchmark de charge : débit de requêtes concurrentes sur un seul worker uvicorn.
+
+Par défaut, lance l'API en local avec un LLM, des embeddings et un ChromaDB
+factices (latences simulées) et compare :
+- /bench/chat-bloquant : ancien handler (rag_chain.run synchrone dans un async def)
+- /api/chat            : handler actuel (rag_chain.arun)
+
+Usage:
+    python scripts/bench_concurrence.py [--requetes 40] [--concurrence 10]
+    python scripts/bench_concurrence.py --url http://localhost:8000   # serveur réel
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+LATENCE_EMBEDDING = 0.15  # secondes (appel API embeddings simulé)
+LATENCE_CHROMA = 0.02  # secondes (requête vectorielle simulée)
+LATENCE_LLM = 1.0  # secondes (génération gpt-4o-mini simulée)
+QUESTION = "Explique le théorème de Pythagore dans un triangle rectangle"
+
+
+class FakeEmbeddings:
+    """Embeddings factices avec latence réseau simulée."""
+
+    def embed_query(self, text):
+        time.sleep(LATENCE_EMBEDDING)
+        return [0.1] * 8
+
+    def embed_documents(self, texts):
+        time.sleep(LATENCE_EMBEDDING)
+        return [[0.1] * 8 for _ in texts]
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(LATENCE_EMBEDDING)
+        return [0.1] * 8
+
+
+class FakeChroma:
+    """Collection ChromaDB factice retournant un document fixe."""
+
+    def __init__(self, embedding_function=None, **kwargs):
+        from langchain_core.documents import Document
+        self._collection = None
+        self._embedding_function = embedding_function
+        self._doc = Document(
+            page_content="Dans un triangle rectangle, le carré de l'hypoténuse...",
+            metadata={"titre": "Théorème de Pythagore", "matiere": "mathematiques", "url": ""}
+        )
+
+    def similarity_search_with_score(self, query, k=5, filter=None):
+        self._embedding_function.embed_query(query)
+        time.sleep(LATENCE_CHROMA)
+        return [(self._doc, 0.2)]
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=5, filter=None):
+        time.sleep(LATENCE_CHROMA)
+        return [(self._doc, 0.2)]
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """LLM factice : invoke bloque le thread, ainvoke rend la main à la boucle."""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def invoke(self, prompt):
+        time.sleep(LATENCE_LLM)
+        return FakeMessage("Réponse simulée.")
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(LATENCE_LLM)
+        return FakeMessage("Réponse simulée.")
+
+
+def demarrer_serveur_simule() -> str:
+    """Démarre l'API avec des dépendances factices sur un port libre (1 worker)."""
+    import uvicorn
+    import rag
+    import main
+    from answer_cache import AnswerCache
+
+    rag.get_shared_embeddings = lambda model: FakeEmbeddings()
+    rag.Chroma = FakeChroma
+    rag.ChatOpenAI = FakeLLM
+    # Cache de réponses désactivé : on mesure le chemin RAG complet
+    main.rag_chain = rag.RAGChain(answer_cache=AnswerCache(max_entries=0))
+    main.app.router.on_startup.clear()
+
+    # Ancien comportement : appel synchrone dans un handler async
+    async def chat_bloquant(request: main.ChatRequest):
+        return main.rag_chain.run(
+            question=request.question,
+            matiere=request.matiere,
+            niveau=request.niveau or "college",
+            source=request.source or "vikidia"
+        )
+
+    main.app.add_api_route("/bench/chat-bloquant", chat_bloquant, methods=["POST"])
+    # Placer la route avant le montage des fichiers statiques sur "/"
+    main.app.router.routes.insert(0, main.app.router.routes.pop())
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def envoyer_question(url: str, question: str) -> float:
+    """Envoie une question et retourne la latence en secondes."""
+    body = json.dumps({"question": question}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    debut = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=300) as response:
+        response.read()
+    return time.perf_counter() - debut
+
+
+def mesurer(url: str, nb_requetes: int, concurrence: int, question: str) -> dict:
+    """Lance nb_requetes avec au plus `concurrence` requêtes en vol."""
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as pool:
+        latences = list(pool.map(lambda _: envoyer_question(url, question), range(nb_requetes)))
+    duree = time.perf_counter() - debut
+
+    latences.sort()
+    return {
+        "debit": nb_requetes / duree,
+        "p50": statistics.median(latences),
+        "p95": latences[int(0.95 * (len(latences) - 1))],
+        "duree": duree,
+    }
+
+
+def afficher(nom: str, resultat: dict) -> None:
+    print(
+        f"{nom:<22} {resultat['debit']:>7.2f} req/s | "
+        f"p50 {resultat['p50']:.2f}s | p95 {resultat['p95']:.2f}s | "
+        f"total {resultat['duree']:.1f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrence de l'API chat")
+    parser.add_argument("--url", help="URL d'un serveur déjà lancé (sinon simulation locale)")
+    parser.add_argument("--requetes", type=int, default=40, help="Nombre total de requêtes")
+    parser.add_argument("--concurrence", type=int, default=10, help="Requêtes simultanées")
+    parser.add_argument("--question", default=QUESTION, help="Question envoyée")
+    args = parser.parse_args()
+
+    print(f"{args.requetes} requêtes, concurrence {args.concurrence}, 1 worker")
+
+    if args.url:
+        afficher("/api/chat", mesurer(f"{args.url}/api/chat", args.requetes, args.concurrence, args.question))
+        return
+
+    base_url = demarrer_serveur_simule()
+    print(f"Simulation: embedding {LATENCE_EMBEDDING}s, chroma {LATENCE_CHROMA}s, LLM {LATENCE_LLM}s")
+    afficher("bloquant (run)", mesurer(f"{base_url}/bench/chat-bloquant", args.requetes, args.concurrence, args.question))
+    afficher("async (arun)", mesurer(f"{base_url}/api/chat", args.requetes, args.concurrence, args.question))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de l'extraction d'articles MediaWiki : un titre par requête vs lots.
+
+Sert un wiki factice local (tests/unit/mediawiki_stub.py) avec une latence
+par réponse simulant l'aller-retour réseau, puis compare :
+- ancien chemin : une requête prop=extracts par titre
+- chemin actuel : scraper.mediawiki.interroger_pages (50 titres par requête,
+  suite `excontinue` suivie)
+
+Deux limites serveur sont mesurées : 1 extrait complet par réponse (valeur
+des wikis Wikimedia pour explaintext sans exintro) et 20 (exintro, ou wiki
+configuré autrement). Avec la limite à 1, le nombre de requêtes d'extraits
+ne baisse pas ; le gain vient des propriétés groupées (info, categories).
+
+Usage:
+    python scripts/bench_extraction.py [--articles 200] [--latence 0.05]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+RACINE = Path(__file__).parent.parent
+sys.path.insert(0, str(RACINE))
+sys.path.insert(0, str(RACINE / "tests" / "unit"))
+
+from mediawiki_stub import StubMediaWiki  # noqa: E402
+from scraper.mediawiki import interroger_pages  # noqa: E402
+from scraper.vikidia import PARAMS_EXTRAITS  # noqa: E402
+
+TEXTE = "Article encyclopédique de test pour le benchmark d'extraction. " * 40
+
+
+def client(url: str):
+    session = requests.Session()
+
+    def get_json(params):
+        return session.get(url, params=params, timeout=30).json()
+    return get_json
+
+
+def par_titre(get_json, titres):
+    for titre in titres:
+        get_json({**PARAMS_EXTRAITS, "titles": titre})
+
+
+def par_lots(get_json, titres):
+    interroger_pages(get_json, titres, PARAMS_EXTRAITS)
+
+
+def mesurer(fonction, pages, latence, extraits_max):
+    with StubMediaWiki(pages=pages, latence=latence, extraits_complets_max=extraits_max) as wiki:
+        debut = time.perf_counter()
+        fonction(client(wiki.url), sorted(pages))
+        return len(wiki.requetes), time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--latence", type=float, default=0.05, help="secondes par réponse")
+    args = parser.parse_args()
+
+    pages = {f"Article {i:04d}": {"extract": TEXTE} for i in range(args.articles)}
+    print(f"{args.articles} articles, latence {args.latence * 1000:.0f} ms/réponse\n")
+    print(f"{'extraits/réponse':>17} | {'mode':<10} | {'requêtes':>8} | {'durée':>8}")
+    for extraits_max in (1, 20):
+        for nom, fonction in (("par titre", par_titre), ("par lots", par_lots)):
+            nb, duree = mesurer(fonction, pages, args.latence, extraits_max)
+            print(f"{extraits_max:>17} | {nom:<10} | {nb:>8} | {duree:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
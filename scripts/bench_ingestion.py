@@ -0,0 +1,144 @@
+"""
+Benchmark de l'ingestion ChromaDB : embeddings séquentiels vs pipeline concurrent.
+
+Lance un faux serveur d'embeddings local compatible OpenAI (/v1/embeddings,
+latence = fixe + proportionnelle au nombre de tokens, 429 injectables) et
+ingère les mêmes chunks dans deux collections ChromaDB temporaires :
+- ancien chemin : vector_store.add_documents par lots fixes de 100 documents,
+  l'un après l'autre
+- chemin actuel : ingest_chromadb.apply_plan (lots par tokens, plusieurs
+  appels en vol, budget TPM, un seul écrivain)
+
+Usage:
+    python scripts/bench_ingestion.py [--chunks 3000] [--concurrence 4] [--taux-429 0.05] [--tpm 1000000]
+
+Après un 429, le budget TPM est vidé : la suite de l'ingestion avance au
+rythme de --tpm (le faux serveur, lui, n'a pas de limite réelle).
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from langchain_chroma import Chroma  # noqa: E402
+from langchain_openai import OpenAIEmbeddings  # noqa: E402
+
+from embedding_pipeline import CHARS_PER_TOKEN, TOKENS_PER_MINUTE  # noqa: E402
+from ingest_chromadb import apply_plan, chunk_id, iter_items  # noqa: E402
+
+LATENCE_FIXE = 0.25  # secondes par appel (aller-retour API)
+LATENCE_PAR_KTOK = 0.01  # secondes par millier de tokens
+DIMENSION = 64
+
+
+def demarrer_serveur(taux_429: float) -> ThreadingHTTPServer:
+    """Faux endpoint OpenAI /v1/embeddings sur un port local."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            corps = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            textes = corps["input"]
+            if random.random() < taux_429:
+                self._repondre(429, {"error": {"message": "Rate limit", "type": "rate_limit"}},
+                               {"retry-after": "0.2"})
+                return
+            tokens = sum(len(t) // CHARS_PER_TOKEN if isinstance(t, str) else len(t) for t in textes)
+            time.sleep(LATENCE_FIXE + LATENCE_PAR_KTOK * tokens / 1000)
+            self._repondre(200, {
+                "object": "list",
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [random.random() for _ in range(DIMENSION)]}
+                    for i in range(len(textes))
+                ],
+                "model": corps.get("model", ""),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+        def _repondre(self, statut, contenu, entetes=None):
+            data = json.dumps(contenu).encode("utf-8")
+            self.send_response(statut)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for cle, valeur in (entetes or {}).items():
+                self.send_header(cle, valeur)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
+
+
+def generer_chunks(n: int) -> list[dict]:
+    rng = random.Random(0)
+    mots = "triangle fraction cellule révolution verbe énergie carte roi molécule équation".split()
+    return [
+        {
+            "text": " ".join(rng.choice(mots) for _ in range(rng.randint(60, 220))),
+            "metadata": {"source": "bench", "matiere": "mathematiques", "titre": f"Leçon {i // 5}",
+                         "url": f"https://example.org/{i // 5}", "chunk_index": i % 5},
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chunks", type=int, default=3000)
+    parser.add_argument("--concurrence", type=int, default=4)
+    parser.add_argument("--taux-429", type=float, default=0.0, help="proportion de réponses 429")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="budget de tokens par minute")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)  # ingest_chromadb configure le logging en INFO
+    logging.getLogger("embedding_pipeline").setLevel(logging.INFO)
+
+    serveur = demarrer_serveur(args.taux_429)
+    host, port = serveur.server_address
+    embeddings = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        base_url=f"http://{host}:{port}/v1",
+        check_embedding_ctx_length=False,
+        max_retries=0,  # les nouvelles tentatives sont gérées par le pipeline
+    )
+    chunks = generer_chunks(args.chunks)
+    print(f"{len(chunks)} chunks, latence {LATENCE_FIXE * 1000:.0f} ms/appel "
+          f"+ {LATENCE_PAR_KTOK * 1000:.0f} ms/ktoken, 429: {args.taux_429:.0%}\n")
+
+    with tempfile.TemporaryDirectory() as dossier:
+        if args.taux_429 == 0:
+            store = Chroma(collection_name="sequentiel", embedding_function=embeddings, persist_directory=dossier)
+            debut = time.perf_counter()
+            for i in range(0, len(chunks), 100):
+                lot = chunks[i:i + 100]
+                store.add_texts([c["text"] for c in lot], metadatas=[c["metadata"] for c in lot])
+            print(f"séquentiel (lots de 100)   : {time.perf_counter() - debut:6.2f}s")
+        else:
+            print("séquentiel (lots de 100)   : ignoré (pas de nouvelle tentative sur 429)")
+
+        store = Chroma(collection_name="pipeline", embedding_function=embeddings, persist_directory=dossier)
+        plan = {"to_add": {chunk_id(c) for c in chunks}, "to_delete": [], "unchanged": 0}
+        debut = time.perf_counter()
+        apply_plan(store._collection, embeddings, plan, iter_items(chunks),
+                   max_in_flight=args.concurrence, tokens_per_minute=args.tpm)
+        print(f"pipeline ({args.concurrence} en vol)       : {time.perf_counter() - debut:6.2f}s "
+              f"({store._collection.count()} documents)")
+
+    serveur.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark du traitement d'un PDF importé : extraction en série puis embedding
+vs extraction parallèle par tranches de pages, embeddée au fil de l'eau.
+
+Génère des PDFs texte (tests/unit/pdf_stub.py) et les traite avec un faux
+vector store dont add_documents dort une latence par lot (appel d'embedding) :
+- ancien chemin : PyPDFLoader.load() de toutes les pages, découpage, puis un
+  seul add_documents (embedding de tous les chunks, lots de 64 simulés)
+- chemin actuel : PDFService.process_pdf (pdf_extract.iter_pages : tranches
+  de pages dans un pool de processus, lots ajoutés pendant l'extraction)
+
+Affiche le temps total et le délai avant le premier lot embeddé, et vérifie
+que les chunks produits sont identiques.
+
+Usage:
+    python scripts/bench_pdf.py [--pages 200 1000] [--workers N] [--latence 0.05]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+RACINE = Path(__file__).parent.parent
+sys.path.insert(0, str(RACINE / "backend"))
+sys.path.insert(0, str(RACINE / "tests" / "unit"))
+
+from langchain_community.document_loaders import PyPDFLoader  # noqa: E402
+from langchain_text_splitters import RecursiveCharacterTextSplitter  # noqa: E402
+
+from pdf_extract import MAX_WORKERS  # noqa: E402
+from pdf_index import PDFIndex  # noqa: E402
+from pdf_service import EMBED_BATCH_SIZE, PDFService  # noqa: E402
+from pdf_stub import generer_pdf  # noqa: E402
+
+
+class FauxVectorStore:
+    """add_documents : `latence` secondes par lot de EMBED_BATCH_SIZE chunks."""
+
+    def __init__(self, latence: float):
+        self.latence = latence
+        self.textes = []
+        self.premier_lot = None
+
+    def add_documents(self, documents):
+        for debut in range(0, len(documents), EMBED_BATCH_SIZE):
+            time.sleep(self.latence)
+            if self.premier_lot is None:
+                self.premier_lot = time.perf_counter()
+        self.textes.extend(d.page_content for d in documents)
+        return [str(i) for i in range(len(self.textes) - len(documents), len(self.textes))]
+
+    def delete(self, ids):
+        pass
+
+
+def decoupeur() -> RecursiveCharacterTextSplitter:
+    """Même découpage que PDFService."""
+    return RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50, separators=["\n\n", "\n", ". ", " ", ""])
+
+
+def ancien_chemin(chemin: str, store: FauxVectorStore) -> None:
+    documents = PyPDFLoader(chemin).load()
+    store.add_documents(decoupeur().split_documents(documents))
+
+
+def chemin_actuel(chemin: str, store: FauxVectorStore, pool, workers: int, dossier: str) -> None:
+    service = PDFService.__new__(PDFService)  # sans ChromaDB ni OpenAI
+    service.chroma_dir = dossier
+    service.index = PDFIndex(f"{dossier}/index.json")
+    service.text_splitter = decoupeur()
+    service.vector_store = store
+    service.extract_pool = pool
+    service.extract_workers = workers
+    service.process_pdf(chemin)
+
+
+def mesurer(fonction, latence: float, *args):
+    store = FauxVectorStore(latence)
+    debut = time.perf_counter()
+    fonction(*args[:1], store, *args[1:])
+    return time.perf_counter() - debut, store.premier_lot - debut, store.textes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--latence", type=float, default=0.05, help="secondes par lot de chunks embeddé")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    with tempfile.TemporaryDirectory() as dossier:
+        # Démarrer les processus du pool hors mesure (comme un serveur déjà lancé)
+        generer_pdf(f"{dossier}/chauffe.pdf", 40)
+        chemin_actuel(f"{dossier}/chauffe.pdf", FauxVectorStore(0), pool, args.workers, dossier)
+
+        print(f"latence {args.latence * 1000:.0f} ms par lot de {EMBED_BATCH_SIZE} chunks, "
+              f"{args.workers} processus d'extraction")
+        print("   pages |  chunks | ancien total (1er lot) | actuel total (1er lot) | gain")
+        for nb_pages in args.pages:
+            chemin = f"{dossier}/cours_{nb_pages}.pdf"
+            generer_pdf(chemin, nb_pages)
+
+            ancien, ancien_premier, textes_ancien = mesurer(ancien_chemin, args.latence, chemin)
+            actuel, actuel_premier, textes_actuel = mesurer(chemin_actuel, args.latence, chemin, pool, args.workers, dossier)
+            assert textes_actuel == textes_ancien, "chunks différents"
+
+            print(f"{nb_pages:8d} | {len(textes_actuel):7d} | {ancien:9.2f}s ({ancien_premier:6.2f}s) "
+                  f"| {actuel:9.2f}s ({actuel_premier:6.2f}s) | {ancien / actuel:4.1f}x")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
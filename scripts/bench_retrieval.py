@@ -0,0 +1,138 @@
+"""
+Benchmark du retrieval source="tous" (Vikidia + Mes Cours).
+
+Compare, sur deux vraies collections ChromaDB temporaires avec des embeddings
+factices (latence API simulée) :
+- ancien chemin : similarity_search_with_score sur chaque collection, l'une
+  après l'autre (2 embeddings de la question), puis tri Python de la fusion
+- chemin actuel : RAGChain.retrieve (1 embedding, collections interrogées
+  en parallèle par vecteur, fusion top-k par tas)
+
+Usage:
+    python scripts/bench_retrieval.py [--requetes 30] [--chunks 5000]
+"""
+
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from langchain_chroma import Chroma  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+LATENCE_EMBEDDING = 0.15  # secondes (appel API embeddings simulé)
+DIMENSION = 256
+QUESTIONS = [
+    "Explique le théorème de Pythagore",
+    "Qu'est-ce que la photosynthèse ?",
+    "Qui était Louis XIV ?",
+    "Comment accorder le participe passé ?",
+    "C'est quoi une fraction ?",
+]
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeddings déterministes (hash du texte) avec latence réseau simulée."""
+
+    def __init__(self, latence: float = 0.0):
+        self.latence = latence
+
+    def _vecteur(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(DIMENSION).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.latence)
+        return [self._vecteur(t) for t in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latence)
+        return self._vecteur(text)
+
+
+def remplir_collections(chroma_dir: str, nb_chunks: int) -> None:
+    """Crée les collections cours_college et mes_cours avec des chunks factices."""
+    embeddings = FakeEmbeddings()
+    matieres = ["mathematiques", "sciences", "histoire_geo", "francais"]
+    vikidia = Chroma(collection_name="cours_college", embedding_function=embeddings,
+                     persist_directory=chroma_dir)
+    vikidia.add_documents([
+        Document(page_content=f"Chunk Vikidia {i}",
+                 metadata={"titre": f"Leçon {i // 4}", "matiere": matieres[i % 4], "source": "vikidia"})
+        for i in range(nb_chunks)
+    ])
+    personnel = Chroma(collection_name="mes_cours", embedding_function=embeddings,
+                       persist_directory=chroma_dir)
+    personnel.add_documents([
+        Document(page_content=f"Chunk PDF {i}",
+                 metadata={"filename": f"cours_{i // 20}.pdf", "source": "mes_cours"})
+        for i in range(max(1, nb_chunks // 10))
+    ])
+
+
+def retrieve_ancien(rag_chain, question: str):
+    """Ancien retrieve(source="tous"): deux recherches texte séquentielles puis tri."""
+    resultats = rag_chain.vector_store.similarity_search_with_score(question, k=rag_chain.top_k)
+    resultats += rag_chain.vector_store_personal.similarity_search_with_score(question, k=rag_chain.top_k)
+    resultats.sort(key=lambda x: x[1])
+    return [doc for doc, _ in resultats[:rag_chain.top_k]]
+
+
+def mesurer(fonction, questions) -> dict:
+    latences = []
+    for question in questions:
+        debut = time.perf_counter()
+        fonction(question)
+        latences.append(time.perf_counter() - debut)
+    latences.sort()
+    return {
+        "p50": statistics.median(latences) * 1000,
+        "p95": latences[int(0.95 * (len(latences) - 1))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du retrieval multi-collections")
+    parser.add_argument("--requetes", type=int, default=30, help="Nombre de questions")
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks dans cours_college")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")  # LLM instancié mais jamais appelé
+    import rag
+    from answer_cache import AnswerCache
+
+    with tempfile.TemporaryDirectory() as chroma_dir:
+        print(f"Remplissage de ChromaDB ({args.chunks} chunks)...")
+        remplir_collections(chroma_dir, args.chunks)
+
+        rag.get_shared_embeddings = lambda model: FakeEmbeddings(LATENCE_EMBEDDING)
+        rag_chain = rag.RAGChain(chroma_dir=chroma_dir, answer_cache=AnswerCache(max_entries=0))
+        questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.requetes)]
+
+        # Mêmes documents retournés par les deux chemins
+        for question in QUESTIONS:
+            ancien = [d.page_content for d in retrieve_ancien(rag_chain, question)]
+            actuel = [d.page_content for d in rag_chain.retrieve(question, source="tous")]
+            assert ancien == actuel, f"Résultats différents pour '{question}'"
+
+        print(f"{args.requetes} questions, source='tous', embedding simulé {LATENCE_EMBEDDING}s")
+        for nom, fonction in [
+            ("ancien (2x texte)", lambda q: retrieve_ancien(rag_chain, q)),
+            ("actuel (1 vecteur)", lambda q: rag_chain.retrieve(q, source="tous")),
+        ]:
+            resultat = mesurer(fonction, questions)
+            print(f"{nom:<20} p50 {resultat['p50']:7.1f} ms | p95 {resultat['p95']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Histogramme du nombre de tokens par chunk (tokenizer de text-embedding-3-small).
+
+Par défaut, lit les chunks de data/processed/<matiere>/. Avec --synthetique N,
+découpe N articles synthétiques (corpus de bench_chunking.py) dans les deux
+modes du chunker pour les comparer.
+
+Affiche aussi la taille maximale du contexte envoyé au LLM par
+RAGChain.generate : TOP_K chunks (backend/rag.py).
+
+Usage:
+    python scripts/stats_chunks.py [--matiere MATIERE] [--synthetique 500] [--largeur 50]
+"""
+
+import argparse
+import logging
+import random
+import sys
+from pathlib import Path
+
+RACINE = Path(__file__).parent.parent
+sys.path.insert(0, str(RACINE))
+
+from scraper.chunk_store import lire_chunks  # noqa: E402
+from scraper.chunker import MODES_DECOUPAGE, _encodeur, compter_tokens, histogramme_tokens  # noqa: E402
+from scraper.pipeline import DOSSIER_PROCESSED, iterer_chunks  # noqa: E402
+
+TOP_K = 5  # backend/rag.py
+
+
+def afficher(nom: str, textes: list[str], largeur: int) -> None:
+    if not textes:
+        print(f"{nom} : aucun chunk\n")
+        return
+    tailles = [compter_tokens(t) for t in textes]
+    print(
+        f"{nom} : {len(textes)} chunks, tokens min {min(tailles)} / moyen {sum(tailles) // len(tailles)}"
+        f" / max {max(tailles)} ; contexte LLM max ({TOP_K} chunks) : {TOP_K * max(tailles)} tokens"
+    )
+    histogramme = histogramme_tokens(textes, largeur)
+    pic = max(histogramme.values())
+    for tranche, nb in histogramme.items():
+        print(f"  {tranche:>5}-{tranche + largeur - 1:<5} {nb:>7} {'#' * max(1, 50 * nb // pic)}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--matiere", help="une seule matière de data/processed")
+    parser.add_argument("--synthetique", type=int, help="comparer les modes sur N articles synthétiques")
+    parser.add_argument("--largeur", type=int, default=50, help="largeur des tranches (tokens)")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)  # scraper.pipeline logue chaque article
+    if _encodeur() is None:
+        print("ATTENTION : tiktoken indisponible, tokens estimés à 4 caractères\n")
+
+    if args.synthetique:
+        sys.path.insert(0, str(RACINE / "scripts"))
+        from bench_chunking import article_synthetique
+
+        rng = random.Random(0)
+        articles = [article_synthetique(i, rng) for i in range(args.synthetique)]
+        for mode in MODES_DECOUPAGE:
+            textes = [c["text"] for c in iterer_chunks(articles, decoupage=mode)]
+            afficher(f"mode {mode}", textes, args.largeur)
+        return
+
+    dossiers = [DOSSIER_PROCESSED / args.matiere] if args.matiere else sorted(
+        d for d in DOSSIER_PROCESSED.glob("*") if d.is_dir()
+    )
+    for dossier in dossiers:
+        afficher(dossier.name, [c["text"] for c in lire_chunks(dossier)], args.largeur)
+
+
+if __name__ == "__main__":
+    main()
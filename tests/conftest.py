@@ -0,0 +1,83 @@
+"""Fixtures partagées des tests (client FastAPI avec RAGChain factice)."""
+
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+
+def make_mock_rag() -> MagicMock:
+    """RAGChain factice : méthodes async en AsyncMock, réponses fixées par chaque test."""
+    mock_rag = MagicMock()
+    mock_rag.arun = AsyncMock()
+    mock_rag.aget_lesson_catalog = AsyncMock()
+    mock_rag.aget_lesson_content = AsyncMock()
+    return mock_rag
+
+
+@pytest.fixture
+def test_client(monkeypatch):
+    """(client, rag factice) : l'événement startup n'est pas lancé, rien n'appelle OpenAI."""
+    import main
+
+    mock_rag = make_mock_rag()
+    monkeypatch.setattr(main, "rag_chain", mock_rag)
+    return TestClient(main.app), mock_rag
+
+
+@pytest.fixture
+def test_client_no_rag(monkeypatch):
+    """Client sans RAGChain (échec d'initialisation au démarrage)."""
+    import main
+
+    monkeypatch.setattr(main, "rag_chain", None)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def mock_vector_store():
+    """Collection Chroma factice : deux documents de mathématiques pour toute recherche."""
+    store = MagicMock()
+    store.similarity_search_by_vector_with_relevance_scores.return_value = [
+        (Document(page_content=f"Contenu {i}", metadata={
+            "titre": f"Leçon {i}", "url": f"http://test.com/{i}", "matiere": "mathematiques",
+            "niveau": "4eme", "source": "vikidia",
+        }), 0.1 * i)
+        for i in (1, 2)
+    ]
+    store._collection.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+    return store
+
+
+@pytest.fixture
+def mock_openai_embeddings():
+    embeddings = MagicMock()
+    embeddings.embed_query.return_value = [0.1] * 8
+    embeddings.aembed_query = AsyncMock(return_value=[0.1] * 8)
+    return embeddings
+
+
+@pytest.fixture
+def mock_openai_llm():
+    llm = MagicMock()
+    llm.invoke.return_value = AIMessage(content="Réponse du LLM")
+    llm.ainvoke = AsyncMock(return_value=AIMessage(content="Réponse du LLM"))
+    return llm
+
+
+@pytest.fixture
+def rag_chain_mocked(tmp_path, monkeypatch, mock_vector_store, mock_openai_embeddings, mock_openai_llm):
+    """RAGChain réel devant ChromaDB, embeddings et LLM factices."""
+    import rag
+
+    monkeypatch.setattr(rag, "Chroma", MagicMock(return_value=mock_vector_store))
+    monkeypatch.setattr(rag, "get_shared_embeddings", MagicMock(return_value=mock_openai_embeddings))
+    monkeypatch.setattr(rag, "ChatOpenAI", MagicMock(return_value=mock_openai_llm))
+    return rag.RAGChain(chroma_dir=str(tmp_path))
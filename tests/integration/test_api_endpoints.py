@@ -35,7 +35,7 @@ class TestChatEndpoint:
     def test_chat_success(self, test_client):
         """Chat avec question valide."""
         client, mock_rag = test_client
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Réponse test",
             "sources": [{"titre": "Source 1", "url": "http://test.com"}],
             "nb_sources": 1
@@ -52,12 +52,12 @@ class TestChatEndpoint:
         assert data["answer"] == "Réponse test"
         assert len(data["sources"]) == 1
         assert data["nb_sources"] == 1
-        mock_rag.run.assert_called_once()
+        mock_rag.arun.assert_called_once()
 
     def test_chat_minimal_request(self, test_client):
         """Chat avec requête minimale (seulement question)."""
         client, mock_rag = test_client
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Test",
             "sources": [],
             "nb_sources": 0
@@ -90,7 +90,7 @@ class TestChatEndpoint:
     def test_chat_with_all_params(self, test_client):
         """Chat avec tous les paramètres."""
         client, mock_rag = test_client
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Réponse complète",
             "sources": [],
             "nb_sources": 0
@@ -103,17 +103,39 @@ class TestChatEndpoint:
         })
 
         assert response.status_code == 200
-        # Vérifier que run a été appelé avec les bons params (ordre: question, matiere, niveau)
-        mock_rag.run.assert_called_once_with(
+        # Vérifier que arun a été appelé avec les bons params (source par défaut, sans élève)
+        mock_rag.arun.assert_called_once_with(
             question="Question complète",
             matiere="svt",
-            niveau="3eme"
+            niveau="3eme",
+            source="vikidia",
+            owner=None
         )
 
+    def test_chat_owner_header(self, test_client):
+        """L'en-tête X-Owner-Id désigne l'élève ; un identifiant invalide donne 400."""
+        client, mock_rag = test_client
+        mock_rag.arun.return_value = {"answer": "Test", "sources": [], "nb_sources": 0}
+
+        response = client.post(
+            "/api/chat",
+            json={"question": "Mon cours", "source": "mes_cours"},
+            headers={"X-Owner-Id": "eleve_42"}
+        )
+        invalide = client.post(
+            "/api/chat",
+            json={"question": "Mon cours"},
+            headers={"X-Owner-Id": "../eleve"}
+        )
+
+        assert response.status_code == 200
+        assert mock_rag.arun.call_args.kwargs["owner"] == "eleve_42"
+        assert invalide.status_code == 400
+
     def test_chat_default_niveau(self, test_client):
         """Chat sans niveau utilise 'college' par défaut."""
         client, mock_rag = test_client
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Test",
             "sources": [],
             "nb_sources": 0
@@ -125,7 +147,7 @@ class TestChatEndpoint:
 
         assert response.status_code == 200
         # Niveau par défaut devrait être "college"
-        call_kwargs = mock_rag.run.call_args.kwargs
+        call_kwargs = mock_rag.arun.call_args.kwargs
         assert call_kwargs["niveau"] == "college"
 
 
@@ -137,7 +159,7 @@ class TestChatAutoEndpoint:
         client, mock_rag = test_client
 
         # Mock retourne les infos de détection dans result
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Test",
             "sources": [],
             "nb_sources": 0
@@ -167,7 +189,7 @@ class TestChatAutoEndpoint:
         """Chat auto avec ambiguïté."""
         client, mock_rag = test_client
 
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Test",
             "sources": [],
             "nb_sources": 0
@@ -195,7 +217,7 @@ class TestChatAutoEndpoint:
         """Chat auto hors périmètre."""
         client, mock_rag = test_client
 
-        mock_rag.run.return_value = {
+        mock_rag.arun.return_value = {
             "answer": "Désolé, pas d'info",
             "sources": [],
             "nb_sources": 0
@@ -219,6 +241,51 @@ class TestChatAutoEndpoint:
         assert "answer" in data
 
 
+class TestChatStreamEndpoint:
+    """Tests endpoints SSE POST /api/chat/stream et /api/chat/auto/stream."""
+
+    @staticmethod
+    def _fake_astream(*args, **kwargs):
+        async def _events():
+            yield {"event": "sources", "data": {"sources": [{"titre": "Pythagore"}], "nb_sources": 1}}
+            yield {"event": "token", "data": {"content": "Réponse "}}
+            yield {"event": "token", "data": {"content": "test"}}
+            yield {"event": "done", "data": {"answer": "Réponse test"}}
+        return _events()
+
+    def test_chat_stream_sources_then_tokens(self, test_client):
+        """Les sources arrivent avant les tokens, puis l'événement done."""
+        client, mock_rag = test_client
+        mock_rag.astream = MagicMock(side_effect=self._fake_astream)
+
+        response = client.post("/api/chat/stream", json={"question": "Pythagore ?"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.text
+        assert body.index("event: sources") < body.index("event: token") < body.index("event: done")
+        assert '"answer": "Réponse test"' in body
+
+    def test_chat_auto_stream_detection_first(self, test_client):
+        """Le flux auto commence par l'événement de détection."""
+        client, mock_rag = test_client
+        mock_rag.astream = MagicMock(side_effect=self._fake_astream)
+
+        response = client.post("/api/chat/auto/stream", json={"question": "théorème de Pythagore"})
+
+        assert response.status_code == 200
+        assert response.text.startswith("event: detection")
+        assert '"matiere_detectee": "mathematiques"' in response.text
+
+    def test_chat_stream_empty_question_422(self, test_client):
+        """Question vide retourne 422 avant tout streaming."""
+        client, _ = test_client
+
+        response = client.post("/api/chat/stream", json={"question": ""})
+
+        assert response.status_code == 422
+
+
 class TestMatieresEndpoint:
     """Tests endpoint GET /api/matieres."""
 
@@ -252,16 +319,33 @@ class TestNiveauxEndpoint:
         assert any(n["id"] == "college" for n in data["niveaux"])
 
 
+def make_catalog(titres, niveau="4eme", version="1"):
+    """Catalogue de leçons de mathématiques pour les tests."""
+    from lesson_catalog import LessonCatalog
+
+    lessons = [
+        {
+            "titre": titre,
+            "url": f"http://test.com/{titre}",
+            "resume": f"Résumé {titre}",
+            "matiere": "mathematiques",
+            "niveau": niveau,
+            "source": "vikidia",
+            "nb_chunks": 1,
+            "chunk_ids": [f"id-{titre}"],
+        }
+        for titre in sorted(titres)
+    ]
+    return LessonCatalog({"mathematiques": lessons}, version)
+
+
 class TestLeconsEndpoint:
     """Tests endpoint GET /api/lecons/{matiere}."""
 
     def test_get_lecons_success(self, test_client):
         """Récupération des leçons."""
         client, mock_rag = test_client
-        mock_rag.get_all_lessons.return_value = [
-            {"titre": "Leçon 1", "url": "http://test1.com"},
-            {"titre": "Leçon 2", "url": "http://test2.com"}
-        ]
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(["Leçon 1", "Leçon 2"])
 
         response = client.get("/api/lecons/mathematiques?limit=100")
 
@@ -270,35 +354,35 @@ class TestLeconsEndpoint:
         assert data["matiere"] == "mathematiques"
         assert data["nb_lecons"] == 2
         assert len(data["lecons"]) == 2
+        assert "chunk_ids" not in data["lecons"][0]
 
     def test_get_lecons_with_niveau(self, test_client):
         """Récupération avec filtre niveau."""
         client, mock_rag = test_client
-        mock_rag.get_all_lessons.return_value = [
-            {"titre": "Leçon 4eme", "url": "http://test.com"}
-        ]
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(["Leçon 4eme"])
 
         response = client.get("/api/lecons/mathematiques?niveau=4eme&limit=100")
 
         assert response.status_code == 200
         data = response.json()
         assert data["niveau"] == "4eme"
+        assert data["nb_lecons"] == 1
 
     def test_get_lecons_default_limit(self, test_client):
-        """Vérifier limite par défaut."""
+        """Sans limite, toutes les leçons sont renvoyées en une page."""
         client, mock_rag = test_client
-        mock_rag.get_all_lessons.return_value = []
+        mock_rag.aget_lesson_catalog.return_value = make_catalog([f"Leçon {i:03d}" for i in range(120)])
 
         response = client.get("/api/lecons/mathematiques")
 
         assert response.status_code == 200
-        # Vérifier que get_all_lessons a été appelé avec la limite
-        mock_rag.get_all_lessons.assert_called_once()
+        assert response.json()["nb_lecons"] == 120
+        assert response.json()["next_cursor"] is None
 
     def test_get_lecons_invalid_matiere(self, test_client):
         """Matière invalide retourne liste vide."""
         client, mock_rag = test_client
-        mock_rag.get_all_lessons.return_value = []
+        mock_rag.aget_lesson_catalog.return_value = make_catalog([])
 
         response = client.get("/api/lecons/matiere_invalide")
 
@@ -306,6 +390,62 @@ class TestLeconsEndpoint:
         data = response.json()
         assert data["nb_lecons"] == 0
 
+    def test_get_lecons_cursor_pagination(self, test_client):
+        """Le curseur next_cursor enchaîne les pages sans doublon."""
+        client, mock_rag = test_client
+        titres = [f"Leçon {i:03d}" for i in range(25)]
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(titres)
+
+        seen = []
+        url = "/api/lecons/mathematiques?limit=10"
+        while url:
+            data = client.get(url).json()
+            seen.extend(lesson["titre"] for lesson in data["lecons"])
+            cursor = data["next_cursor"]
+            url = f"/api/lecons/mathematiques?limit=10&cursor={cursor}" if cursor else None
+
+        assert seen == titres
+
+    def test_get_lecons_search_prefix_first(self, test_client):
+        """q filtre les titres (accents ignorés), début de titre en premier."""
+        client, mock_rag = test_client
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(
+            ["Angle droit", "Triangle", "Triangle rectangle", "Cercle"]
+        )
+
+        data = client.get("/api/lecons/mathematiques?q=TRIANGLE").json()
+
+        assert [lesson["titre"] for lesson in data["lecons"]] == ["Triangle", "Triangle rectangle"]
+        assert data["total"] == 2
+
+    def test_get_lecons_fields_projection(self, test_client):
+        """fields limite les champs renvoyés; un champ inconnu donne 400."""
+        client, mock_rag = test_client
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(["Leçon 1"])
+
+        data = client.get("/api/lecons/mathematiques?fields=titre,niveau").json()
+        assert data["lecons"] == [{"titre": "Leçon 1", "niveau": "4eme"}]
+
+        response = client.get("/api/lecons/mathematiques?fields=titre,chunk_ids")
+        assert response.status_code == 400
+
+    def test_get_lecons_etag_304(self, test_client):
+        """If-None-Match avec l'ETag courant → 304; nouvelle version → 200."""
+        client, mock_rag = test_client
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(["Leçon 1"], version="1")
+
+        first = client.get("/api/lecons/mathematiques")
+        etag = first.headers["etag"]
+        second = client.get("/api/lecons/mathematiques", headers={"If-None-Match": etag})
+
+        assert second.status_code == 304
+        assert second.content == b""
+
+        mock_rag.aget_lesson_catalog.return_value = make_catalog(["Leçon 1"], version="2")
+        third = client.get("/api/lecons/mathematiques", headers={"If-None-Match": etag})
+        assert third.status_code == 200
+        assert third.headers["etag"] != etag
+
 
 class TestLeconDetailEndpoint:
     """Tests endpoint GET /api/lecons/{matiere}/detail."""
@@ -313,7 +453,7 @@ class TestLeconDetailEndpoint:
     def test_get_lecon_content_success(self, test_client):
         """Récupération contenu leçon."""
         client, mock_rag = test_client
-        mock_rag.get_lesson_content.return_value = {
+        mock_rag.aget_lesson_content.return_value = {
             "titre": "Pythagore",
             "contenu_complet": "Contenu...",
             "url": "http://test.com",
@@ -332,7 +472,7 @@ class TestLeconDetailEndpoint:
     def test_get_lecon_not_found_404(self, test_client):
         """Leçon introuvable retourne 404."""
         client, mock_rag = test_client
-        mock_rag.get_lesson_content.return_value = None
+        mock_rag.aget_lesson_content.return_value = None
 
         response = client.get("/api/lecons/francais/detail?titre=Inexistant")
 
@@ -352,7 +492,7 @@ class TestLeconDetailEndpoint:
         client, mock_rag = test_client
 
         # Mock pour retourner None
-        mock_rag.get_lesson_content.return_value = None
+        mock_rag.aget_lesson_content.return_value = None
 
         response = client.get("/api/lecons/mathematiques/detail?titre=")
 
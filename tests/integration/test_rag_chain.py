@@ -1,10 +1,22 @@
 """Tests d'intégration pour backend/rag.py avec mocks."""
 
+import asyncio
+
 import pytest
 from unittest.mock import patch, MagicMock
+from langchain_core.messages import AIMessageChunk
 from langchain_core.documents import Document
 
 
+def load_collection(rag_chain, results):
+    """Remplace le contenu de la collection et signale le changement (comme après une ingestion)."""
+    from answer_cache import bump_collections_version
+    from rag import COLLECTION_NAME
+
+    rag_chain.vector_store._collection.get = MagicMock(return_value=results)
+    bump_collections_version(rag_chain.chroma_dir, COLLECTION_NAME)
+
+
 class TestRAGChainInit:
     """Tests initialisation RAGChain."""
 
@@ -15,15 +27,15 @@ class TestRAGChainInit:
         assert hasattr(rag_chain_mocked, 'llm')
         assert rag_chain_mocked.top_k == 5
 
-    def test_ragchain_init_custom_params(self, mock_vector_store, mock_openai_embeddings, mock_openai_llm):
+    def test_ragchain_init_custom_params(self, tmp_path, mock_vector_store, mock_openai_embeddings, mock_openai_llm):
         """Initialisation avec paramètres personnalisés."""
-        with patch('backend.services.rag_chain.Chroma', return_value=mock_vector_store):
-            with patch('backend.services.rag_chain.OpenAIEmbeddings', return_value=mock_openai_embeddings):
-                with patch('backend.services.rag_chain.ChatOpenAI', return_value=mock_openai_llm):
-                    from backend.services.rag_chain import RAGChain
+        with patch('rag.Chroma', return_value=mock_vector_store):
+            with patch('rag.get_shared_embeddings', return_value=mock_openai_embeddings):
+                with patch('rag.ChatOpenAI', return_value=mock_openai_llm):
+                    from rag import RAGChain
 
                     chain = RAGChain(
-                        chroma_dir="custom_dir",
+                        chroma_dir=str(tmp_path),
                         top_k=10,
                         similarity_threshold=0.5
                     )
@@ -48,8 +60,8 @@ class TestRAGChainRetrieve:
         docs = rag_chain_mocked.retrieve("pythagore", matiere="mathematiques")
 
         # Vérifier que le mock a été appelé avec le filtre
-        rag_chain_mocked.vector_store.similarity_search_with_score.assert_called_once()
-        call_kwargs = rag_chain_mocked.vector_store.similarity_search_with_score.call_args[1]
+        rag_chain_mocked.vector_store.similarity_search_by_vector_with_relevance_scores.assert_called_once()
+        call_kwargs = rag_chain_mocked.vector_store.similarity_search_by_vector_with_relevance_scores.call_args[1]
         assert call_kwargs["filter"]["matiere"] == "mathematiques"
 
     def test_retrieve_with_niveau_filter(self, rag_chain_mocked):
@@ -62,10 +74,10 @@ class TestRAGChainRetrieve:
     def test_retrieve_empty_results(self, rag_chain_mocked):
         """Retrieve sans résultats."""
         # Override the mock pour retourner rien
-        def mock_empty_search(query, k=5, filter=None):
+        def mock_empty_search(embedding, k=5, filter=None):
             return []
 
-        rag_chain_mocked.vector_store.similarity_search_with_score = MagicMock(side_effect=mock_empty_search)
+        rag_chain_mocked.vector_store.similarity_search_by_vector_with_relevance_scores = MagicMock(side_effect=mock_empty_search)
         docs = rag_chain_mocked.retrieve("hors sujet xyz123")
 
         assert docs == []
@@ -86,6 +98,57 @@ class TestRAGChainRetrieve:
             assert hasattr(doc, 'page_content')
 
 
+class TestRAGChainAsync:
+    """Tests aretrieve(), arun() et astream()."""
+
+    def test_retrieve_embeds_question_once(self, rag_chain_mocked):
+        """source="tous": un seul embedding, chaque collection interrogée par vecteur."""
+        rag_chain_mocked.retrieve("pythagore", source="tous")
+
+        rag_chain_mocked.embeddings.embed_query.assert_called_once_with("pythagore")
+        search = rag_chain_mocked.vector_store.similarity_search_by_vector_with_relevance_scores
+        assert search.call_count == 2
+        assert all(call.args[0] == [0.1] * 8 for call in search.call_args_list)
+
+    def test_aretrieve_embeds_question_once(self, rag_chain_mocked):
+        """Version async: aembed_query une fois, pas d'appel synchrone."""
+        docs = asyncio.run(rag_chain_mocked.aretrieve("pythagore", matiere="mathematiques", source="tous"))
+
+        assert [doc.metadata["titre"] for doc in docs] == ["Leçon 1", "Leçon 1", "Leçon 2", "Leçon 2"]
+        rag_chain_mocked.embeddings.aembed_query.assert_awaited_once_with("pythagore")
+        rag_chain_mocked.embeddings.embed_query.assert_not_called()
+        search = rag_chain_mocked.vector_store.similarity_search_by_vector_with_relevance_scores
+        assert search.call_args_list[0].kwargs["filter"] == {"matiere": "mathematiques"}
+
+    def test_arun_then_cache(self, rag_chain_mocked):
+        """arun génère avec ainvoke; la même question est ensuite servie par le cache."""
+        first = asyncio.run(rag_chain_mocked.arun("pythagore", "mathematiques", "4eme"))
+        second = asyncio.run(rag_chain_mocked.arun("pythagore", "mathematiques", "4eme"))
+
+        assert first["answer"] == "Réponse du LLM"
+        assert first["nb_sources"] == len(first["sources"]) == 2
+        assert second == first
+        rag_chain_mocked.llm.ainvoke.assert_awaited_once()
+        rag_chain_mocked.embeddings.aembed_query.assert_awaited_once()
+
+    def test_astream_sources_then_tokens(self, rag_chain_mocked):
+        """Les sources sont émises avant les tokens, puis done avec la réponse complète."""
+        async def fake_astream(prompt):
+            for content in ("Le théorème ", "", "de Pythagore"):
+                yield AIMessageChunk(content=content)
+
+        rag_chain_mocked.llm.astream = fake_astream
+
+        async def collect():
+            return [event async for event in rag_chain_mocked.astream("pythagore", "mathematiques", "4eme")]
+
+        events = asyncio.run(collect())
+
+        assert [event["event"] for event in events] == ["sources", "token", "token", "done"]
+        assert events[0]["data"]["nb_sources"] == 2
+        assert events[-1]["data"]["answer"] == "Le théorème de Pythagore"
+
+
 class TestRAGChainGenerate:
     """Tests generate()."""
 
@@ -210,8 +273,8 @@ class TestRAGChainGetAllLessons:
             ]
         }
 
-        # Override le mock pour ce test spécifique
-        rag_chain_mocked.vector_store._collection.get = MagicMock(return_value=mock_results)
+        # Nouveau contenu de la collection pour ce test spécifique
+        load_collection(rag_chain_mocked, mock_results)
 
         lessons = rag_chain_mocked.get_all_lessons("mathematiques")
 
@@ -235,8 +298,8 @@ class TestRAGChainGetAllLessons:
             }]
         }
 
-        # Override le mock
-        rag_chain_mocked.vector_store._collection.get = MagicMock(return_value=mock_results)
+        # Nouveau contenu de la collection
+        load_collection(rag_chain_mocked, mock_results)
 
         lessons = rag_chain_mocked.get_all_lessons("mathematiques")
 
@@ -273,8 +336,8 @@ class TestRAGChainGetLessonContent:
             ]
         }
 
-        # Override le mock
-        rag_chain_mocked.vector_store._collection.get = MagicMock(return_value=mock_results)
+        # Nouveau contenu de la collection
+        load_collection(rag_chain_mocked, mock_results)
 
         content = rag_chain_mocked.get_lesson_content("mathematiques", "Pythagore")
 
@@ -308,8 +371,8 @@ class TestRAGChainGetLessonContent:
             }]
         }
 
-        # Override le mock
-        rag_chain_mocked.vector_store._collection.get = MagicMock(return_value=mock_results)
+        # Nouveau contenu de la collection
+        load_collection(rag_chain_mocked, mock_results)
 
         content = rag_chain_mocked.get_lesson_content("svt", "Test")
 
@@ -0,0 +1,155 @@
+"""Serveur MediaWiki factice (api.php) pour tester les scrapers sans réseau.
+
+Implémente le sous-ensemble de l'API utilisé par les scrapers :
+- list=categorymembers (cmtype page/subcat, cmlimit, cmcontinue) ;
+- prop=extracts (plusieurs titres, exlimit, excontinue), prop=categories,
+  prop=info (lastrevid, touched) ;
+- erreurs `maxlag` (HTTP 200 + Retry-After) injectables.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EXTRACTS_LIMIT = 20  # exlimit max de l'extension TextExtracts (avec exintro)
+TITLES_LIMIT = 50  # titres max par requête (utilisateur non-bot)
+
+
+class StubMediaWiki:
+    """Wiki en mémoire servi sur un port local."""
+
+    def __init__(
+        self,
+        categories=None,
+        pages=None,
+        latence: float = 0.0,
+        extraits_complets_max: int = 1,
+    ):
+        """Initialise le wiki.
+
+        Args:
+            categories: {"Catégorie:X": {"pages": [...], "subcats": [...]}}.
+            pages: {titre: {"extract": str, "revid": int, "touched": str,
+                "categories": [str]}}.
+            latence: Délai ajouté à chaque réponse (secondes).
+            extraits_complets_max: Extraits complets (sans exintro) par réponse ;
+                1 sur les wikis Wikimedia.
+        """
+        self.categories = categories or {}
+        self.pages = pages or {}
+        self.latence = latence
+        self.extraits_complets_max = extraits_complets_max
+        self.requetes: list[dict] = []  # paramètres de chaque requête reçue
+        self.maxlag_a_renvoyer = 0  # nombre de prochaines requêtes refusées (maxlag)
+        self._verrou = threading.Lock()
+        self._serveur = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._serveur.server_address
+        return f"http://{host}:{port}/w/api.php"
+
+    def demarrer(self) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                statut, entetes, corps = stub.repondre(params)
+                self.send_response(statut)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                for cle, valeur in entetes.items():
+                    self.send_header(cle, valeur)
+                data = json.dumps(corps).encode("utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._serveur = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._serveur.serve_forever, daemon=True).start()
+        return self.url
+
+    def arreter(self) -> None:
+        if self._serveur:
+            self._serveur.shutdown()
+            self._serveur.server_close()
+
+    def __enter__(self):
+        self.demarrer()
+        return self
+
+    def __exit__(self, *exc):
+        self.arreter()
+
+    # Réponses
+
+    def repondre(self, params: dict):
+        with self._verrou:
+            self.requetes.append(params)
+            if self.maxlag_a_renvoyer > 0:
+                self.maxlag_a_renvoyer -= 1
+                return 200, {"Retry-After": "0"}, {
+                    "error": {"code": "maxlag", "info": "Waiting for replica: 6 seconds lagged"}
+                }
+        if self.latence:
+            time.sleep(self.latence)
+
+        if params.get("list") == "categorymembers":
+            return 200, {}, self._categorymembers(params)
+        if "prop" in params:
+            return 200, {}, self._pages(params)
+        return 200, {}, {"error": {"code": "badparams"}}
+
+    def _categorymembers(self, params: dict) -> dict:
+        categorie = self.categories.get(params["cmtitle"], {})
+        if params.get("cmtype") == "subcat":
+            membres = [{"ns": 14, "title": t} for t in categorie.get("subcats", [])]
+        else:
+            membres = [{"ns": 0, "title": t} for t in categorie.get("pages", [])]
+        limite = int(params.get("cmlimit", 10))
+        debut = int(params.get("cmcontinue", 0))
+        reponse = {"query": {"categorymembers": membres[debut:debut + limite]}}
+        if debut + limite < len(membres):
+            reponse["continue"] = {"cmcontinue": str(debut + limite), "continue": "-||"}
+        return reponse
+
+    def _pages(self, params: dict) -> dict:
+        props = params["prop"].split("|")
+        titres = params["titles"].split("|")[:TITLES_LIMIT]
+        # Dans une suite (excontinue), les autres modules déjà complets ne sont pas renvoyés
+        suite = "excontinue" in params
+        pages = {}
+        manquant = -1
+        for titre in titres:
+            page = self.pages.get(titre)
+            if page is None:
+                pages[str(manquant)] = {"ns": 0, "title": titre, "missing": ""}
+                manquant -= 1
+                continue
+            page_id = str(1000 + sorted(self.pages).index(titre))
+            entree = {"pageid": int(page_id), "ns": 0, "title": titre}
+            if "info" in props and not suite:
+                entree["lastrevid"] = page.get("revid", 1)
+                entree["touched"] = page.get("touched", "2024-01-01T00:00:00Z")
+            if "categories" in props and not suite:
+                entree["categories"] = [{"ns": 14, "title": c} for c in page.get("categories", [])]
+            pages[page_id] = entree
+
+        reponse = {"query": {"pages": pages}}
+        if "extracts" in props:
+            # TextExtracts : au plus `exlimit` extraits par réponse, dans l'ordre des pages
+            existantes = [pid for pid in sorted(pages, key=int) if int(pid) > 0]
+            limite = EXTRACTS_LIMIT if "exintro" in params else self.extraits_complets_max
+            demande = params.get("exlimit", "1")
+            exlimit = limite if demande == "max" else min(int(demande), limite)
+            debut = int(params.get("excontinue", 0))
+            for pid in existantes[debut:debut + exlimit]:
+                pages[pid]["extract"] = self.pages[pages[pid]["title"]]["extract"]
+            if debut + exlimit < len(existantes):
+                reponse["continue"] = {"excontinue": debut + exlimit, "continue": "||"}
+        return reponse
@@ -0,0 +1,39 @@
+"""Génération de PDFs texte factices (pypdf seul) pour tester l'import de PDFs."""
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+LIGNES_PAR_PAGE = 45
+
+
+def texte_page(numero: int, lignes: int = LIGNES_PAR_PAGE) -> list[str]:
+    """Lignes de la page `numero` (contenu déterministe)."""
+    return [
+        f"Page {numero} ligne {i} : la photosynthese transforme la lumiere en energie chimique."
+        for i in range(lignes)
+    ]
+
+
+def generer_pdf(chemin, nb_pages: int, lignes: int = LIGNES_PAR_PAGE) -> None:
+    """Écrit un PDF de `nb_pages` pages de texte (police Helvetica standard)."""
+    writer = PdfWriter()
+    police = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for numero in range(nb_pages):
+        page = writer.add_blank_page(612, 792)
+        operations = ["BT", "/F1 10 Tf", "14 TL", "40 760 Td"]
+        for ligne in texte_page(numero, lignes):
+            echappee = ligne.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            operations.append(f"({echappee}) '")
+        operations.append("ET")
+        contenu = DecodedStreamObject()
+        contenu.set_data("\n".join(operations).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(contenu)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): police}),
+        })
+    with open(chemin, "wb") as f:
+        writer.write(f)
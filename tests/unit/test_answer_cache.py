@@ -0,0 +1,208 @@
+"""Tests unitaires pour backend/answer_cache.py."""
+
+import time
+
+import pytest
+from backend.answer_cache import AnswerCache, bump_collections_version, normalize_question
+
+
+RESULT = {"answer": "Réponse", "sources": [{"titre": "Pythagore"}], "nb_sources": 1}
+
+
+class TestNormalizeQuestion:
+    """Tests normalisation des questions."""
+
+    def test_normalize_case_accents_punctuation(self):
+        """Casse, accents, espaces et ponctuation finale sont ignorés."""
+        assert normalize_question("C'est quoi le  Théorème de Pythagore ?") == \
+            normalize_question("c'est quoi le theoreme de pythagore")
+
+    def test_normalize_apostrophe(self):
+        """L'apostrophe typographique équivaut à l'apostrophe droite."""
+        assert normalize_question("qu’est-ce qu’une fraction") == "qu'est-ce qu'une fraction"
+
+
+class TestExactTier:
+    """Tests niveau exact (LRU)."""
+
+    def test_exact_hit_after_set(self):
+        """Même question normalisée → hit exact."""
+        cache = AnswerCache()
+        cache.set("Pythagore ?", "mathematiques", "4eme", "vikidia", RESULT)
+
+        assert cache.get_exact("pythagore", "mathematiques", "4eme", "vikidia") == RESULT
+        assert cache.stats()["exact_hits"] == 1
+
+    def test_exact_key_includes_filters(self):
+        """Matière, niveau et source font partie de la clé."""
+        cache = AnswerCache()
+        cache.set("Pythagore", "mathematiques", "4eme", "vikidia", RESULT)
+
+        assert cache.get_exact("Pythagore", "mathematiques", "3eme", "vikidia") is None
+        assert cache.get_exact("Pythagore", "mathematiques", "4eme", "tous") is None
+
+    def test_returns_copy(self):
+        """Modifier la réponse retournée ne modifie pas le cache."""
+        cache = AnswerCache()
+        cache.set("q", None, "college", "vikidia", RESULT)
+
+        cached = cache.get_exact("q", None, "college", "vikidia")
+        cached["niveau_detecte"] = "6eme"
+
+        assert "niveau_detecte" not in cache.get_exact("q", None, "college", "vikidia")
+
+    def test_lru_eviction(self):
+        """Au-delà de max_entries, la réponse la moins récemment utilisée est évincée."""
+        cache = AnswerCache(max_entries=2)
+        cache.set("a", None, "college", "vikidia", RESULT)
+        cache.set("b", None, "college", "vikidia", RESULT)
+        cache.get_exact("a", None, "college", "vikidia")
+        cache.set("c", None, "college", "vikidia", RESULT)
+
+        assert cache.get_exact("b", None, "college", "vikidia") is None
+        assert cache.get_exact("a", None, "college", "vikidia") is not None
+        assert len(cache) == 2
+
+    def test_ttl_expiration(self):
+        """Une réponse plus vieille que le TTL n'est plus servie."""
+        cache = AnswerCache(ttl_seconds=0.01)
+        cache.set("a", None, "college", "vikidia", RESULT)
+        time.sleep(0.02)
+
+        assert cache.get_exact("a", None, "college", "vikidia") is None
+
+
+class TestSemanticTier:
+    """Tests niveau sémantique (distance cosinus)."""
+
+    def test_semantic_hit_close_embedding(self):
+        """Embedding très proche dans la même partition → hit sémantique."""
+        cache = AnswerCache(semantic_max_distance=0.05)
+        cache.set("c'est quoi Pythagore", "mathematiques", "4eme", "vikidia", RESULT, [1.0, 0.0, 0.0])
+
+        cached = cache.get_similar("explique Pythagore", [0.99, 0.05, 0.0], "mathematiques", "4eme", "vikidia")
+
+        assert cached == RESULT
+        assert cache.stats()["semantic_hits"] == 1
+
+    def test_semantic_miss_far_embedding(self):
+        """Embedding éloigné → miss."""
+        cache = AnswerCache(semantic_max_distance=0.05)
+        cache.set("Pythagore", "mathematiques", "4eme", "vikidia", RESULT, [1.0, 0.0, 0.0])
+
+        assert cache.get_similar("Thalès", [0.0, 1.0, 0.0], "mathematiques", "4eme", "vikidia") is None
+        assert cache.stats()["misses"] == 1
+
+    def test_semantic_respects_partition(self):
+        """Une question proche d'une autre matière n'est pas réutilisée."""
+        cache = AnswerCache()
+        cache.set("Pythagore", "mathematiques", "4eme", "vikidia", RESULT, [1.0, 0.0])
+
+        assert cache.get_similar("Pythagore", [1.0, 0.0], "histoire_geo", "4eme", "vikidia") is None
+
+    def test_hit_rate(self):
+        """Le taux de succès compte les hits exacts et sémantiques."""
+        cache = AnswerCache()
+        cache.set("a", None, "college", "vikidia", RESULT, [1.0, 0.0])
+        cache.get_exact("a", None, "college", "vikidia")
+        cache.get_similar("b", [1.0, 0.0], None, "college", "vikidia")
+        cache.get_similar("c", [0.0, 1.0], None, "college", "vikidia")
+
+        assert cache.stats()["hit_rate"] == pytest.approx(2 / 3)
+
+
+class TestInvalidation:
+    """Tests invalidation quand les collections changent."""
+
+    def test_invalidate_by_source(self):
+        """Invalider mes_cours garde vikidia mais supprime mes_cours et tous."""
+        cache = AnswerCache()
+        for source in ("vikidia", "mes_cours", "tous"):
+            cache.set("q", None, "college", source, RESULT)
+
+        cache.invalidate("mes_cours")
+
+        assert cache.get_exact("q", None, "college", "vikidia") is not None
+        assert cache.get_exact("q", None, "college", "mes_cours") is None
+        assert cache.get_exact("q", None, "college", "tous") is None
+
+    def test_version_file_invalidation(self, tmp_path):
+        """bump_collections_version (ex: ingest dans un autre process) invalide le cache."""
+        cache = AnswerCache(chroma_dir=str(tmp_path), version_check_interval=0)
+        cache.set("q", None, "college", "vikidia", RESULT)
+        cache.set("q", None, "college", "mes_cours", RESULT)
+
+        bump_collections_version(tmp_path, "cours_college")
+
+        assert cache.get_exact("q", None, "college", "vikidia") is None
+        assert cache.get_exact("q", None, "college", "mes_cours") is not None
+
+    def test_version_file_read_at_most_once_per_interval(self, tmp_path, monkeypatch):
+        """Les fichiers .version ne sont pas relus à chaque requête, mais au plus une fois par intervalle."""
+        from backend import answer_cache
+        reads = []
+        read = answer_cache.read_collections_version
+        monkeypatch.setattr(
+            answer_cache, "read_collections_version",
+            lambda chroma_dir, collection: reads.append(collection) or read(chroma_dir, collection)
+        )
+        cache = AnswerCache(chroma_dir=str(tmp_path), version_check_interval=60)
+        cache.set("q", None, "college", "vikidia", RESULT)
+        reads.clear()
+
+        bump_collections_version(tmp_path, "cours_college")
+        for _ in range(3):
+            assert cache.get_exact("q", None, "college", "vikidia") is not None
+
+        assert reads == []
+        cache.version_check_interval = 0
+        assert cache.get_exact("q", None, "college", "vikidia") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_invalidation_counted_only_when_entries_dropped(self):
+        """Une invalidation qui ne supprime aucune réponse n'est pas comptée."""
+        cache = AnswerCache()
+        cache.set("q", None, "college", "vikidia", RESULT)
+
+        cache.invalidate("mes_cours")
+        assert cache.stats()["invalidations"] == 0
+        cache.invalidate("vikidia")
+        assert cache.stats()["invalidations"] == 1
+
+    def test_personal_collection_in_key(self):
+        """Deux élèves n'ont pas les mêmes réponses sur "mes_cours", ni sur "tous"."""
+        cache = AnswerCache(semantic_max_distance=0.5)
+        cache.set("q", None, "college", "mes_cours", RESULT, [1.0, 0.0], personal_collection="mes_cours_a")
+
+        assert cache.get_exact("q", None, "college", "mes_cours", "mes_cours_a") is not None
+        assert cache.get_exact("q", None, "college", "mes_cours", "mes_cours_b") is None
+        assert cache.get_exact("q", None, "college", "mes_cours") is None
+        assert cache.get_similar("q", [1.0, 0.0], None, "college", "mes_cours", "mes_cours_b") is None
+
+    def test_version_file_invalidation_per_owner(self, tmp_path):
+        """Un import dans la collection d'un élève n'invalide que ses réponses."""
+        cache = AnswerCache(chroma_dir=str(tmp_path), version_check_interval=0)
+        for collection in ("mes_cours_a", "mes_cours_b"):
+            cache.set("q", None, "college", "mes_cours", RESULT, personal_collection=collection)
+            cache.set("q", None, "college", "tous", RESULT, personal_collection=collection)
+        cache.set("q", None, "college", "vikidia", RESULT)
+
+        bump_collections_version(tmp_path, "mes_cours_a")
+
+        assert cache.get_exact("q", None, "college", "mes_cours", "mes_cours_a") is None
+        assert cache.get_exact("q", None, "college", "tous", "mes_cours_a") is None
+        assert cache.get_exact("q", None, "college", "mes_cours", "mes_cours_b") is not None
+        assert cache.get_exact("q", None, "college", "tous", "mes_cours_b") is not None
+        assert cache.get_exact("q", None, "college", "vikidia") is not None
+
+    def test_vikidia_answers_shared_between_owners(self):
+        """Une réponse Vikidia sert à tous les élèves ; "mes_cours" et "tous" restent séparées."""
+        cache = AnswerCache(semantic_max_distance=0.5)
+        for source in ("vikidia", "mes_cours", "tous"):
+            cache.set("q", None, "college", source, RESULT, [1.0, 0.0], personal_collection="mes_cours_a")
+
+        assert cache.get_exact("q", None, "college", "vikidia", "mes_cours_b") is not None
+        assert cache.get_similar("q2", [1.0, 0.01], None, "college", "vikidia", "mes_cours_b") is not None
+        for source in ("mes_cours", "tous"):
+            assert cache.get_exact("q", None, "college", source, "mes_cours_b") is None
+            assert cache.get_similar("q2", [1.0, 0.01], None, "college", source, "mes_cours_b") is None
@@ -0,0 +1,161 @@
+"""Tests des fichiers de chunks JSONL (scraper/chunk_store.py)."""
+
+import json
+
+import pytest
+
+from scraper import pipeline
+from scraper.chunk_store import EcrivainChunks, MagasinChunks, fichier_chunks, lire_chunks
+
+
+TEXTE = "Le théorème de Pythagore relie les longueurs des côtés d'un triangle rectangle. " * 3
+
+
+def chunk(i, matiere="mathematiques"):
+    return {"text": f"[Leçon {i}]\n{TEXTE}", "metadata": {"matiere": matiere, "titre": f"Leçon {i}", "chunk_index": 0}}
+
+
+class TestEcrivainChunks:
+    """Tests écriture / lecture."""
+
+    def test_roundtrip_jsonl(self, tmp_path):
+        """Un chunk par ligne, relu à l'identique (accents compris)."""
+        chunks = [chunk(i) for i in range(3)]
+        with EcrivainChunks(tmp_path) as ecrivain:
+            ecrivain.ecrire_tout(iter(chunks))
+
+        assert ecrivain.chemin.name == "chunks.jsonl"
+        assert len(ecrivain.chemin.read_text(encoding="utf-8").splitlines()) == 3
+        assert list(lire_chunks(tmp_path)) == chunks
+
+    def test_roundtrip_zstd(self, tmp_path):
+        """chunks.jsonl.zst si la compression est demandée."""
+        pytest.importorskip("zstandard")
+        chunks = [chunk(i) for i in range(3)]
+        with EcrivainChunks(tmp_path, compresser=True) as ecrivain:
+            ecrivain.ecrire_tout(chunks)
+
+        assert fichier_chunks(tmp_path).name == "chunks.jsonl.zst"
+        assert list(lire_chunks(tmp_path)) == chunks
+
+    def test_legacy_json_replaced(self, tmp_path):
+        """L'ancien chunks.json reste lisible, puis est remplacé par le JSONL."""
+        (tmp_path / "chunks.json").write_text(json.dumps([chunk(0)]), encoding="utf-8")
+        assert list(lire_chunks(tmp_path)) == [chunk(0)]
+
+        with EcrivainChunks(tmp_path) as ecrivain:
+            ecrivain.ecrire(chunk(1))
+
+        assert not (tmp_path / "chunks.json").exists()
+        assert list(lire_chunks(tmp_path)) == [chunk(1)]
+
+    def test_error_keeps_previous_file(self, tmp_path):
+        """Une erreur pendant l'écriture laisse le fichier précédent intact."""
+        with EcrivainChunks(tmp_path) as ecrivain:
+            ecrivain.ecrire(chunk(0))
+
+        with pytest.raises(RuntimeError):
+            with EcrivainChunks(tmp_path) as ecrivain:
+                ecrivain.ecrire(chunk(1))
+                raise RuntimeError("interruption")
+
+        assert list(lire_chunks(tmp_path)) == [chunk(0)]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["chunks.jsonl"]
+
+
+def test_pipeline_appends_to_existing_chunks(tmp_path, monkeypatch):
+    """Wikiversité : ajout aux chunks existants, sans doublons si relancé."""
+    monkeypatch.setattr(pipeline, "DOSSIER_PROCESSED", tmp_path)
+    pipeline.sauvegarder_chunks([chunk(0)], "mathematiques")
+    article = {"titre": "Fraction", "texte": TEXTE, "metadata": {"matiere": "mathematiques", "url": "u"}}
+
+    pipeline.ajouter_aux_chunks_existants([article], "mathematiques")
+    stats = pipeline.ajouter_aux_chunks_existants([article], "mathematiques")
+
+    chunks = list(lire_chunks(tmp_path / "mathematiques"))
+    assert chunks[0] == chunk(0)
+    assert len(chunks) >= 2
+    assert chunks[1]["metadata"] == {
+        "matiere": "mathematiques", "url": "u", "chunk_index": 0,
+        "section": "", "section_niveau": 0, "section_index": 0, "sections": "",
+    }
+    assert stats["ajoutes"] == 0 and stats["inchanges"] == len(chunks) - 1
+
+
+class TestMagasinChunks:
+    """Tests ajout dédupliqué."""
+
+    def test_append_is_idempotent(self, tmp_path):
+        """Ré-ajouter les mêmes chunks ne modifie pas le fichier."""
+        with EcrivainChunks(tmp_path) as ecrivain:
+            ecrivain.ecrire(chunk(0))
+
+        assert MagasinChunks(tmp_path).ajouter([chunk(1), chunk(2)])["ajoutes"] == 2
+        taille = (tmp_path / "chunks.jsonl").stat().st_size
+        stats = MagasinChunks(tmp_path).ajouter([chunk(1), chunk(2)])
+
+        assert stats == {"ajoutes": 0, "modifies": 0, "inchanges": 2, "supprimes": 0}
+        assert (tmp_path / "chunks.jsonl").stat().st_size == taille
+        assert list(lire_chunks(tmp_path)) == [chunk(0), chunk(1), chunk(2)]
+
+    def test_modified_chunk_replaces_previous(self, tmp_path):
+        """Un texte modifié (même url + chunk_index) remplace l'ancien à la lecture."""
+        magasin = MagasinChunks(tmp_path)
+        magasin.ajouter([chunk(i) for i in range(4)])
+        modifie = {**chunk(1), "text": "[Leçon 1]\nTexte corrigé"}
+
+        assert magasin.ajouter([modifie])["modifies"] == 1
+        assert [c["text"] for c in lire_chunks(tmp_path)] == [
+            chunk(0)["text"], chunk(2)["text"], chunk(3)["text"], modifie["text"]
+        ]
+        assert magasin.nb_obsoletes == 1
+
+    def test_shrinking_lesson_drops_old_chunks(self, tmp_path):
+        """Une leçon qui produit moins de chunks perd ses anciens chunks de fin, même après relecture."""
+        def lecon(index, texte, url="u"):
+            return {"text": texte, "metadata": {"url": url, "chunk_index": index}}
+
+        magasin = MagasinChunks(tmp_path)
+        magasin.ajouter([lecon(0, "a"), lecon(1, "b"), lecon(2, "c"), lecon(0, "x", url="autre")])
+
+        stats = magasin.ajouter([lecon(0, "A")])
+
+        assert stats == {"ajoutes": 0, "modifies": 1, "inchanges": 0, "supprimes": 2}
+        assert [c["text"] for c in lire_chunks(tmp_path)] == ["x", "A"]
+        assert [c["text"] for c in lire_chunks(MagasinChunks(tmp_path).chemin)] == ["x", "A"]
+        # La leçon qui s'allonge de nouveau : chunk 1 rajouté
+        assert MagasinChunks(tmp_path).ajouter([lecon(0, "A"), lecon(1, "B")])["ajoutes"] == 1
+        assert [c["text"] for c in lire_chunks(tmp_path)] == ["x", "A", "B"]
+
+    def test_sources_without_chunks_are_dropped(self, tmp_path):
+        """Une url passée dans sources sans aucun chunk (article supprimé) perd tous ses chunks."""
+        def lecon(index, texte, url):
+            return {"text": texte, "metadata": {"url": url, "chunk_index": index}}
+
+        magasin = MagasinChunks(tmp_path)
+        magasin.ajouter([lecon(0, "a", "u"), lecon(1, "b", "u"), lecon(0, "x", "autre")])
+
+        stats = magasin.ajouter([], sources=["u", "inconnue"])
+
+        assert stats == {"ajoutes": 0, "modifies": 0, "inchanges": 0, "supprimes": 2}
+        assert [c["text"] for c in lire_chunks(tmp_path)] == ["x"]
+        assert "u" not in magasin.cles_par_source
+
+    def test_compaction(self, tmp_path):
+        """Quand les versions obsolètes sont majoritaires, le fichier est réécrit."""
+        magasin = MagasinChunks(tmp_path)
+        magasin.ajouter([chunk(0)])
+        for version in range(2):
+            magasin.ajouter([{**chunk(0), "text": f"v{version}"}])
+
+        assert magasin.nb_obsoletes == 0
+        assert len((tmp_path / "chunks.jsonl").read_text(encoding="utf-8").splitlines()) == 1
+        assert [c["text"] for c in lire_chunks(tmp_path)] == ["v1"]
+
+    def test_zstd_append_frames(self, tmp_path):
+        """En zstd, chaque ajout est une nouvelle trame, relue à la suite."""
+        pytest.importorskip("zstandard")
+        MagasinChunks(tmp_path, compresser=True).ajouter([chunk(0)])
+        MagasinChunks(tmp_path).ajouter([chunk(1)])
+
+        assert list(lire_chunks(tmp_path)) == [chunk(0), chunk(1)]
@@ -0,0 +1,161 @@
+"""Tests du découpage en chunks (scraper/chunker.py)."""
+
+import re
+
+import pytest
+
+from scraper import chunker
+from scraper.chunker import (
+    TAILLE_CHUNK_CHARS,
+    TAILLE_CHUNK_TOKENS,
+    TAILLE_MIN_CHUNK_CHARS,
+    compter_tokens,
+    decouper_en_chunks,
+    decouper_sections_en_chunks,
+    generer_chunks,
+    histogramme_tokens,
+)
+
+
+class EncodeurMots:
+    """Tokenizer factice : un token par mot ou par suite d'espaces."""
+
+    def encode(self, texte, disallowed_special=()):
+        return re.findall(r"\s+|\S+", texte)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+@pytest.fixture
+def encodeur(monkeypatch):
+    monkeypatch.setattr(chunker, "_encodeur", lambda: EncodeurMots())
+
+
+def texte_lecon(nb_sections=12, mots=90):
+    return "\n\n".join(
+        f"Paragraphe {i}. " + " ".join(f"mot{i}_{j}." for j in range(mots)) for i in range(nb_sections)
+    )
+
+
+class TestDecoupageCaracteres:
+    """Tests mode "caracteres" (par défaut)."""
+
+    def test_long_section_split_on_sentences(self):
+        """Une section trop longue est coupée entre deux phrases, ponctuation gardée."""
+        texte = " ".join(f"Phrase {j} de la longue section{'!?.'[j % 3]}" for j in range(400))
+
+        chunks = decouper_en_chunks(texte)
+
+        assert len(chunks) > 1
+        assert all(len(c["text"]) <= TAILLE_CHUNK_CHARS for c in chunks)
+        assert all(c["text"][-1] in "!?." for c in chunks)
+        # Le chunk suivant reprend la fin du précédent
+        assert chunks[0]["text"][-30:] in chunks[1]["text"]
+
+    def test_generator_is_lazy(self):
+        """generer_chunks produit le premier chunk sans découper tout le texte."""
+        chunks = generer_chunks(texte_lecon(nb_sections=2000))
+
+        premier = next(chunks)
+
+        assert premier["index"] == 0
+        assert premier["text"].startswith("Paragraphe 0.")
+
+
+class TestDecoupageTokens:
+    """Tests mode "tokens"."""
+
+    def test_chunks_fit_token_budget(self, encodeur):
+        """Chaque chunk, titre compris, tient dans TAILLE_CHUNK_TOKENS tokens."""
+        longue_section = " ".join(f"Phrase {j} de la longue section." for j in range(400))
+        phrase_geante = " ".join(f"mot{j}" for j in range(1500))
+        texte = "\n\n".join([texte_lecon(), longue_section, phrase_geante, "Conclusion de la leçon."])
+
+        chunks = decouper_en_chunks(texte, titre="Les fractions", mode="tokens")
+
+        tailles = [compter_tokens(c["text"]) for c in chunks]
+        assert len(chunks) > 5
+        assert max(tailles) <= TAILLE_CHUNK_TOKENS
+        assert [c["index"] for c in chunks] == list(range(len(chunks)))
+        assert all(c["text"].startswith("[Les fractions]\n") for c in chunks)
+
+    def test_sections_packed_with_overlap(self, encodeur):
+        """Les sections sont regroupées, la fin d'un chunk reprise au début du suivant."""
+        chunks = decouper_en_chunks(texte_lecon(), mode="tokens")
+
+        assert 1 < len(chunks) < 12
+        fin_premier = chunks[0]["text"].split()[-1]
+        assert fin_premier in chunks[1]["text"].split("\n\n")[0]
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            decouper_en_chunks(texte_lecon(), mode="mots")
+
+
+class TestDecoupageSections:
+    """Tests regroupement des sections d'une leçon."""
+
+    def test_short_sections_share_a_chunk(self):
+        """Huit sections courtes : un seul chunk, chemin de la plus longue et liste des couvertes."""
+        sections = [{"titres": [], "texte": "Introduction de la leçon."}] + [
+            {"titres": ["Partie", f"Point {i}"], "texte": f"Le point {i} en deux phrases. " * 3} for i in range(8)
+        ]
+
+        chunks = decouper_sections_en_chunks(sections, titre="Leçon")
+
+        assert len(chunks) == 1
+        assert (chunks[0]["section"], chunks[0]["section_index"]) == ("Partie > Point 0", 1)
+        assert chunks[0]["sections"] == [""] + [f"Partie > Point {i}" for i in range(8)]
+        assert "\n\nPoint 7\n\nLe point 7" in chunks[0]["text"]
+
+    def test_long_sections_apart_short_one_merged(self):
+        """Une section longue reste à part, titre compris ; une section trop courte ouvre la suivante, qui garde son nom."""
+        longue = " ".join(f"Phrase {j} de la section." for j in range(150))
+        sections = [
+            {"titres": ["A"], "texte": longue},
+            {"titres": ["B"], "texte": "Court."},
+            {"titres": ["C"], "texte": longue},
+        ]
+
+        chunks = decouper_sections_en_chunks(sections)
+
+        assert all(TAILLE_MIN_CHUNK_CHARS <= len(chunk["text"]) <= TAILLE_CHUNK_CHARS for chunk in chunks)
+        assert [chunk["section"] for chunk in chunks] == ["A", "A", "C", "C", "C"]
+        assert {chunk["section_index"] for chunk in chunks[2:]} == {2}
+        assert chunks[0]["text"].startswith("A\n\nPhrase 0 ")
+        assert chunks[2]["sections"] == ["B", "C"]
+        assert chunks[2]["text"].startswith("B\n\nCourt.\n\nC\n\nPhrase 0 ")
+        assert [chunk["index"] for chunk in chunks] == list(range(len(chunks)))
+
+    def test_tokens_mode_packs_sections(self, encodeur):
+        sections = [{"titres": [f"Titre {i}"], "texte": f"Texte {i}."} for i in range(5)]
+
+        chunks = decouper_sections_en_chunks(sections, titre="Leçon", mode="tokens")
+
+        assert len(chunks) == 1
+        assert compter_tokens(chunks[0]["text"]) <= TAILLE_CHUNK_TOKENS
+
+        longue = " ".join(f"Phrase {j} de la section." for j in range(300))
+        chunks = decouper_sections_en_chunks([{"titres": ["Titre"], "texte": longue}], mode="tokens")
+
+        assert len(chunks) > 1
+        assert chunks[0]["text"].startswith("Titre\n\nPhrase 0 ")
+        assert all(compter_tokens(chunk["text"]) <= TAILLE_CHUNK_TOKENS for chunk in chunks)
+
+
+class TestCompterTokens:
+    """Tests comptage et histogramme."""
+
+    def test_fallback_without_tokenizer(self, monkeypatch):
+        """Sans tokenizer, les tokens sont estimés à 4 caractères (arrondi supérieur)."""
+        monkeypatch.setattr(chunker, "_encodeur", lambda: None)
+
+        assert compter_tokens("abcdefgh") == 2
+        assert compter_tokens("abcdefghi") == 3
+
+    def test_histogram(self, encodeur):
+        """Chunks comptés par tranche de tokens."""
+        textes = ["a " * 10, "a " * 40, "a " * 60, "a " * 200]
+
+        assert histogramme_tokens(textes, largeur=100) == {0: 2, 100: 1, 400: 1}
@@ -0,0 +1,63 @@
+"""Tests du nettoyage des extraits MediaWiki (scraper/cleaner.py)."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from scraper.cleaner import nettoyer_en_sections, nettoyer_texte
+
+
+# Sorties de référence du nettoyeur d'origine (une regex par section et par
+# motif LaTeX, appliquées successivement), sur des extraits de type MediaWiki
+GOLDEN = json.loads((Path(__file__).parent / "golden" / "cleaner.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("cas", GOLDEN, ids=range(len(GOLDEN)))
+def test_golden_output(cas):
+    """Même sortie que le nettoyeur d'origine."""
+    assert nettoyer_texte(cas["entree"]) == cas["attendu"]
+
+
+class TestNettoyerTexte:
+    """Tests de comportements ciblés."""
+
+    def test_sections_removed_case_insensitive(self):
+        """Les sections à supprimer sont reconnues quelle que soit la casse."""
+        texte = "Intro.\n== VOIR AUSSI ==\nA\n== Notes et références ==\nB\n== Suite ==\nC"
+
+        assert nettoyer_texte(texte) == "Intro.\n\nSuite\n\nC"
+
+    def test_nested_style_blocks(self):
+        """Un bloc de style contenant un bloc plus prioritaire est retiré en entier."""
+        assert nettoyer_texte("a {\\textstyle {\\scriptstyle x}} b") == "a b"
+
+    def test_spaces_normalized(self):
+        """Espaces et tabulations regroupés, pas d'espace en bord de ligne, 2 sauts de ligne max."""
+        assert nettoyer_texte(" a \t b \n\n\n\n c  ") == "a b\n\nc"
+
+
+class TestNettoyerEnSections:
+    """Tests nettoyage avec hiérarchie des titres."""
+
+    def test_heading_paths(self):
+        """Chaque section garde le chemin de ses titres ; titres sans texte et sections supprimées omis."""
+        texte = (
+            "Intro [[Nombre|nombres]].\n== Partie A ==\n=== Sous A1 ===\nCorps a1.\n"
+            "=== Sous A2 ===\nCorps a2.\n== Partie B ==\nCorps b.\n== Voir aussi ==\n* Lien"
+        )
+
+        assert nettoyer_en_sections(texte) == [
+            {"titres": [], "texte": "Intro nombres."},
+            {"titres": ["Partie A", "Sous A1"], "texte": "Corps a1."},
+            {"titres": ["Partie A", "Sous A2"], "texte": "Corps a2."},
+            {"titres": ["Partie B"], "texte": "Corps b."},
+        ]
+
+    @pytest.mark.parametrize("cas", GOLDEN, ids=range(len(GOLDEN)))
+    def test_same_text_as_flat_cleaning(self, cas):
+        """Titres et textes des sections recollés : même texte que nettoyer_texte."""
+        sections = nettoyer_en_sections(cas["entree"])
+        morceaux = [m for s in sections for m in (s["titres"][-1:] + [s["texte"]])]
+
+        assert "\n\n".join(morceaux) == nettoyer_texte(cas["entree"])
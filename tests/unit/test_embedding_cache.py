@@ -0,0 +1,145 @@
+"""Tests unitaires pour backend/embedding_cache.py."""
+
+import asyncio
+import sqlite3
+import threading
+
+from backend.embedding_cache import CachedEmbeddings, EmbeddingStore, embedding_key
+
+
+class CountingEmbeddings:
+    """Embeddings factices qui comptent les textes envoyés à l'"API"."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text)), 1.0]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def make_cached(tmp_path, model="text-embedding-3-small"):
+    underlying = CountingEmbeddings()
+    store = EmbeddingStore(tmp_path / "embeddings.sqlite3")
+    return CachedEmbeddings(underlying, model=model, store=store), underlying
+
+
+class TestEmbeddingKey:
+    """Tests clé de cache."""
+
+    def test_key_depends_on_model(self):
+        """Le même texte avec un autre modèle a une autre clé."""
+        assert embedding_key("a", "texte") != embedding_key("b", "texte")
+
+    def test_key_is_stable(self):
+        """La clé est déterministe."""
+        assert embedding_key("m", "texte") == embedding_key("m", "texte")
+
+
+class TestCachedEmbeddings:
+    """Tests du wrapper avec cache persistant."""
+
+    def test_query_cached_after_first_call(self, tmp_path):
+        """La 2e requête identique ne passe pas par l'API."""
+        cached, underlying = make_cached(tmp_path)
+
+        first = cached.embed_query("Pythagore")
+        second = cached.embed_query("Pythagore")
+
+        assert first == second == [9.0, 1.0]
+        assert len(underlying.calls) == 1
+        assert cached.hits == 1 and cached.misses == 1
+
+    def test_documents_only_missing_sent(self, tmp_path):
+        """Seuls les textes absents (dédupliqués) sont envoyés à l'API."""
+        cached, underlying = make_cached(tmp_path)
+        cached.embed_query("a")
+
+        vectors = cached.embed_documents(["a", "bb", "bb", "ccc"])
+
+        assert vectors == [[1.0, 1.0], [2.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+        assert underlying.calls[-1] == ["bb", "ccc"]
+
+    def test_persistent_across_instances(self, tmp_path):
+        """Le cache survit à un redémarrage (nouvelle connexion SQLite)."""
+        cached, _ = make_cached(tmp_path)
+        cached.embed_documents(["leçon 1", "leçon 2"])
+
+        reopened, underlying = make_cached(tmp_path)
+        reopened.embed_documents(["leçon 1", "leçon 2"])
+
+        assert underlying.calls == []
+
+    def test_async_shares_cache(self, tmp_path):
+        """aembed_query réutilise les vecteurs calculés en synchrone."""
+        cached, underlying = make_cached(tmp_path)
+        cached.embed_query("fraction")
+
+        vector = asyncio.run(cached.aembed_query("fraction"))
+
+        assert vector == [8.0, 1.0]
+        assert len(underlying.calls) == 1
+
+    def test_async_store_access_off_event_loop(self, tmp_path):
+        """En async, la base SQLite est lue et écrite hors du thread de la boucle."""
+        cached, _ = make_cached(tmp_path)
+        threads = []
+        get_many, set_many = cached.store.get_many, cached.store.set_many
+        cached.store.get_many = lambda keys: threads.append(threading.get_ident()) or get_many(keys)
+        cached.store.set_many = lambda items: threads.append(threading.get_ident()) or set_many(items)
+
+        asyncio.run(cached.aembed_documents(["a", "bb"]))
+
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+
+    def test_model_isolation(self, tmp_path):
+        """Deux modèles partageant le fichier ne se mélangent pas."""
+        small, _ = make_cached(tmp_path, model="small")
+        large, underlying = make_cached(tmp_path, model="large")
+        small.embed_query("texte")
+
+        large.embed_query("texte")
+
+        assert len(underlying.calls) == 1
+
+
+class TestEmbeddingStore:
+    """Tests taille bornée de la base."""
+
+    def test_prune_keeps_recently_used(self, tmp_path):
+        """Au-delà de max_rows, les vecteurs les moins récemment utilisés sont retirés."""
+        store = EmbeddingStore(tmp_path / "embeddings.sqlite3", max_rows=10)
+        store.set_many({f"k{i}": [float(i)] for i in range(10)})
+        with store._lock:
+            store._conn.execute("UPDATE embeddings SET used_at = 0")
+        store.get_many(["k0"])  # k0 redevient récent
+
+        store.set_many({"nouveau": [1.0]})
+
+        assert len(store) == 9
+        assert set(store.get_many(["k0", "nouveau"])) == {"k0", "nouveau"}
+        assert store.prune(5) == 4 and len(store) == 5
+
+    def test_opens_database_without_used_at(self, tmp_path):
+        """Une base créée avant la limite de taille est migrée, ses vecteurs gardés."""
+        path = tmp_path / "embeddings.sqlite3"
+        conn = sqlite3.connect(str(path))
+        conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        conn.execute("INSERT INTO embeddings VALUES ('ancien', x'0000803f')")
+        conn.commit()
+        conn.close()
+
+        store = EmbeddingStore(path)
+
+        assert store.get_many(["ancien"]) == {"ancien": [1.0]}
@@ -0,0 +1,117 @@
+"""Tests unitaires pour backend/embedding_pipeline.py."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from embedding_pipeline import EmbeddingPipeline, TokenBudget, make_batches  # noqa: E402
+
+
+class RateLimitError(Exception):
+    """Même nom que openai.RateLimitError."""
+
+    status_code = 429
+
+
+class SlowEmbeddings(Embeddings):
+    """Embeddings avec latence ; mesure le nombre d'appels simultanés."""
+
+    def __init__(self, latency=0.05, rate_limited_calls=0):
+        self.latency = latency
+        self.rate_limited_calls = rate_limited_calls
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            if self.rate_limited_calls > 0:
+                self.rate_limited_calls -= 1
+                raise RateLimitError("429 Too Many Requests")
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+
+def items(n, chars=400):
+    return [(f"id{i}", {"text": "x" * chars, "metadata": {}}) for i in range(n)]
+
+
+class TestMakeBatches:
+    """Tests découpage en lots par tokens."""
+
+    def test_batches_by_tokens(self):
+        """400 caractères ≈ 100 tokens : 250 tokens max → 2 chunks par lot."""
+        batches = make_batches(items(5), max_tokens=250)
+        assert [len(b) for b in batches] == [2, 2, 1]
+
+    def test_max_docs_and_oversized_chunk(self):
+        """Limite en nombre de textes ; un chunk trop gros forme un lot seul."""
+        assert [len(b) for b in make_batches(items(5, chars=4), max_docs=2)] == [2, 2, 1]
+        assert [len(b) for b in make_batches(items(2, chars=4000), max_tokens=100)] == [1, 1]
+
+
+class TestEmbeddingPipeline:
+    """Tests pipeline concurrent."""
+
+    def test_concurrent_embedding_single_writer(self):
+        """Les lots sont embeddés en parallèle (borné) et écrits par le thread appelant."""
+        embeddings = SlowEmbeddings()
+        writers = set()
+        written = []
+
+        def write(batch, vectors):
+            writers.add(threading.get_ident())
+            written.extend(cid for cid, _ in batch)
+
+        count = EmbeddingPipeline(embeddings, max_in_flight=3).run(
+            make_batches(items(12), max_docs=1), write
+        )
+
+        assert count == 12 and sorted(written) == sorted(cid for cid, _ in items(12))
+        assert embeddings.max_in_flight == 3
+        assert writers == {threading.get_ident()}
+
+    def test_retries_on_rate_limit(self):
+        """Un RateLimitError est retenté après backoff."""
+        embeddings = SlowEmbeddings(latency=0, rate_limited_calls=2)
+        pipeline = EmbeddingPipeline(embeddings, max_in_flight=1, backoff_base=0.01)
+
+        assert pipeline.run(make_batches(items(3), max_docs=1), lambda b, v: None) == 3
+        assert pipeline.retries == 2
+
+    def test_other_errors_propagate(self):
+        """Une erreur qui n'est pas un rate limit arrête l'ingestion."""
+        class Broken(SlowEmbeddings):
+            def embed_documents(self, texts):
+                raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            EmbeddingPipeline(Broken(), max_in_flight=2).run(make_batches(items(3)), lambda b, v: None)
+
+
+class TestTokenBudget:
+    """Tests budget TPM."""
+
+    def test_waits_when_budget_exhausted(self):
+        """6000 TPM = 100 tokens/s : 50 tokens au-delà du budget → ~0.5s d'attente."""
+        budget = TokenBudget(tokens_per_minute=6000)
+        budget.acquire(6000)
+        debut = time.monotonic()
+        budget.acquire(50)
+        assert time.monotonic() - debut >= 0.45
@@ -0,0 +1,122 @@
+"""Tests unitaires de l'ingestion incrémentale (backend/ingest_chromadb.py)."""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+import ingest_chromadb  # noqa: E402
+from embedding_cache import CachedEmbeddings, EmbeddingStore  # noqa: E402
+from ingest_chromadb import chunk_id, estimate_cost, ingest_to_chromadb  # noqa: E402
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeddings déterministes, compte les textes embeddés."""
+
+    def __init__(self):
+        self.texts = []
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255 for b in digest[:8]]
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def make_chunk(titre, index, text=None, matiere="mathematiques"):
+    return {
+        "text": text or f"[{titre}]\nContenu {index} de {titre}",
+        "metadata": {
+            "source": "vikidia",
+            "matiere": matiere,
+            "titre": titre,
+            "url": f"https://fr.vikidia.org/wiki/{titre}",
+            "chunk_index": index,
+        },
+    }
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    fake = FakeEmbeddings()
+    cached = CachedEmbeddings(fake, ingest_chromadb.EMBEDDING_MODEL, EmbeddingStore(tmp_path / "emb.sqlite3"))
+    monkeypatch.setattr(ingest_chromadb, "CHROMADB_DIR", tmp_path / "chromadb")
+    monkeypatch.setattr(ingest_chromadb, "get_shared_embeddings", lambda model: cached)
+    return fake
+
+
+def test_chunk_id_deterministic():
+    """Même url + index + texte → même id ; texte modifié → autre id."""
+    chunk = make_chunk("Fraction", 0)
+
+    assert chunk_id(chunk) == chunk_id(make_chunk("Fraction", 0))
+    assert chunk_id(chunk) != chunk_id(make_chunk("Fraction", 0, text="autre"))
+    assert chunk_id(chunk) != chunk_id(make_chunk("Fraction", 1, text=chunk["text"]))
+
+
+def test_rerun_embeds_nothing(env):
+    """Ré-ingérer les mêmes chunks n'embedde rien et ne duplique rien."""
+    chunks = [make_chunk("Fraction", i) for i in range(3)] + [make_chunk("Fraction", 0)]
+
+    ingest_to_chromadb(lambda: chunks)
+    plan = ingest_to_chromadb(lambda: chunks)
+
+    assert len(env.texts) == 3
+    assert plan["unchanged"] == 3 and not plan["to_add"] and not plan["to_delete"]
+
+
+def test_changed_and_vanished_chunks(env):
+    """Chunk modifié → ré-embeddé ; chunk disparu → supprimé de la collection."""
+    ingest_to_chromadb(lambda: [make_chunk("Fraction", i) for i in range(3)])
+    env.texts.clear()
+
+    nouveaux = [make_chunk("Fraction", 0), make_chunk("Fraction", 1, text="[Fraction]\nRéécrit")]
+    plan = ingest_to_chromadb(lambda: nouveaux)
+
+    assert env.texts == ["[Fraction]\nRéécrit"]
+    assert len(plan["to_delete"]) == 2
+    collection = ingest_chromadb.Chroma(
+        collection_name=ingest_chromadb.COLLECTION_NAME,
+        embedding_function=env,
+        persist_directory=str(ingest_chromadb.CHROMADB_DIR),
+    )._collection
+    assert sorted(collection.get()["ids"]) == sorted(chunk_id(c) for c in nouveaux)
+
+
+def test_matiere_scopes_deletions(env):
+    """Une ingestion limitée à une matière ne supprime pas les autres matières."""
+    ingest_to_chromadb(lambda: [make_chunk("Fraction", 0), make_chunk("Cellule", 0, matiere="svt")])
+
+    plan = ingest_to_chromadb(lambda: [make_chunk("Cellule", 0, matiere="svt")], matiere="svt")
+
+    assert plan["to_delete"] == [] and plan["unchanged"] == 1
+
+
+def test_dry_run_changes_nothing(env):
+    """--dry-run : plan calculé, aucun embedding, collection inchangée."""
+    plan = ingest_to_chromadb(lambda: [make_chunk("Fraction", 0)], dry_run=True)
+
+    assert len(plan["to_add"]) == 1
+    assert env.texts == []
+    assert ingest_to_chromadb(lambda: [make_chunk("Fraction", 0)], dry_run=True)["unchanged"] == 0
+
+
+def test_estimate_cost_skips_cached(tmp_path):
+    """Les textes déjà dans le cache d'embeddings ne comptent pas dans le coût."""
+    store = EmbeddingStore(tmp_path / "emb.sqlite3")
+    CachedEmbeddings(FakeEmbeddings(), ingest_chromadb.EMBEDDING_MODEL, store).embed_documents(["a" * 400])
+
+    cost = estimate_cost([{"text": "a" * 400}, {"text": "b" * 400}], store)
+
+    assert cost["cached"] == 1 and cost["api_calls"] == 1
+    assert cost["tokens"] == 100
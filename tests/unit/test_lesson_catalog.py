@@ -0,0 +1,214 @@
+"""Tests unitaires pour backend/lesson_catalog.py."""
+
+import sys
+from pathlib import Path
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from answer_cache import bump_collections_version  # noqa: E402
+from lesson_catalog import (  # noqa: E402
+    CatalogHolder,
+    LessonCatalog,
+    LessonContentCache,
+    catalog_path,
+    merge_chunks,
+    merge_sections,
+    strip_title_prefix,
+)
+
+
+class FakeCollection:
+    """Collection ChromaDB minimale: get() paginé par limit/offset."""
+
+    def __init__(self, chunks):
+        # chunks: liste de (id, metadata, document)
+        self.chunks = chunks
+        self.get_calls = 0
+
+    def get(self, include=None, limit=None, offset=0):
+        self.get_calls += 1
+        page = self.chunks[offset:offset + limit]
+        return {
+            "ids": [c[0] for c in page],
+            "metadatas": [c[1] for c in page],
+            "documents": [c[2] for c in page],
+        }
+
+
+def make_chunk(doc_id, titre, chunk_index, matiere="mathematiques", niveau="4eme", text=None):
+    metadata = {
+        "titre": titre,
+        "url": f"https://fr.vikidia.org/wiki/{titre}",
+        "matiere": matiere,
+        "niveau": niveau,
+        "source": "vikidia",
+        "chunk_index": chunk_index,
+    }
+    return (doc_id, metadata, text or f"{titre} chunk {chunk_index}")
+
+
+CHUNKS = [
+    make_chunk("p2", "Pythagore", 2),
+    make_chunk("t0", "Thalès", 0, niveau="3eme"),
+    make_chunk("p0", "Pythagore", 0, text="Début " + "x" * 300),
+    make_chunk("p1", "Pythagore", 1),
+    make_chunk("r0", "Révolution française", 0, matiere="histoire_geo"),
+]
+
+
+class TestLessonCatalog:
+    """Tests construction et lecture du catalogue."""
+
+    def test_groups_chunks_by_lesson(self):
+        """Une entrée par (matière, titre), chunk ids triés par chunk_index."""
+        catalog = LessonCatalog.from_collection(FakeCollection(CHUNKS), batch_size=2)
+
+        pythagore = catalog.get("mathematiques", "Pythagore")
+        assert pythagore["nb_chunks"] == 3
+        assert pythagore["chunk_ids"] == ["p0", "p1", "p2"]
+        assert len(catalog) == 3
+
+    def test_resume_from_first_chunk(self):
+        """Le résumé vient du chunk d'index 0, tronqué à 200 caractères."""
+        catalog = LessonCatalog.from_collection(FakeCollection(CHUNKS))
+
+        resume = catalog.get("mathematiques", "Pythagore")["resume"]
+        assert resume.startswith("Début ")
+        assert resume.endswith("...")
+        assert len(resume) == 203
+
+    def test_lessons_sorted_and_filtered_by_niveau(self):
+        """Leçons triées par titre; le niveau "college" ne filtre pas."""
+        catalog = LessonCatalog.from_collection(FakeCollection(CHUNKS))
+
+        assert [l["titre"] for l in catalog.lessons("mathematiques")] == ["Pythagore", "Thalès"]
+        assert [l["titre"] for l in catalog.lessons("mathematiques", "3eme")] == ["Thalès"]
+        assert len(catalog.lessons("mathematiques", "college")) == 2
+        assert catalog.lessons("anglais") == []
+
+    def test_save_and_load(self, tmp_path):
+        """Le catalogue relu depuis le disque est identique."""
+        catalog = LessonCatalog.from_collection(FakeCollection(CHUNKS), version="42")
+        path = tmp_path / "cours_college.catalog.json"
+        catalog.save(path)
+
+        loaded = LessonCatalog.load(path)
+
+        assert loaded.version == "42"
+        assert loaded.lessons("mathematiques") == catalog.lessons("mathematiques")
+
+
+class TestCatalogHolder:
+    """Tests chargement / reconstruction du catalogue."""
+
+    def test_builds_once_then_serves_from_memory(self, tmp_path):
+        """Sans fichier: construit et sauvegarde, puis ne relit plus la collection."""
+        collection = FakeCollection(CHUNKS)
+        holder = CatalogHolder(collection, tmp_path, "cours_college")
+
+        holder.get()
+        calls = collection.get_calls
+        holder.get()
+
+        assert catalog_path(tmp_path, "cours_college").exists()
+        assert collection.get_calls == calls
+
+    def test_loads_existing_file_without_scan(self, tmp_path):
+        """Un catalogue sur disque à jour est chargé sans parcourir la collection."""
+        LessonCatalog.from_collection(FakeCollection(CHUNKS)).save(catalog_path(tmp_path, "cours_college"))
+        collection = FakeCollection(CHUNKS)
+
+        catalog = CatalogHolder(collection, tmp_path, "cours_college").get()
+
+        assert len(catalog) == 3
+        assert collection.get_calls == 0
+
+    def test_rebuilds_when_collection_version_changes(self, tmp_path):
+        """Après une ingestion (bump de version), le catalogue est reconstruit."""
+        collection = FakeCollection(CHUNKS)
+        holder = CatalogHolder(collection, tmp_path, "cours_college")
+        holder.get()
+
+        collection.chunks = CHUNKS + [make_chunk("f0", "Fractions", 0)]
+        bump_collections_version(tmp_path, "cours_college")
+
+        assert holder.get().get("mathematiques", "Fractions") is not None
+
+
+class TestLessonReconstruction:
+    """Tests recollage des chunks d'une leçon."""
+
+    def test_strip_title_prefix(self):
+        """Le préfixe "[titre]\\n" du chunker est retiré, le reste est inchangé."""
+        assert strip_title_prefix("[Pythagore]\nTexte", "Pythagore") == "Texte"
+        assert strip_title_prefix("[Autre]\nTexte", "Pythagore") == "[Autre]\nTexte"
+
+    def test_merge_removes_chunker_overlap(self):
+        """Recoller la sortie du chunker redonne le texte d'origine, sans doublon."""
+        from scraper.chunker import decouper_en_chunks
+
+        sections = [
+            f"Paragraphe {i}. " + " ".join(f"mot{i}_{j}" for j in range(90))
+            for i in range(12)
+        ]
+        texte = "\n\n".join(sections)
+        chunks = decouper_en_chunks(texte, titre="Leçon")
+        assert len(chunks) > 2
+
+        bodies = [strip_title_prefix(chunk["text"], "Leçon") for chunk in chunks]
+
+        assert merge_chunks(bodies) == texte
+
+    def test_merge_sections_builds_table_of_contents(self):
+        """Leçon découpée par sections: texte recollé et sommaire tiré des métadonnées."""
+        from scraper.chunker import decouper_sections_en_chunks
+
+        longue = " ".join(f"Phrase {j} de la démonstration." for j in range(150))
+        sections = [
+            {"titres": [], "texte": "Introduction."},
+            {"titres": ["Énoncé", "Cas général"], "texte": "Dans un triangle rectangle."},
+            {"titres": ["Démonstration"], "texte": longue},
+        ]
+        chunks = decouper_sections_en_chunks(sections, titre="Leçon")
+        metadatas = [
+            {"section": chunk["section"], "section_index": chunk["section_index"], "sections": "\n".join(chunk["sections"])}
+            for chunk in chunks
+        ]
+        bodies = [strip_title_prefix(chunk["text"], "Leçon") for chunk in chunks]
+
+        texte, sommaire = merge_sections(list(zip(bodies, metadatas)))
+
+        assert texte == (
+            "Introduction.\n\nCas général\n\nDans un triangle rectangle.\n\nDémonstration\n\n" + longue
+        )
+        assert [(entry["section"], entry["niveau"]) for entry in sommaire] == [
+            ("Énoncé", 1), ("Énoncé > Cas général", 2), ("Démonstration", 1)
+        ]
+        assert all(texte[entry["position"]:].startswith("Cas général") for entry in sommaire[:2])
+        assert texte[sommaire[2]["position"]:].startswith("Démonstration")
+
+    def test_merge_sections_without_metadata(self):
+        """Chunks sans métadonnées de section: recollés comme avant, sommaire vide."""
+        assert merge_sections([("Premier chunk.", {}), ("Second chunk.", None)]) == (
+            "Premier chunk.\n\nSecond chunk.", []
+        )
+
+    def test_merge_without_overlap_keeps_both(self):
+        """Sans recouvrement, les chunks sont séparés par une ligne vide."""
+        assert merge_chunks(["Premier chunk.", "Second chunk."]) == "Premier chunk.\n\nSecond chunk."
+
+
+class TestLessonContentCache:
+    """Tests LRU des leçons reconstruites."""
+
+    def test_lru_eviction_and_copy(self):
+        """Éviction LRU; la leçon renvoyée est une copie."""
+        cache = LessonContentCache(max_entries=2)
+        cache.set(("v", "maths", "a"), {"titre": "a"})
+        cache.set(("v", "maths", "b"), {"titre": "b"})
+        cache.get(("v", "maths", "a"))["titre"] = "modifié"
+        cache.set(("v", "maths", "c"), {"titre": "c"})
+
+        assert cache.get(("v", "maths", "b")) is None
+        assert cache.get(("v", "maths", "a")) == {"titre": "a"}
@@ -0,0 +1,129 @@
+"""Tests des requêtes MediaWiki groupées (scraper/mediawiki.py) et de leur usage par les scrapers."""
+
+import pytest
+import requests
+
+from mediawiki_stub import StubMediaWiki
+from scraper import vikidia, wikiversite
+from scraper.mediawiki import ResultatPages, decouper_en_lots, interroger_pages, parametres_suivants
+
+
+TEXTE = "Contenu de leçon suffisamment long pour être gardé par le scraper. " * 3
+
+
+def get_json_pour(url):
+    session = requests.Session()
+
+    def get_json(params):
+        return session.get(url, params=params, timeout=10).json()
+    return get_json
+
+
+class TestResultatPages:
+    """Tests fusion des réponses."""
+
+    def test_merge_lists_and_fields_across_responses(self):
+        """Les catégories reçues en deux fois sont concaténées, l'extrait complété."""
+        resultat = ResultatPages()
+        resultat.ajouter({"query": {"pages": {"1": {"title": "A", "categories": [{"title": "C1"}]}}}})
+        resultat.ajouter({"query": {"pages": {"1": {"title": "A", "categories": [{"title": "C2"}],
+                                                    "extract": "texte"}}}})
+
+        page_id, page = resultat.page("A")
+        assert page_id == "1"
+        assert [c["title"] for c in page["categories"]] == ["C1", "C2"]
+        assert page["extract"] == "texte"
+
+    def test_normalized_and_redirect(self):
+        """Un titre demandé est retrouvé après normalisation puis redirection."""
+        resultat = ResultatPages()
+        resultat.ajouter({"query": {
+            "normalized": [{"from": "théorème de pythagore", "to": "Théorème de pythagore"}],
+            "redirects": [{"from": "Théorème de pythagore", "to": "Théorème de Pythagore"}],
+            "pages": {"7": {"title": "Théorème de Pythagore", "extract": "x"}},
+        }})
+
+        assert resultat.page("théorème de pythagore")[1]["title"] == "Théorème de Pythagore"
+
+    def test_missing_page(self):
+        """Page inexistante (id négatif) → None."""
+        resultat = ResultatPages()
+        resultat.ajouter({"query": {"pages": {"-1": {"title": "X", "missing": ""}}}})
+
+        assert resultat.page("X") is None
+        assert resultat.manquantes == {"X"}
+
+    def test_continue_params_replace_previous(self):
+        """La suite repart des paramètres d'origine + bloc continue."""
+        params = {"titles": "A|B"}
+        suite = parametres_suivants(params, {"continue": {"excontinue": 1, "continue": "||"}})
+
+        assert suite == {"titles": "A|B", "excontinue": 1, "continue": "||"}
+        assert parametres_suivants(params, {"batchcomplete": ""}) is None
+
+
+class TestInterrogerPages:
+    """Tests interrogation par lots contre le wiki factice."""
+
+    def test_batches_and_follows_excontinue(self):
+        """120 titres → 3 lots de ≤50 ; tous les extraits récupérés via excontinue."""
+        pages = {f"Page {i:03d}": {"extract": TEXTE} for i in range(120)}
+        with StubMediaWiki(pages=pages, extraits_complets_max=20) as wiki:
+            resultat = interroger_pages(
+                get_json_pour(wiki.url), sorted(pages), {**vikidia.PARAMS_EXTRAITS}
+            )
+
+        assert all(resultat.page(t)[1]["extract"] == TEXTE for t in pages)
+        assert [len(lot) for lot in decouper_en_lots(sorted(pages))] == [50, 50, 20]
+        # 3 lots, 20 extraits par réponse : 3 + 3 + 1 requêtes
+        assert len(wiki.requetes) == 7
+
+    def test_one_extract_per_response(self):
+        """Avec un serveur limité à 1 extrait complet par réponse, le résultat est identique."""
+        pages = {f"Page {i}": {"extract": TEXTE} for i in range(5)}
+        with StubMediaWiki(pages=pages) as wiki:
+            resultat = interroger_pages(get_json_pour(wiki.url), list(pages), {**vikidia.PARAMS_EXTRAITS})
+
+        assert all(resultat.page(t)[1]["extract"] == TEXTE for t in pages)
+        assert len(wiki.requetes) == 5
+
+
+@pytest.fixture
+def pas_de_delai(monkeypatch):
+    monkeypatch.setattr(vikidia, "DELAI_REQUETE", 0)
+    monkeypatch.setattr(wikiversite, "DELAI_REQUETE", 0)
+
+
+class TestScrapersGroupes:
+    """Tests extraction groupée dans les scrapers."""
+
+    def test_vikidia_extraire_articles(self, monkeypatch, tmp_path, pas_de_delai):
+        """Articles dans l'ordre demandé ; pages absentes ou trop courtes omises."""
+        pages = {"A": {"extract": TEXTE}, "B": {"extract": "court"}, "C": {"extract": TEXTE}}
+        with StubMediaWiki(pages=pages, extraits_complets_max=20) as wiki:
+            monkeypatch.setattr(vikidia, "API_URL", wiki.url)
+            scraper = vikidia.VikidiaScraper(dossier_sortie=str(tmp_path))
+            scraper.session = requests.Session()
+
+            articles = scraper._extraire_articles(["C", "Absent", "B", "A"], "mathematiques", "Catégorie:X")
+
+        assert [a["titre"] for a in articles] == ["C", "A"]
+        assert articles[0]["metadata"]["categorie"] == "Catégorie:X"
+        assert len(wiki.requetes) == 1
+
+    def test_wikiversite_extraire_lecons(self, monkeypatch, tmp_path, pas_de_delai):
+        """La matière est détectée depuis les catégories reçues dans la même requête."""
+        pages = {
+            "Fraction": {"extract": TEXTE, "categories": ["Catégorie:Leçons de la faculté Mathématiques"]},
+            "Cellule": {"extract": TEXTE, "categories": ["Catégorie:Leçons de la faculté Biologie"]},
+        }
+        with StubMediaWiki(pages=pages) as wiki:
+            monkeypatch.setattr(wikiversite, "API_URL", wiki.url)
+            scraper = wikiversite.WikiversiteScraper(dossier_sortie=str(tmp_path))
+            scraper.session = requests.Session()
+
+            lecons = scraper._extraire_lecons(["Fraction", "Cellule"], "6eme", 8)
+
+        assert [(l["titre"], l["metadata"]["matiere"]) for l in lecons] == [
+            ("Fraction", "mathematiques"), ("Cellule", "svt")
+        ]
@@ -0,0 +1,55 @@
+"""Tests unitaires pour backend/owners.py."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+from owners import OwnerLRU, open_personal_store, personal_collection_name, validate_owner  # noqa: E402
+
+
+class TestOwners:
+    """Tests identifiants d'élèves et collections."""
+
+    def test_validate_owner(self):
+        """Identifiant vide : pas de propriétaire ; caractères hors [A-Za-z0-9_-] refusés."""
+        assert validate_owner(None) is None
+        assert validate_owner("") is None
+        assert validate_owner("0b5f-eleve_12") == "0b5f-eleve_12"
+        for invalid in ("../autre", "a b", "x" * 65):
+            with pytest.raises(ValueError):
+                validate_owner(invalid)
+
+    def test_personal_collection_name(self):
+        """Une collection stable et distincte par élève, "mes_cours" sans élève."""
+        assert personal_collection_name() == "mes_cours"
+        name = personal_collection_name("eleve-1")
+        assert name == personal_collection_name("eleve-1")
+        assert name != personal_collection_name("eleve-2")
+        assert name.startswith("mes_cours_") and len(name) == len("mes_cours_") + 16
+
+    def test_open_personal_store_read_creates_nothing(self, tmp_path):
+        """En lecture, la collection d'un élève sans import n'est pas créée."""
+        embeddings = DeterministicFakeEmbedding(size=8)
+
+        assert open_personal_store("eleve-1", embeddings, str(tmp_path)) is None
+        store = open_personal_store("eleve-1", embeddings, str(tmp_path), create=True)
+        assert store._collection.name == personal_collection_name("eleve-1")
+        assert open_personal_store("eleve-1", embeddings, str(tmp_path)) is not None
+        assert open_personal_store("eleve-2", embeddings, str(tmp_path)) is None
+
+    def test_owner_lru(self):
+        """Les élèves les moins récemment utilisés sont oubliés au-delà de max_size."""
+        cache = OwnerLRU(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+        assert cache.put("a", 10) == 1  # déjà ouvert par un autre thread
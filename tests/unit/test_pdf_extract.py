@@ -0,0 +1,56 @@
+"""Tests unitaires pour backend/pdf_extract.py."""
+
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from langchain_community.document_loaders import PyPDFLoader
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from pdf_extract import count_pages, iter_pages, pages_per_task  # noqa: E402
+from pdf_stub import generer_pdf  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def pdf_40_pages(tmp_path_factory):
+    chemin = tmp_path_factory.mktemp("pdf") / "cours.pdf"
+    generer_pdf(chemin, 40, lignes=5)
+    return str(chemin)
+
+
+class TestIterPages:
+    """Tests extraction par tranches."""
+
+    def test_same_text_as_pypdfloader(self, pdf_40_pages):
+        """Sans pool, pages dans l'ordre et texte identique à PyPDFLoader."""
+        attendu = [page.page_content for page in PyPDFLoader(pdf_40_pages).load()]
+
+        pages = list(iter_pages(pdf_40_pages))
+
+        assert [numero for numero, _ in pages] == list(range(40))
+        assert [texte for _, texte in pages] == attendu
+        assert count_pages(pdf_40_pages) == 40
+
+    def test_pool_keeps_page_order(self, pdf_40_pages):
+        """Avec un pool, les tranches sont remises dans l'ordre des pages."""
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            pages = list(iter_pages(pdf_40_pages, pool, workers=1, max_in_flight=2))
+
+        assert pages == list(iter_pages(pdf_40_pages))
+
+    def test_process_pool(self, pdf_40_pages):
+        """Les tranches s'extraient dans des processus (spawn)."""
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pages = list(iter_pages(pdf_40_pages, pool, workers=2))
+
+        assert pages == list(iter_pages(pdf_40_pages))
+
+    def test_slice_size(self):
+        """Quelques tranches par processus, jamais moins de 16 pages."""
+        assert pages_per_task(40, workers=4) == 16
+        assert pages_per_task(1000, workers=4) == 63
+        assert pages_per_task(1000, workers=1) == 250
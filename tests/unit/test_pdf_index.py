@@ -0,0 +1,48 @@
+"""Tests unitaires pour backend/pdf_index.py."""
+
+import sys
+from pathlib import Path
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from pdf_index import PDFIndex  # noqa: E402
+
+
+class TestPDFIndex:
+    """Tests index filename -> chunks."""
+
+    def test_set_pop_persisted(self, tmp_path):
+        """Chaque modification est écrite sur disque."""
+        index = PDFIndex(tmp_path / "index.json")
+        index.set("a.pdf", ["id1", "id2"], nb_pages=2)
+        index.set("b.pdf", ["id3"])
+
+        assert PDFIndex(tmp_path / "index.json").get("a.pdf") == {"chunk_ids": ["id1", "id2"], "nb_pages": 2}
+        assert index.pop("a.pdf")["chunk_ids"] == ["id1", "id2"]
+        assert index.pop("a.pdf") is None
+        assert PDFIndex(tmp_path / "index.json").filenames() == ["b.pdf"]
+        assert not (tmp_path / "index.json.tmp").exists()
+
+    def test_unreadable_index_starts_empty(self, tmp_path):
+        """Un index corrompu est ignoré (la compaction le reconstruit)."""
+        (tmp_path / "index.json").write_text("{pas du json", encoding="utf-8")
+
+        index = PDFIndex(tmp_path / "index.json")
+
+        assert len(index) == 0
+        index.set("a.pdf", ["id1"])
+        assert PDFIndex(tmp_path / "index.json").get("a.pdf") == {"chunk_ids": ["id1"]}
+
+    def test_find_by_hash(self, tmp_path):
+        """L'empreinte retrouve le PDF, jusqu'à sa suppression, y compris après relecture."""
+        index = PDFIndex(tmp_path / "index.json")
+        index.set("a.pdf", ["id1"], sha256="aaa")
+        index.set("b.pdf", ["id2"])
+
+        assert index.find_by_hash("aaa") == "a.pdf"
+        assert PDFIndex(tmp_path / "index.json").find_by_hash("aaa") == "a.pdf"
+        index.pop("a.pdf")
+        assert index.find_by_hash("aaa") is None
+        index.replace_all({"c.pdf": {"chunk_ids": [], "sha256": "ccc"}})
+        assert index.find_by_hash("ccc") == "c.pdf"
@@ -0,0 +1,141 @@
+"""Tests unitaires pour backend/pdf_jobs.py."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from pdf_jobs import DONE, ERROR, PDFJobQueue, QueueFullError  # noqa: E402
+
+
+def wait_for(job, timeout=5.0):
+    """Attend qu'une tâche soit terminée (comme le polling du frontend)."""
+    deadline = time.monotonic() + timeout
+    while job.to_dict()["status"] not in (DONE, ERROR):
+        assert time.monotonic() < deadline, "tâche non terminée"
+        time.sleep(0.01)
+    return job.to_dict()
+
+
+class FakeProcess:
+    """Traitement factice: progression par page, mesure les traitements simultanés."""
+
+    def __init__(self, pages=3, delay=0.0, release=None):
+        self.pages = pages
+        self.delay = delay
+        self.release = release
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, file_path, progress):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if self.release is not None:
+                self.release.wait(5)
+            for page in range(1, self.pages + 1):
+                progress(nb_pages=page)
+                time.sleep(self.delay)
+            if file_path.endswith("casse.pdf"):
+                raise ValueError("PDF illisible")
+            progress(nb_chunks=10, nb_chunks_embedded=10)
+            return {"filename": Path(file_path).name, "nb_pages": self.pages, "nb_chunks": 10}
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class TestPDFJobQueue:
+    """Tests file de traitement."""
+
+    def test_job_reports_progress_and_result(self):
+        """La tâche passe à "done" avec sa progression et le résultat du traitement."""
+        queue = PDFJobQueue(FakeProcess(pages=4))
+
+        job = queue.submit("/tmp/cours.pdf", "cours.pdf")
+        state = wait_for(job)
+
+        assert queue.get(job.id) is job
+        assert state["status"] == DONE
+        assert state["nb_pages"] == 4
+        assert state["nb_chunks_embedded"] == state["nb_chunks"] == 10
+        assert state["error"] is None
+        queue.shutdown()
+
+    def test_options_passed_to_process(self):
+        """Les options de submit sont passées au traitement."""
+        calls = []
+        queue = PDFJobQueue(lambda file_path, progress, **options: calls.append(options) or {})
+
+        wait_for(queue.submit("/tmp/cours.pdf", "cours.pdf", sha256="abc"))
+
+        assert calls == [{"sha256": "abc"}]
+        queue.shutdown()
+
+    def test_job_owner(self):
+        """Le propriétaire passé à submit est gardé sur la tâche (contrôle d'accès de /api/jobs)."""
+        queue = PDFJobQueue(lambda file_path, progress, **options: {})
+
+        job = queue.submit("/tmp/cours.pdf", "cours.pdf", owner="alice")
+        wait_for(job)
+
+        assert job.owner == "alice"
+        assert queue.submit("/tmp/autre.pdf", "autre.pdf").owner is None
+        queue.shutdown()
+
+    def test_error_is_reported(self):
+        """Une exception du traitement met la tâche en erreur, avec le message."""
+        queue = PDFJobQueue(FakeProcess())
+
+        state = wait_for(queue.submit("/tmp/casse.pdf", "casse.pdf"))
+
+        assert state["status"] == ERROR
+        assert state["error"] == "PDF illisible"
+        assert state["nb_pages"] == 3
+        queue.shutdown()
+
+    def test_bounded_concurrency(self):
+        """Jamais plus de max_workers PDFs traités en même temps."""
+        process = FakeProcess(pages=2, delay=0.02)
+        queue = PDFJobQueue(process, max_workers=2)
+
+        jobs = [queue.submit(f"/tmp/{i}.pdf", f"{i}.pdf") for i in range(6)]
+        states = [wait_for(job) for job in jobs]
+
+        assert all(state["status"] == DONE for state in states)
+        assert process.max_running == 2
+        queue.shutdown()
+
+    def test_queue_full_then_accepts_again(self):
+        """Au-delà de max_pending tâches non terminées, l'upload est refusé."""
+        release = threading.Event()
+        queue = PDFJobQueue(FakeProcess(release=release), max_workers=1, max_pending=2)
+        jobs = [queue.submit("/tmp/a.pdf", "a.pdf"), queue.submit("/tmp/b.pdf", "b.pdf")]
+
+        with pytest.raises(QueueFullError):
+            queue.submit("/tmp/c.pdf", "c.pdf")
+
+        release.set()
+        for job in jobs:
+            wait_for(job)
+        assert wait_for(queue.submit("/tmp/c.pdf", "c.pdf"))["status"] == DONE
+        queue.shutdown()
+
+    def test_old_finished_jobs_forgotten(self):
+        """Seules les max_finished tâches terminées les plus récentes restent consultables."""
+        queue = PDFJobQueue(FakeProcess(pages=1), max_workers=1, max_finished=2)
+
+        jobs = []
+        for i in range(4):
+            jobs.append(queue.submit(f"/tmp/{i}.pdf", f"{i}.pdf"))
+            wait_for(jobs[-1])
+
+        assert [queue.get(job.id) is not None for job in jobs] == [False, False, True, True]
+        queue.shutdown()
@@ -0,0 +1,319 @@
+"""Tests unitaires pour PDFService (backend/pdf_service.py), sans OpenAI."""
+
+import hashlib
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+import pdf_service  # noqa: E402
+from pdf_index import PDFIndex  # noqa: E402
+from pdf_service import PDFService  # noqa: E402
+from pdf_stub import generer_pdf  # noqa: E402
+
+
+class FakeVectorStore:
+    """add_documents / delete en mémoire ; peut échouer au n-ième lot."""
+
+    def __init__(self, fail_on_batch=None):
+        self.documents = {}
+        self.batches = 0
+        self.fail_on_batch = fail_on_batch
+
+    def add_documents(self, documents):
+        self.batches += 1
+        if self.batches == self.fail_on_batch:
+            raise RuntimeError("API indisponible")
+        ids = [f"id{len(self.documents) + i}" for i in range(len(documents))]
+        self.documents.update(zip(ids, documents))
+        return ids
+
+    def delete(self, ids):
+        for doc_id in ids:
+            del self.documents[doc_id]
+
+
+def make_service(tmp_path, store, pool=None):
+    service = PDFService.__new__(PDFService)
+    service.upload_dir = tmp_path
+    service.chroma_dir = str(tmp_path)
+    service.index = PDFIndex(tmp_path / "index.json")
+    service.text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    service.vector_store = store
+    service.extract_pool = pool
+    service.extract_workers = 2
+    return service
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    chemin = tmp_path / "20250101_000000_cours.pdf"
+    generer_pdf(chemin, 60)
+    return str(chemin)
+
+
+class TestProcessPdf:
+    """Tests traitement au fil de l'eau."""
+
+    def test_chunks_added_in_batches_with_progress(self, tmp_path, pdf_path):
+        """Chunks ajoutés par lots pendant l'extraction, numérotés dans l'ordre des pages."""
+        store = FakeVectorStore()
+        updates = []
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            result = make_service(tmp_path, store, pool).process_pdf(pdf_path, lambda **p: updates.append(p))
+
+        documents = list(store.documents.values())
+        assert result["nb_pages"] == 60
+        assert result["nb_chunks"] == len(documents)
+        assert store.batches > 1
+        assert [d.metadata["chunk_index"] for d in documents] == list(range(len(documents)))
+        assert [d.metadata["page"] for d in documents] == sorted(d.metadata["page"] for d in documents)
+        assert documents[0].metadata["filename"] == "20250101_000000_cours.pdf"
+        assert updates[0] == {"nb_pages_total": 60}
+        # Un lot embeddé avant la dernière page lue
+        first_embedded = next(i for i, u in enumerate(updates) if "nb_chunks_embedded" in u)
+        last_page = next(i for i, u in enumerate(updates) if u.get("nb_pages") == 60)
+        assert first_embedded < last_page
+        assert updates[-1] == {"nb_chunks_embedded": result["nb_chunks"]}
+        assert make_service(tmp_path, store).index.get(result["filename"])["chunk_ids"] == list(store.documents)
+
+    def test_failure_removes_added_chunks(self, tmp_path, pdf_path):
+        """Si un lot échoue, les chunks déjà ajoutés sont retirés."""
+        store = FakeVectorStore(fail_on_batch=3)
+
+        with pytest.raises(RuntimeError):
+            make_service(tmp_path, store).process_pdf(pdf_path)
+
+        assert store.documents == {}
+        assert make_service(tmp_path, store).index.get("20250101_000000_cours.pdf") is None
+
+    def test_empty_pdf_rejected(self, tmp_path):
+        """Un PDF sans texte (ex: scanné) est refusé."""
+        chemin = tmp_path / "vide.pdf"
+        generer_pdf(chemin, 2, lignes=0)
+
+        with pytest.raises(ValueError):
+            make_service(tmp_path, FakeVectorStore()).process_pdf(str(chemin))
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeddings déterministes (hash du texte)."""
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255 for b in digest[:8]]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def chroma_service(tmp_path, monkeypatch):
+    """PDFService sur une vraie base ChromaDB (tmp_path), embeddings factices."""
+    monkeypatch.setattr(pdf_service, "get_shared_embeddings", lambda model: FakeEmbeddings())
+    return PDFService(upload_dir=str(tmp_path / "pdfs"), chroma_dir=str(tmp_path / "chroma"), extract_workers=0)
+
+
+def import_pdf(service, filename, nb_pages=3):
+    chemin = service.upload_dir / filename
+    generer_pdf(chemin, nb_pages)
+    return service.process_pdf(str(chemin))
+
+
+def filenames_found(service):
+    """PDFs d'où viennent les chunks renvoyés par la recherche (tous les chunks)."""
+    return {doc["filename"] for doc in service.search_in_personal_docs("photosynthese", top_k=1000)}
+
+
+class TestDeletePdf:
+    """Tests suppression des chunks et compaction."""
+
+    def test_deleted_pdf_no_longer_retrieved(self, chroma_service):
+        """Après suppression, la recherche ne renvoie plus rien du PDF supprimé."""
+        import_pdf(chroma_service, "a.pdf")
+        result_b = import_pdf(chroma_service, "b.pdf")
+        assert filenames_found(chroma_service) == {"a.pdf", "b.pdf"}
+
+        assert chroma_service.delete_pdf("a.pdf") is True
+
+        assert filenames_found(chroma_service) == {"b.pdf"}
+        remaining_ids = chroma_service.vector_store.get(include=[])["ids"]
+        assert sorted(remaining_ids) == sorted(chroma_service.index.get("b.pdf")["chunk_ids"])
+        assert len(remaining_ids) == result_b["nb_chunks"]
+        assert not (chroma_service.upload_dir / "a.pdf").exists()
+        assert chroma_service.index.filenames() == ["b.pdf"]
+        assert chroma_service.delete_pdf("a.pdf") is False
+
+    def test_delete_pdf_missing_from_index(self, chroma_service):
+        """Un PDF importé avant l'index est retrouvé par sa métadonnée filename."""
+        import_pdf(chroma_service, "a.pdf")
+        import_pdf(chroma_service, "b.pdf")
+        chroma_service.index.replace_all({})
+
+        assert chroma_service.delete_pdf("a.pdf") is True
+
+        assert filenames_found(chroma_service) == {"b.pdf"}
+
+    def test_index_survives_restart(self, chroma_service):
+        """L'index est relu depuis le disque."""
+        result = import_pdf(chroma_service, "a.pdf")
+
+        index = PDFIndex(chroma_service.upload_dir / "index.json")
+
+        assert len(index.get("a.pdf")["chunk_ids"]) == result["nb_chunks"]
+        assert index.get("a.pdf")["nb_pages"] == 3
+
+    def test_compact_removes_orphans_and_reindexes(self, chroma_service, monkeypatch):
+        """La compaction supprime les chunks des PDFs disparus et réindexe les autres."""
+        monkeypatch.setattr(pdf_service, "SCAN_BATCH_SIZE", 7)  # plusieurs pages de métadonnées
+        import_pdf(chroma_service, "a.pdf")
+        result_b = import_pdf(chroma_service, "b.pdf")
+        # Supprimé avant l'index : fichier parti, chunks restés
+        (chroma_service.upload_dir / "a.pdf").unlink()
+        chroma_service.index.replace_all({})
+
+        stats = chroma_service.compact()
+
+        assert stats["nb_files_deleted"] == 1
+        assert stats["nb_files_indexed"] == 1
+        assert filenames_found(chroma_service) == {"b.pdf"}
+        assert len(chroma_service.index.get("b.pdf")["chunk_ids"]) == result_b["nb_chunks"]
+        assert chroma_service.compact() == {"nb_chunks_deleted": 0, "nb_files_deleted": 0, "nb_files_indexed": 0}
+
+
+def upload_pdf(service, filename, content):
+    """Comme /api/upload-pdf : sauvegarde, doublon ou traitement."""
+    file_path, sha256 = service.save_pdf(io.BytesIO(content), filename)
+    return service.reuse_duplicate(file_path, sha256) or service.process_pdf(file_path, sha256=sha256)
+
+
+@pytest.fixture
+def pdf_bytes(tmp_path):
+    chemin = tmp_path / "source.pdf"
+    generer_pdf(chemin, 3)
+    return chemin.read_bytes()
+
+
+class TestDuplicateUpload:
+    """Tests détection des PDFs déjà importés (SHA-256)."""
+
+    def test_save_pdf_hashes_content(self, chroma_service, pdf_bytes, monkeypatch):
+        """L'empreinte est celle du contenu entier, copié en plusieurs blocs."""
+        monkeypatch.setattr(pdf_service, "UPLOAD_CHUNK_BYTES", 1000)
+
+        file_path, sha256 = chroma_service.save_pdf(io.BytesIO(pdf_bytes), "cours.pdf")
+
+        assert sha256 == hashlib.sha256(pdf_bytes).hexdigest()
+        assert Path(file_path).read_bytes() == pdf_bytes
+
+    def test_same_content_reused(self, chroma_service, pdf_bytes, monkeypatch):
+        """Un PDF déjà importé (même sous un autre nom) n'est ni extrait ni embeddé à nouveau."""
+        first = upload_pdf(chroma_service, "cours.pdf", pdf_bytes)
+        nb_ids = len(chroma_service.vector_store.get(include=[])["ids"])
+        monkeypatch.setattr(pdf_service, "iter_pages", None)  # échouerait si appelé
+
+        second = upload_pdf(chroma_service, "copie.pdf", pdf_bytes)
+
+        assert second["duplicate"] is True
+        assert second["filename"] == first["filename"]
+        assert second["nb_chunks"] == first["nb_chunks"]
+        assert len(chroma_service.vector_store.get(include=[])["ids"]) == nb_ids
+        assert [pdf["filename"] for pdf in chroma_service.list_pdfs()] == [first["filename"]]
+
+    def test_queued_duplicate_reused(self, chroma_service, pdf_bytes):
+        """Deux envois du même PDF avant la fin du premier traitement : traité une fois."""
+        first_path, sha256 = chroma_service.save_pdf(io.BytesIO(pdf_bytes), "cours.pdf")
+        second_path, _ = chroma_service.save_pdf(io.BytesIO(pdf_bytes), "copie.pdf")
+
+        first = chroma_service.process_pdf(first_path, sha256=sha256)
+        second = chroma_service.process_pdf(second_path, sha256=sha256)
+
+        assert second["duplicate"] is True
+        assert not Path(second_path).exists()
+        assert len(chroma_service.vector_store.get(include=[])["ids"]) == first["nb_chunks"]
+
+    def test_deleted_pdf_imported_again(self, chroma_service, pdf_bytes):
+        """Après suppression, le même contenu est de nouveau traité."""
+        first = upload_pdf(chroma_service, "cours.pdf", pdf_bytes)
+        chroma_service.delete_pdf(first["filename"])
+
+        again = upload_pdf(chroma_service, "cours.pdf", pdf_bytes)
+
+        assert "duplicate" not in again
+        assert len(chroma_service.vector_store.get(include=[])["ids"]) == again["nb_chunks"]
+
+
+class TestOwners:
+    """Tests séparation des PDFs par élève."""
+
+    def test_search_only_owner_documents(self, chroma_service, pdf_bytes):
+        """Chaque élève ne voit et ne cherche que ses PDFs, dans sa propre collection."""
+        upload_pdf(chroma_service, "partage.pdf", pdf_bytes)
+        mine = chroma_service.process_pdf(
+            chroma_service.save_pdf(io.BytesIO(pdf_bytes), "alice.pdf", owner="alice")[0], owner="alice"
+        )
+        other_path = chroma_service.space("bob", create=True).upload_dir / "bob.pdf"
+        generer_pdf(other_path, 2)
+        chroma_service.process_pdf(str(other_path), owner="bob")
+
+        found = chroma_service.search_in_personal_docs("photosynthese", top_k=1000, owner="alice")
+        assert {doc["filename"] for doc in found} == {mine["filename"]}
+        assert [pdf["filename"] for pdf in chroma_service.list_pdfs(owner="bob")] == ["bob.pdf"]
+        assert filenames_found(chroma_service) == {next(iter(chroma_service.index.filenames()))}
+        assert chroma_service.space("alice").collection != chroma_service.space("bob").collection
+        assert len(chroma_service.space("alice").vector_store.get(include=[])["ids"]) == mine["nb_chunks"]
+
+    def test_owner_cannot_delete_other_pdf(self, chroma_service, pdf_bytes):
+        """Supprimer ne touche qu'aux PDFs de l'élève qui le demande."""
+        path, sha256 = chroma_service.save_pdf(io.BytesIO(pdf_bytes), "cours.pdf", owner="alice")
+        result = chroma_service.process_pdf(path, sha256=sha256, owner="alice")
+
+        assert chroma_service.delete_pdf(result["filename"], owner="bob") is False
+        assert chroma_service.delete_pdf(result["filename"]) is False
+        assert chroma_service.delete_pdf(result["filename"], owner="alice") is True
+        assert chroma_service.search_in_personal_docs("photosynthese", top_k=1000, owner="alice") == []
+
+    def test_duplicates_detected_per_owner(self, chroma_service, pdf_bytes):
+        """Le même PDF importé par un autre élève est traité pour lui."""
+        path, sha256 = chroma_service.save_pdf(io.BytesIO(pdf_bytes), "cours.pdf", owner="alice")
+        chroma_service.process_pdf(path, sha256=sha256, owner="alice")
+
+        path, sha256 = chroma_service.save_pdf(io.BytesIO(pdf_bytes), "cours.pdf", owner="bob")
+
+        assert chroma_service.reuse_duplicate(path, sha256, owner="bob") is None
+        result = chroma_service.process_pdf(path, sha256=sha256, owner="bob")
+        assert "duplicate" not in result
+        assert len(chroma_service.space("bob").vector_store.get(include=[])["ids"]) == result["nb_chunks"]
+
+    def test_unknown_owner_creates_nothing(self, chroma_service):
+        """Lister, chercher, supprimer ou compacter avec un identifiant inconnu ne crée ni dossier ni collection."""
+        collections = chroma_service.vector_store._client.list_collections()
+
+        assert chroma_service.list_pdfs(owner="inconnu") == []
+        assert chroma_service.search_in_personal_docs("photosynthese", owner="inconnu") == []
+        assert chroma_service.delete_pdf("cours.pdf", owner="inconnu") is False
+        assert chroma_service.compact(owner="inconnu")["nb_chunks_deleted"] == 0
+
+        assert chroma_service.vector_store._client.list_collections() == collections
+        assert not (chroma_service.upload_dir / pdf_service.OWNERS_DIR).exists()
+
+    def test_open_owners_bounded(self, chroma_service):
+        """Au plus MAX_CACHED_OWNERS élèves gardés ouverts (LRU)."""
+        chroma_service._spaces.max_size = 2
+        for owner in ("a", "b", "c"):
+            chroma_service.space(owner, create=True)
+
+        assert len(chroma_service._spaces) == 2
+        assert chroma_service._spaces.get("a") is None
+        # Rouvert depuis le disque à la demande
+        assert chroma_service.space("a") is not None
@@ -0,0 +1,96 @@
+"""Tests de l'étape clean → chunk du pipeline (scraper/pipeline.py)."""
+
+from scraper import pipeline
+from scraper.chunk_store import lire_chunks
+
+
+PARAGRAPHE = "Une fraction représente une partie d'un tout partagé en parts égales. " * 8
+
+
+def article(i):
+    texte = f"Introduction de la leçon {i}.\n\n" + "\n\n".join([PARAGRAPHE] * (i % 4 + 1))
+    return {"titre": f"Leçon {i}", "texte": texte, "metadata": {"matiere": "mathematiques", "id": i}}
+
+
+class TestIterChunks:
+    """Tests séquentiel vs pool de processus."""
+
+    def test_workers_same_chunks_in_order(self):
+        """Avec un pool de processus, mêmes chunks dans le même ordre qu'en séquentiel."""
+        articles = [article(i) for i in range(30)]
+
+        sequentiel = list(pipeline.iterer_chunks(articles))
+        parallele = list(pipeline.iterer_chunks(articles, workers=2, taille_paquet=4))
+
+        assert parallele == sequentiel
+        assert [c["metadata"]["id"] for c in parallele] == sorted(c["metadata"]["id"] for c in sequentiel)
+
+    def test_short_articles_skipped(self):
+        """Un article trop court après nettoyage ne produit aucun chunk."""
+        articles = [{"titre": "Vide", "texte": "{{modèle}}", "metadata": {}}, article(1)]
+
+        chunks = pipeline.traiter_articles(articles)
+
+        assert chunks and all(c["metadata"]["id"] == 1 for c in chunks)
+
+
+class TestSections:
+    """Tests métadonnées de section des chunks."""
+
+    def test_chunks_carry_section_path(self):
+        """Sections courtes regroupées dans un chunk, avec le chemin de la plus longue et la liste des couvertes."""
+        texte = (
+            f"{PARAGRAPHE}\n== Définition ==\n{PARAGRAPHE}\n"
+            f"=== Exemple ===\nUn demi.\n== Propriétés ==\n{PARAGRAPHE * 6}"
+        )
+        articles = [{"titre": "Fractions", "texte": texte, "metadata": {"matiere": "mathematiques"}}]
+
+        chunks = pipeline.traiter_articles(articles)
+
+        metadonnees = [c["metadata"] for c in chunks]
+        assert [m["chunk_index"] for m in metadonnees] == list(range(len(chunks)))
+        assert (metadonnees[0]["section"], metadonnees[0]["section_niveau"]) == ("Définition", 1)
+        assert metadonnees[0]["sections"] == "\nDéfinition\nDéfinition > Exemple"
+        assert {m["section"] for m in metadonnees[1:]} == {"Propriétés"}
+        assert {m["sections"] for m in metadonnees[1:]} == {"Propriétés"}
+        assert len(metadonnees) > 2
+        assert chunks[0]["text"].startswith("[Fractions]\nUne fraction")
+        assert "\n\nDéfinition\n\n" in chunks[0]["text"]
+        assert chunks[0]["text"].endswith("\n\nExemple\n\nUn demi.")
+
+
+class TestDelta:
+    """Tests du redécoupage limité au delta du scraping incrémental."""
+
+    def test_only_delta_titles_rechunked(self, tmp_path, monkeypatch):
+        """Articles inchangés non redécoupés, chunks des titres supprimés retirés."""
+        monkeypatch.setattr(pipeline, "DOSSIER_PROCESSED", tmp_path)
+        base = "https://exemple.org/wiki/"
+
+        def lecon(titre, texte):
+            url = base + titre.replace(" ", "_")
+            return {"titre": titre, "texte": texte, "metadata": {"matiere": "mathematiques", "url": url}}
+
+        premier = [lecon("Fraction", PARAGRAPHE), lecon("Angle droit", PARAGRAPHE), lecon("Cercle", PARAGRAPHE)]
+        pipeline.appliquer_delta(
+            premier, {"ajoutes": ["Angle droit", "Cercle", "Fraction"], "modifies": [], "supprimes": []},
+            base, ["mathematiques"],
+        )
+
+        decoupes = []
+        iterer_chunks = pipeline.iterer_chunks
+        monkeypatch.setattr(
+            pipeline, "iterer_chunks",
+            lambda articles, *args, **kwargs: decoupes.extend(a["titre"] for a in articles)
+            or iterer_chunks(articles, *args, **kwargs),
+        )
+        second = [lecon("Fraction", "Une fraction se simplifie. " * 10), lecon("Cercle", PARAGRAPHE)]
+        pipeline.appliquer_delta(
+            second, {"ajoutes": [], "modifies": ["Fraction"], "supprimes": ["Angle droit"]},
+            base, ["mathematiques"],
+        )
+
+        chunks = list(lire_chunks(tmp_path / "mathematiques"))
+        assert decoupes == ["Fraction"]
+        assert {c["metadata"]["url"] for c in chunks} == {base + "Fraction", base + "Cercle"}
+        assert all("simplifie" in c["text"] for c in chunks if c["metadata"]["url"] == base + "Fraction")
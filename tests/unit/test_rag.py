@@ -0,0 +1,45 @@
+"""Tests unitaires pour RAGChain (backend/rag.py), sans OpenAI."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Les modules du backend s'importent entre eux sans préfixe de package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+import rag  # noqa: E402
+from rag import RAGChain  # noqa: E402
+from scraper.pipeline import _chunks_article  # noqa: E402
+
+LONGUE = " ".join(f"Phrase {j} de la section." for j in range(150))
+
+
+@pytest.fixture
+def rag_chain(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "get_shared_embeddings", lambda model: DeterministicFakeEmbedding(size=16))
+    monkeypatch.setattr(rag, "ChatOpenAI", lambda **kwargs: None)
+    return RAGChain(chroma_dir=str(tmp_path / "chroma"))
+
+
+class TestRetrieveSection:
+    """Tests filtre par section sur des chunks regroupés."""
+
+    def test_section_filter_finds_long_section_after_short_one(self, rag_chain):
+        """Une section courte regroupée avec la suivante ne lui retire pas ses chunks."""
+        texte = f"== A ==\n{LONGUE}\n== B ==\nCourt.\n== C ==\n{LONGUE}"
+        article = {"titre": "Leçon", "texte": texte, "metadata": {"matiere": "test", "url": "u"}}
+        chunks = _chunks_article(article)
+        rag_chain.vector_store.add_texts(
+            [chunk["text"] for chunk in chunks], metadatas=[chunk["metadata"] for chunk in chunks]
+        )
+
+        documents = rag_chain.retrieve("Phrase de la section", section="C")
+
+        chunks_c = [chunk for chunk in chunks if "C" in chunk["metadata"]["sections"].split("\n")]
+        assert len(chunks_c) >= 2
+        assert len(documents) == len(chunks_c)
+        assert all(doc.metadata["section"] == "C" for doc in documents)
+        assert any("\n\nC\n\nPhrase 0 " in doc.page_content for doc in documents)
@@ -0,0 +1,101 @@
+"""Tests du scraping incrémental (scraper/revisions.py) contre un wiki factice."""
+
+import json
+
+import pytest
+import requests
+
+from mediawiki_stub import StubMediaWiki
+from scraper import vikidia, vikidia_async
+from scraper.vikidia import VikidiaScraper
+from scraper.vikidia_async import VikidiaCrawlerAsync
+
+
+TEXTE = "Contenu encyclopédique suffisamment long pour être gardé par le scraper. " * 3
+
+
+@pytest.fixture
+def wiki(monkeypatch):
+    categories = {"Catégorie:Racine": {"pages": ["A", "B", "C"], "subcats": []}}
+    pages = {t: {"extract": TEXTE, "revid": 1} for t in ("A", "B", "C")}
+    racines = {"test": ["Catégorie:Racine"]}
+    monkeypatch.setattr(vikidia, "CATEGORIES_RACINES", racines)
+    monkeypatch.setattr(vikidia_async, "CATEGORIES_RACINES", racines)
+    monkeypatch.setattr(vikidia, "DELAI_REQUETE", 0)
+    with StubMediaWiki(categories, pages) as stub:
+        monkeypatch.setattr(vikidia, "API_URL", stub.url)
+        yield stub
+
+
+def scraper_sync(tmp_path, **kwargs):
+    scraper = VikidiaScraper(dossier_sortie=str(tmp_path), **kwargs)
+    scraper.session = requests.Session()
+    return scraper
+
+
+def scraper_async(wiki, tmp_path):
+    return VikidiaCrawlerAsync(
+        dossier_sortie=str(tmp_path), api_url=wiki.url, session=requests.Session(), debit=1000, rafale=100
+    )
+
+
+def modifier_wiki(wiki):
+    """B modifié, C supprimé de la catégorie, D ajouté."""
+    wiki.pages["B"] = {"extract": TEXTE + " Nouveau paragraphe.", "revid": 2}
+    wiki.pages["D"] = {"extract": TEXTE, "revid": 1}
+    wiki.categories["Catégorie:Racine"]["pages"] = ["A", "B", "D"]
+    wiki.requetes.clear()
+
+
+def titres_extraits(wiki):
+    return sorted({
+        titre
+        for r in wiki.requetes if r.get("prop") == "extracts"
+        for titre in r["titles"].split("|")
+    })
+
+
+@pytest.mark.parametrize("creer", [lambda wiki, tmp: scraper_sync(tmp), scraper_async])
+def test_second_run_fetches_only_changed(wiki, tmp_path, creer):
+    """Au 2e run, seuls les articles modifiés/ajoutés sont extraits ; le delta est écrit."""
+    premier = creer(wiki, tmp_path)
+    premier.scraper_matiere("test")
+    assert premier.deltas["test"] == {"ajoutes": ["A", "B", "C"], "modifies": [], "supprimes": []}
+
+    modifier_wiki(wiki)
+    second = creer(wiki, tmp_path)
+    articles = second.scraper_matiere("test")
+
+    assert titres_extraits(wiki) == ["B", "D"]
+    assert sorted(a["titre"] for a in articles) == ["A", "B", "D"]
+    assert next(a for a in articles if a["titre"] == "B")["texte"].endswith("Nouveau paragraphe.")
+    delta = {"ajoutes": ["D"], "modifies": ["B"], "supprimes": ["C"]}
+    assert second.deltas["test"] == delta
+    assert json.loads((tmp_path / "test.delta.json").read_text(encoding="utf-8")) == delta
+    manifeste = json.loads((tmp_path / "test.manifeste.json").read_text(encoding="utf-8"))
+    assert {t: r["revid"] for t, r in manifeste.items()} == {"A": 1, "B": 2, "D": 1}
+
+
+def test_full_run_refetches_everything(wiki, tmp_path):
+    """incremental=False : tout est retéléchargé, le delta reste calculé."""
+    scraper_sync(tmp_path).scraper_matiere("test")
+    modifier_wiki(wiki)
+
+    scraper = scraper_sync(tmp_path, incremental=False)
+    scraper.scraper_matiere("test")
+
+    assert titres_extraits(wiki) == ["A", "B", "D"]
+    assert scraper.deltas["test"]["modifies"] == ["B"]
+
+
+def test_failed_requests_do_not_report_deletions(wiki, tmp_path, monkeypatch):
+    """Si des requêtes échouent, les titres non revus ne sont pas signalés supprimés."""
+    scraper_sync(tmp_path).scraper_matiere("test")
+    monkeypatch.setattr(vikidia, "API_URL", "http://127.0.0.1:9/api.php")
+
+    scraper = scraper_sync(tmp_path)
+    scraper.scraper_matiere("test")
+
+    assert scraper.deltas["test"]["supprimes"] == []
+    manifeste = json.loads((tmp_path / "test.manifeste.json").read_text(encoding="utf-8"))
+    assert sorted(manifeste) == ["A", "B", "C"]
@@ -0,0 +1,177 @@
+"""Tests du crawler Vikidia asynchrone (scraper/vikidia_async.py) contre un wiki factice."""
+
+import asyncio
+import json
+import time
+
+import pytest
+import requests
+
+from mediawiki_stub import StubMediaWiki
+from scraper import vikidia_async
+from scraper.vikidia_async import JournalReprise, SeauAJetons, VikidiaCrawlerAsync
+
+
+TEXTE = "Contenu encyclopédique suffisamment long pour être gardé par le scraper. " * 3
+
+CATEGORIES = {
+    "Catégorie:Racine": {"pages": ["A", "B"], "subcats": ["Catégorie:Sous"]},
+    "Catégorie:Sous": {"pages": ["B", "C", "Court"], "subcats": []},
+}
+PAGES = {
+    "A": {"extract": TEXTE},
+    "B": {"extract": TEXTE},
+    "C": {"extract": TEXTE},
+    "Court": {"extract": "Trop court"},
+}
+
+
+@pytest.fixture
+def wiki(monkeypatch):
+    monkeypatch.setattr(vikidia_async, "CATEGORIES_RACINES", {"test": ["Catégorie:Racine"]})
+    with StubMediaWiki(CATEGORIES, PAGES) as stub:
+        yield stub
+
+
+def make_crawler(wiki, tmp_path, **kwargs):
+    return VikidiaCrawlerAsync(
+        dossier_sortie=str(tmp_path),
+        api_url=wiki.url,
+        session=requests.Session(),
+        debit=1000,
+        rafale=100,
+        **kwargs,
+    )
+
+
+def titres_extraits(wiki):
+    """Titres demandés dans les requêtes prop=extracts (groupées par lots)."""
+    return sorted({
+        titre
+        for r in wiki.requetes if r.get("prop") == "extracts"
+        for titre in r["titles"].split("|")
+    })
+
+
+class TestCrawl:
+    """Tests crawl complet."""
+
+    def test_crawl_recursive_dedup(self, wiki, tmp_path):
+        """Sous-catégories crawlées, chaque titre extrait une seule fois, pages courtes ignorées."""
+        articles = make_crawler(wiki, tmp_path).scraper_matiere("test")
+
+        assert sorted(a["titre"] for a in articles) == ["A", "B", "C"]
+        assert titres_extraits(wiki) == ["A", "B", "C", "Court"]
+        assert articles[0]["metadata"]["matiere"] == "test"
+        assert all(r["maxlag"] == "5" for r in wiki.requetes)
+
+    def test_output_file_and_journal_cleanup(self, wiki, tmp_path):
+        """Le fichier <matiere>.json est écrit et le journal de reprise supprimé."""
+        make_crawler(wiki, tmp_path).scraper_matiere("test")
+
+        with open(tmp_path / "test.json", encoding="utf-8") as f:
+            assert len(json.load(f)) == 3
+        assert not (tmp_path / ".reprise_test.jsonl").exists()
+
+    def test_retries_after_maxlag(self, wiki, tmp_path):
+        """Une réponse maxlag est retentée après le Retry-After."""
+        wiki.maxlag_a_renvoyer = 2
+
+        articles = make_crawler(wiki, tmp_path).scraper_matiere("test")
+
+        assert len(articles) == 3
+
+
+class TestReprise:
+    """Tests reprise d'un crawl interrompu."""
+
+    def test_resume_skips_done_categories_and_titles(self, wiki, tmp_path):
+        """Catégories terminées et titres du journal ne sont pas redemandés."""
+        journal = JournalReprise(tmp_path / ".reprise_test.jsonl")
+        article_c = {"titre": "C", "texte": TEXTE, "url": "", "metadata": {"matiere": "test"}}
+        journal.titre_traite("C", article_c)
+        journal.titre_traite("Court", None)
+        journal.categorie_terminee("Catégorie:Sous")
+        journal.titre_traite("A", {"titre": "A", "texte": TEXTE, "url": "", "metadata": {}})
+        journal.fermer()
+
+        articles = make_crawler(wiki, tmp_path).scraper_matiere("test")
+
+        assert sorted(a["titre"] for a in articles) == ["A", "B", "C"]
+        assert titres_extraits(wiki) == ["B"]
+        assert not any(r.get("cmtitle") == "Catégorie:Sous" for r in wiki.requetes)
+
+    def test_failed_lot_retried_on_resume(self, wiki, tmp_path, monkeypatch):
+        """Un lot en erreur garde le journal et sa catégorie ouverte : le run suivant le reprend."""
+        repondre = wiki.repondre
+
+        def extraits_en_panne(params):
+            if params.get("prop") == "extracts" and "C" in params["titles"].split("|"):
+                return 500, {}, {}
+            return repondre(params)
+
+        monkeypatch.setattr(wiki, "repondre", extraits_en_panne)
+        articles = make_crawler(wiki, tmp_path).scraper_matiere("test")
+
+        assert "C" not in {a["titre"] for a in articles}
+        journal = JournalReprise(tmp_path / ".reprise_test.jsonl")
+        journal.charger()
+        assert "C" not in journal.titres and "A" in journal.titres
+        assert journal.categories.isdisjoint({"Catégorie:Racine", "Catégorie:Sous"})
+
+        monkeypatch.setattr(wiki, "repondre", repondre)
+        wiki.requetes.clear()
+        articles = make_crawler(wiki, tmp_path).scraper_matiere("test")
+
+        assert sorted(a["titre"] for a in articles) == ["A", "B", "C"]
+        assert "C" in titres_extraits(wiki) and "A" not in titres_extraits(wiki)
+        assert not (tmp_path / ".reprise_test.jsonl").exists()
+
+    def test_truncated_last_line_ignored(self, tmp_path):
+        """Une ligne tronquée (crash pendant l'écriture) est ignorée."""
+        chemin = tmp_path / ".reprise_test.jsonl"
+        chemin.write_text('{"titre": "A", "article": null}\n{"titre": "B", "art', encoding="utf-8")
+
+        journal = JournalReprise(chemin)
+        journal.charger()
+
+        assert journal.titres == {"A"}
+
+
+class TestSession:
+    """Tests session HTTP par défaut."""
+
+    def test_session_pool_sized_to_concurrency(self):
+        """La session par défaut garde `concurrence` connexions HTTPS, avec le TLS de cloudscraper."""
+        session = VikidiaCrawlerAsync._creer_session(12)
+
+        adaptateur = session.get_adapter("https://fr.vikidia.org")
+        assert adaptateur.poolmanager.connection_pool_kw["maxsize"] == 12
+        assert adaptateur.poolmanager.connection_pool_kw["ssl_context"] is adaptateur.ssl_context
+        assert len(session.adapters) == 2
+
+
+class TestSeauAJetons:
+    """Tests limiteur de débit."""
+
+    def test_rate_limit(self):
+        """Au-delà de la rafale, les jetons arrivent au débit configuré."""
+        async def scenario():
+            seau = SeauAJetons(debit=50, capacite=1)
+            debut = time.monotonic()
+            for _ in range(6):
+                await seau.acquerir()
+            return time.monotonic() - debut
+
+        assert asyncio.run(scenario()) >= 5 / 50 * 0.9
+
+    def test_suspend(self):
+        """suspendre() retarde la prochaine acquisition."""
+        async def scenario():
+            seau = SeauAJetons(debit=1000, capacite=10)
+            seau.suspendre(0.1)
+            debut = time.monotonic()
+            await seau.acquerir()
+            return time.monotonic() - debut
+
+        assert asyncio.run(scenario()) >= 0.09